@@ -1,32 +1,52 @@
 """Album selection and download services."""
+import hashlib
 import os
+import re
+import string
+import threading
+import unicodedata
+import uuid
+from contextlib import nullcontext
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from difflib import SequenceMatcher
+import numpy as np
 import requests
-from PIL import Image
+from PIL import Image, features
 from io import BytesIO
-from typing import Optional, List, Dict, Any, Callable
+from typing import Optional, List, Dict, Any, Callable, NamedTuple, Sequence, Tuple
+from transport import Transport, build_retry
+from limiter import AdaptiveLimiter
+from query import fold, strip_edition
+from models import Album
+from freshness import ValidatorManifest
+from profiler import Profiler
 
 
 class AlbumSelector:
     """Handles album selection from search results."""
 
-    def __init__(self, output, input_fn=input):
+    def __init__(self, output, input_fn=input,
+                 on_list: Optional[Callable[[List[Album]], None]] = None):
         """
         Initialize album selector.
 
         Args:
             output: ConsoleOutput instance
             input_fn: Input function (for testing, default: built-in input)
+            on_list: Called with the listed albums before waiting for the
+                user's choice, e.g. to prefetch their artwork
         """
         self.output = output
         self.input_fn = input_fn
+        self.on_list = on_list
 
-    def choose_from_list(self, albums: List[Dict[str, Any]],
-                        get_artist_name: Callable) -> Optional[Dict[str, Any]]:
+    def choose_from_list(self, albums: List[Album],
+                        get_artist_name: Callable) -> Optional[Album]:
         """
         Prompt user to choose an album from a list.
 
         Args:
-            albums: List of album dictionaries
+            albums: List of album records
             get_artist_name: Function to extract artist name from album
 
         Returns:
@@ -41,8 +61,10 @@ class AlbumSelector:
             color = RED if idx < 10 else RESET
             artist_name = get_artist_name(album)
             self.output._print(
-                f"{color}{idx + 1}. {album['name']} by {artist_name}{RESET}"
+                f"{color}{idx + 1}. {album.name} by {artist_name}{RESET}"
             )
+        if self.on_list:
+            self.on_list(albums)
 
         try:
             choice_str = self.output.prompt(
@@ -58,38 +80,836 @@ class AlbumSelector:
         return albums[0]
 
 
+class AutoSelector:
+    """Selects the first (best-ranked) album without prompting."""
+
+    def choose_from_list(self, albums: List[Album],
+                         get_artist_name: Callable) -> Optional[Album]:
+        """
+        Pick the first album from a list.
+
+        Args:
+            albums: List of album records
+            get_artist_name: Unused, kept for AlbumSelector compatibility
+
+        Returns:
+            First album or None if no albums provided
+        """
+        return albums[0] if albums else None
+
+
+class AlbumMatcher:
+    """Scores how well search results match the user's query."""
+
+    def __init__(self, get_artist_name: Callable):
+        """
+        Initialize album matcher.
+
+        Args:
+            get_artist_name: Function to extract artist name from album
+        """
+        self.get_artist_name = get_artist_name
+
+    @staticmethod
+    def _similarity(a: str, b: str) -> float:
+        return SequenceMatcher(None, fold(a), fold(b)).ratio()
+
+    def score(self, query: str, album: Album) -> float:
+        """
+        Score an album against a query.
+
+        The query is compared with the album name alone and combined with
+        the artist name, so "Abbey Road", "Abbey Road The Beatles" and
+        "The Beatles Abbey Road" all score highly for the same album.
+        Case, punctuation and edition suffixes such as "(Remastered)" are
+        ignored on both sides.
+
+        Args:
+            query: Search query
+            album: Album record
+
+        Returns:
+            Similarity between 0.0 and 1.0
+        """
+        query = strip_edition(query)
+        name = strip_edition(album.name)
+        artist = self.get_artist_name(album)
+        return max(
+            self._similarity(query, name),
+            self._similarity(query, f"{name} {artist}"),
+            self._similarity(query, f"{artist} {name}"),
+        )
+
+    def rank(self, query: str,
+             albums: List[Album]) -> List[Album]:
+        """
+        Order albums by descending score, keeping Spotify's order on ties.
+
+        Args:
+            query: Search query
+            albums: List of album records
+
+        Returns:
+            New list of albums, best match first
+        """
+        return sorted(albums, key=lambda album: -self.score(query, album))
+
+
+class ImageEncoder:
+    """Encodes downloaded artwork into the configured output format."""
+
+    # format name -> (Pillow format, file extension, Pillow feature to check)
+    FORMATS = {
+        'jpeg': ('JPEG', '.jpg', 'jpg'),
+        'webp': ('WEBP', '.webp', 'webp'),
+        'avif': ('AVIF', '.avif', 'avif'),
+        'png': ('PNG', '.png', 'zlib'),
+    }
+
+    def __init__(self, fmt: str = 'jpeg', quality: int = 85,
+                 progressive: bool = False, optimize: bool = False,
+                 strip_metadata: bool = False):
+        """
+        Initialize image encoder.
+
+        Args:
+            fmt: Output format name ('jpeg', 'webp', 'avif' or 'png')
+            quality: Lossy quality from 1 to 100 (ignored for PNG)
+            progressive: Write progressive JPEGs
+            optimize: Spend extra CPU for smaller output files
+            strip_metadata: Drop EXIF and ICC profile data
+
+        Raises:
+            ValueError: If the format is unknown, unsupported by the
+                installed Pillow, or the quality is out of range
+        """
+        fmt = fmt.lower()
+        if fmt == 'jpg':
+            fmt = 'jpeg'
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        if not self.is_supported(fmt):
+            raise ValueError(
+                f"Output format {fmt} is not supported by the installed Pillow"
+            )
+        if not 1 <= quality <= 100:
+            raise ValueError("Quality must be between 1 and 100")
+
+        self.fmt = fmt
+        self.quality = quality
+        self.progressive = progressive
+        self.optimize = optimize
+        self.strip_metadata = strip_metadata
+
+    @classmethod
+    def is_supported(cls, fmt: str) -> bool:
+        """
+        Check whether the installed Pillow can write a format.
+
+        Args:
+            fmt: Output format name
+
+        Returns:
+            True if the format can be encoded, False otherwise
+        """
+        if fmt not in cls.FORMATS:
+            return False
+        return bool(features.check(cls.FORMATS[fmt][2]))
+
+    @property
+    def extension(self) -> str:
+        """File extension (including the dot) for the output format."""
+        return self.FORMATS[self.fmt][1]
+
+    def save_options(self, img: Image.Image) -> Dict[str, Any]:
+        """
+        Build the keyword arguments passed to ``Image.save``.
+
+        Args:
+            img: Image about to be saved
+
+        Returns:
+            Dictionary of Pillow save options
+        """
+        pil_format = self.FORMATS[self.fmt][0]
+        options: Dict[str, Any] = {'format': pil_format}
+
+        if self.fmt == 'png':
+            options['optimize'] = self.optimize
+        else:
+            options['quality'] = self.quality
+        if self.fmt == 'jpeg':
+            options['optimize'] = self.optimize
+            options['progressive'] = self.progressive
+        elif self.fmt == 'webp':
+            # method 6 is the slowest, best-compressing WebP encoder setting
+            options['method'] = 6 if self.optimize else 4
+        elif self.fmt == 'avif':
+            options['speed'] = 4 if self.optimize else 6
+
+        if not self.strip_metadata:
+            if img.info.get('exif'):
+                options['exif'] = img.info['exif']
+            if img.info.get('icc_profile'):
+                options['icc_profile'] = img.info['icc_profile']
+        return options
+
+    def save(self, img: Image.Image, save_path) -> None:
+        """
+        Encode an image and write it to disk.
+
+        Args:
+            img: Decoded source image
+            save_path: Local path (or binary file object) to save the
+                encoded image to
+        """
+        if self.fmt == 'jpeg' and img.mode not in ('RGB', 'L', 'CMYK'):
+            img = img.convert('RGB')
+        options = self.save_options(img)
+        if self.strip_metadata:
+            # Pillow falls back to img.info for some plugins
+            img.info = {}
+        img.save(save_path, **options)
+
+
+class ImageReport(NamedTuple):
+    """Result of analysing one piece of artwork."""
+
+    width: int
+    height: int
+    ahash: int
+    dhash: int
+    problems: Tuple[str, ...]
+
+
+# Problems reported by ImageAnalyzer
+TOO_SMALL = "too_small"
+NOT_SQUARE = "not_square"
+BLANK = "blank"
+PLACEHOLDER = "placeholder"
+# Problems that mean the artwork shouldn't be saved at all
+REJECTED_PROBLEMS = (BLANK, PLACEHOLDER)
+
+# Grayscale standard deviation below which an image counts as blank
+BLANK_STDDEV = 2.0
+
+ARTWORK_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.avif')
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Count set bits in each uint64 element."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    # NumPy < 2.0: sum bits byte by byte
+    as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1)
+
+
+class ImageAnalyzer:
+    """Validates downloaded artwork and computes perceptual hashes."""
+
+    HASH_SIZE = 8
+
+    def __init__(self, min_size: int = 300, max_aspect_ratio: float = 1.1,
+                 placeholder_hashes: Sequence[int] = (),
+                 max_distance: int = 5):
+        """
+        Initialize image analyzer.
+
+        Args:
+            min_size: Smallest acceptable width and height in pixels
+            max_aspect_ratio: Largest acceptable long/short side ratio
+            placeholder_hashes: dHashes of known placeholder images
+            max_distance: Hamming distance at or below which two hashes
+                count as the same image
+        """
+        self.min_size = min_size
+        self.max_aspect_ratio = max_aspect_ratio
+        self.placeholder_hashes = np.array(
+            [int(h) for h in placeholder_hashes], dtype=np.uint64
+        )
+        self.max_distance = max_distance
+
+    @staticmethod
+    def parse_hashes(text: str) -> List[int]:
+        """
+        Parse a comma-separated list of hexadecimal hashes.
+
+        Args:
+            text: Hashes, e.g. "f0e4c2d7a1b3c5d9,0000ffff0000ffff"
+
+        Returns:
+            List of integer hashes
+
+        Raises:
+            ValueError: If a hash isn't valid hexadecimal
+        """
+        return [int(h.strip(), 16) for h in text.split(',') if h.strip()]
+
+    @classmethod
+    def hashes(cls, img: Image.Image) -> Tuple[int, int, float]:
+        """
+        Compute the average hash and difference hash of an image.
+
+        Args:
+            img: Decoded image
+
+        Returns:
+            Tuple of (ahash, dhash, grayscale standard deviation)
+        """
+        size = cls.HASH_SIZE
+        gray = img.convert('L')
+        small = np.asarray(
+            gray.resize((size + 1, size), Image.Resampling.BOX), dtype=np.float32
+        )
+        # aHash over the left size x size block, dHash over adjacent pixels
+        ahash_bits = small[:, :size] > small[:, :size].mean()
+        dhash_bits = small[:, 1:] > small[:, :-1]
+        weights = 1 << np.arange(size * size, dtype=np.uint64)
+        ahash = int((ahash_bits.ravel().astype(np.uint64) * weights).sum())
+        dhash = int((dhash_bits.ravel().astype(np.uint64) * weights).sum())
+        return ahash, dhash, float(small.std())
+
+    def analyze(self, img: Image.Image) -> ImageReport:
+        """
+        Check an image's dimensions and content and hash it.
+
+        Args:
+            img: Decoded image
+
+        Returns:
+            ImageReport listing any problems found
+        """
+        width, height = img.size
+        ahash, dhash, spread = self.hashes(img)
+
+        problems = []
+        if min(width, height) < self.min_size:
+            problems.append(TOO_SMALL)
+        if max(width, height) > self.max_aspect_ratio * max(min(width, height), 1):
+            problems.append(NOT_SQUARE)
+        if spread < BLANK_STDDEV:
+            problems.append(BLANK)
+        if self.placeholder_hashes.size:
+            distances = _popcount(self.placeholder_hashes ^ np.uint64(dhash))
+            if distances.min() <= self.max_distance:
+                problems.append(PLACEHOLDER)
+        return ImageReport(width, height, ahash, dhash, tuple(problems))
+
+    @staticmethod
+    def open_safely(data: bytes) -> Image.Image:
+        """
+        Verify and decode image bytes.
+
+        Args:
+            data: Encoded image
+
+        Returns:
+            Fully loaded image
+
+        Raises:
+            Exception: If the data is truncated, corrupt, or a
+                decompression bomb
+        """
+        with Image.open(BytesIO(data)) as probe:
+            probe.verify()
+        img = Image.open(BytesIO(data))
+        img.load()
+        return img
+
+
+class DuplicateFinder:
+    """Finds near-duplicate artwork across a directory by perceptual hash."""
+
+    # Rows compared per block; bounds memory to block * n * 8 bytes
+    BLOCK_SIZE = 64
+    # Narrower chunks match too often to be worth indexing
+    MIN_CHUNK_BITS = 4
+
+    def __init__(self, analyzer: ImageAnalyzer, workers: int = 4):
+        """
+        Initialize duplicate finder.
+
+        Args:
+            analyzer: Analyzer providing hashes and thresholds
+            workers: Threads used to decode images while scanning
+        """
+        self.analyzer = analyzer
+        self.workers = workers
+
+    @staticmethod
+    def hash_file(path: str) -> Optional[Tuple[int, float]]:
+        """
+        Hash an artwork file.
+
+        Args:
+            path: Image file path
+
+        Returns:
+            Tuple of (dhash, grayscale standard deviation), or None if the
+            file can't be decoded
+        """
+        try:
+            with Image.open(path) as img:
+                # Let JPEG decode at reduced scale; hashing needs 9x8 pixels
+                img.draft('L', (64, 64))
+                _, dhash, spread = ImageAnalyzer.hashes(img)
+                return dhash, spread
+        except Exception:
+            return None
+
+    def scan(self, directory: str) -> List[Tuple[str, Optional[Tuple[int, float]]]]:
+        """
+        Hash every artwork file in a directory tree.
+
+        Args:
+            directory: Artwork directory
+
+        Returns:
+            List of (path, hash_file() result) sorted by path
+        """
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(directory)
+            for name in names
+            if name.lower().endswith(ARTWORK_EXTENSIONS)
+        )
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(zip(paths, executor.map(self.hash_file, paths)))
+
+    def find_pairs(self, hashes: np.ndarray) -> List[Tuple[int, int, int]]:
+        """
+        Find all pairs of hashes within the analyzer's max distance.
+
+        Hashes are split into max_distance + 1 bit chunks. Two hashes that
+        differ in at most max_distance bits must agree exactly on at least
+        one chunk, so only hashes sharing a chunk value are compared. Large
+        thresholds fall back to comparing everything in blocks.
+
+        Args:
+            hashes: uint64 array of dHashes
+
+        Returns:
+            List of (i, j, distance) with i < j, sorted
+        """
+        max_distance = self.analyzer.max_distance
+        chunks = max_distance + 1
+        if 64 // chunks < self.MIN_CHUNK_BITS:
+            return self._find_pairs_blocked(hashes)
+
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        found = []
+        bounds = np.linspace(0, 64, chunks + 1).astype(int)
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            mask = np.uint64((1 << int(high - low)) - 1)
+            keys = (hashes >> np.uint64(low)) & mask
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            # Compare each hash with the ones 1, 2, ... places later in its run
+            for shift in range(1, len(keys)):
+                same = keys[shift:] == keys[:-shift]
+                if not same.any():
+                    break
+                first = order[:-shift][same]
+                second = order[shift:][same]
+                distances = _popcount(hashes[first] ^ hashes[second])
+                close = distances <= max_distance
+                found.append(np.stack([
+                    np.minimum(first[close], second[close]),
+                    np.maximum(first[close], second[close]),
+                    distances[close].astype(np.int64),
+                ], axis=1))
+
+        if not found:
+            return []
+        # Pairs sharing several chunks were found more than once
+        pairs = np.unique(np.concatenate(found), axis=0)
+        return [tuple(pair) for pair in pairs.tolist()]
+
+    def _find_pairs_blocked(self, hashes: np.ndarray) -> List[Tuple[int, int, int]]:
+        """Compare every pair of hashes, a block of rows at a time."""
+        pairs = []
+        count = len(hashes)
+        for start in range(0, count, self.BLOCK_SIZE):
+            block = hashes[start:start + self.BLOCK_SIZE]
+            distances = _popcount(block[:, None] ^ hashes[None, start:])
+            rows, cols = np.nonzero(distances <= self.analyzer.max_distance)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                i, j = start + row, start + col
+                if i < j:
+                    pairs.append((i, j, int(distances[row, col])))
+        return sorted(pairs)
+
+    def find_placeholders(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Find hashes close to a known placeholder.
+
+        Args:
+            hashes: uint64 array of dHashes
+
+        Returns:
+            Indices of placeholder matches
+        """
+        placeholders = self.analyzer.placeholder_hashes
+        if not placeholders.size or not hashes.size:
+            return np.array([], dtype=np.int64)
+        distances = _popcount(hashes[:, None] ^ placeholders[None, :])
+        return np.nonzero(distances.min(axis=1) <= self.analyzer.max_distance)[0]
+
+    @staticmethod
+    def group_pairs(count: int, pairs: List[Tuple[int, int, int]]) -> List[List[int]]:
+        """
+        Merge duplicate pairs into groups (connected components).
+
+        Args:
+            count: Number of hashed items
+            pairs: Pairs from find_pairs()
+
+        Returns:
+            List of index groups with two or more members
+        """
+        parent = list(range(count))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j, _ in pairs:
+            parent[find(i)] = find(j)
+
+        groups: Dict[int, List[int]] = {}
+        for i in range(count):
+            groups.setdefault(find(i), []).append(i)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def analyze(self, hashed: List[Tuple[str, Optional[Tuple[int, float]]]]
+                ) -> Dict[str, List]:
+        """
+        Find duplicates, placeholders, blank and broken files.
+
+        Args:
+            hashed: List of (path, hash_file() result), e.g. from scan()
+
+        Returns:
+            Dictionary with 'duplicates' (lists of paths), 'placeholders',
+            'blank' and 'broken' (lists of paths)
+        """
+        paths, hashes, broken, blank = [], [], [], []
+        for path, result in hashed:
+            if result is None:
+                broken.append(path)
+                continue
+            dhash, spread = result
+            if spread < BLANK_STDDEV:
+                # Uniform images all hash alike; don't group them together
+                blank.append(path)
+                continue
+            paths.append(path)
+            hashes.append(dhash)
+
+        hashes = np.array(hashes, dtype=np.uint64)
+        groups = self.group_pairs(len(paths), self.find_pairs(hashes))
+        return {
+            'duplicates': [[paths[i] for i in group] for group in groups],
+            'placeholders': [paths[i] for i in self.find_placeholders(hashes)],
+            'blank': blank,
+            'broken': broken,
+        }
+
+    def analyze_directory(self, directory: str) -> Dict[str, List]:
+        """
+        Scan a directory for duplicates, placeholders and broken files.
+
+        Args:
+            directory: Artwork directory
+
+        Returns:
+            Report from analyze()
+        """
+        return self.analyze(self.scan(directory))
+
+
+class ArtworkPrefetcher:
+    """
+    Fetches candidate artwork in the background while the user chooses.
+
+    start() begins downloading the first ``count`` images of a result
+    list. take() hands over the chosen image, waiting for it if it's
+    still in flight, and discards the others: fetches that haven't
+    started are cancelled and finished ones dropped. At most ``count``
+    images are held in memory. Safe to share between threads.
+    """
+
+    def __init__(self, session: requests.Session, timeout: float = 10,
+                 count: int = 3):
+        """
+        Initialize prefetcher.
+
+        Args:
+            session: HTTP session images are fetched with
+            timeout: HTTP request timeout in seconds
+            count: Images fetched per result list
+
+        Raises:
+            ValueError: If count is less than 1
+        """
+        if count < 1:
+            raise ValueError("prefetch_count must be at least 1")
+        self.session = session
+        self.timeout = timeout
+        self.count = count
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=count,
+                                            thread_name_prefix="prefetch")
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def start(self, urls: Sequence[Optional[str]]) -> None:
+        """
+        Discard earlier fetches and start fetching the first images.
+
+        Args:
+            urls: Image URLs in the order they're listed (None for albums
+                without artwork)
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))[:self.count]
+        with self._lock:
+            self._discard()
+            for url in urls:
+                self._pending[url] = self._executor.submit(self._fetch, url)
+
+    def take(self, url: str) -> Optional[requests.Response]:
+        """
+        Get a prefetched image and discard the rest.
+
+        Args:
+            url: Image URL about to be downloaded
+
+        Returns:
+            Successful response, or None if the image wasn't prefetched
+            or its fetch failed
+        """
+        with self._lock:
+            future = self._pending.pop(url, None)
+            self._discard()
+        response = None
+        if future is not None:
+            try:
+                # Already started, so waiting beats starting over
+                response = future.result()
+            except CancelledError:
+                pass
+        with self._lock:
+            if response is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return response
+
+    def discard(self) -> None:
+        """Cancel pending fetches and drop fetched images."""
+        with self._lock:
+            self._discard()
+
+    def close(self) -> None:
+        """Discard everything and stop the fetch threads."""
+        self.discard()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _discard(self) -> None:
+        """Cancel and forget every fetch; caller holds the lock."""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def _fetch(self, url: str) -> Optional[requests.Response]:
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            return None
+        # Errors are left to the regular download, which reports them
+        return response if response.status_code == 200 else None
+
+
 class AlbumDownloader:
     """Handles album artwork download operations."""
 
-    def __init__(self, output, timeout: int = 10):
+    def __init__(self, output, timeout: float = 10,
+                 encoder: Optional[ImageEncoder] = None,
+                 session: Optional[requests.Session] = None,
+                 analyzer: Optional[ImageAnalyzer] = None,
+                 processor=None,
+                 manifest: Optional[ValidatorManifest] = None,
+                 profiler: Optional[Profiler] = None,
+                 prefetcher: Optional[ArtworkPrefetcher] = None):
         """
         Initialize album downloader.
 
         Args:
             output: ConsoleOutput instance
             timeout: HTTP request timeout in seconds
+            encoder: Output encoder (None keeps Pillow's defaults for the
+                save path's extension)
+            session: HTTP session to reuse connections (None issues
+                standalone requests)
+            analyzer: Validates artwork before saving (None skips checks)
+            processor: Image process pool that decodes, validates and
+                encodes in worker processes instead of this thread (None
+                processes in-thread)
+            manifest: ETag/Last-Modified of saved files, used to ask for
+                existing artwork only if it changed (None always downloads)
+            profiler: Attributes time and allocations to the download,
+                decode and save stages (None doesn't profile)
+            prefetcher: Background fetches of candidate artwork; a
+                prefetched image is used instead of requesting it again
+                (None always requests)
         """
         self.output = output
         self.timeout = timeout
+        self.encoder = encoder
+        self.session = session
+        self.analyzer = analyzer
+        self.processor = processor
+        self.manifest = manifest
+        self.profiler = profiler
+        self.prefetcher = prefetcher
+        self.bytes_downloaded = 0
+        self.not_modified = 0
+        self._bytes_lock = threading.Lock()
+        self._local = threading.local()
+
+    def last_status(self) -> Optional[int]:
+        """
+        HTTP status of the calling thread's last download.
+
+        Returns:
+            Status code, or None if no response arrived
+        """
+        return getattr(self._local, "status", None)
+
+    @staticmethod
+    def create_session(pool_connections: int = 10, pool_maxsize: int = 10,
+                       max_retries: int = 3, backoff_factor: float = 0.3,
+                       transport: Optional[Transport] = None,
+                       http2_streams: int = 0,
+                       http2_connections: int = 2,
+                       limiter: Optional[AdaptiveLimiter] = None) -> requests.Session:
+        """
+        Create a pooled HTTP session with a retry policy.
+
+        Args:
+            pool_connections: Number of host connection pools to cache
+            pool_maxsize: Maximum connections kept per host
+            max_retries: Maximum retries for failed or rate-limited requests
+            backoff_factor: Exponential backoff factor between retries
+            transport: Live, recording or replay transport (default: live)
+            http2_streams: Fetch images over HTTP/2 with up to this many
+                concurrent streams (0 uses pooled HTTP/1.1)
+            http2_connections: HTTP/2 connections kept per host
+            limiter: Adaptive limit on concurrent image requests (None
+                leaves them unlimited)
+
+        Returns:
+            Configured requests Session
+
+        Raises:
+            ValueError: If HTTP/2 is requested but httpx isn't installed
+        """
+        return (transport or Transport()).create_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=build_retry(max_retries, backoff_factor),
+            http2_streams=http2_streams,
+            http2_connections=http2_connections,
+            limiter=limiter
+        )
 
     def download(self, image_url: str, save_path: str) -> bool:
         """
         Download album artwork from URL and save to file.
 
+        If the file was saved from the same URL before and hasn't changed
+        since, the request is conditional and a 304 Not Modified answer
+        keeps the file as it is. Otherwise an image the prefetcher already
+        fetched is saved without requesting it again.
+
         Args:
             image_url: URL of the album artwork image
             save_path: Local path to save the image
 
         Returns:
-            True if successful, False otherwise
+            True if saved or confirmed unchanged, False otherwise
         """
+        self._local.status = None
         try:
-            response = requests.get(image_url, timeout=self.timeout)
+            http = self.session or requests
+            conditional = {}
+            if self.manifest is not None:
+                conditional = self.manifest.conditional_headers(
+                    save_path, image_url
+                )
+            response = None
+            if self.prefetcher is not None:
+                if conditional:
+                    # The saved file may be current; a 304 beats
+                    # rewriting it from a full prefetched copy
+                    self.prefetcher.discard()
+                else:
+                    response = self.prefetcher.take(image_url)
+            if response is None:
+                with self._stage("download"):
+                    if conditional:
+                        response = http.get(image_url, timeout=self.timeout,
+                                            headers=conditional)
+                    else:
+                        response = http.get(image_url, timeout=self.timeout)
+            self._local.status = response.status_code
+            if response.status_code == 304 and conditional:
+                self.manifest.revalidated(save_path, response.headers)
+                with self._bytes_lock:
+                    self.not_modified += 1
+                self.output.info(f"Artwork unchanged: {save_path}")
+                return True
             response.raise_for_status()
+            with self._bytes_lock:
+                self.bytes_downloaded += len(response.content)
 
             try:
-                img = Image.open(BytesIO(response.content))
-                img.save(save_path)
+                directory = os.path.dirname(save_path)
+                if directory:
+                    # Path templates may place artwork in subdirectories
+                    os.makedirs(directory, exist_ok=True)
+                if self.processor:
+                    if not self._process_in_pool(response.content, save_path):
+                        return False
+                else:
+                    with self._stage("decode"):
+                        if self.analyzer:
+                            img = self.analyzer.open_safely(response.content)
+                            report = self.analyzer.analyze(img)
+                        else:
+                            img = Image.open(BytesIO(response.content))
+                            report = None
+                    if report is not None and not self._check_report(report):
+                        return False
+                    with self._stage("save"):
+                        if self.encoder:
+                            self._write_atomically(
+                                save_path, lambda f: self.encoder.save(img, f)
+                            )
+                        else:
+                            # Format by the real extension, not the temp file's
+                            pil_format = Image.registered_extensions().get(
+                                os.path.splitext(save_path)[1].lower()
+                            )
+                            self._write_atomically(
+                                save_path, lambda f: img.save(f, format=pil_format)
+                            )
+                if self.manifest is not None:
+                    self.manifest.record(save_path, image_url, response.headers)
                 self.output.success(f"Album artwork saved to {save_path}")
                 return True
             except Exception as e:
@@ -110,25 +930,211 @@ class AlbumDownloader:
             self.output.error(f"Error: Failed to download album artwork: {e}")
             return False
 
+    def _process_in_pool(self, data: bytes, save_path: str) -> bool:
+        """Decode and encode in the process pool, then write the result."""
+        with self._stage("decode"):
+            processed = self.processor.process(data)
+        if processed.report and not self._check_report(processed.report):
+            return False
+        with self._stage("save"):
+            self._write_atomically(save_path, lambda f: f.write(processed.data))
+        return True
+
+    @staticmethod
+    def _write_atomically(save_path: str, write: Callable[[Any], Any]) -> None:
+        """
+        Write a file through a temporary file in the same directory.
+
+        Existing artwork is only replaced once the new file is complete,
+        so a failed or interrupted save never leaves a truncated image.
+
+        Args:
+            save_path: Final file path
+            write: Function writing the contents to a binary file object
+        """
+        directory, name = os.path.split(save_path)
+        # Not mkstemp: its 0600 mode would ignore the umask
+        temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, 'xb') as f:
+                write(f)
+            os.replace(temp_path, save_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _stage(self, name: str):
+        """Profile a stage of a download, if profiling."""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name)
+
+    def _check_report(self, report: ImageReport) -> bool:
+        """Warn about questionable artwork; False if it should be skipped."""
+        if not report.problems:
+            return True
+        problems = ", ".join(report.problems).replace("_", " ")
+        if any(problem in REJECTED_PROBLEMS for problem in report.problems):
+            self.output.error(
+                f"Error: Artwork looks like a placeholder ({problems}); not saved."
+            )
+            return False
+        self.output.warning(
+            f"Warning: Artwork is {report.width}x{report.height} ({problems})."
+        )
+        return True
+
+
+# Device names Windows won't create as files, with or without an extension
+RESERVED_NAMES = frozenset(
+    ['CON', 'PRN', 'AUX', 'NUL']
+    + [f'COM{i}' for i in range(1, 10)]
+    + [f'LPT{i}' for i in range(1, 10)]
+)
+# Longest path component in UTF-8 bytes, leaving room for an extension and
+# a disambiguating suffix under the usual 255-byte filesystem limit
+MAX_COMPONENT_BYTES = 200
+
+
+class PathTemplate:
+    """
+    Builds artwork file paths from a template such as
+    ``{artist}/{album} [{year}]``.
+
+    Fields: album, artist, year, album_id and provider. Slashes separate
+    directories; each field value and path component is sanitized, and
+    brackets left empty by a missing field are removed. Paths can be
+    spread over hash-named subdirectories to keep directories small.
+    """
+
+    FIELDS = ('album', 'artist', 'year', 'album_id', 'provider')
+    _EMPTY_BRACKETS = re.compile(r'\(\s*\)|\[\s*\]|\{\s*\}')
+
+    def __init__(self, template: str = '{album}', shards: int = 0,
+                 extension: str = '.jpg'):
+        """
+        Initialize path template.
+
+        Args:
+            template: Relative path template; a trailing image extension
+                is replaced by ``extension``
+            shards: Levels of two-hex-digit subdirectories (0-3) derived
+                from a hash of the rendered path
+            extension: File extension including the dot
+
+        Raises:
+            ValueError: If the template is empty, absolute, uses an
+                unknown field, or shards is out of range
+        """
+        template = template.strip().replace('\\', '/')
+        root, ext = os.path.splitext(template)
+        if ext.lower() in ARTWORK_EXTENSIONS:
+            template = root
+        if not template or template.startswith('/'):
+            raise ValueError(f"Invalid path template: {template!r}")
+        for _, field, _, _ in string.Formatter().parse(template):
+            if field is not None and field not in self.FIELDS:
+                raise ValueError(
+                    f"Unknown path template field: {{{field}}} "
+                    f"(choose from {', '.join(self.FIELDS)})"
+                )
+        if not 0 <= shards <= 3:
+            raise ValueError("Path shards must be between 0 and 3")
+        self.template = template
+        self.shards = shards
+        self.extension = extension
+
+    def fields(self, album: Album, artist: str = '') -> Dict[str, str]:
+        """
+        Template field values for an album, each sanitized.
+
+        Args:
+            album: Album record
+            artist: Artist name
+
+        Returns:
+            Dictionary of field name to value
+        """
+        values = {
+            'album': album.name,
+            'artist': artist,
+            'year': album.year,
+            'album_id': album.id,
+            'provider': album.provider,
+        }
+        return {
+            name: FilenameUtil.sanitize(value) if value else ''
+            for name, value in values.items()
+        }
+
+    def render(self, album: Album, artist: str = '',
+               disambiguate: bool = False) -> str:
+        """
+        Build the relative artwork path for an album.
+
+        Args:
+            album: Album record
+            artist: Artist name
+            disambiguate: Append the album ID to the file name, for when
+                another album already uses the plain path
+
+        Returns:
+            Relative path including the extension
+        """
+        rendered = self.template.format(**self.fields(album, artist))
+        parts = []
+        for part in rendered.split('/'):
+            part = ' '.join(self._EMPTY_BRACKETS.sub('', part).split())
+            if part and part not in ('.', '..'):
+                parts.append(FilenameUtil.sanitize(part))
+        if not parts:
+            parts = ['_']
+        if disambiguate and album.id:
+            parts[-1] += f" [{FilenameUtil.sanitize(album.id)[:12]}]"
+        parts[-1] += self.extension
+
+        if self.shards:
+            digest = hashlib.sha1('/'.join(parts).encode('utf-8')).hexdigest()
+            parts = [digest[2 * i:2 * i + 2] for i in range(self.shards)] + parts
+        return os.path.join(*parts)
+
 
 class FilenameUtil:
     """Utility for filename operations."""
 
     @staticmethod
-    def sanitize(filename: str) -> str:
+    def sanitize(filename: str, max_bytes: int = MAX_COMPONENT_BYTES) -> str:
         """
         Sanitize a filename by replacing invalid characters.
 
+        The name is NFC-normalized, characters invalid on common
+        filesystems are replaced by underscores, trailing dots and spaces
+        are dropped, Windows device names are suffixed, and the result is
+        truncated to max_bytes of UTF-8.
+
         Args:
             filename: Original filename
+            max_bytes: Maximum encoded length
 
         Returns:
             Sanitized filename safe for filesystem
         """
+        filename = unicodedata.normalize('NFC', filename)
         invalid_chars = '<>:"/\\|?*'
         for char in invalid_chars:
             filename = filename.replace(char, '_')
-        return filename
+        filename = ''.join(
+            '_' if unicodedata.category(char) == 'Cc' else char
+            for char in filename
+        )
+        encoded = filename.encode('utf-8')
+        if len(encoded) > max_bytes:
+            filename = encoded[:max_bytes].decode('utf-8', errors='ignore')
+        filename = filename.strip().rstrip('. ')
+        if filename.split('.')[0].upper() in RESERVED_NAMES:
+            filename += '_'
+        return filename or '_'
 
     @staticmethod
     def ensure_directory(directory: str, output) -> bool:
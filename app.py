@@ -1,11 +1,50 @@
 """Main application orchestration."""
+import argparse
+import multiprocessing
+import queue
+import sqlite3
 import sys
 import os
-from typing import Optional
-from config import CredentialsManager, ALBUM_ARTWORKS_DIR, SEARCH_LIMIT
-from output import ConsoleOutput
-from spotify_client import SpotifyClient
-from album_service import AlbumSelector, AlbumDownloader, FilenameUtil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, List, Iterable, Iterator, Dict, Set, Union
+import requests
+from batch_input import BatchItem, BATCH_FORMATS, read_batch, count_rows
+from config import CredentialsManager, Settings, DEFAULT_SETTINGS
+from output import ConsoleOutput, ProgressReporter, DONE, FAILED, SKIPPED
+from log_sink import LogSink, LEVELS as LOG_LEVELS
+from cache import NegativeCache, NOT_FOUND, NO_ARTWORK, NEGATIVE_CACHE_FILENAME
+from library import ArtworkIndex, LIBRARY_INDEX_FILENAME
+from freshness import ValidatorManifest
+from catalog import AlbumCatalog, CATALOG_FILENAME
+from profiler import Profiler
+from image_pool import ImageProcessPool
+from limiter import AdaptiveLimiter
+from query import parse_query
+from shards import (
+    ShardJournal, parse_shard, shard_of, merge_shards,
+    MERGED, UNCHANGED as SHARD_UNCHANGED, CONFLICTS, MISSING, MISSES
+)
+from models import Album
+from sync import ArtworkSync, COPIED, UNCHANGED, DELETED, FAILED as SYNC_FAILED
+from watcher import FolderWatcher, WATCH_BACKENDS, album_query
+from transport import (
+    Transport, build_retry, check_http2, MODES as TRANSPORT_MODES,
+    TRANSPORT_ARCHIVE_FILENAME
+)
+from spotify_client import SpotifyClient, SpotifyClientPool
+from providers import (
+    ProviderChain, SpotifyProvider, ITunesProvider, CoverArtArchiveProvider,
+    PROVIDER_MODES, parse_provider_names
+)
+from album_service import (
+    AlbumSelector, AutoSelector, AlbumDownloader, AlbumMatcher, FilenameUtil,
+    ImageEncoder, ImageAnalyzer, DuplicateFinder, PathTemplate,
+    ArtworkPrefetcher
+)
 
 # Fix SSL certificate path for PyInstaller binary
 if getattr(sys, 'frozen', False):
@@ -23,7 +62,19 @@ class AlbumArtworkApp:
                  spotify_client: Optional[SpotifyClient] = None,
                  album_selector: Optional[AlbumSelector] = None,
                  album_downloader: Optional[AlbumDownloader] = None,
-                 artworks_dir: str = ALBUM_ARTWORKS_DIR):
+                 artworks_dir: Optional[str] = None,
+                 encoder: Optional[ImageEncoder] = None,
+                 settings: Optional[Settings] = None,
+                 negative_cache: Optional[NegativeCache] = None,
+                 transport: Optional[Transport] = None,
+                 analyzer: Optional[ImageAnalyzer] = None,
+                 library: Optional[ArtworkIndex] = None,
+                 path_template: Optional[PathTemplate] = None,
+                 image_pool: Optional[ImageProcessPool] = None,
+                 journal: Optional[ShardJournal] = None,
+                 validators: Optional[ValidatorManifest] = None,
+                 catalog: Optional[AlbumCatalog] = None,
+                 profiler: Optional[Profiler] = None):
         """
         Initialize application with dependencies.
 
@@ -33,16 +84,76 @@ class AlbumArtworkApp:
             spotify_client: Spotify client (will be created if None)
             album_selector: Album selector (will be created if None)
             album_downloader: Album downloader (will be created if None)
-            artworks_dir: Directory to save album artworks
+            artworks_dir: Directory to save album artworks (default: from
+                settings)
+            encoder: Output image encoder (None saves Pillow-default JPEGs)
+            settings: Resolved settings (default: built-in defaults)
+            negative_cache: Cache of known misses (None disables it)
+            transport: Live, recording or replay HTTP transport
+                (default: live)
+            analyzer: Artwork validator used before saving (None skips
+                validation)
+            library: Index of saved artwork, consulted before searching
+                and downloading (None disables the checks)
+            path_template: Layout of saved artwork (default: album name
+                in the artworks directory)
+            image_pool: Worker processes for decoding and encoding
+                artwork (None processes on the download threads)
+            journal: Shard journal that downloads and misses are also
+                recorded in, for merging later (None when not sharded)
+            validators: ETag/Last-Modified manifest of saved artwork, so
+                re-downloads are conditional (None always downloads)
+            catalog: Metadata catalog every downloaded album is recorded
+                in (None records nothing)
+            profiler: Memory and CPU profiler the search, download,
+                decode and save stages report to (None doesn't profile)
+
+        Raises:
+            ValueError: If the shard setting or the Spotify credentials
+                are invalid
         """
         self.output = output
         self.credentials_manager = credentials_manager
-        self.artworks_dir = artworks_dir
+        self.settings = settings or Settings()
+        self.negative_cache = negative_cache
+        self.library = library
+        self.journal = journal
+        self.validators = validators
+        self.catalog = catalog
+        self.profiler = profiler
+        self.shard = parse_shard(self.settings.shard) if self.settings.shard else None
+        self._in_batch = False
+        self.transport = transport or Transport()
+        # Adaptive limits on concurrent Spotify API and image CDN requests
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+        if self.settings.adaptive_concurrency:
+            self.limiters = {
+                name: AdaptiveLimiter(
+                    name, initial=self.settings.concurrency,
+                    maximum=max(self.settings.max_concurrency,
+                                self.settings.concurrency)
+                )
+                for name in ("api", "cdn")
+            }
+        self.artworks_dir = artworks_dir or self.settings.artworks_dir
+        self.file_extension = encoder.extension if encoder else ".jpg"
+        self.path_template = path_template or PathTemplate(
+            extension=self.file_extension
+        )
+        # Save paths of downloads in flight, so concurrent downloads of
+        # different albums with the same name don't collide; finished
+        # ones are found through the library index
+        self._claimed_paths: Dict[str, Optional[str]] = {}
+        self._paths_lock = threading.Lock()
+        # Recent search results by canonical query key; equivalent queries
+        # running at the same time share one upstream search
+        self._searches: "OrderedDict[str, Future]" = OrderedDict()
+        self._searches_lock = threading.Lock()
 
         # Initialize Spotify client if not provided
         if spotify_client is None:
-            client_id, client_secret = credentials_manager.get_or_prompt(output)
-            spotify_client = SpotifyClient(client_id, client_secret)
+            credentials = credentials_manager.get_all_or_prompt(output)
+            spotify_client = self._create_spotify_client(credentials)
 
             if not spotify_client.test_credentials():
                 output.error(
@@ -52,10 +163,222 @@ class AlbumArtworkApp:
                 raise ValueError("Invalid Spotify credentials")
 
         self.spotify_client = spotify_client
-        self.album_selector = album_selector or AlbumSelector(output)
-        self.album_downloader = album_downloader or AlbumDownloader(output)
+        self.provider_chain = self._create_provider_chain()
+        self.album_selector = album_selector or AlbumSelector(
+            output, on_list=self.prefetch_artwork
+        )
+        self.album_matcher = AlbumMatcher(spotify_client.get_artist_name)
+        # Fetches listed artwork while the user is choosing (interactive
+        # selection only)
+        self.prefetcher: Optional[ArtworkPrefetcher] = None
+        if album_downloader is None:
+            session = AlbumDownloader.create_session(
+                pool_connections=self.settings.pool_connections,
+                pool_maxsize=self.settings.pool_maxsize,
+                max_retries=self.settings.max_retries,
+                backoff_factor=self.settings.retry_backoff,
+                transport=self.transport,
+                http2_streams=(self.settings.http2_streams
+                               if self.settings.http2 else 0),
+                http2_connections=self.settings.http2_connections,
+                limiter=self.limiters.get("cdn")
+            )
+            if album_selector is None and self.settings.prefetch_count > 0:
+                self.prefetcher = ArtworkPrefetcher(
+                    session, timeout=self.settings.download_timeout,
+                    count=self.settings.prefetch_count
+                )
+            album_downloader = AlbumDownloader(
+                output,
+                timeout=self.settings.download_timeout,
+                encoder=encoder,
+                analyzer=analyzer,
+                processor=image_pool,
+                manifest=validators,
+                profiler=profiler,
+                prefetcher=self.prefetcher,
+                session=session
+            )
+        self.album_downloader = album_downloader
+
+    def _create_spotify_client(self, credentials: list) -> SpotifyClient:
+        """
+        Create a Spotify client, pooling several credential sets.
+
+        Args:
+            credentials: List of (client_id, client_secret) tuples
+
+        Returns:
+            SpotifyClient, or SpotifyClientPool for several credentials
+        """
+        pooled = len(credentials) > 1
+        clients = []
+        for client_id, client_secret in credentials:
+            client_options = {}
+            if not self.transport.is_live or "api" in self.limiters:
+                retry = build_retry(
+                    self.settings.max_retries, self.settings.retry_backoff
+                )
+                if pooled:
+                    retry = SpotifyClientPool.client_retry(retry)
+                client_options['session'] = self.transport.create_session(
+                    pool_connections=self.settings.pool_connections,
+                    pool_maxsize=self.settings.pool_maxsize,
+                    max_retries=retry,
+                    limiter=self.limiters.get("api")
+                )
+            if pooled:
+                # Let the pool fail over on 429 instead of sleeping
+                client_options['status_forcelist'] = (
+                    SpotifyClientPool.CLIENT_STATUS_FORCELIST
+                )
+            clients.append(SpotifyClient(
+                client_id, client_secret,
+                requests_timeout=self.settings.api_timeout,
+                retries=self.settings.max_retries,
+                backoff_factor=self.settings.retry_backoff,
+                **client_options
+            ))
+        return SpotifyClientPool(clients) if pooled else clients[0]
+
+    def _create_provider_chain(self) -> Optional[ProviderChain]:
+        """
+        Create the artwork provider chain from the ``providers`` setting.
+
+        Returns:
+            ProviderChain, or None when Spotify is the only provider
+
+        Raises:
+            ValueError: If a provider name or the provider mode is unknown
+        """
+        names = parse_provider_names(self.settings.providers)
+        if names == ["spotify"]:
+            return None
+
+        session = None
+        if any(name != "spotify" for name in names):
+            session = self.transport.create_session(
+                pool_connections=self.settings.pool_connections,
+                pool_maxsize=self.settings.pool_maxsize,
+                max_retries=build_retry(
+                    self.settings.max_retries, self.settings.retry_backoff
+                )
+            )
+
+        providers = []
+        for name in names:
+            if name == "spotify":
+                providers.append(
+                    SpotifyProvider(lambda query, limit: self.search_spotify(query))
+                )
+            elif name == "itunes":
+                providers.append(ITunesProvider(
+                    session, base_url=self.settings.itunes_url,
+                    timeout=self.settings.api_timeout
+                ))
+            else:
+                providers.append(CoverArtArchiveProvider(
+                    session,
+                    musicbrainz_url=self.settings.musicbrainz_url,
+                    coverart_url=self.settings.coverartarchive_url,
+                    timeout=self.settings.api_timeout
+                ))
+        return ProviderChain(providers, mode=self.settings.provider_mode)
+
+    def search(self, album_name: str) -> list:
+        """
+        Search the configured artwork providers for albums.
+
+        The query is normalized first (see query.parse_query). Results are
+        kept for the last ``search_cache_size`` distinct queries, so
+        equivalent queries such as "Abbey Road (Remastered 2009)" and
+        "abbey road" make a single upstream search.
+
+        Args:
+            album_name: Name of album to search for
 
-    def find_and_select_album(self, album_name: str) -> Optional[dict]:
+        Returns:
+            List of album records
+        """
+        query = parse_query(album_name)
+        if self.settings.search_cache_size <= 0:
+            return self._search_providers(query.search_text)
+
+        with self._searches_lock:
+            future = self._searches.get(query.key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._searches[query.key] = future
+                while len(self._searches) > self.settings.search_cache_size:
+                    self._searches.popitem(last=False)
+            else:
+                self._searches.move_to_end(query.key)
+
+        if owner:
+            try:
+                future.set_result(self._search_providers(query.search_text))
+            except Exception as e:
+                # Don't cache failures; the next query retries
+                with self._searches_lock:
+                    if self._searches.get(query.key) is future:
+                        del self._searches[query.key]
+                future.set_exception(e)
+        return future.result()
+
+    def _search_providers(self, text: str) -> list:
+        """Search the provider chain, or Spotify alone."""
+        stage = (self.profiler.stage("search") if self.profiler is not None
+                 else nullcontext())
+        with stage:
+            if self.provider_chain is not None:
+                return self.provider_chain.search_albums(
+                    text, self.settings.search_limit
+                )
+            return self.search_spotify(text)
+
+    def search_spotify(self, album_name: str) -> list:
+        """
+        Search Spotify for albums, paging past the first page when configured.
+
+        A single page of ``search_limit`` results is requested unless
+        ``search_max_results`` is larger or a wide scan is enabled. In
+        that case further pages are fetched (in parallel for wide scans)
+        until a result scores at least ``match_threshold``, and the
+        ``search_limit`` best-scoring albums are returned.
+
+        Args:
+            album_name: Name of album to search for
+
+        Returns:
+            List of album records
+        """
+        settings = self.settings
+        max_results = settings.search_max_results
+        workers = 1
+        if settings.search_wide:
+            max_results = max(max_results, SpotifyClient.MAX_PAGE_SIZE)
+            workers = settings.concurrency
+
+        if max_results <= settings.search_limit:
+            return self.spotify_client.search_albums(
+                album_name, limit=settings.search_limit
+            )
+
+        def is_confident(album: Album) -> bool:
+            score = self.album_matcher.score(album_name, album)
+            return score >= settings.match_threshold
+
+        albums = self.spotify_client.search_albums_paginated(
+            album_name,
+            max_results=max_results,
+            page_size=settings.search_limit,
+            is_confident=is_confident,
+            workers=workers
+        )
+        return self.album_matcher.rank(album_name, albums)[:settings.search_limit]
+
+    def find_and_select_album(self, album_name: str) -> Optional[Album]:
         """
         Search for and select an album.
 
@@ -63,20 +386,20 @@ class AlbumArtworkApp:
             album_name: Name of album to search for
 
         Returns:
-            Selected album dictionary or None
+            Selected album record or None
         """
-        albums = self.spotify_client.search_albums(album_name, limit=SEARCH_LIMIT)
+        albums = self.search(album_name)
         return self.album_selector.choose_from_list(
             albums,
             self.spotify_client.get_artist_name
         )
 
-    def download_album_artwork(self, album: dict) -> bool:
+    def download_album_artwork(self, album: Album) -> bool:
         """
         Download artwork for an album.
 
         Args:
-            album: Album dictionary from Spotify
+            album: Album record
 
         Returns:
             True if download successful, False otherwise
@@ -87,12 +410,393 @@ class AlbumArtworkApp:
             return False
 
         artist_name = self.spotify_client.get_artist_name(album)
-        self.output.info(f"Selected album: {album['name']} by {artist_name}")
+        self.output.info(f"Selected album: {album.name} by {artist_name}")
 
-        safe_album_name = FilenameUtil.sanitize(album['name'])
-        save_path = os.path.join(self.artworks_dir, f"{safe_album_name}.jpg")
+        if self.library is not None and self.settings.skip_existing and album.id:
+            existing = self.library.find_album(album.id)
+            if existing:
+                self.output.info(f"Artwork already saved: {existing}")
+                return True
 
-        return self.album_downloader.download(image_url, save_path)
+        save_path = self.artwork_path(album, artist_name)
+        try:
+            downloaded = self.album_downloader.download(image_url, save_path)
+            if downloaded and self.library is not None:
+                self.library.add(save_path, album, artist_name)
+        finally:
+            with self._paths_lock:
+                self._claimed_paths.pop(save_path, None)
+        if downloaded and self.library is not None and not self._in_batch:
+            self.library.save()
+        if (downloaded and self.validators is not None
+                and not self._in_batch):
+            self.validators.save()
+        if downloaded and self.catalog is not None:
+            try:
+                self.catalog.record(save_path, album, artist_name)
+                if not self._in_batch:
+                    self.catalog.commit()
+            except sqlite3.Error as e:
+                # The artwork is saved; only its catalog row is missing
+                self.output.warning(f"Couldn't catalog {save_path}: {e}")
+        if downloaded and self.journal:
+            self.journal.record_download(save_path, album, artist_name)
+        return downloaded
+
+    def prefetch_artwork(self, albums: List[Album]) -> None:
+        """
+        Start fetching listed albums' artwork while the user chooses.
+
+        Albums whose saved artwork can be revalidated with a conditional
+        request aren't prefetched; downloading them again is usually a
+        304 Not Modified.
+
+        Args:
+            albums: Albums in the order they're listed; the first
+                ``prefetch_count`` are fetched
+        """
+        if self.prefetcher is None:
+            return
+        urls = []
+        for album in albums:
+            url = self.spotify_client.get_album_image_url(album)
+            if url and self._has_validators(album, url):
+                url = None
+            urls.append(url)
+        self.prefetcher.start(urls)
+
+    def _has_validators(self, album: Album, image_url: str) -> bool:
+        """Whether the album's saved artwork can be revalidated."""
+        if self.validators is None or self.library is None or not album.id:
+            return False
+        path = self.library.find_album(album.id)
+        return bool(path and self.validators.conditional_headers(path, image_url))
+
+    def concurrency_limits(self) -> Dict[str, int]:
+        """
+        Current adaptive concurrency limits.
+
+        Returns:
+            Dictionary of service ("api", "cdn") to its current limit;
+            empty unless ``adaptive_concurrency`` is on
+        """
+        return {name: limiter.current for name, limiter in self.limiters.items()}
+
+    def artwork_path(self, album: Album, artist_name: str) -> str:
+        """
+        Choose where to save an album's artwork.
+
+        The path comes from the path template. If it already holds (or
+        is being downloaded for) a different album's artwork, the album ID
+        is added to the file name instead of overwriting it. The path
+        stays claimed until download_album_artwork() is done with it.
+
+        Args:
+            album: Album record
+            artist_name: Artist name
+
+        Returns:
+            Absolute save path
+        """
+        album_id = album.id
+        with self._paths_lock:
+            for disambiguate in (False, True):
+                path = os.path.join(
+                    self.artworks_dir,
+                    self.path_template.render(album, artist_name, disambiguate)
+                )
+                if path in self._claimed_paths:
+                    owner = self._claimed_paths[path]
+                elif self.library is not None:
+                    owner = self.library.album_id_at(path)
+                else:
+                    owner = None
+                if owner is None or owner == album_id:
+                    break
+            self._claimed_paths[path] = album_id
+        return path
+
+    def fetch_artwork(self, album_name: str) -> bool:
+        """
+        Search for an album and download its artwork.
+
+        Args:
+            album_name: Name of album to search for
+
+        Returns:
+            True if artwork was downloaded, False otherwise
+        """
+        return self.process_album(album_name) == DONE
+
+    def process_album(self, album_name: str,
+                      album_id: Optional[str] = None) -> str:
+        """
+        Search for an album, download its artwork and report the outcome.
+
+        Albums already in the library index are skipped without searching
+        when the album ID, or the title and artist of a "Title - Artist"
+        query, match. Other queries are searched, and the selected album
+        skipped if its ID is in the library.
+
+        Searches that previously found nothing, and albums previously
+        found without artwork, are skipped until the negative cache entry
+        expires.
+
+        Args:
+            album_name: Name of album to search for
+            album_id: Spotify album ID; the album is looked up directly
+                and only searched for by name if the ID is unknown
+
+        Returns:
+            DONE, FAILED or SKIPPED (already saved or cached miss)
+        """
+        if self.library is not None and self.settings.skip_existing:
+            existing = album_id and self.library.find_album(album_id)
+            query = parse_query(album_name) if album_name else None
+            if not existing and query is not None and query.artist:
+                # A title alone may be another artist's album; the search
+                # finds out, and the album ID is checked before downloading
+                existing = (self.library.find_title(query.title, query.artist)
+                            or self.library.find_title(query.artist, query.title))
+            if existing:
+                self.output.info(f"Artwork already saved: {existing}")
+                return SKIPPED
+
+        cache = self.negative_cache
+        if album_id:
+            key = NegativeCache.make_key("album", album_id)
+        else:
+            key = NegativeCache.make_key("query", parse_query(album_name).key)
+        reason = cache.get(key) if cache is not None else None
+        if reason == NOT_FOUND:
+            self.output.info("No matching album found (cached result).")
+            return SKIPPED
+        if reason == NO_ARTWORK:
+            self.output.info("No album artwork found (cached result).")
+            return SKIPPED
+
+        started = time.perf_counter()
+        album = self.spotify_client.get_album(album_id) if album_id else None
+        if album is None and album_name:
+            album = self.find_and_select_album(album_name)
+        self.output.event(
+            "search", query=album_name, album_id=album and album.id,
+            duration=time.perf_counter() - started
+        )
+        if not album:
+            self.output.info("No matching album found.")
+            self._record_miss(key, NOT_FOUND)
+            return FAILED
+
+        # A missing cover belongs to the album, not the query: the query's
+        # other results may well have artwork
+        album_key = NegativeCache.make_key("album", album.id) if album.id else None
+        if (album_key and album_key != key and cache is not None
+                and cache.get(album_key) == NO_ARTWORK):
+            self.output.info("No album artwork found (cached result).")
+            return SKIPPED
+        if not self.spotify_client.get_album_image_url(album) and album_key:
+            self._record_miss(album_key, NO_ARTWORK)
+
+        started = time.perf_counter()
+        downloaded = self.download_album_artwork(album)
+        tried = {album.provider}
+        while (not downloaded and album_name and self.provider_chain is not None
+               and self.album_downloader.last_status() == 404):
+            # The provider listed artwork it doesn't have
+            other = self._search_other_providers(album_name, tried)
+            if other is None or other.provider in tried:
+                break
+            album = other
+            tried.add(album.provider)
+            downloaded = self.download_album_artwork(album)
+        self.output.event(
+            "download", query=album_name, album_id=album.id,
+            duration=time.perf_counter() - started, ok=downloaded
+        )
+        return DONE if downloaded else FAILED
+
+    def _search_other_providers(self, album_name: str,
+                                tried: Set[str]) -> Optional[Album]:
+        """
+        Search and select an album from providers not tried yet.
+
+        Args:
+            album_name: Name of album to search for
+            tried: Names of providers whose artwork couldn't be downloaded
+
+        Returns:
+            Selected album record, or None if no other provider has one
+        """
+        chain = self.provider_chain.without(tried)
+        if chain is None:
+            return None
+        self.output.info("Artwork not found; trying other providers.")
+        albums = chain.search_albums(parse_query(album_name).search_text,
+                                     self.settings.search_limit)
+        if not albums:
+            return None
+        return self.album_selector.choose_from_list(
+            albums, self.spotify_client.get_artist_name
+        )
+
+    def _record_miss(self, key: str, reason: str) -> None:
+        """Record a search miss in the negative cache, if enabled."""
+        if self.negative_cache is not None:
+            self.negative_cache.record(key, reason)
+            if not self._in_batch:
+                self.negative_cache.save()
+        if self.journal:
+            self.journal.record_miss(key, reason)
+
+    def run_batch(self, album_names: Iterable[Union[str, BatchItem]],
+                  total: Optional[int] = None,
+                  progress: Optional[ProgressReporter] = None) -> Dict[str, int]:
+        """
+        Download artwork for many albums without prompting.
+
+        Albums are handed to ``concurrency`` worker threads (or
+        ``max_concurrency`` with ``adaptive_concurrency``, the adaptive
+        limits then deciding how many requests run at once) through a
+        queue of at most ``batch_queue_size`` items, so the input is
+        consumed only as fast as it is processed and can be a lazy
+        iterator over any number of albums. Blank names are ignored, and
+        albums equivalent to an earlier one (same Spotify ID or canonical
+        query key) are counted as skipped. With the ``shard`` setting
+        ("I/N"), only albums whose key hashes to shard I are processed;
+        the others are left to the hosts running the other shards.
+
+        Args:
+            album_names: Album names, or BatchItems with optional IDs
+            total: Number of albums, if known (for the ETA)
+            progress: Progress reporter (default: one on stdout)
+
+        Returns:
+            Dictionary of outcome (DONE, FAILED, SKIPPED) to count
+        """
+        if not FilenameUtil.ensure_directory(self.artworks_dir, self.output):
+            return {DONE: 0, FAILED: 0, SKIPPED: 0}
+
+        if progress is None:
+            progress = ProgressReporter(
+                total=total,
+                bytes_source=lambda: getattr(
+                    self.album_downloader, 'bytes_downloaded', 0
+                )
+            )
+        if self.limiters and progress.limits_source is None:
+            progress.limits_source = self.concurrency_limits
+
+        def process(item: BatchItem) -> str:
+            try:
+                return self.process_album(item.query, item.album_id or None)
+            except Exception as e:
+                self.output.error(f"Error: {item.query or item.album_id}: {e}")
+                return FAILED
+
+        def unique(items: Iterable[Union[str, BatchItem]]) -> Iterable[BatchItem]:
+            # Hashes rather than keys, to keep multi-million row inputs
+            # to a few dozen bytes per album
+            seen = set()
+            for item in items:
+                if isinstance(item, str):
+                    item = BatchItem(item.strip())
+                if not item.query and not item.album_id:
+                    continue
+                key_text = (f"id:{item.album_id}" if item.album_id
+                            else parse_query(item.query).key)
+                if self.shard and shard_of(key_text, self.shard[1]) != self.shard[0]:
+                    continue
+                key = hash(key_text)
+                if key in seen:
+                    self.output.info(
+                        f"Skipping duplicate: {item.query or item.album_id}"
+                    )
+                    progress.update(SKIPPED)
+                    continue
+                seen.add(key)
+                yield item
+
+        work: "queue.Queue[Optional[BatchItem]]" = queue.Queue(
+            maxsize=max(self.settings.batch_queue_size, 1)
+        )
+
+        def worker() -> None:
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                progress.update(process(item))
+
+        self._in_batch = True
+        worker_count = self.settings.concurrency
+        if self.limiters:
+            worker_count = max(self.settings.max_concurrency, worker_count)
+        workers = [
+            threading.Thread(target=worker, daemon=True)
+            for _ in range(max(worker_count, 1))
+        ]
+        for thread in workers:
+            thread.start()
+        try:
+            for item in unique(album_names):
+                work.put(item)
+        except BaseException:
+            # Drop queued albums so an interrupted batch stops promptly
+            while True:
+                try:
+                    work.get_nowait()
+                except queue.Empty:
+                    break
+            raise
+        finally:
+            for _ in workers:
+                work.put(None)
+            for thread in workers:
+                thread.join()
+            self._in_batch = False
+            self.save_state()
+            if isinstance(self.spotify_client, SpotifyClientPool):
+                self.output.event(
+                    "credentials", credentials=self.spotify_client.credential_stats()
+                )
+            if self.limiters:
+                self.output.event("concurrency", limits={
+                    name: limiter.snapshot()
+                    for name, limiter in self.limiters.items()
+                })
+            self.output.flush()
+            progress.finish()
+        return dict(progress.counts)
+
+    def save_state(self) -> None:
+        """Save the caches and indexes that batches save only at the end."""
+        if self.negative_cache is not None:
+            self.negative_cache.save()
+        if self.library is not None:
+            self.library.save()
+        if self.validators is not None:
+            self.validators.save()
+        if self.catalog is not None:
+            try:
+                self.catalog.commit()
+            except sqlite3.Error as e:
+                self.output.warning(f"Couldn't update album catalog: {e}")
+
+    @contextmanager
+    def deferred_saves(self) -> Iterator[None]:
+        """
+        Context manager that holds back per-album saves.
+
+        Albums processed inside it don't rewrite the caches and indexes;
+        call save_state() to save them, as happens on exit.
+        """
+        self._in_batch = True
+        try:
+            yield
+        finally:
+            self._in_batch = False
+            self.save_state()
 
     def run(self):
         """Run the main application loop."""
@@ -106,41 +810,1096 @@ class AlbumArtworkApp:
         if not FilenameUtil.ensure_directory(self.artworks_dir, self.output):
             return
 
-        while True:
-            album_name = self.output.prompt(
-                "Enter the album name (or type 'exit' to quit): "
-            ).strip()
+        try:
+            while True:
+                album_name = self.output.prompt(
+                    "Enter the album name (or type 'exit' to quit): "
+                ).strip()
 
-            if album_name.lower() == 'exit':
-                self.output.info("Exiting the program.")
-                break
+                if album_name.lower() == 'exit':
+                    self.output.info("Exiting the program.")
+                    break
 
-            if not album_name:
-                self.output.info("Please enter a valid album name.")
-                continue
+                if not album_name:
+                    self.output.info("Please enter a valid album name.")
+                    continue
 
-            album = self.find_and_select_album(album_name)
-            if album:
-                self.download_album_artwork(album)
-            else:
-                self.output.info("No matching album found.")
+                try:
+                    self.fetch_artwork(album_name)
+                except requests.exceptions.RequestException as e:
+                    # E.g. the only artwork provider is down or sent a
+                    # reply that isn't JSON; the next album may work
+                    self.output.error(f"Search failed: {e}")
+                if self.prefetcher is not None:
+                    # Drop the other candidates, e.g. if the chosen
+                    # album was already saved
+                    self.prefetcher.discard()
+        finally:
+            if self.prefetcher is not None:
+                self.prefetcher.close()
 
 
-def main():
-    """Entry point for the application."""
+def _parse_setting(text: str):
+    """Split a ``KEY=VALUE`` command-line override."""
+    key, sep, value = text.partition("=")
+    key = key.strip().replace("-", "_")
+    if not sep or key not in DEFAULT_SETTINGS:
+        raise argparse.ArgumentTypeError(
+            f"expected KEY=VALUE with KEY one of: {', '.join(DEFAULT_SETTINGS)}"
+        )
+    return key, value
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line argument parser.
+
+    Flags default to None so that unset flags don't override the config
+    file or environment.
+
+    Returns:
+        Configured ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        description="Download album artwork from Spotify."
+    )
+    parser.add_argument(
+        "--config", metavar="FILE",
+        help="Settings file in TOML or JSON format "
+             "(default: ~/.album_artwork_downloader.toml)"
+    )
+    parser.add_argument(
+        "--set", dest="settings", metavar="KEY=VALUE", action="append",
+        type=_parse_setting, default=[],
+        help="Override any setting, e.g. --set pool_maxsize=32"
+    )
+    parser.add_argument(
+        "--add-credentials", action="store_true",
+        help="Save another Spotify app's credentials to spread the rate "
+             "limit over several apps, then exit"
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="Download artwork for every album in FILE (text with one "
+             "album per line, CSV or JSONL; '-' for stdin) without prompting"
+    )
+    parser.add_argument(
+        "--batch-format", choices=BATCH_FORMATS,
+        help="Format of the --batch file (default: from its extension)"
+    )
+    parser.add_argument(
+        "--watch", metavar="DIR",
+        help="Keep running and download artwork for albums as they are "
+             "added to the music folder DIR"
+    )
+    parser.add_argument(
+        "--watch-backend", choices=WATCH_BACKENDS,
+        help="Get folder changes from inotify, by polling, or auto "
+             "(inotify where available)"
+    )
+    parser.add_argument(
+        "--watch-debounce", type=float, metavar="SECONDS",
+        help="Wait until an album folder has been quiet this long"
+    )
+    parser.add_argument(
+        "--watch-interval", type=float, metavar="SECONDS",
+        help="Seconds between scans when polling"
+    )
+    parser.add_argument(
+        "--shard", metavar="I/N",
+        help="With --batch, process only the albums in shard I of N, so a "
+             "batch can be split across hosts"
+    )
+    parser.add_argument(
+        "--merge-shards", nargs="+", metavar="DIR",
+        help="Merge the artwork and journals of shard artworks directories "
+             "into the artworks directory, then exit"
+    )
+    parser.add_argument(
+        "--find-duplicates", action="store_true",
+        help="Report near-duplicate, placeholder and unreadable artwork "
+             "in the artworks directory, then exit"
+    )
+    parser.add_argument(
+        "--library-search", metavar="TEXT",
+        help="List saved artwork whose title, artist or file name contains "
+             "every word of TEXT, then exit"
+    )
+    parser.add_argument(
+        "--catalog", action=argparse.BooleanOptionalAction,
+        help="Record downloaded albums' metadata in an SQLite catalog"
+    )
+    parser.add_argument(
+        "--catalog-path", metavar="FILE",
+        help="Catalog database (default: album_catalog.sqlite in the "
+             "artworks directory)"
+    )
+    parser.add_argument(
+        "--profile", action=argparse.BooleanOptionalAction,
+        help="Trace memory allocations and CPU time by stage (search, "
+             "download, decode, save) and write snapshots and reports to "
+             "--profile-dir"
+    )
+    parser.add_argument(
+        "--profile-dir", metavar="DIR",
+        help="Profiling output directory (default: a new directory under "
+             "profiles/ in the cache directory)"
+    )
+    parser.add_argument(
+        "--profile-interval", type=float, metavar="SECONDS",
+        help="Seconds between memory snapshots while profiling"
+    )
+    parser.add_argument(
+        "--revalidate", action="store_true",
+        help="Re-download saved artwork that changed at its source, using "
+             "conditional requests, then exit"
+    )
+    parser.add_argument(
+        "--library-refresh", action="store_true",
+        help="Update the library index from the artworks directory, then exit"
+    )
+    parser.add_argument(
+        "--sync", metavar="DIR",
+        help="Copy new and changed artwork into DIR (e.g. a device or "
+             "network share), then exit"
+    )
+    parser.add_argument(
+        "--sync-size", dest="sync_max_size", type=int, metavar="PIXELS",
+        help="Resize synced artwork to fit within PIXELS per side "
+             "(0 copies originals)"
+    )
+    parser.add_argument(
+        "--sync-delete", action=argparse.BooleanOptionalAction,
+        help="Remove synced files that are no longer in the library"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="With --sync, report what would change without copying"
+    )
+    parser.add_argument(
+        "--skip-existing", action=argparse.BooleanOptionalAction,
+        help="Skip albums whose artwork is already in the library"
+    )
+    parser.add_argument(
+        "--concurrency", type=int,
+        help="Albums processed in parallel in batch mode"
+    )
+    parser.add_argument(
+        "--log-level", choices=LOG_LEVELS,
+        help="Minimum level of messages to show and log"
+    )
+    parser.add_argument(
+        "--log-file", metavar="FILE",
+        help="Write JSON-structured log records to FILE (rotated by size)"
+    )
+    parser.add_argument(
+        "--artworks-dir", help="Directory to save album artworks"
+    )
+    parser.add_argument(
+        "--search-limit", type=int, help="Search results to show"
+    )
+    parser.add_argument(
+        "--search-max-results", type=int,
+        help="Search past the first page, up to this many results"
+    )
+    parser.add_argument(
+        "--wide", dest="search_wide", action=argparse.BooleanOptionalAction,
+        help="Fetch several result pages in parallel for ambiguous titles"
+    )
+    parser.add_argument(
+        "--providers",
+        help="Comma-separated artwork sources in order of preference: "
+             "spotify, itunes, coverartarchive (default: spotify)"
+    )
+    parser.add_argument(
+        "--provider-mode", choices=PROVIDER_MODES,
+        help="Try providers in order (fallback), take the first hit (race) "
+             "or the highest resolution (best)"
+    )
+    parser.add_argument(
+        "--negative-cache-days", type=float,
+        help="Days before re-checking albums that weren't found (0 disables)"
+    )
+    parser.add_argument(
+        "--download-timeout", type=float,
+        help="Image download timeout in seconds"
+    )
+    parser.add_argument(
+        "--max-retries", type=int,
+        help="Retries for failed or rate-limited requests"
+    )
+    parser.add_argument(
+        "--adaptive", dest="adaptive_concurrency",
+        action=argparse.BooleanOptionalAction,
+        help="Adapt concurrent API and image requests to observed latency "
+             "and errors, between 1 and --max-concurrency"
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, metavar="N",
+        help="Upper limit for --adaptive"
+    )
+    parser.add_argument(
+        "--prefetch", dest="prefetch_count", type=int, metavar="N",
+        help="Fetch the first N listed albums' artwork while you choose "
+             "(0 turns it off)"
+    )
+    parser.add_argument(
+        "--http2", action=argparse.BooleanOptionalAction,
+        help="Fetch images over multiplexed HTTP/2 connections "
+             '(needs "httpx[http2]")'
+    )
+    parser.add_argument(
+        "--http2-streams", type=int, metavar="N",
+        help="Image downloads in flight at once over HTTP/2"
+    )
+    parser.add_argument(
+        "--transport", dest="transport_mode", choices=TRANSPORT_MODES,
+        help="Use the network (live), record responses, or replay them"
+    )
+    parser.add_argument(
+        "--archive", dest="transport_archive", metavar="FILE",
+        help="Response archive for --transport record/replay"
+    )
+    parser.add_argument(
+        "--replay-latency", type=float,
+        help="Mean injected delay per replayed response in seconds"
+    )
+    parser.add_argument(
+        "--replay-error-rate", type=float,
+        help="Fraction of replayed responses turned into 503 errors"
+    )
+    parser.add_argument(
+        "--format", dest="output_format",
+        choices=sorted(ImageEncoder.FORMATS), help="Output image format"
+    )
+    parser.add_argument(
+        "--quality", dest="jpeg_quality", type=int,
+        help="Lossy encoding quality 1-100"
+    )
+    parser.add_argument(
+        "--progressive", dest="progressive_jpeg",
+        action=argparse.BooleanOptionalAction, help="Write progressive JPEGs"
+    )
+    parser.add_argument(
+        "--optimize", dest="optimize_output",
+        action=argparse.BooleanOptionalAction,
+        help="Spend extra CPU to produce smaller files"
+    )
+    parser.add_argument(
+        "--strip-metadata", action=argparse.BooleanOptionalAction,
+        help="Drop EXIF and ICC profile data"
+    )
+    parser.add_argument(
+        "--path-template", metavar="TEMPLATE",
+        help="Artwork path relative to the artworks directory, e.g. "
+             "'{artist}/{album} [{year}]' (fields: album, artist, year, "
+             "album_id, provider)"
+    )
+    parser.add_argument(
+        "--path-shards", type=int, choices=range(4),
+        help="Levels of hash-named subdirectories to spread artwork over"
+    )
+    parser.add_argument(
+        "--image-workers", type=int,
+        help="Processes used to decode and encode artwork (0 uses the "
+             "download threads)"
+    )
+    parser.add_argument(
+        "--validate", dest="validate_artwork",
+        action=argparse.BooleanOptionalAction,
+        help="Check downloaded artwork for placeholders and low resolution"
+    )
+    parser.add_argument(
+        "--min-image-size", type=int,
+        help="Warn about artwork smaller than this many pixels per side"
+    )
+    return parser
+
+
+def load_settings(args: argparse.Namespace, environ=None) -> Settings:
+    """
+    Resolve settings from defaults, config file, environment and flags.
+
+    Args:
+        args: Parsed command-line arguments
+        environ: Environment mapping (default: os.environ)
+
+    Returns:
+        Resolved Settings
+
+    Raises:
+        ValueError: If any layer contains an invalid setting
+    """
+    overrides = dict(args.settings)
+    for key, value in vars(args).items():
+        if key in DEFAULT_SETTINGS:
+            overrides[key] = value
+    return Settings.load(args.config, environ=environ, overrides=overrides)
+
+
+def build_negative_cache(settings: Settings) -> NegativeCache:
+    """
+    Create the persistent negative-result cache.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        NegativeCache stored in the configured cache directory
+    """
+    return NegativeCache(
+        os.path.join(settings.cache_dir, NEGATIVE_CACHE_FILENAME),
+        ttl=settings.negative_cache_days * 24 * 60 * 60,
+        max_entries=settings.cache_max_entries
+    )
+
+
+def build_library(settings: Settings) -> ArtworkIndex:
+    """
+    Load the artwork library index and bring it up to date.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        Refreshed ArtworkIndex of the artworks directory
+    """
+    library = ArtworkIndex(
+        os.path.join(settings.cache_dir, LIBRARY_INDEX_FILENAME),
+        settings.artworks_dir
+    )
+    library.refresh()
+    return library
+
+
+def build_validator_manifest(settings: Settings) -> ValidatorManifest:
+    """
+    Load the ETag/Last-Modified manifest of the artworks directory.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        ValidatorManifest kept as a sidecar file in the artworks directory
+    """
+    return ValidatorManifest(settings.artworks_dir)
+
+
+def build_catalog(settings: Settings) -> Optional[AlbumCatalog]:
+    """
+    Open the album metadata catalog.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        AlbumCatalog at ``catalog_path`` (default: in the artworks
+        directory), or None if the ``catalog`` setting is off
+
+    Raises:
+        ValueError: If the database can't be opened
+    """
+    if not settings.catalog:
+        return None
+    path = settings.catalog_path or os.path.join(
+        settings.artworks_dir, CATALOG_FILENAME
+    )
+    try:
+        return AlbumCatalog(path, settings.artworks_dir)
+    except (sqlite3.Error, OSError) as e:
+        raise ValueError(f"Can't open album catalog {path}: {e}") from None
+
+
+def build_profiler(settings: Settings) -> Optional[Profiler]:
+    """
+    Create the memory and CPU profiler.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        Profiler writing to ``profile_dir`` (default: a timestamped
+        directory under profiles/ in the cache directory), or None if the
+        ``profile`` setting is off
+
+    Raises:
+        ValueError: If the interval or report size is out of range
+    """
+    if not settings.profile:
+        return None
+    directory = settings.profile_dir or os.path.join(
+        settings.cache_dir, "profiles", time.strftime("%Y%m%d-%H%M%S")
+    )
+    return Profiler(directory, interval=settings.profile_interval,
+                    top=settings.profile_top)
+
+
+def build_transport(settings: Settings) -> Transport:
+    """
+    Create the HTTP transport selected by the settings.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        Configured Transport
+
+    Raises:
+        ValueError: If the mode is unknown or the replay archive is missing
+    """
+    archive = settings.transport_archive or os.path.join(
+        settings.cache_dir, TRANSPORT_ARCHIVE_FILENAME
+    )
+    return Transport(
+        settings.transport_mode,
+        archive_path=archive,
+        latency=settings.replay_latency,
+        error_rate=settings.replay_error_rate,
+        seed=settings.replay_seed
+    )
+
+
+def build_encoder(settings: Settings) -> ImageEncoder:
+    """
+    Create the image encoder selected by the settings.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        Configured ImageEncoder
+
+    Raises:
+        ValueError: If the requested format or quality is invalid
+    """
+    return ImageEncoder(
+        settings.output_format,
+        quality=settings.jpeg_quality,
+        progressive=settings.progressive_jpeg,
+        optimize=settings.optimize_output,
+        strip_metadata=settings.strip_metadata,
+    )
+
+
+def build_path_template(settings: Settings,
+                        encoder: ImageEncoder) -> PathTemplate:
+    """
+    Create the artwork path template selected by the settings.
+
+    Args:
+        settings: Resolved settings
+        encoder: Encoder whose extension saved files use
+
+    Returns:
+        Configured PathTemplate
+
+    Raises:
+        ValueError: If the template or shard count is invalid
+    """
+    return PathTemplate(
+        settings.path_template, shards=settings.path_shards,
+        extension=encoder.extension
+    )
+
+
+def build_image_pool(settings: Settings, encoder: ImageEncoder,
+                     analyzer: Optional[ImageAnalyzer]
+                     ) -> Optional[ImageProcessPool]:
+    """
+    Create the image process pool selected by the settings.
+
+    Args:
+        settings: Resolved settings
+        encoder: Output encoder for the workers
+        analyzer: Validator for the workers (None skips checks)
+
+    Returns:
+        ImageProcessPool, or None if image_workers is 0
+
+    Raises:
+        ValueError: If image_workers is negative
+    """
+    if settings.image_workers < 0:
+        raise ValueError("image_workers must be 0 or more")
+    if not settings.image_workers:
+        return None
+    return ImageProcessPool(encoder, analyzer, workers=settings.image_workers)
+
+
+def build_analyzer(settings: Settings) -> Optional[ImageAnalyzer]:
+    """
+    Create the artwork analyzer selected by the settings.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        Configured ImageAnalyzer, or None if validation is disabled
+
+    Raises:
+        ValueError: If a placeholder hash isn't valid hexadecimal
+    """
+    if not settings.validate_artwork:
+        return None
+    return _create_analyzer(settings)
+
+
+def _create_analyzer(settings: Settings) -> ImageAnalyzer:
+    return ImageAnalyzer(
+        min_size=settings.min_image_size,
+        placeholder_hashes=ImageAnalyzer.parse_hashes(
+            settings.placeholder_hashes
+        ),
+        max_distance=settings.duplicate_threshold
+    )
+
+
+def find_duplicates(settings: Settings, output: ConsoleOutput) -> Dict[str, list]:
+    """
+    Report near-duplicate, placeholder and unreadable artwork.
+
+    Args:
+        settings: Resolved settings
+        output: Console output handler
+
+    Returns:
+        Report from DuplicateFinder.analyze_directory()
+
+    Raises:
+        ValueError: If a placeholder hash isn't valid hexadecimal
+    """
+    finder = DuplicateFinder(
+        _create_analyzer(settings), workers=settings.concurrency
+    )
+    # Hashes are kept in the library index, so only new files are decoded
+    library = build_library(settings)
+    library.refresh(hash_fn=finder.hash_file, workers=settings.concurrency)
+    library.save()
+    report = finder.analyze(library.hashes())
+
+    for group in report['duplicates']:
+        output.warning(f"Near-duplicates ({len(group)}):")
+        for path in group:
+            output.info(f"  {path}")
+    labels = {'placeholders': "Placeholder", 'blank': "Blank",
+              'broken': "Unreadable"}
+    for key, label in labels.items():
+        for path in report[key]:
+            output.warning(f"{label}: {path}")
+    output.info(
+        f"{len(report['duplicates'])} duplicate group(s), "
+        f"{len(report['placeholders'])} placeholder(s), "
+        f"{len(report['blank'])} blank and "
+        f"{len(report['broken'])} unreadable file(s)."
+    )
+    return report
+
+
+def search_library(settings: Settings, output: ConsoleOutput,
+                   text: str) -> list:
+    """
+    Print saved artwork matching a query.
+
+    Args:
+        settings: Resolved settings
+        output: Console output handler
+        text: Words to look for
+
+    Returns:
+        List of (path, entry) matches
+    """
+    library = build_library(settings)
+    library.save()
+    matches = library.search(text)
+    for path, entry in matches:
+        artist = f" by {entry['artist']}" if entry.get('artist') else ""
+        album_id = f" [{entry['album_id']}]" if entry.get('album_id') else ""
+        output.info(f"{entry.get('title', '')}{artist}{album_id}: {path}")
+    output.info(f"{len(matches)} of {len(library)} saved artwork(s) matched.")
+    return matches
+
+
+def sync_artwork(settings: Settings, output: ConsoleOutput, target_dir: str,
+                 dry_run: bool = False) -> Dict[str, int]:
+    """
+    Mirror the artworks directory into a target directory.
+
+    Args:
+        settings: Resolved settings
+        output: Console output handler
+        target_dir: Destination folder
+        dry_run: Report what would change without copying
+
+    Returns:
+        Counts from ArtworkSync.run()
+
+    Raises:
+        ValueError: If the target or sync settings are invalid
+    """
+    sync = ArtworkSync(
+        settings.artworks_dir, os.path.expanduser(target_dir),
+        workers=settings.concurrency, max_size=settings.sync_max_size,
+        encoder=build_encoder(settings), delete=settings.sync_delete
+    )
+    started = time.perf_counter()
+    counts = sync.run(dry_run=dry_run)
+    verb = "Would copy" if dry_run else "Copied"
+    output.info(
+        f"{verb} {counts[COPIED]} file(s) "
+        f"({counts['bytes'] / (1024 * 1024):.1f} MB), "
+        f"{counts[UNCHANGED]} unchanged, {counts[DELETED]} deleted "
+        f"in {time.perf_counter() - started:.1f}s."
+    )
+    if counts[SYNC_FAILED]:
+        output.error(f"Error: {counts[SYNC_FAILED]} file(s) could not be synced.")
+    return counts
+
+
+def revalidate_artwork(settings: Settings,
+                       output: ConsoleOutput) -> Dict[str, int]:
+    """
+    Check every saved file with recorded validators against its source.
+
+    Each image URL is requested with If-None-Match/If-Modified-Since, so
+    unchanged artwork costs a 304 response without a body; artwork that
+    changed is downloaded and saved again. No Spotify credentials are
+    needed.
+
+    Args:
+        settings: Resolved settings
+        output: Console output handler
+
+    Returns:
+        Dictionary with 'unchanged', 'updated' and 'failed' counts
+
+    Raises:
+        ValueError: If the output format or transport settings are invalid
+    """
+    manifest = build_validator_manifest(settings)
+    entries = manifest.entries()
+    encoder = build_encoder(settings)
+    analyzer = build_analyzer(settings)
+    transport = build_transport(settings)
+    session = AlbumDownloader.create_session(
+        pool_connections=settings.pool_connections,
+        pool_maxsize=settings.pool_maxsize,
+        max_retries=settings.max_retries,
+        backoff_factor=settings.retry_backoff,
+        transport=transport,
+        http2_streams=settings.http2_streams if settings.http2 else 0,
+        http2_connections=settings.http2_connections
+    )
+    # Files saved in another format keep it: Pillow picks the format from
+    # their extension instead of using the configured encoder
+    downloaders = {
+        matching: AlbumDownloader(
+            output, timeout=settings.download_timeout,
+            encoder=encoder if matching else None, analyzer=analyzer,
+            session=session, manifest=manifest
+        )
+        for matching in (True, False)
+    }
+
+    def revalidate(entry) -> bool:
+        path, url = entry
+        matching = os.path.splitext(path)[1].lower() == encoder.extension
+        return downloaders[matching].download(url, path)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(settings.concurrency, 1)) as executor:
+            results = list(executor.map(revalidate, entries))
+    finally:
+        session.close()
+        transport.close()
+        manifest.save()
+
+    failed = results.count(False)
+    unchanged = sum(d.not_modified for d in downloaders.values())
+    downloaded = sum(d.bytes_downloaded for d in downloaders.values())
+    counts = {"unchanged": unchanged,
+              "updated": len(results) - failed - unchanged, "failed": failed}
+    output.info(
+        f"Checked {len(results)} file(s): {counts['unchanged']} unchanged, "
+        f"{counts['updated']} updated, {counts['failed']} failed "
+        f"({downloaded} bytes downloaded)."
+    )
+    return counts
+
+
+def report_profile(profiler: Profiler, output: ConsoleOutput) -> Dict:
+    """
+    Stop profiling and say where the reports were written.
+
+    Args:
+        profiler: Running profiler
+        output: Console output handler
+
+    Returns:
+        Summary from Profiler.stop(), or an empty dictionary if the
+        reports couldn't be written
+    """
+    try:
+        summary = profiler.stop()
+    except OSError as e:
+        output.error(f"Error: Failed to write profile: {e}")
+        return {}
+    if not summary:
+        return summary
+    output.event("profile", current=summary["current"], peak=summary["peak"],
+                 stages=summary["stages"])
+    output.info(
+        f"Profile written to {summary['directory']} "
+        f"({summary['peak'] / (1024 * 1024):.1f} MB traced at peak)."
+    )
+    return summary
+
+
+def build_folder_watcher(settings: Settings, root: str) -> FolderWatcher:
+    """
+    Create the music folder watcher selected by the settings.
+
+    Args:
+        settings: Resolved settings
+        root: Music folder to watch
+
+    Returns:
+        FolderWatcher for the folder
+
+    Raises:
+        ValueError: If the folder doesn't exist or a watch setting is invalid
+    """
+    root = os.path.abspath(os.path.expanduser(root))
+    if not os.path.isdir(root):
+        raise ValueError(f"Music folder not found: {root}")
+    return FolderWatcher(
+        root, debounce=settings.watch_debounce,
+        interval=settings.watch_interval, backend=settings.watch_backend
+    )
+
+
+def watch_folder(app: AlbumArtworkApp, watcher: FolderWatcher,
+                 stop: Optional[threading.Event] = None) -> None:
+    """
+    Download artwork for albums as they appear in a music folder.
+
+    Albums already in the folder are checked first; those already in the
+    library or the negative cache are skipped without a search. Changed
+    album folders are queued to ``concurrency`` worker threads, and a
+    folder that is still being processed isn't queued again. The library
+    index and caches are saved once the queued folders are done, rather
+    than after every album.
+
+    Args:
+        app: Application to search and download with
+        watcher: Watcher for the music folder
+        stop: Event that ends watching when set (default: run until
+            interrupted)
+    """
+    if not FilenameUtil.ensure_directory(app.artworks_dir, app.output):
+        return
+    active = set()
+    lock = threading.Lock()
+
+    def process(directory: str) -> None:
+        query = album_query(directory, watcher.root)
+        try:
+            app.output.info(f"Album folder changed: {query}")
+            app.process_album(query)
+        except Exception as e:
+            app.output.error(f"Error: {query}: {e}")
+        finally:
+            with lock:
+                active.discard(directory)
+                settled = not active
+            if settled:
+                app.save_state()
+
+    with app.deferred_saves(), \
+            ThreadPoolExecutor(max_workers=app.settings.concurrency) as executor:
+        def queue(directory: str) -> None:
+            with lock:
+                if directory in active:
+                    return
+                active.add(directory)
+            executor.submit(process, directory)
+
+        app.output.info(f"Watching {watcher.root} for new albums...")
+        watcher.run(queue, stop)
+
+
+def build_shard_journal(settings: Settings) -> Optional[ShardJournal]:
+    """
+    Open the shard journal if a shard is configured.
+
+    Args:
+        settings: Resolved settings
+
+    Returns:
+        ShardJournal in the artworks directory, or None when not sharded
+
+    Raises:
+        ValueError: If the shard setting is invalid
+        OSError: If the journal can't be opened
+    """
+    if not settings.shard:
+        return None
+    index, count = parse_shard(settings.shard)
+    return ShardJournal(settings.artworks_dir, index, count)
+
+
+def merge_shard_dirs(settings: Settings, output: ConsoleOutput,
+                     shard_dirs: List[str]) -> Dict[str, int]:
+    """
+    Merge shard artworks directories into the artworks directory.
+
+    Args:
+        settings: Resolved settings
+        output: Console output handler
+        shard_dirs: Artworks directories copied from the shards
+
+    Returns:
+        Counts from merge_shards()
+
+    Raises:
+        ValueError: If a directory isn't a shard's artworks directory
+    """
+    library = build_library(settings)
+    negative_cache = build_negative_cache(settings)
+    counts = merge_shards(
+        [os.path.expanduser(path) for path in shard_dirs],
+        library, negative_cache
+    )
+    library.save()
+    negative_cache.save()
+    output.info(
+        f"Merged {counts[MERGED]} file(s), {counts[SHARD_UNCHANGED]} already "
+        f"present, {counts[MISSES]} miss(es); {len(library)} saved artwork(s) "
+        f"indexed."
+    )
+    if counts[CONFLICTS] or counts[MISSING]:
+        output.warning(
+            f"{counts[CONFLICTS]} conflicting and {counts[MISSING]} missing "
+            f"file(s) were not merged."
+        )
+    return counts
+
+
+def run_batch_file(app: AlbumArtworkApp, path: str,
+                   progress: ProgressReporter) -> Dict[str, int]:
+    """
+    Run a batch from a text, CSV or JSONL file, streaming its rows.
+
+    The ``batch_format`` setting picks the format ("auto" goes by the
+    file extension). Rows that can't be used, including lines that
+    aren't UTF-8 and CSV rows the csv module rejects, are reported and
+    counted as failed. The rows are counted for the ETA in the
+    background, so processing doesn't wait for a large file to be read.
+
+    Args:
+        app: Application to run the batch with
+        path: Input file path, or '-' for stdin
+        progress: Progress reporter for the batch
+
+    Returns:
+        Dictionary of outcome to count
+    """
+    fmt = app.settings.batch_format
+    progress.bytes_source = lambda: getattr(
+        app.album_downloader, 'bytes_downloaded', 0
+    )
+    if app.limiters:
+        progress.limits_source = app.concurrency_limits
+
+    def on_invalid(line_number: int, reason: str) -> None:
+        app.output.warning(f"Skipping line {line_number}: {reason}")
+        progress.update(FAILED)
+
+    if path != '-':
+        def count() -> None:
+            try:
+                total = count_rows(path, fmt)
+            except OSError:
+                return
+            if app.shard:
+                # Hashing spreads rows evenly, so this is close enough for
+                # an ETA
+                total = -(-total // app.shard[1])
+            progress.total = total
+
+        # Work starts on the first row while the rest is counted
+        threading.Thread(target=count, name="batch-count", daemon=True).start()
+    items = read_batch(path, fmt, on_invalid=on_invalid)
+    return app.run_batch(items, progress=progress)
+
+
+def build_log_sink(settings: Settings, print_fn=print) -> LogSink:
+    """
+    Create the logging backend selected by the settings.
+
+    Args:
+        settings: Resolved settings
+        print_fn: Function the writer thread uses for console text
+
+    Returns:
+        Started LogSink
+
+    Raises:
+        ValueError: If the log level is unknown
+        OSError: If the log file can't be opened
+    """
+    return LogSink(
+        level=settings.log_level,
+        print_fn=print_fn,
+        log_file=settings.log_file or None,
+        max_bytes=settings.log_max_bytes,
+        backup_count=settings.log_backup_count
+    )
+
+
+def add_credentials(credentials_manager: CredentialsManager,
+                    output: ConsoleOutput) -> bool:
+    """
+    Prompt for another Spotify credential set and add it to the pool.
+
+    Args:
+        credentials_manager: Credentials manager to save to
+        output: Console output handler
+
+    Returns:
+        True if the credentials were saved, False otherwise
+    """
+    client_id = output.prompt("Your Spotify Client ID: ").strip()
+    client_secret = output.prompt("Your Spotify Client Secret: ").strip()
+    if not credentials_manager.add(client_id, client_secret):
+        output.error("Error: Unable to save credentials.")
+        return False
+    count = len(credentials_manager.load_all())
+    output.info(f"Saved. {count} Spotify credential set(s) configured.")
+    return True
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Entry point for the application.
+
+    Args:
+        argv: Command-line arguments (default: sys.argv[1:])
+    """
+    args = build_arg_parser().parse_args(argv)
     output = ConsoleOutput()
     credentials_manager = CredentialsManager()
 
+    if args.add_credentials:
+        add_credentials(credentials_manager, output)
+        return
+
+    if args.batch and args.batch != '-' and not os.path.isfile(args.batch):
+        output.error(f"Error: Batch file not found: {args.batch}")
+        sys.exit(2)
+
+    if args.shard and not args.batch:
+        output.error("Error: --shard needs --batch")
+        sys.exit(2)
+
+    if (args.find_duplicates or args.library_search or args.library_refresh
+            or args.sync or args.merge_shards or args.revalidate):
+        try:
+            settings = load_settings(args)
+            if args.revalidate:
+                revalidate_artwork(settings, output)
+            elif args.merge_shards:
+                merge_shard_dirs(settings, output, args.merge_shards)
+            elif args.sync:
+                sync_artwork(settings, output, args.sync, dry_run=args.dry_run)
+            elif args.find_duplicates:
+                find_duplicates(settings, output)
+            elif args.library_search:
+                search_library(settings, output, args.library_search)
+            else:
+                library = build_library(settings)
+                library.save()
+                output.info(f"{len(library)} saved artwork(s) indexed.")
+        except (ValueError, OSError) as e:
+            output.error(f"Error: {e}")
+            sys.exit(2)
+        return
+
+    progress = ProgressReporter() if args.batch else None
+    try:
+        settings = load_settings(args)
+        encoder = build_encoder(settings)
+        analyzer = build_analyzer(settings)
+        path_template = build_path_template(settings, encoder)
+        watcher = build_folder_watcher(settings, args.watch) if args.watch else None
+        transport = build_transport(settings)
+        parse_provider_names(settings.providers)
+        if settings.provider_mode not in PROVIDER_MODES:
+            raise ValueError(f"Unknown provider mode: {settings.provider_mode}")
+        if settings.batch_format not in BATCH_FORMATS:
+            raise ValueError(f"Unknown batch format: {settings.batch_format}")
+        if settings.shard:
+            parse_shard(settings.shard)
+        if settings.max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if settings.prefetch_count < 0:
+            raise ValueError("prefetch_count can't be negative")
+        if settings.http2:
+            check_http2(settings.http2_streams, settings.http2_connections)
+        sink = build_log_sink(
+            settings, print_fn=progress.print if progress else print
+        )
+        image_pool = build_image_pool(settings, encoder, analyzer)
+        journal = build_shard_journal(settings) if args.batch else None
+        catalog = build_catalog(settings)
+        profiler = build_profiler(settings)
+        if profiler is not None:
+            profiler.start()
+    except (ValueError, OSError) as e:
+        output.error(f"Error: {e}")
+        sys.exit(2)
+
+    output = ConsoleOutput(sink=sink)
+    if profiler is not None:
+        profiler.output = output
     try:
-        app = AlbumArtworkApp(output, credentials_manager)
-        app.run()
-    except ValueError:
-        # Invalid credentials already reported
-        sys.exit(1)
+        try:
+            app = AlbumArtworkApp(
+                output, credentials_manager,
+                album_selector=AutoSelector() if args.batch or watcher else None,
+                encoder=encoder, settings=settings,
+                negative_cache=build_negative_cache(settings),
+                transport=transport, analyzer=analyzer,
+                library=build_library(settings), path_template=path_template,
+                image_pool=image_pool, journal=journal,
+                validators=build_validator_manifest(settings), catalog=catalog,
+                profiler=profiler
+            )
+        except ValueError:
+            # Invalid credentials already reported
+            sys.exit(1)
+        if args.batch:
+            run_batch_file(app, args.batch, progress)
+        elif watcher:
+            watch_folder(app, watcher)
+        else:
+            app.run()
     except KeyboardInterrupt:
         output.info("\nExiting the program.")
         sys.exit(0)
+    finally:
+        if image_pool:
+            image_pool.close()
+        if journal:
+            journal.close()
+        if catalog is not None:
+            catalog.close()
+        if profiler is not None:
+            report_profile(profiler, output)
+        transport.close()
+        sink.close()
 
 
 if __name__ == "__main__":
+    # Needed for the image process pool in PyInstaller builds
+    multiprocessing.freeze_support()
     main()
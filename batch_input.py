@@ -0,0 +1,303 @@
+"""Streaming readers for batch input files (text, CSV and JSONL)."""
+import csv
+import json
+import os
+import re
+import sys
+from typing import Optional, Callable, Iterable, Iterator, List, NamedTuple, Dict
+
+BATCH_FORMATS = ("auto", "text", "csv", "jsonl")
+
+# Accepted column names, in order of preference
+ALBUM_FIELDS = ("album", "title", "album_name", "name")
+ARTIST_FIELDS = ("artist", "album_artist", "artist_name")
+ID_FIELDS = ("spotify_id", "album_id", "id", "spotify_uri", "uri", "url")
+
+# spotify:album:<id> and https://open.spotify.com/album/<id>?si=...
+_SPOTIFY_ID = re.compile(r"(?:album[:/])?([0-9A-Za-z]{22})(?:[?#].*)?$")
+
+# Called with (line number, reason) for rows that can't be used
+InvalidRowFn = Callable[[int, str], None]
+
+
+class BatchItem(NamedTuple):
+    """One album to process: a search query and, optionally, its ID."""
+
+    query: str
+    album_id: str = ""
+
+    @classmethod
+    def from_fields(cls, album: str = "", artist: str = "",
+                    album_id: str = "") -> "BatchItem":
+        """
+        Build an item from separate album, artist and ID values.
+
+        Args:
+            album: Album title
+            artist: Artist name
+            album_id: Spotify album ID, URI or URL
+
+        Returns:
+            BatchItem with a "Title - Artist" query
+        """
+        album = " ".join(album.split())
+        artist = " ".join(artist.split())
+        query = f"{album} - {artist}" if album and artist else album
+        return cls(query, spotify_album_id(album_id))
+
+
+def spotify_album_id(value: str) -> str:
+    """
+    Extract a Spotify album ID from an ID, URI or open.spotify.com URL.
+
+    Args:
+        value: ID as found in an export
+
+    Returns:
+        The 22-character ID, or "" if the value isn't one
+    """
+    match = _SPOTIFY_ID.search(value.strip()) if value else None
+    return match.group(1) if match else ""
+
+
+def detect_format(path: str) -> str:
+    """
+    Guess a batch file's format from its extension.
+
+    Args:
+        path: Input file path ('-' for stdin)
+
+    Returns:
+        "csv", "jsonl" or "text"
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".csv", ".tsv"):
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "text"
+
+
+def _pick(row: Dict[str, str], fields: Iterable[str]) -> str:
+    for field in fields:
+        value = row.get(field)
+        if value:
+            return str(value)
+    return ""
+
+
+def parse_text(lines: Iterable[str],
+               on_invalid: Optional[InvalidRowFn] = None) -> Iterator[BatchItem]:
+    """
+    Parse one query per line, skipping blank lines.
+
+    Args:
+        lines: Input lines
+        on_invalid: Unused; accepted so every parser has the same signature
+
+    Returns:
+        Iterator of BatchItem
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield BatchItem(line)
+
+
+def parse_csv(lines: Iterable[str],
+              on_invalid: Optional[InvalidRowFn] = None,
+              delimiter: str = ",") -> Iterator[BatchItem]:
+    """
+    Parse CSV rows of album, artist and optional Spotify ID.
+
+    A header row naming the columns (album/title, artist, spotify_id/id,
+    ...) is used if present; otherwise the columns are taken in that
+    order.
+
+    Args:
+        lines: Input lines
+        on_invalid: Called for rows without an album or ID, or that the
+            csv module can't parse
+        delimiter: Field separator
+
+    Returns:
+        Iterator of BatchItem
+    """
+    reader = csv.reader(lines, delimiter=delimiter)
+    columns: Optional[List[str]] = None
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            # e.g. a field over csv.field_size_limit(); the reader carries
+            # on with the next line
+            if on_invalid:
+                on_invalid(reader.line_num, f"unreadable CSV row: {e}")
+            continue
+        if not any(cell.strip() for cell in row):
+            continue
+        if columns is None:
+            names = [cell.strip().lower().replace(" ", "_") for cell in row]
+            if set(names) & set(ALBUM_FIELDS + ID_FIELDS):
+                columns = names
+                continue
+            columns = ["album", "artist", "spotify_id"]
+        values = dict(zip(columns, row))
+        item = BatchItem.from_fields(
+            _pick(values, ALBUM_FIELDS), _pick(values, ARTIST_FIELDS),
+            _pick(values, ID_FIELDS)
+        )
+        if item.query or item.album_id:
+            yield item
+        elif on_invalid:
+            on_invalid(reader.line_num, "no album name or Spotify ID")
+
+
+def parse_jsonl(lines: Iterable[str],
+                on_invalid: Optional[InvalidRowFn] = None) -> Iterator[BatchItem]:
+    """
+    Parse one JSON object (or string) per line.
+
+    Objects use the same keys as CSV headers: album/title, artist and
+    spotify_id/id.
+
+    Args:
+        lines: Input lines
+        on_invalid: Called for lines that aren't valid JSON or lack an
+            album and ID
+
+    Returns:
+        Iterator of BatchItem
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            if on_invalid:
+                on_invalid(line_number, f"invalid JSON: {e.msg}")
+            continue
+        if isinstance(record, str):
+            item = BatchItem.from_fields(record)
+        elif isinstance(record, dict):
+            item = BatchItem.from_fields(
+                _pick(record, ALBUM_FIELDS), _pick(record, ARTIST_FIELDS),
+                _pick(record, ID_FIELDS)
+            )
+        else:
+            item = BatchItem("")
+        if item.query or item.album_id:
+            yield item
+        elif on_invalid:
+            on_invalid(line_number, "no album name or Spotify ID")
+
+
+def _decode_lines(lines: Iterable[bytes],
+                 on_invalid: Optional[InvalidRowFn] = None) -> Iterator[str]:
+    """
+    Decode UTF-8 lines one at a time, blanking the ones that aren't.
+
+    A line that doesn't decode is reported and replaced by an empty line,
+    so the parsers skip it and later line numbers stay right. A byte
+    order mark at the start is dropped.
+
+    Args:
+        lines: Raw input lines (text lines are passed through)
+        on_invalid: Called with (line number, reason) for undecodable lines
+
+    Returns:
+        Iterator of text lines
+    """
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, str):
+            yield line
+            continue
+        try:
+            yield line.decode("utf-8-sig" if line_number == 1 else "utf-8")
+        except UnicodeDecodeError as e:
+            if on_invalid:
+                on_invalid(line_number, f"not valid UTF-8 (byte {e.start + 1})")
+            yield "\n"
+
+
+def read_batch(path: str, fmt: str = "auto",
+               on_invalid: Optional[InvalidRowFn] = None) -> Iterator[BatchItem]:
+    """
+    Lazily read albums from a batch file.
+
+    Rows are parsed one at a time as the iterator is consumed, so memory
+    use doesn't grow with the file and work can start on the first row
+    straight away. The file is closed when the iterator is exhausted or
+    closed.
+
+    Args:
+        path: Input file path, or '-' for stdin
+        fmt: One of BATCH_FORMATS ("auto" guesses from the extension)
+        on_invalid: Called with (line number, reason) for skipped rows,
+            including lines that aren't valid UTF-8
+
+    Returns:
+        Iterator of BatchItem
+
+    Raises:
+        ValueError: If the format is unknown
+        OSError: If the file can't be opened (when iteration starts)
+    """
+    if fmt not in BATCH_FORMATS:
+        raise ValueError(f"Unknown batch format: {fmt}")
+    if fmt == "auto":
+        fmt = detect_format(path)
+    options = {}
+    if fmt == "csv" and path.lower().endswith(".tsv"):
+        options["delimiter"] = "\t"
+    parse = {"text": parse_text, "csv": parse_csv, "jsonl": parse_jsonl}[fmt]
+
+    def rows() -> Iterator[BatchItem]:
+        if path == "-":
+            stdin = getattr(sys.stdin, "buffer", sys.stdin)
+            yield from parse(_decode_lines(stdin, on_invalid), on_invalid,
+                             **options)
+            return
+        # Decoded line by line, so one bad byte only loses its line
+        with open(path, "rb") as f:
+            yield from parse(_decode_lines(f, on_invalid), on_invalid, **options)
+
+    return rows()
+
+
+def count_rows(path: str, fmt: str = "auto") -> int:
+    """
+    Estimate the number of albums in a batch file without parsing it.
+
+    Counts non-blank lines, less a CSV header. Quoted CSV fields spanning
+    lines make this an overestimate; it is only used for progress.
+
+    Args:
+        path: Input file path
+        fmt: One of BATCH_FORMATS
+
+    Returns:
+        Approximate number of rows
+    """
+    if fmt == "auto":
+        fmt = detect_format(path)
+    count = 0
+    header = None
+    # Bytes, so counting is cheap and undecodable lines don't stop it
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                if header is None:
+                    header = line.decode("utf-8-sig", errors="replace")
+                count += 1
+    if fmt == "csv" and header is not None:
+        names = {
+            cell.strip().strip('"').lower().replace(" ", "_")
+            for cell in re.split(r"[,\t]", header)
+        }
+        if names & set(ALBUM_FIELDS + ID_FIELDS):
+            count -= 1
+    return count
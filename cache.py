@@ -0,0 +1,171 @@
+"""Persistent caches for search results."""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional, Dict, Any, Callable
+
+# Reasons recorded for a miss
+NOT_FOUND = "not_found"
+NO_ARTWORK = "no_artwork"
+
+NEGATIVE_CACHE_FILENAME = "negative_cache.json"
+
+
+class NegativeCache:
+    """
+    Remembers searches that came back empty so they aren't repeated.
+
+    Entries expire after ``ttl`` seconds, after which the search is tried
+    again. The cache is safe to share between threads.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int = 10000,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize negative cache.
+
+        Args:
+            path: JSON file the cache is persisted to
+            ttl: Seconds before a recorded miss is checked again
+                (0 disables the cache)
+            max_entries: Maximum entries kept; the oldest are dropped
+            clock: Time function (for testing, default: time.time)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def make_key(kind: str, value: str) -> str:
+        """
+        Build a cache key, normalizing case and whitespace.
+
+        Args:
+            kind: Key namespace, e.g. "query" or "album"
+            value: Query text or album ID
+
+        Returns:
+            Cache key string
+        """
+        return f"{kind}:{' '.join(value.casefold().split())}"
+
+    @property
+    def enabled(self) -> bool:
+        """Whether misses are recorded and honoured."""
+        return self.ttl > 0
+
+    def load(self) -> None:
+        """
+        Load entries from disk, starting empty if missing or corrupted.
+
+        Malformed entries, e.g. from a hand-edited file, are dropped.
+        """
+        if not self.enabled or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (ValueError, IOError):
+            return
+        if not isinstance(data, dict):
+            return
+        entries = {key: entry for key, entry in data.items()
+                   if self._is_valid(entry)}
+        with self._lock:
+            self._entries = entries
+            self._dirty = len(entries) != len(data)
+
+    @staticmethod
+    def _is_valid(entry: Any) -> bool:
+        """Whether a loaded entry has a reason and a check time."""
+        return (isinstance(entry, dict)
+                and isinstance(entry.get("reason"), str)
+                and isinstance(entry.get("checked_at"), (int, float))
+                and not isinstance(entry["checked_at"], bool))
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a recorded miss that hasn't expired yet.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Miss reason, or None if the search should be attempted
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.clock() - entry["checked_at"] >= self.ttl:
+                del self._entries[key]
+                self._dirty = True
+                return None
+            return entry["reason"]
+
+    def record(self, key: str, reason: str) -> None:
+        """
+        Record a miss.
+
+        Args:
+            key: Cache key
+            reason: Why the lookup failed (NOT_FOUND or NO_ARTWORK)
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {"reason": reason, "checked_at": self.clock()}
+            # Dicts keep insertion order, so the first entries are the oldest
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._dirty = True
+
+    def discard(self, key: str) -> None:
+        """
+        Forget a recorded miss, e.g. after the album was found.
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> bool:
+        """
+        Write the cache to disk if it changed.
+
+        Returns:
+            True if saved (or nothing to save), False on error
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            entries = dict(self._entries)
+            self._dirty = False
+
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+            return True
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            return False
@@ -0,0 +1,191 @@
+"""SQLite catalog of downloaded albums' metadata, for other tools to query."""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from PIL import Image
+
+from models import Album
+
+CATALOG_FILENAME = "album_catalog.sqlite"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS albums (
+    path TEXT PRIMARY KEY,
+    album_id TEXT NOT NULL DEFAULT '',
+    provider TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    artist TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    release_date TEXT NOT NULL DEFAULT '',
+    year INTEGER,
+    album_type TEXT NOT NULL DEFAULT '',
+    total_tracks INTEGER,
+    image_url TEXT NOT NULL DEFAULT '',
+    image_width INTEGER,
+    image_height INTEGER,
+    downloaded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS albums_artist ON albums (artist, title);
+CREATE INDEX IF NOT EXISTS albums_title ON albums (title);
+CREATE INDEX IF NOT EXISTS albums_album_id ON albums (album_id);
+"""
+
+_COLUMNS = (
+    "path", "album_id", "provider", "title", "artist", "release_date", "year",
+    "album_type", "total_tracks", "image_url", "image_width", "image_height",
+    "downloaded_at",
+)
+
+
+def _image_size(path: str, album: Album) -> Tuple[Optional[int], Optional[int]]:
+    """Saved file's dimensions (header only), else the provider's."""
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        pass
+    if album.images and album.images[0].width:
+        return album.images[0].width, album.images[0].height
+    return None, None
+
+
+class AlbumCatalog:
+    """
+    SQLite table of every downloaded album's metadata.
+
+    One row per artwork file (keyed by its path relative to the artworks
+    directory) with album ID, provider, title, artist, release date,
+    track count and image dimensions. Title and artist are indexed and
+    compare case-insensitively, so other tools can query the library
+    directly, e.g. ``SELECT * FROM albums WHERE artist = 'queen'``.
+
+    The database uses write-ahead logging, so readers aren't blocked
+    while a batch is writing. Rows are committed by commit() and every
+    ``commit_every`` records. Safe to share between threads.
+    """
+
+    def __init__(self, path: str, artworks_dir: str, commit_every: int = 200,
+                 clock=time.time):
+        """
+        Open (or create) a catalog.
+
+        Args:
+            path: SQLite database file
+            artworks_dir: Directory the catalog's paths are relative to
+            commit_every: Records between automatic commits
+            clock: Time function for download timestamps (for testing)
+
+        Raises:
+            sqlite3.Error: If the database can't be opened or is corrupt
+            OSError: If its directory can't be created
+        """
+        self.path = path
+        self.artworks_dir = artworks_dir
+        self.commit_every = max(commit_every, 1)
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        try:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._db.commit()
+        except sqlite3.Error:
+            self._db.close()
+            raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM albums").fetchone()[0]
+
+    def record(self, path: str, album: Album, artist: str = "") -> None:
+        """
+        Record (or update) a downloaded album.
+
+        Args:
+            path: Saved artwork file path
+            album: Album record from the provider
+            artist: Artist name (default: the album's first artist)
+        """
+        width, height = _image_size(path, album)
+        row = (
+            os.path.relpath(path, self.artworks_dir), album.id, album.provider,
+            album.name, artist or album.artist, album.release_date,
+            int(album.year) if album.year.isdigit() else None,
+            album.album_type, album.total_tracks or None,
+            album.image_url or "", width, height, self.clock(),
+        )
+        placeholders = ", ".join("?" * len(_COLUMNS))
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO albums ({', '.join(_COLUMNS)}) "
+                f"VALUES ({placeholders})", row
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._db.commit()
+                self._pending = 0
+
+    def find_album(self, album_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an album by provider album ID.
+
+        Args:
+            album_id: Album ID
+
+        Returns:
+            Row as a dictionary, or None if not catalogued
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM albums WHERE album_id = ? "
+                "ORDER BY downloaded_at DESC LIMIT 1", (album_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def search(self, artist: Optional[str] = None,
+               title: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Find albums by exact (case-insensitive) artist and/or title.
+
+        Args:
+            artist: Artist name
+            title: Album title
+
+        Returns:
+            Matching rows as dictionaries, sorted by artist, year and title
+        """
+        conditions, values = [], []
+        if artist is not None:
+            conditions.append("artist = ?")
+            values.append(artist)
+        if title is not None:
+            conditions.append("title = ?")
+            values.append(title)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM albums {where}ORDER BY artist, year, title",
+                values
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def commit(self) -> None:
+        """Make recorded rows visible to other readers."""
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        """Commit and close the database."""
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -1,17 +1,291 @@
 """Configuration and credentials management."""
 import json
 import os
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, Any, Mapping, List
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+_CONFIG_READ_ERRORS = (json.JSONDecodeError, IOError) + (
+    (tomllib.TOMLDecodeError,) if tomllib else ()
+)
 
 # Configuration constants
 CREDENTIALS_FILE = os.path.expanduser("~/.spotify_credentials.json")
+CONFIG_FILE = os.path.expanduser("~/.album_artwork_downloader.toml")
+CACHE_DIR = os.path.expanduser("~/.cache/album_artwork_downloader")
 ALBUM_ARTWORKS_DIR = os.path.expanduser("~/Pictures/albumartworks")
 SEARCH_LIMIT = 10
-DOWNLOAD_TIMEOUT = 10
+DOWNLOAD_TIMEOUT = 10.0
+ENV_PREFIX = "ALBUM_ARTWORK_"
+
+# Output encoding defaults
+OUTPUT_FORMAT = "jpeg"
+JPEG_QUALITY = 85
+PROGRESSIVE_JPEG = False
+OPTIMIZE_OUTPUT = False
+STRIP_METADATA = False
+
+# Built-in defaults for every tunable setting (lowest configuration layer)
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "artworks_dir": ALBUM_ARTWORKS_DIR,
+    "search_limit": SEARCH_LIMIT,
+    "search_max_results": SEARCH_LIMIT,
+    "search_wide": False,
+    "match_threshold": 0.9,
+    "providers": "spotify",
+    "provider_mode": "fallback",
+    "itunes_url": "https://itunes.apple.com",
+    "musicbrainz_url": "https://musicbrainz.org",
+    "coverartarchive_url": "https://coverartarchive.org",
+    "download_timeout": DOWNLOAD_TIMEOUT,
+    "api_timeout": 5.0,
+    "concurrency": 4,
+    "adaptive_concurrency": False,
+    "max_concurrency": 32,
+    "prefetch_count": 3,
+    "pool_connections": 10,
+    "pool_maxsize": 10,
+    "max_retries": 3,
+    "retry_backoff": 0.3,
+    "http2": False,
+    "http2_streams": 100,
+    "http2_connections": 2,
+    "cache_dir": CACHE_DIR,
+    "cache_max_entries": 10000,
+    "negative_cache_days": 7.0,
+    "log_level": "info",
+    "log_file": "",
+    "log_max_bytes": 10 * 1024 * 1024,
+    "log_backup_count": 3,
+    "transport_mode": "live",
+    "transport_archive": "",
+    "replay_latency": 0.0,
+    "replay_error_rate": 0.0,
+    "replay_seed": 0,
+    "output_format": OUTPUT_FORMAT,
+    "jpeg_quality": JPEG_QUALITY,
+    "progressive_jpeg": PROGRESSIVE_JPEG,
+    "optimize_output": OPTIMIZE_OUTPUT,
+    "strip_metadata": STRIP_METADATA,
+    "validate_artwork": True,
+    "min_image_size": 300,
+    "duplicate_threshold": 5,
+    "placeholder_hashes": "",
+    "skip_existing": True,
+    "path_template": "{album}",
+    "path_shards": 0,
+    "image_workers": 0,
+    "sync_max_size": 0,
+    "sync_delete": False,
+    "search_cache_size": 1000,
+    "batch_format": "auto",
+    "batch_queue_size": 100,
+    "shard": "",
+    "catalog": False,
+    "catalog_path": "",
+    "profile": False,
+    "profile_dir": "",
+    "profile_interval": 60.0,
+    "profile_top": 10,
+    "watch_backend": "auto",
+    "watch_debounce": 2.0,
+    "watch_interval": 10.0,
+}
+
+_PATH_SETTINGS = {
+    "artworks_dir", "cache_dir", "transport_archive", "log_file", "catalog_path",
+    "profile_dir",
+}
+_TRUE_STRINGS = {"1", "true", "yes", "on"}
+_FALSE_STRINGS = {"0", "false", "no", "off"}
+
+
+class Settings:
+    """
+    Layered application settings.
+
+    Values are resolved from built-in defaults, then a TOML/JSON config
+    file, then ``ALBUM_ARTWORK_*`` environment variables, then explicit
+    overrides (usually command-line flags). Later layers win.
+    """
+
+    def __init__(self, values: Optional[Mapping[str, Any]] = None):
+        """
+        Initialize settings on top of the built-in defaults.
+
+        Args:
+            values: Setting overrides (validated and coerced)
+
+        Raises:
+            ValueError: If a key is unknown or a value has the wrong type
+        """
+        self._values = dict(DEFAULT_SETTINGS)
+        if values:
+            self.update(values)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self.__dict__["_values"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Settings) and self._values == other._values
+
+    def __repr__(self) -> str:
+        return f"Settings({self._values!r})"
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Get a copy of all resolved settings.
+
+        Returns:
+            Dictionary of setting name to value
+        """
+        return dict(self._values)
+
+    def update(self, values: Mapping[str, Any]) -> None:
+        """
+        Apply a layer of overrides, skipping None values.
+
+        Args:
+            values: Setting overrides
+
+        Raises:
+            ValueError: If a key is unknown or a value has the wrong type
+        """
+        for key, value in values.items():
+            if value is None:
+                continue
+            self._values[key] = self._coerce(key, value)
+
+    @staticmethod
+    def _coerce(key: str, value: Any) -> Any:
+        """Convert a raw value to the type of the setting's default."""
+        if key not in DEFAULT_SETTINGS:
+            raise ValueError(f"Unknown setting: {key}")
+
+        default = DEFAULT_SETTINGS[key]
+        try:
+            if isinstance(default, bool):
+                if isinstance(value, bool):
+                    return value
+                text = str(value).strip().lower()
+                if text in _TRUE_STRINGS:
+                    return True
+                if text in _FALSE_STRINGS:
+                    return False
+                raise ValueError(value)
+            if isinstance(default, int):
+                if isinstance(value, bool):
+                    raise ValueError(value)
+                return int(value)
+            if isinstance(default, float):
+                return float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for {key}: {value!r}") from None
+
+        value = str(value)
+        if key in _PATH_SETTINGS:
+            value = os.path.expanduser(value)
+        return value
+
+    @staticmethod
+    def read_file(path: str) -> Dict[str, Any]:
+        """
+        Read settings from a TOML or JSON file.
+
+        Args:
+            path: Path to the config file (``.json`` files are parsed as
+                JSON, everything else as TOML)
+
+        Returns:
+            Dictionary of settings, empty if the file doesn't exist
+
+        Raises:
+            ValueError: If the file can't be parsed
+        """
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            if path.endswith(".json"):
+                with open(path, "r") as f:
+                    data = json.load(f)
+            else:
+                if tomllib is None:
+                    raise ValueError(
+                        "TOML config files require Python 3.11 or newer"
+                    )
+                with open(path, "rb") as f:
+                    data = tomllib.load(f)
+        except _CONFIG_READ_ERRORS as e:
+            raise ValueError(f"Unable to read config file {path}: {e}")
+
+        if not isinstance(data, dict):
+            raise ValueError(f"Config file {path} must contain a table")
+        return data
+
+    @staticmethod
+    def from_environ(environ: Mapping[str, str]) -> Dict[str, str]:
+        """
+        Collect settings from ``ALBUM_ARTWORK_<NAME>`` environment variables.
+
+        Args:
+            environ: Environment mapping
+
+        Returns:
+            Dictionary of settings found in the environment
+        """
+        values = {}
+        for key in DEFAULT_SETTINGS:
+            env_name = ENV_PREFIX + key.upper()
+            if env_name in environ:
+                values[key] = environ[env_name]
+        return values
+
+    @classmethod
+    def load(cls, config_file: Optional[str] = None,
+             environ: Optional[Mapping[str, str]] = None,
+             overrides: Optional[Mapping[str, Any]] = None) -> "Settings":
+        """
+        Resolve settings from every configuration layer.
+
+        Args:
+            config_file: Config file path (default: ``ALBUM_ARTWORK_CONFIG``
+                or CONFIG_FILE)
+            environ: Environment mapping (default: os.environ)
+            overrides: Highest-priority overrides, e.g. CLI flags
+
+        Returns:
+            Resolved Settings
+
+        Raises:
+            ValueError: If any layer contains an invalid setting
+        """
+        if environ is None:
+            environ = os.environ
+        if config_file is None:
+            config_file = environ.get(ENV_PREFIX + "CONFIG", CONFIG_FILE)
+
+        settings = cls()
+        settings.update(cls.read_file(os.path.expanduser(config_file)))
+        settings.update(cls.from_environ(environ))
+        if overrides:
+            settings.update(overrides)
+        return settings
 
 
 class CredentialsManager:
-    """Manages Spotify API credentials with file persistence."""
+    """
+    Manages Spotify API credentials with file persistence.
+
+    The file holds either a single ``client_id``/``client_secret`` pair or
+    a ``credentials`` list of pairs for spreading load over several apps.
+    """
 
     def __init__(self, credentials_file: str = CREDENTIALS_FILE):
         """
@@ -44,22 +318,73 @@ class CredentialsManager:
         except IOError:
             return False
 
+    def add(self, client_id: str, client_secret: str) -> bool:
+        """
+        Add another set of Spotify API credentials to the file.
+
+        Args:
+            client_id: Spotify client ID
+            client_secret: Spotify client secret
+
+        Returns:
+            True if saved successfully, False otherwise
+        """
+        if not client_id or not client_secret:
+            return False
+
+        credentials = [
+            creds for creds in self.load_all()
+            if creds["client_id"] != client_id
+        ]
+        credentials.append(
+            {"client_id": client_id, "client_secret": client_secret}
+        )
+        try:
+            with open(self.credentials_file, "w") as f:
+                json.dump({"credentials": credentials}, f)
+            return True
+        except IOError:
+            return False
+
     def load(self) -> Optional[dict]:
         """
         Load Spotify API credentials from file.
 
         Returns:
-            Dictionary with 'client_id' and 'client_secret' if found,
-            None if file doesn't exist or is corrupted
+            Dictionary with 'client_id' and 'client_secret' if found (the
+            first set when several are saved), None if file doesn't exist
+            or is corrupted
+        """
+        credentials = self.load_all()
+        return credentials[0] if credentials else None
+
+    def load_all(self) -> List[dict]:
+        """
+        Load every saved set of Spotify API credentials.
+
+        Returns:
+            List of dictionaries with 'client_id' and 'client_secret';
+            empty if file doesn't exist or is corrupted
         """
         if not os.path.exists(self.credentials_file):
-            return None
+            return []
 
         try:
             with open(self.credentials_file, "r") as f:
-                return json.load(f)
+                data = json.load(f)
         except (json.JSONDecodeError, IOError):
-            return None
+            return []
+
+        if not isinstance(data, dict):
+            return []
+        entries = data.get("credentials", [data])
+        if not isinstance(entries, list):
+            return []
+        return [
+            entry for entry in entries
+            if isinstance(entry, dict)
+            and entry.get("client_id") and entry.get("client_secret")
+        ]
 
     def get_or_prompt(self, output, input_fn=input) -> Tuple[str, str]:
         """
@@ -85,3 +410,25 @@ class CredentialsManager:
                 return client_id, client_secret
             else:
                 output.error("Error: Client ID and Client Secret cannot be empty.")
+
+    def get_all_or_prompt(self, output, input_fn=input) -> List[Tuple[str, str]]:
+        """
+        Get every saved credential set, or prompt user for one.
+
+        Args:
+            output: ConsoleOutput instance for messaging
+            input_fn: Input function (for testing, default: built-in input)
+
+        Returns:
+            List of (client_id, client_secret) tuples
+        """
+        credentials = self.load_all()
+        if len(credentials) > 1:
+            output.info(
+                f"Using {len(credentials)} saved Spotify credential sets."
+            )
+            return [
+                (creds["client_id"], creds["client_secret"])
+                for creds in credentials
+            ]
+        return [self.get_or_prompt(output, input_fn)]
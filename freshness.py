@@ -0,0 +1,183 @@
+"""HTTP validators for saved artwork, used to revalidate instead of re-download."""
+import json
+import os
+import tempfile
+import threading
+from typing import Optional, Dict, Any, List, Mapping, Tuple
+
+VALIDATORS_FILENAME = ".artwork-validators.json"
+MANIFEST_VERSION = 1
+
+
+class ValidatorManifest:
+    """
+    Sidecar manifest of each saved file's source URL, ETag and
+    Last-Modified.
+
+    Kept as a hidden file in the artworks directory, so it travels with
+    the artwork it describes. Each entry also keeps the size and
+    modification time of the file as saved; once a file has been edited
+    or replaced, its validators no longer describe it and aren't used.
+    The manifest is safe to share between threads.
+    """
+
+    def __init__(self, artworks_dir: str, path: Optional[str] = None):
+        """
+        Initialize manifest, loading any saved entries.
+
+        Args:
+            artworks_dir: Directory the manifest describes
+            path: JSON file the manifest is persisted to (default:
+                VALIDATORS_FILENAME in the artworks directory)
+        """
+        self.artworks_dir = artworks_dir
+        self.path = path or os.path.join(artworks_dir, VALIDATORS_FILENAME)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Load entries from disk, starting empty if missing or invalid."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return
+        entries = data.get("entries")
+        if isinstance(entries, dict):
+            with self._lock:
+                self._entries = entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _relpath(self, path: str) -> str:
+        return os.path.relpath(path, self.artworks_dir)
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def conditional_headers(self, path: str, url: str) -> Dict[str, str]:
+        """
+        Request headers that let the server answer 304 Not Modified.
+
+        Args:
+            path: Artwork file about to be (re)downloaded
+            url: Image URL about to be requested
+
+        Returns:
+            If-None-Match and/or If-Modified-Since headers, or an empty
+            dictionary if the file is unknown, changed since it was saved
+            or came from a different URL
+        """
+        with self._lock:
+            entry = self._entries.get(self._relpath(path))
+        if not entry or entry.get("url") != url:
+            return {}
+        if self._stat(path) != (entry.get("size"), entry.get("mtime_ns")):
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, path: str, url: str, headers: Mapping[str, str]) -> None:
+        """
+        Record the validators of a freshly saved file.
+
+        Args:
+            path: Saved artwork file path
+            url: Image URL it was downloaded from
+            headers: Response headers (case-insensitive mapping)
+        """
+        relpath = self._relpath(path)
+        stat = self._stat(path)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        with self._lock:
+            if stat is None or not (etag or last_modified):
+                # Nothing to revalidate with
+                if self._entries.pop(relpath, None) is not None:
+                    self._dirty = True
+                return
+            self._entries[relpath] = {
+                "url": url, "etag": etag, "last_modified": last_modified,
+                "size": stat[0], "mtime_ns": stat[1],
+            }
+            self._dirty = True
+
+    def revalidated(self, path: str, headers: Mapping[str, str]) -> None:
+        """
+        Update a file's validators from a 304 Not Modified response.
+
+        Args:
+            path: Artwork file that was confirmed unchanged
+            headers: Response headers; validators the server resent
+                replace the stored ones
+        """
+        with self._lock:
+            entry = self._entries.get(self._relpath(path))
+            if entry is None:
+                return
+            for header, key in (("ETag", "etag"),
+                                ("Last-Modified", "last_modified")):
+                value = headers.get(header)
+                if value and value != entry.get(key):
+                    entry[key] = value
+                    self._dirty = True
+
+    def entries(self) -> List[Tuple[str, str]]:
+        """
+        Files with recorded validators that still exist.
+
+        Returns:
+            List of (artwork path, source URL) sorted by path
+        """
+        with self._lock:
+            items = sorted(self._entries.items())
+        entries = []
+        for relpath, entry in items:
+            path = os.path.join(self.artworks_dir, relpath)
+            if entry.get("url") and os.path.isfile(path):
+                entries.append((path, entry["url"]))
+        return entries
+
+    def save(self) -> bool:
+        """
+        Write the manifest to disk if it changed.
+
+        Returns:
+            True if saved (or nothing to save), False on error
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            data = {
+                "version": MANIFEST_VERSION,
+                "entries": {relpath: dict(entry)
+                            for relpath, entry in self._entries.items()},
+            }
+            self._dirty = False
+
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+            return True
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            return False
@@ -0,0 +1,151 @@
+"""Process-pool image decoding and encoding with shared-memory transfer."""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, NamedTuple, Tuple
+
+from PIL import Image
+
+from album_service import (
+    ImageEncoder, ImageAnalyzer, ImageReport, REJECTED_PROBLEMS
+)
+
+# Per-process state set up by _init_worker
+_encoder: Optional[ImageEncoder] = None
+_analyzer: Optional[ImageAnalyzer] = None
+
+
+class ProcessedImage(NamedTuple):
+    """Result of processing one image in a worker."""
+
+    data: Optional[bytes]
+    report: Optional[ImageReport]
+
+
+def _init_worker(encoder: ImageEncoder,
+                 analyzer: Optional[ImageAnalyzer]) -> None:
+    """Store the encoder and analyzer once per worker process."""
+    global _encoder, _analyzer
+    _encoder = encoder
+    _analyzer = analyzer
+
+
+def _write_shared(data: bytes) -> str:
+    """Copy bytes into a new shared memory block and return its name."""
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        block.buf[:len(data)] = data
+        return block.name
+    finally:
+        block.close()
+
+
+def _read_shared(name: str, size: int, unlink: bool = False) -> bytes:
+    """Copy bytes out of a shared memory block, optionally freeing it."""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(block.buf[:size])
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+
+
+def _free_shared(name: str) -> None:
+    """Release a shared memory block."""
+    block = shared_memory.SharedMemory(name=name)
+    block.close()
+    block.unlink()
+
+
+def _process(name: str, size: int) -> Tuple[Optional[str], int,
+                                             Optional[ImageReport]]:
+    """
+    Decode, check and re-encode an image held in shared memory.
+
+    Runs in a worker process. The encoded result is written to a new
+    shared memory block which the caller reads and unlinks.
+
+    Returns:
+        Tuple of (result block name or None if rejected, result size,
+        analysis report or None)
+    """
+    data = _read_shared(name, size)
+    if _analyzer:
+        img = _analyzer.open_safely(data)
+        report = _analyzer.analyze(img)
+        if any(problem in REJECTED_PROBLEMS for problem in report.problems):
+            return None, 0, report
+    else:
+        img = Image.open(BytesIO(data))
+        report = None
+
+    out = BytesIO()
+    _encoder.save(img, out)
+    encoded = out.getbuffer()
+    return _write_shared(encoded), len(encoded), report
+
+
+class ImageProcessPool:
+    """
+    Decodes, validates and encodes images in worker processes.
+
+    Image bytes are handed to workers, and results handed back, through
+    ``multiprocessing.shared_memory`` blocks rather than pickled copies,
+    so Pillow work runs in parallel on every core without the GIL.
+    """
+
+    def __init__(self, encoder: ImageEncoder,
+                 analyzer: Optional[ImageAnalyzer] = None,
+                 workers: Optional[int] = None):
+        """
+        Initialize and start the worker processes.
+
+        Args:
+            encoder: Output encoder used by the workers
+            analyzer: Validator run before encoding (None skips checks)
+            workers: Number of processes (default: one per CPU)
+        """
+        self.encoder = encoder
+        self.analyzer = analyzer
+        # Workers must share the parent's tracker so blocks created on one
+        # side and unlinked on the other aren't reported as leaked
+        resource_tracker.ensure_running()
+        # Forking a process that already runs download threads isn't safe
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker, initargs=(encoder, analyzer)
+        )
+
+    def process(self, data: bytes) -> ProcessedImage:
+        """
+        Process one image in a worker and wait for the result.
+
+        Safe to call from several threads at once.
+
+        Args:
+            data: Encoded source image
+
+        Returns:
+            ProcessedImage with the encoded output (None if the analyzer
+            rejected the image) and the analysis report
+
+        Raises:
+            Exception: If the image can't be decoded or encoded
+        """
+        name = _write_shared(data)
+        try:
+            result_name, size, report = self.executor.submit(
+                _process, name, len(data)
+            ).result()
+        finally:
+            _free_shared(name)
+        if result_name is None:
+            return ProcessedImage(None, report)
+        return ProcessedImage(_read_shared(result_name, size, unlink=True), report)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,389 @@
+"""Persistent index of the local artwork library."""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List, Iterator, Tuple
+
+from album_service import ARTWORK_EXTENSIONS
+from models import Album
+from query import fold, parse_query
+
+LIBRARY_INDEX_FILENAME = "artwork_index.json"
+INDEX_VERSION = 1
+
+# Returns (dhash, contrast) for an image file, or None if it can't be decoded
+HashFn = Callable[[str], Optional[Tuple[int, float]]]
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize text for index lookups, ignoring case, punctuation and
+    edition suffixes such as "(Remastered 2009)".
+
+    Args:
+        text: Album title, artist or file name
+
+    Returns:
+        Normalized text
+    """
+    return fold(parse_query(text).search_text)
+
+
+def iter_artwork_files(directory: str) -> Iterator[os.DirEntry]:
+    """
+    Yield artwork files below a directory, skipping hidden entries.
+
+    Args:
+        directory: Directory to walk
+
+    Returns:
+        Iterator of os.DirEntry for each artwork file
+    """
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    yield from iter_artwork_files(entry.path)
+                elif entry.name.lower().endswith(ARTWORK_EXTENSIONS):
+                    yield entry
+    except OSError:
+        return
+
+
+class ArtworkIndex:
+    """
+    Index of downloaded artwork keyed by album ID, title, artist and name.
+
+    Entries are keyed by path relative to the artworks directory and keep
+    each file's size and modification time, so refresh() only has to stat
+    the directory tree and re-examine files that changed. The index is
+    safe to share between threads.
+    """
+
+    def __init__(self, path: str, artworks_dir: str):
+        """
+        Initialize artwork index, loading any saved entries.
+
+        Args:
+            path: JSON file the index is persisted to
+            artworks_dir: Directory the index describes
+        """
+        self.path = path
+        self.artworks_dir = artworks_dir
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._by_album_id: Dict[str, str] = {}
+        self._by_key: Dict[str, str] = {}
+        self._by_title_artist: Dict[Tuple[str, str], str] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Load entries from disk, starting empty if missing or stale."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+        # An index of another directory (or format) is no use here
+        if (not isinstance(data, dict)
+                or data.get("version") != INDEX_VERSION
+                or data.get("root") != os.path.abspath(self.artworks_dir)):
+            return
+        with self._lock:
+            self._entries = data.get("entries", {})
+            self._rebuild_lookups()
+
+    def _rebuild_lookups(self) -> None:
+        """Rebuild lookup tables from entries; caller holds the lock."""
+        self._by_album_id = {}
+        self._by_key = {}
+        self._by_title_artist = {}
+        for relpath, entry in self._entries.items():
+            self._add_lookups(relpath, entry)
+
+    def _add_lookups(self, relpath: str, entry: Dict[str, Any]) -> None:
+        if entry.get("album_id"):
+            self._by_album_id[entry["album_id"]] = relpath
+        for key in self._keys(entry):
+            self._by_key.setdefault(key, relpath)
+        if entry.get("artist"):
+            self._by_title_artist.setdefault(
+                (normalize(entry.get("title", "")), normalize(entry["artist"])),
+                relpath
+            )
+
+    def _drop_lookups(self, relpath: str, entry: Dict[str, Any]) -> None:
+        """Remove an entry's lookups that point at relpath."""
+        if self._by_album_id.get(entry.get("album_id")) == relpath:
+            del self._by_album_id[entry["album_id"]]
+        for key in self._keys(entry):
+            if self._by_key.get(key) == relpath:
+                del self._by_key[key]
+        if entry.get("artist"):
+            title_artist = (normalize(entry.get("title", "")),
+                            normalize(entry["artist"]))
+            if self._by_title_artist.get(title_artist) == relpath:
+                del self._by_title_artist[title_artist]
+
+    @staticmethod
+    def _keys(entry: Dict[str, Any]) -> List[str]:
+        """Lookup keys for an entry: name, title and artist with title."""
+        keys = [normalize(entry.get("name", "")), normalize(entry.get("title", ""))]
+        if entry.get("artist"):
+            keys.append(normalize(f"{entry['artist']} {entry['title']}"))
+            keys.append(normalize(f"{entry['title']} {entry['artist']}"))
+        return [key for key in keys if key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def refresh(self, hash_fn: Optional[HashFn] = None,
+                workers: int = 4) -> Dict[str, int]:
+        """
+        Bring the index up to date with the artworks directory.
+
+        Unchanged files (same size and modification time) keep their
+        entries. New and changed files are (re)examined; removed files are
+        dropped.
+
+        Args:
+            hash_fn: Computes (dhash, contrast) for a file path, e.g.
+                DuplicateFinder.hash_file (None skips hashing); only run
+                for new, changed or unhashed files
+            workers: Threads used to run hash_fn
+
+        Returns:
+            Dictionary with 'added', 'changed', 'removed' and 'unchanged'
+            counts
+        """
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        seen = {}
+        for file_entry in iter_artwork_files(self.artworks_dir):
+            stat = file_entry.stat()
+            relpath = os.path.relpath(file_entry.path, self.artworks_dir)
+            seen[relpath] = (stat.st_size, stat.st_mtime)
+
+        with self._lock:
+            entries = {}
+            for relpath, (size, mtime) in seen.items():
+                entry = self._entries.get(relpath)
+                if entry is None:
+                    counts["added"] += 1
+                    stem = os.path.splitext(os.path.basename(relpath))[0]
+                    entry = {"name": stem, "title": stem}
+                elif entry.get("size") != size or entry.get("mtime") != mtime:
+                    counts["changed"] += 1
+                    entry = dict(entry)
+                    entry.pop("dhash", None)
+                    entry.pop("contrast", None)
+                else:
+                    counts["unchanged"] += 1
+                entry["size"] = size
+                entry["mtime"] = mtime
+                entries[relpath] = entry
+            counts["removed"] = len(set(self._entries) - set(entries))
+            self._entries = entries
+            self._rebuild_lookups()
+            if counts["added"] or counts["changed"] or counts["removed"]:
+                self._dirty = True
+
+        if hash_fn:
+            self._hash_missing(hash_fn, workers)
+        return counts
+
+    def _hash_missing(self, hash_fn: HashFn, workers: int) -> None:
+        """Compute hashes for entries that don't have one yet."""
+        with self._lock:
+            pending = [relpath for relpath, entry in self._entries.items()
+                       if "dhash" not in entry]
+        if not pending:
+            return
+        paths = [os.path.join(self.artworks_dir, relpath) for relpath in pending]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(hash_fn, paths))
+        with self._lock:
+            for relpath, result in zip(pending, results):
+                entry = self._entries.get(relpath)
+                if entry is None:
+                    continue
+                if result is None:
+                    # Remember undecodable files until they change
+                    entry["dhash"] = None
+                else:
+                    entry["dhash"] = f"{result[0]:016x}"
+                    entry["contrast"] = round(result[1], 2)
+            self._dirty = True
+
+    def add(self, path: str, album: Album, artist: str = "") -> None:
+        """
+        Record a downloaded album's artwork.
+
+        Args:
+            path: Saved artwork file path
+            album: Album record
+            artist: Artist name
+        """
+        relpath = os.path.relpath(path, self.artworks_dir)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        entry = {
+            "name": os.path.splitext(os.path.basename(relpath))[0],
+            "title": album.name,
+            "artist": artist,
+            "album_id": album.id or None,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+        with self._lock:
+            old = self._entries.get(relpath)
+            self._entries[relpath] = entry
+            if old is not None:
+                self._drop_lookups(relpath, old)
+            self._add_lookups(relpath, entry)
+            self._dirty = True
+
+    def _existing(self, relpath: Optional[str]) -> Optional[str]:
+        """Absolute path for an indexed file that still exists."""
+        if relpath is None:
+            return None
+        path = os.path.join(self.artworks_dir, relpath)
+        return path if os.path.exists(path) else None
+
+    def find_album(self, album_id: str) -> Optional[str]:
+        """
+        Find saved artwork for an album ID.
+
+        Args:
+            album_id: Provider album ID
+
+        Returns:
+            Artwork path, or None if not in the library
+        """
+        with self._lock:
+            relpath = self._by_album_id.get(album_id)
+        return self._existing(relpath)
+
+    def album_id_at(self, path: str) -> Optional[str]:
+        """
+        Album ID recorded for an artwork file.
+
+        Args:
+            path: Artwork file path
+
+        Returns:
+            Album ID, or None if the file is unknown or has no ID
+        """
+        relpath = os.path.relpath(path, self.artworks_dir)
+        with self._lock:
+            entry = self._entries.get(relpath)
+        return entry.get("album_id") if entry else None
+
+    def find(self, text: str) -> Optional[str]:
+        """
+        Find saved artwork by title, "artist title" or file name.
+
+        Args:
+            text: Search query or sanitized name
+
+        Returns:
+            Artwork path, or None if not in the library
+        """
+        with self._lock:
+            relpath = self._by_key.get(normalize(text))
+        return self._existing(relpath)
+
+    def find_title(self, title: str, artist: str) -> Optional[str]:
+        """
+        Find saved artwork for an album title by a given artist.
+
+        Unlike find(), a title saved for a different artist (two
+        artists' "Greatest Hits") doesn't match.
+
+        Args:
+            title: Album title
+            artist: Artist name
+
+        Returns:
+            Artwork path, or None if not in the library
+        """
+        with self._lock:
+            relpath = self._by_title_artist.get((normalize(title), normalize(artist)))
+        return self._existing(relpath)
+
+    def search(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Find entries containing every word of a query.
+
+        Args:
+            text: Words to look for in titles, artists and file names
+
+        Returns:
+            List of (path, entry) sorted by path
+        """
+        words = normalize(text).split()
+        with self._lock:
+            items = sorted(self._entries.items())
+        results = []
+        for relpath, entry in items:
+            haystack = normalize(" ".join(
+                [relpath, entry.get("title", ""), entry.get("artist", "")]
+            ))
+            if all(word in haystack for word in words):
+                results.append((os.path.join(self.artworks_dir, relpath), entry))
+        return results
+
+    def hashes(self) -> List[Tuple[str, Optional[Tuple[int, float]]]]:
+        """
+        Perceptual hashes recorded by refresh().
+
+        Returns:
+            List of (path, (dhash, contrast)) for hashed entries, with None
+            in place of the tuple for files that couldn't be decoded
+        """
+        with self._lock:
+            items = sorted(self._entries.items())
+        return [
+            (os.path.join(self.artworks_dir, relpath),
+             None if entry["dhash"] is None
+             else (int(entry["dhash"], 16), entry.get("contrast", 0.0)))
+            for relpath, entry in items if "dhash" in entry
+        ]
+
+    def save(self) -> bool:
+        """
+        Write the index to disk if it changed.
+
+        Returns:
+            True if saved (or nothing to save), False on error
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            data = {
+                "version": INDEX_VERSION,
+                "root": os.path.abspath(self.artworks_dir),
+                "entries": dict(self._entries),
+            }
+            self._dirty = False
+
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+            return True
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            return False
@@ -0,0 +1,165 @@
+"""Adaptive (AIMD) concurrency limits driven by observed latency and errors."""
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable
+
+# Responses that mean the server is overloaded or rate limiting
+OVERLOAD_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class AdaptiveLimiter:
+    """
+    Limits concurrent requests to one service, adapting the limit with
+    additive increase / multiplicative decrease (AIMD).
+
+    While every slot is in use and recent requests are healthy (p95
+    latency within ``latency_tolerance`` of the best p95 seen, error
+    rate at most ``max_error_rate``), the limit grows by about one slot
+    per ``limit`` completions. A 429, 5xx or timeout multiplies it by
+    ``decrease``. Only requests started after the last decrease can
+    decrease it again, so the requests caught in one overload count
+    once, as in TCP congestion control. Safe to share between threads.
+    """
+
+    def __init__(self, name: str, initial: int = 4, minimum: int = 1,
+                 maximum: int = 32, window: int = 50,
+                 latency_tolerance: float = 2.0, max_error_rate: float = 0.05,
+                 decrease: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize limiter.
+
+        Args:
+            name: Service name used in metrics, e.g. "api" or "cdn"
+            initial: Starting limit
+            minimum: Lowest limit
+            maximum: Highest limit
+            window: Number of recent requests latency and errors are
+                measured over
+            latency_tolerance: How far p95 latency may rise above the best
+                p95 seen before the limit stops growing
+            max_error_rate: Fraction of overloaded requests in the window
+                above which the limit stops growing
+            decrease: Factor applied to the limit on overload
+            clock: Time function (for testing, default: time.monotonic)
+
+        Raises:
+            ValueError: If the limits or factors are out of range
+        """
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Concurrency limits need 1 <= minimum <= maximum")
+        if not 0 < decrease < 1:
+            raise ValueError("Concurrency decrease must be between 0 and 1")
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.decrease = decrease
+        self.clock = clock
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        # Most requests in flight at once since the limit last changed
+        self._peak = 0
+        self.requests = 0
+        self.overloads = 0
+        self.decreases = 0
+        # (latency, overloaded) of recent requests
+        self._samples: deque = deque(maxlen=max(window, 1))
+        self._baseline = math.inf
+        self._last_decrease = -math.inf
+        self._condition = threading.Condition()
+
+    @property
+    def current(self) -> int:
+        """Current limit as a number of slots."""
+        return int(self.limit)
+
+    def acquire(self) -> float:
+        """
+        Wait for a free slot and take it.
+
+        Returns:
+            Start time to pass to release()
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            self._peak = max(self._peak, self.in_flight)
+        return self.clock()
+
+    def release(self, started: float, overloaded: bool = False) -> None:
+        """
+        Return a slot and adjust the limit from the request's outcome.
+
+        Args:
+            started: Value returned by acquire()
+            overloaded: The request got a 429 or 5xx response or timed out
+        """
+        now = self.clock()
+        with self._condition:
+            slots = int(self.limit)
+            self.in_flight -= 1
+            self.requests += 1
+            self._samples.append((now - started, overloaded))
+            if overloaded:
+                self.overloads += 1
+                if started >= self._last_decrease:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif self._peak >= slots and self._healthy():
+                # Only grow a limit that demand actually reached
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if self.requests % self._samples.maxlen == 0:
+                # Let the latency baseline drift up slowly, so a network
+                # that got slower for good doesn't pin the limit forever
+                self._baseline *= 1.05
+                self._peak = self.in_flight
+            elif int(self.limit) != slots:
+                self._peak = self.in_flight
+            self._condition.notify_all()
+
+    def _p95(self) -> float:
+        """p95 latency of the window; caller holds the lock."""
+        latencies = sorted(latency for latency, _ in self._samples)
+        return latencies[max(math.ceil(len(latencies) * 0.95) - 1, 0)]
+
+    def _error_rate(self) -> float:
+        """Fraction of overloaded requests; caller holds the lock."""
+        if not self._samples:
+            return 0.0
+        return sum(overloaded for _, overloaded in self._samples) / len(self._samples)
+
+    def _healthy(self) -> bool:
+        """Whether recent requests allow a higher limit; caller holds the lock."""
+        if self._error_rate() > self.max_error_rate:
+            return False
+        if len(self._samples) < self._samples.maxlen:
+            # Too few requests to judge latency yet
+            return True
+        p95 = self._p95()
+        self._baseline = min(self._baseline, p95)
+        return p95 <= self._baseline * self.latency_tolerance
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current limit and health for reporting.
+
+        Returns:
+            Dictionary with limit, in_flight, p95_ms, error_rate,
+            requests, overloads and decreases
+        """
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "p95_ms": round(self._p95() * 1000) if self._samples else None,
+                "error_rate": round(self._error_rate(), 3),
+                "requests": self.requests,
+                "overloads": self.overloads,
+                "decreases": self.decreases,
+            }
@@ -0,0 +1,122 @@
+"""Buffered, structured logging backend for console and log file output."""
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Callable, Any
+
+LOGGER_NAME = "album_artwork"
+LEVELS = ("debug", "info", "warning", "error")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(
+                record.created, tz=timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        data.update(getattr(record, "fields", None) or {})
+        return json.dumps(data, default=str)
+
+
+class ConsoleHandler(logging.Handler):
+    """Writes pre-formatted console text; records without text are skipped."""
+
+    def __init__(self, print_fn: Callable[[str], Any] = print):
+        """
+        Initialize console handler.
+
+        Args:
+            print_fn: Function to use for printing (default: built-in print)
+        """
+        super().__init__()
+        self.print_fn = print_fn
+
+    def emit(self, record: logging.LogRecord) -> None:
+        text = getattr(record, "text", None)
+        if text is not None:
+            self.print_fn(text)
+
+
+class LogSink:
+    """
+    Level-filtered log sink with a background writer thread.
+
+    Callers only enqueue records; a single listener thread writes them to
+    the console and, optionally, to a rotating JSON-lines log file. Worker
+    threads therefore never block on or interleave output.
+    """
+
+    def __init__(self, level: str = "info",
+                 print_fn: Callable[[str], Any] = print,
+                 log_file: Optional[str] = None,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3):
+        """
+        Initialize and start the log sink.
+
+        Args:
+            level: Minimum level to keep ('debug', 'info', 'warning', 'error')
+            print_fn: Function used by the writer thread for console text
+            log_file: Path of the JSON log file (None disables it)
+            max_bytes: Log file size that triggers rotation
+            backup_count: Number of rotated log files to keep
+
+        Raises:
+            ValueError: If the level is unknown
+            OSError: If the log file can't be opened
+        """
+        if level.lower() not in LEVELS:
+            raise ValueError(f"Unknown log level: {level}")
+
+        self.queue: queue.Queue = queue.Queue()
+        # A private logger keeps records out of the global logging tree
+        self.logger = logging.Logger(LOGGER_NAME, level.upper())
+        self.logger.addHandler(QueueHandler(self.queue))
+
+        self.handlers = [ConsoleHandler(print_fn)]
+        if log_file:
+            file_handler = RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count,
+                encoding="utf-8"
+            )
+            file_handler.setFormatter(JsonFormatter())
+            self.handlers.append(file_handler)
+
+        self.listener = QueueListener(self.queue, *self.handlers)
+        self.listener.start()
+        self._closed = False
+
+    def log(self, level: int, message: str, text: Optional[str] = None,
+            **fields) -> None:
+        """
+        Queue a log record.
+
+        Args:
+            level: logging level, e.g. logging.INFO
+            message: Plain message for the log file
+            text: Formatted console text (None logs to the file only)
+            **fields: Structured fields such as query, album_id, stage
+                and duration
+        """
+        self.logger.log(level, message, extra={"text": text, "fields": fields})
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        if not self._closed:
+            self.queue.join()
+
+    def close(self) -> None:
+        """Write pending records, stop the writer thread and close files."""
+        if self._closed:
+            return
+        self._closed = True
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
@@ -0,0 +1,82 @@
+"""Compact album records shared by search, selection and download."""
+import sys
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, NamedTuple
+
+# __slots__ dataclasses need Python 3.10
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+class ImageVariant(NamedTuple):
+    """One size of an album's artwork."""
+
+    url: str
+    width: int = 0
+    height: int = 0
+
+
+@dataclass(frozen=True, **_SLOTS)
+class Album:
+    """
+    The fields of a search result the application uses.
+
+    Built once from a provider's response, so the full API payload
+    (markets, external URLs, ...) isn't kept alive for every result.
+    """
+
+    id: str
+    name: str
+    artist: str = ""
+    year: str = ""
+    album_type: str = ""
+    images: Tuple[ImageVariant, ...] = ()
+    provider: str = "spotify"
+    release_date: str = ""
+    total_tracks: int = 0
+
+    @property
+    def image_url(self) -> Optional[str]:
+        """URL of the largest image, or None if there is no artwork."""
+        return self.images[0].url if self.images else None
+
+    @property
+    def image_area(self) -> int:
+        """Pixel area of the largest image, 0 if unknown."""
+        if not self.images:
+            return 0
+        return self.images[0].width * self.images[0].height
+
+    @classmethod
+    def from_spotify(cls, data: Dict[str, Any],
+                     provider: str = "spotify") -> "Album":
+        """
+        Build a record from a Spotify-shaped album dictionary.
+
+        Args:
+            data: Album object with ``id``, ``name``, ``artists``,
+                ``images`` (largest first), ``release_date``,
+                ``total_tracks`` and ``album_type``
+            provider: Provider the album came from
+
+        Returns:
+            Album record
+        """
+        artists = data.get('artists') or []
+        images = sorted(
+            (ImageVariant(image['url'], image.get('width') or 0,
+                          image.get('height') or 0)
+             for image in data.get('images') or [] if image.get('url')),
+            # Spotify lists the largest first; keep that order on ties
+            key=lambda image: -(image.width * image.height)
+        )
+        return cls(
+            id=data.get('id') or "",
+            name=data.get('name') or "",
+            artist=artists[0].get('name', "") if artists else "",
+            year=(data.get('release_date') or "")[:4],
+            album_type=data.get('album_type') or "",
+            images=tuple(images),
+            provider=provider,
+            release_date=data.get('release_date') or "",
+            total_tracks=data.get('total_tracks') or 0,
+        )
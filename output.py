@@ -1,59 +1,107 @@
 """Console output utilities with color formatting."""
+import logging
+import re
+import sys
+import threading
+import time
+from typing import Optional, Callable, Dict
 
 # ANSI escape codes for color formatting
 RED = "\033[91m"
 GREEN = "\033[92m"
 YELLOW = "\033[93m"
 RESET = "\033[0m"
+CLEAR_LINE = "\r\033[K"
+
+# Batch item outcomes counted by ProgressReporter
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+_ANSI_ESCAPE = re.compile(r"\033\[[0-9;]*[A-Za-z]")
 
 
 class ConsoleOutput:
     """Handles formatted console output with dependency injection for testability."""
 
-    def __init__(self, print_fn=print):
+    def __init__(self, print_fn=print, sink=None):
         """
         Initialize with optional print function (for testing).
 
         Args:
             print_fn: Function to use for printing (default: built-in print)
+            sink: LogSink to send messages through instead of printing
+                directly (its writer thread does the printing)
         """
-        self._print = print_fn
+        self.sink = sink
+        self._print = self._print_to_sink if sink else print_fn
+
+    def _print_to_sink(self, text: str) -> None:
+        """Send pre-formatted text through the sink at info level."""
+        self.sink.log(logging.INFO, _ANSI_ESCAPE.sub("", text), text=text)
 
-    def error(self, message: str) -> None:
+    def _emit(self, level: int, message: str, text: str, fields) -> None:
+        """Print formatted text, or log it with its fields via the sink."""
+        if self.sink:
+            self.sink.log(level, message, text=text, **fields)
+        else:
+            self._print(text)
+
+    def error(self, message: str, **fields) -> None:
         """
         Print error message in red.
 
         Args:
             message: Error message to display
+            **fields: Structured fields for the log file
         """
-        self._print(f"{RED}{message}{RESET}")
+        self._emit(logging.ERROR, message, f"{RED}{message}{RESET}", fields)
 
-    def success(self, message: str) -> None:
+    def success(self, message: str, **fields) -> None:
         """
         Print success message (default color).
 
         Args:
             message: Success message to display
+            **fields: Structured fields for the log file
         """
-        self._print(message)
+        self._emit(logging.INFO, message, message, fields)
 
-    def warning(self, message: str) -> None:
+    def warning(self, message: str, **fields) -> None:
         """
         Print warning message in yellow.
 
         Args:
             message: Warning message to display
+            **fields: Structured fields for the log file
         """
-        self._print(f"{YELLOW}{message}{RESET}")
+        self._emit(logging.WARNING, message, f"{YELLOW}{message}{RESET}", fields)
 
-    def info(self, message: str) -> None:
+    def info(self, message: str, **fields) -> None:
         """
         Print info message (default color).
 
         Args:
             message: Info message to display
+            **fields: Structured fields for the log file
+        """
+        self._emit(logging.INFO, message, message, fields)
+
+    def event(self, stage: str, **fields) -> None:
         """
-        self._print(message)
+        Record a structured event in the log file without printing it.
+
+        Args:
+            stage: Pipeline stage, e.g. "search" or "download"
+            **fields: Structured fields such as query, album_id, duration
+        """
+        if self.sink:
+            self.sink.log(logging.INFO, stage, stage=stage, **fields)
+
+    def flush(self) -> None:
+        """Wait until queued messages have been written."""
+        if self.sink:
+            self.sink.flush()
 
     def prompt(self, message: str, color: str = GREEN) -> str:
         """
@@ -66,4 +114,162 @@ class ConsoleOutput:
         Returns:
             User input string
         """
+        # Let queued messages appear before the prompt
+        self.flush()
         return input(f"{color}{message}{RESET}")
+
+
+class ProgressReporter:
+    """
+    Live progress line for batch runs with throughput and ETA.
+
+    On a terminal the status line is redrawn in place at most once every
+    ``min_interval`` seconds. Otherwise (e.g. output piped to a log file)
+    a full status line is written every ``log_interval`` seconds.
+    """
+
+    def __init__(self, total: Optional[int] = None, stream=None,
+                 is_tty: Optional[bool] = None,
+                 bytes_source: Optional[Callable[[], int]] = None,
+                 limits_source: Optional[Callable[[], Dict[str, int]]] = None,
+                 min_interval: float = 0.2, log_interval: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize progress reporter.
+
+        Args:
+            total: Number of items in the batch, if known
+            stream: Output stream (default: sys.stdout)
+            is_tty: Force terminal/log behaviour (default: detect)
+            bytes_source: Function returning total bytes downloaded so far
+            limits_source: Function returning current concurrency limits
+                by service name
+            min_interval: Minimum seconds between terminal redraws
+            log_interval: Seconds between log lines when not a terminal
+            clock: Time function (for testing, default: time.monotonic)
+        """
+        self.total = total
+        self.stream = stream or sys.stdout
+        if is_tty is None:
+            is_tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.is_tty = is_tty
+        self.bytes_source = bytes_source
+        self.limits_source = limits_source
+        self.interval = min_interval if is_tty else log_interval
+        self.clock = clock
+        self.counts = {DONE: 0, FAILED: 0, SKIPPED: 0}
+        self.started = clock()
+        self._last_draw = None
+        self._line_visible = False
+        self._lock = threading.Lock()
+
+    @property
+    def completed(self) -> int:
+        """Number of items finished, whatever the outcome."""
+        return sum(self.counts.values())
+
+    def update(self, outcome: str) -> None:
+        """
+        Count a finished item and redraw if the interval has passed.
+
+        Args:
+            outcome: DONE, FAILED or SKIPPED
+        """
+        with self._lock:
+            self.counts[outcome] += 1
+            now = self.clock()
+            if self._last_draw is None or now - self._last_draw >= self.interval:
+                self._draw(now)
+
+    def render(self, now: Optional[float] = None) -> str:
+        """
+        Format the current status line.
+
+        Args:
+            now: Current clock value (default: read the clock)
+
+        Returns:
+            Status line without trailing newline
+        """
+        if now is None:
+            now = self.clock()
+        elapsed = max(now - self.started, 1e-9)
+        completed = self.completed
+        rate = completed / elapsed
+
+        progress = f"{completed}/{self.total}" if self.total else f"{completed}"
+        parts = [
+            f"{progress} processed: {self.counts[DONE]} done, "
+            f"{self.counts[FAILED]} failed, {self.counts[SKIPPED]} skipped",
+            f"{rate:.1f} albums/s",
+        ]
+        if self.bytes_source:
+            megabytes = self.bytes_source() / (1024 * 1024)
+            parts.append(f"{megabytes / elapsed:.2f} MB/s")
+        if self.limits_source:
+            limits = self.limits_source()
+            if limits:
+                parts.append("limit " + ", ".join(
+                    f"{name} {limit}" for name, limit in limits.items()
+                ))
+        if self.total and rate > 0:
+            remaining = max(self.total - completed, 0) / rate
+            parts.append(f"ETA {self.format_duration(remaining)}")
+        return " | ".join(parts)
+
+    @staticmethod
+    def format_duration(seconds: float) -> str:
+        """
+        Format a duration like "1h02m", "4m10s" or "12s".
+
+        Args:
+            seconds: Duration in seconds
+
+        Returns:
+            Short human-readable duration
+        """
+        seconds = int(round(seconds))
+        hours, rest = divmod(seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        if hours:
+            return f"{hours}h{minutes:02d}m"
+        if minutes:
+            return f"{minutes}m{seconds:02d}s"
+        return f"{seconds}s"
+
+    def _draw(self, now: float) -> None:
+        """Write the status line (caller holds the lock)."""
+        self._last_draw = now
+        if self.is_tty:
+            self.stream.write(CLEAR_LINE + self.render(now))
+            self._line_visible = True
+        else:
+            self.stream.write(self.render(now) + "\n")
+        self.stream.flush()
+
+    def print(self, message: str) -> None:
+        """
+        Print a message above the status line.
+
+        Pass this as ConsoleOutput's print_fn so messages don't get mixed
+        into the redrawn line.
+
+        Args:
+            message: Message to print
+        """
+        with self._lock:
+            if self._line_visible:
+                self.stream.write(CLEAR_LINE)
+            self.stream.write(message + "\n")
+            if self._line_visible:
+                self.stream.write(self.render())
+            self.stream.flush()
+
+    def finish(self) -> None:
+        """Write the final status line."""
+        with self._lock:
+            if self.is_tty:
+                self.stream.write(CLEAR_LINE)
+            self.stream.write(self.render() + "\n")
+            self.stream.flush()
+            self._line_visible = False
@@ -0,0 +1,359 @@
+"""Opt-in memory and CPU profiling, for diagnosing leaks and hot spots."""
+import cProfile
+import fnmatch
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+
+# Pipeline stages allocations are attributed to
+STAGES = ("search", "download", "decode", "save")
+CPU_PROFILE_FILENAME = "cpu.pstats"
+REPORT_FILENAME = "allocations.txt"
+
+# Allocations made by the profiling itself
+_IGNORED_FILES = (tracemalloc.__file__, __file__, "<unknown>")
+_IGNORED = tuple(tracemalloc.Filter(False, filename)
+                 for filename in _IGNORED_FILES)
+
+# (file name, line number) of an allocation site
+Site = Tuple[str, int]
+
+
+def _format_size(size: int) -> str:
+    """Signed byte count in KiB."""
+    return f"{size / 1024:+,.1f} KiB"
+
+
+class Profiler:
+    """
+    tracemalloc snapshots, per-stage allocation diffs and a cProfile dump.
+
+    While running, a snapshot of all traced allocations is dumped to the
+    output directory every ``interval`` seconds (``snapshot-0001.tracemalloc``
+    and so on, loadable with ``tracemalloc.Snapshot.load``), and its growth
+    since the previous one is logged as a "memory" event.
+
+    Code wraps pipeline stages in stage(). Every ``sample_every``-th call
+    of a stage is bracketed by snapshots, and the allocations it left
+    behind are added up per source line, so a stage that keeps images,
+    response bodies or cache entries alive stands out. Snapshots are
+    process-wide: with concurrent downloads a sample also includes other
+    threads' allocations, so use a concurrency of 1 for exact attribution.
+
+    Each thread's stages run under its own cProfile profiler; stop()
+    merges them with the main thread's into ``cpu.pstats`` and writes the
+    stage report to ``allocations.txt``.
+    """
+
+    def __init__(self, directory: str, interval: float = 60.0, top: int = 10,
+                 sample_every: int = 10, frames: int = 1):
+        """
+        Initialize profiler.
+
+        Args:
+            directory: Directory snapshots and reports are written to
+            interval: Seconds between periodic snapshots
+            top: Allocation sites listed per stage and snapshot
+            sample_every: Measure allocations of every Nth call of a stage
+            frames: Stack frames recorded per allocation
+
+        Raises:
+            ValueError: If a value is out of range
+        """
+        if interval <= 0:
+            raise ValueError("profile_interval must be positive")
+        if top < 1 or sample_every < 1 or frames < 1:
+            raise ValueError("Profiler counts must be at least 1")
+        self.directory = directory
+        self.interval = interval
+        self.top = top
+        self.sample_every = sample_every
+        self.frames = frames
+        # ConsoleOutput that periodic "memory" events are logged to
+        self.output = None
+        self.snapshots = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        # Stage name to calls, seconds and sampled calls
+        self._stages: Dict[str, Dict[str, float]] = {}
+        # Stage name to allocation site to [bytes, blocks] left behind
+        self._retained: Dict[str, Dict[Site, List[int]]] = {}
+        self._started_tracing = False
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._first: Optional[tracemalloc.Snapshot] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        """Whether start() was called and stop() wasn't yet."""
+        return self._running
+
+    def start(self) -> None:
+        """
+        Start tracing allocations, CPU profiling and periodic snapshots.
+
+        Raises:
+            OSError: If the output directory can't be created
+        """
+        if self._running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for trace_filter in _IGNORED:
+            # Compile the filters' patterns now, so their cache isn't
+            # reported as allocated by the first stage
+            fnmatch.fnmatch("", trace_filter.filename_pattern)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._first = self._previous = self._snapshot()
+        self._enable_thread_profile()
+        # The main thread stays profiled until stop()
+        self._local.depth = 1
+        self._running = True
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._snapshot_loop, name="profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        """
+        Stop profiling and write the final snapshot and reports.
+
+        Returns:
+            Summary with the report paths, traced ``current`` and ``peak``
+            bytes and per-stage statistics (see stage_stats)
+        """
+        if not self._running:
+            return {}
+        self._running = False
+        self._stop.set()
+        self._thread.join()
+        profile = getattr(self._local, "profile", None)
+        if profile is not None:
+            profile.disable()
+        self._local.depth = 0
+        self._take_periodic_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        final = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        cpu_path = self._dump_cpu_profile()
+        report_path = os.path.join(self.directory, REPORT_FILENAME)
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(self.report(final, current, peak))
+        return {
+            "directory": self.directory,
+            "cpu_profile": cpu_path,
+            "report": report_path,
+            "current": current,
+            "peak": peak,
+            "stages": self.stage_stats(),
+        }
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Context manager that attributes time and allocations to a stage.
+
+        Args:
+            name: Stage name, e.g. "download" (see STAGES)
+        """
+        if not self._running:
+            yield
+            return
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth == 0:
+            self._enable_thread_profile()
+        local.depth = depth + 1
+        with self._lock:
+            stats = self._stages.setdefault(
+                name, {"calls": 0, "seconds": 0.0, "sampled": 0}
+            )
+            stats["calls"] += 1
+            sampled = (stats["calls"] - 1) % self.sample_every == 0
+            if sampled:
+                stats["sampled"] += 1
+        before = self._unprofiled(tracemalloc.take_snapshot) if sampled else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if before is not None and tracemalloc.is_tracing():
+                self._unprofiled(self._add_retained, name, before)
+            with self._lock:
+                stats["seconds"] += elapsed
+            local.depth = depth
+            if depth == 0 and getattr(local, "profile", None) is not None:
+                local.profile.disable()
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Time and retained allocations per stage so far.
+
+        Returns:
+            Stage name to calls, seconds, sampled calls and
+            ``retained_bytes`` (net bytes still allocated after the
+            sampled calls returned)
+        """
+        with self._lock:
+            return {
+                name: {
+                    "calls": int(stats["calls"]),
+                    "seconds": round(stats["seconds"], 3),
+                    "sampled": int(stats["sampled"]),
+                    "retained_bytes": sum(
+                        size for size, _ in self._retained.get(name, {}).values()
+                    ),
+                }
+                for name, stats in self._stages.items()
+            }
+
+    def report(self, final: Optional[tracemalloc.Snapshot] = None,
+               current: int = 0, peak: int = 0) -> str:
+        """
+        Render the per-stage and whole-run allocation report.
+
+        Args:
+            final: Last snapshot, compared against the first one
+            current: Traced bytes at the end of the run
+            peak: Most traced bytes at any time
+
+        Returns:
+            Plain-text report
+        """
+        lines = [
+            f"Traced memory: {current / 1024:,.1f} KiB at exit, "
+            f"{peak / 1024:,.1f} KiB peak",
+            "",
+        ]
+        stats = self.stage_stats()
+        ordered = [name for name in STAGES if name in stats] + sorted(
+            name for name in stats if name not in STAGES
+        )
+        for name in ordered:
+            stage = stats[name]
+            lines.append(
+                f"[{name}] {stage['calls']} call(s), {stage['seconds']:.3f}s, "
+                f"{stage['sampled']} sampled, "
+                f"{_format_size(stage['retained_bytes'])} retained"
+            )
+            with self._lock:
+                sites = sorted(self._retained.get(name, {}).items(),
+                               key=lambda item: -abs(item[1][0]))
+            for (filename, lineno), (size, count) in sites[:self.top]:
+                lines.append(f"  {_format_size(size)} in {count:+d} block(s)  "
+                             f"{filename}:{lineno}")
+            lines.append("")
+        if final is not None and self._first is not None:
+            lines.append("Growth over the whole run:")
+            for diff in final.compare_to(self._first, "lineno")[:self.top]:
+                frame = diff.traceback[0]
+                lines.append(f"  {_format_size(diff.size_diff)} in "
+                             f"{diff.count_diff:+d} block(s)  "
+                             f"{frame.filename}:{frame.lineno}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def _unprofiled(self, function, *args):
+        """Call a function without counting it in the thread's CPU profile."""
+        profile = getattr(self._local, "profile", None)
+        if profile is not None:
+            profile.disable()
+        try:
+            return function(*args)
+        finally:
+            if profile is not None:
+                profile.enable()
+
+    def _add_retained(self, name: str, before: tracemalloc.Snapshot) -> None:
+        """Add what a sampled stage call left allocated to its totals."""
+        # Filtering the diff is much cheaper than filtering every trace
+        diffs = tracemalloc.take_snapshot().compare_to(before, "lineno")
+        with self._lock:
+            sites = self._retained.setdefault(name, {})
+            for diff in diffs:
+                frame = diff.traceback[0]
+                if not diff.size_diff or frame.filename in _IGNORED_FILES:
+                    continue
+                site = sites.setdefault((frame.filename, frame.lineno), [0, 0])
+                site[0] += diff.size_diff
+                site[1] += diff.count_diff
+
+    def _enable_thread_profile(self) -> None:
+        """Profile the calling thread with its own cProfile profiler."""
+        local = self._local
+        if not hasattr(local, "profile"):
+            local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(local.profile)
+        if local.profile is None:
+            return
+        try:
+            local.profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from one profiler, and
+            # the main thread's is already active
+            local.profile = None
+
+    def _snapshot_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._take_periodic_snapshot()
+
+    def _take_periodic_snapshot(self) -> None:
+        """Dump a snapshot and log its growth since the previous one."""
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = self._snapshot()
+        self.snapshots += 1
+        snapshot.dump(os.path.join(
+            self.directory, f"snapshot-{self.snapshots:04d}.tracemalloc"
+        ))
+        growth = snapshot.compare_to(self._previous, "lineno")[:self.top]
+        self._previous = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        if self.output is not None:
+            self.output.event(
+                "memory", snapshot=self.snapshots, current=current, peak=peak,
+                growth=[
+                    {"site": f"{diff.traceback[0].filename}:"
+                             f"{diff.traceback[0].lineno}",
+                     "bytes": diff.size_diff, "blocks": diff.count_diff}
+                    for diff in growth if diff.size_diff
+                ],
+                stages=self.stage_stats()
+            )
+
+    def _dump_cpu_profile(self) -> Optional[str]:
+        """Merge every thread's CPU profile into one pstats file."""
+        with self._lock:
+            profiles = list(self._profiles)
+            self._profiles = []
+        stats = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is None:
+            return None
+        path = os.path.join(self.directory, CPU_PROFILE_FILENAME)
+        stats.dump_stats(path)
+        return path
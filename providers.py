@@ -0,0 +1,433 @@
+"""Artwork providers: Spotify, iTunes Search and MusicBrainz/Cover Art Archive."""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (
+    Optional, List, Dict, Any, Callable, Collection, Sequence, Tuple
+)
+
+import requests
+
+from models import Album, ImageVariant
+
+# How a ProviderChain combines its providers
+FALLBACK = "fallback"
+RACE = "race"
+BEST = "best"
+PROVIDER_MODES = (FALLBACK, RACE, BEST)
+
+ITUNES_URL = "https://itunes.apple.com"
+MUSICBRAINZ_URL = "https://musicbrainz.org"
+COVERARTARCHIVE_URL = "https://coverartarchive.org"
+PROVIDER_NAMES = ("spotify", "itunes", "coverartarchive")
+USER_AGENT = (
+    "AlbumArtworkDownloader/1.0 "
+    "(https://github.com/Asherpayn/Album_artwork_downloader)"
+)
+
+
+def parse_provider_names(text: str) -> List[str]:
+    """
+    Parse a comma-separated list of provider names.
+
+    Args:
+        text: Provider names, e.g. "spotify,itunes"
+
+    Returns:
+        List of lower-case provider names
+
+    Raises:
+        ValueError: If a name is unknown or the list is empty
+    """
+    names = [name.strip().lower() for name in text.split(",") if name.strip()]
+    if not names:
+        raise ValueError("At least one artwork provider is required")
+    for name in names:
+        if name not in PROVIDER_NAMES:
+            raise ValueError(
+                f"Unknown artwork provider: {name} "
+                f"(choose from {', '.join(PROVIDER_NAMES)})"
+            )
+    return names
+
+
+def _json_list(response: requests.Response, key: str) -> List[Dict[str, Any]]:
+    """
+    List under a key of a JSON object reply.
+
+    Args:
+        response: Successful API response
+        key: Key of the list, e.g. "results"
+
+    Returns:
+        The list, empty if the key is missing
+
+    Raises:
+        requests.exceptions.InvalidJSONError: If the reply isn't a JSON
+            object, so a chain counts it as a miss like a network error
+    """
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(
+            f"Invalid JSON from {response.url}: {e}", response=response
+        ) from None
+    items = data.get(key) if isinstance(data, dict) else None
+    if items is None and isinstance(data, dict):
+        return []
+    if not isinstance(items, list):
+        raise requests.exceptions.InvalidJSONError(
+            f"Unexpected reply from {response.url}", response=response
+        )
+    return [item for item in items if isinstance(item, dict)]
+
+
+class ArtworkProvider:
+    """
+    Base class for album artwork sources.
+
+    Providers return Album records with images largest first, so the
+    rest of the application handles every source the same way.
+    """
+
+    name = "provider"
+    # Longest side credited to images listed without a size
+    nominal_size = 0
+
+    def search_albums(self, query: str, limit: int = 10) -> List[Album]:
+        """
+        Search for albums matching the query.
+
+        Args:
+            query: Album name to search for
+            limit: Maximum number of results
+
+        Returns:
+            List of album records
+        """
+        raise NotImplementedError
+
+    def largest_image_size(self, albums: List[Album]) -> int:
+        """
+        Longest side of the first album's largest image.
+
+        Every variant counts, not just the first; variants of unknown
+        size count as ``nominal_size``.
+
+        Args:
+            albums: List of album records
+
+        Returns:
+            Size in pixels, 0 if there is no image
+        """
+        if not albums:
+            return 0
+        return max(
+            (max(image.width, image.height) or self.nominal_size
+             for image in albums[0].images),
+            default=0
+        )
+
+
+class SpotifyProvider(ArtworkProvider):
+    """Artwork from Spotify via a search function (e.g. AlbumArtworkApp's)."""
+
+    name = "spotify"
+
+    def __init__(self, search_fn: Callable[[str, int], List[Album]]):
+        """
+        Initialize Spotify provider.
+
+        Args:
+            search_fn: Function taking (query, limit) and returning album
+                records, e.g. SpotifyClient.search_albums
+        """
+        self.search_fn = search_fn
+
+    def search_albums(self, query: str, limit: int = 10) -> List[Album]:
+        return self.search_fn(query, limit)
+
+
+class ITunesProvider(ArtworkProvider):
+    """Artwork from the iTunes Search API."""
+
+    name = "itunes"
+    # Artwork URLs embed their size and can be requested larger, but the
+    # image served is no bigger than the label's upload
+    SIZES = (1200, 600)
+    # Nearly every upload is served at the smaller requested size
+    nominal_size = SIZES[-1]
+
+    def __init__(self, session: Optional[requests.Session] = None,
+                 base_url: str = ITUNES_URL, timeout: float = 5):
+        """
+        Initialize iTunes provider.
+
+        Args:
+            session: HTTP session (default: a new session)
+            base_url: API base URL (override for testing)
+            timeout: Request timeout in seconds
+        """
+        self.session = session or requests.Session()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def search_albums(self, query: str, limit: int = 10) -> List[Album]:
+        response = self.session.get(
+            f"{self.base_url}/search",
+            params={"term": query, "entity": "album", "limit": limit},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return [
+            self._to_album(result)
+            for result in _json_list(response, 'results')
+            if result.get('collectionName')
+        ]
+
+    def _to_album(self, result: Dict[str, Any]) -> Album:
+        """Convert an iTunes result to an album record."""
+        artwork = result.get('artworkUrl100')
+        images = ()
+        if artwork:
+            # Only the 100x100 original's size is known before downloading
+            images = tuple(
+                ImageVariant(artwork.replace('100x100', f'{size}x{size}'), 0, 0)
+                for size in self.SIZES
+            ) + (ImageVariant(artwork, 100, 100),)
+        return Album(
+            id=f"itunes:{result.get('collectionId')}",
+            name=result['collectionName'],
+            artist=result.get('artistName') or "",
+            year=(result.get('releaseDate') or '')[:4],
+            images=images,
+            provider=self.name,
+            release_date=(result.get('releaseDate') or '')[:10],
+            total_tracks=result.get('trackCount') or 0,
+        )
+
+
+class CoverArtArchiveProvider(ArtworkProvider):
+    """
+    Artwork from the Cover Art Archive, found via MusicBrainz search.
+
+    Each release group's image listing is fetched to find its front
+    cover, so albums without one come back without images. Thumbnail
+    sizes are the archive's nominal ones (longest side); the original's
+    size is unknown.
+    """
+
+    name = "coverartarchive"
+    # Listings fetched at once per search
+    MAX_WORKERS = 4
+
+    def __init__(self, session: Optional[requests.Session] = None,
+                 musicbrainz_url: str = MUSICBRAINZ_URL,
+                 coverart_url: str = COVERARTARCHIVE_URL,
+                 timeout: float = 5):
+        """
+        Initialize Cover Art Archive provider.
+
+        Args:
+            session: HTTP session (default: a new session)
+            musicbrainz_url: MusicBrainz base URL (override for testing)
+            coverart_url: Cover Art Archive base URL (override for testing)
+            timeout: Request timeout in seconds
+        """
+        self.session = session or requests.Session()
+        self.musicbrainz_url = musicbrainz_url.rstrip('/')
+        self.coverart_url = coverart_url.rstrip('/')
+        self.timeout = timeout
+
+    def search_albums(self, query: str, limit: int = 10) -> List[Album]:
+        # MusicBrainz rejects requests without a descriptive User-Agent
+        response = self.session.get(
+            f"{self.musicbrainz_url}/ws/2/release-group/",
+            params={"query": query, "fmt": "json", "limit": limit},
+            headers={"User-Agent": USER_AGENT, "Accept": "application/json"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        groups = [group for group in _json_list(response, 'release-groups')
+                  if group.get('id')]
+        if not groups:
+            return []
+        with ThreadPoolExecutor(
+                max_workers=min(len(groups), self.MAX_WORKERS)) as executor:
+            images = list(executor.map(
+                lambda group: self._front_images(group['id']), groups
+            ))
+        return [self._to_album(group, front)
+                for group, front in zip(groups, images)]
+
+    def _front_images(self, mbid: str) -> Tuple[ImageVariant, ...]:
+        """
+        Look up a release group's front cover in the archive.
+
+        Args:
+            mbid: MusicBrainz release group ID
+
+        Returns:
+            Thumbnails largest first, then the original; empty if the
+            archive has no front cover or can't be reached
+        """
+        try:
+            response = self.session.get(
+                f"{self.coverart_url}/release-group/{mbid}",
+                headers={"User-Agent": USER_AGENT, "Accept": "application/json"},
+                timeout=self.timeout
+            )
+            if response.status_code == 404:
+                return ()
+            response.raise_for_status()
+            listing = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return ()
+        for image in listing.get('images') or []:
+            if not image.get('front') or not image.get('image'):
+                continue
+            thumbnails = sorted(
+                ((int(size), url)
+                 for size, url in (image.get('thumbnails') or {}).items()
+                 if size.isdigit() and url),
+                reverse=True
+            )
+            return tuple(
+                ImageVariant(url, size, size) for size, url in thumbnails
+            ) + (ImageVariant(image['image'], 0, 0),)
+        return ()
+
+    def _to_album(self, group: Dict[str, Any],
+                  images: Tuple[ImageVariant, ...] = ()) -> Album:
+        """Convert a MusicBrainz release group to an album record."""
+        mbid = group['id']
+        credits = [credit['name'] for credit in group.get('artist-credit') or []
+                   if credit.get('name')]
+        return Album(
+            id=f"mbid:{mbid}",
+            name=group.get('title', ''),
+            artist=credits[0] if credits else "",
+            year=(group.get('first-release-date') or '')[:4],
+            album_type=(group.get('primary-type') or '').lower(),
+            images=images,
+            provider=self.name,
+            release_date=group.get('first-release-date') or "",
+        )
+
+
+class ProviderChain(ArtworkProvider):
+    """
+    Combines several artwork providers.
+
+    Modes:
+        fallback: ask providers in order until one has artwork
+        race: ask all at once and take the first result with artwork
+        best: ask all at once and take the highest-resolution artwork
+
+    Best mode compares the longest known side of each provider's first
+    album (see largest_image_size); ties go to the provider listed first.
+    """
+
+    name = "chain"
+
+    def __init__(self, providers: Sequence[ArtworkProvider],
+                 mode: str = FALLBACK):
+        """
+        Initialize provider chain.
+
+        Args:
+            providers: Providers in order of preference
+            mode: FALLBACK, RACE or BEST
+
+        Raises:
+            ValueError: If no providers are given or the mode is unknown
+        """
+        if not providers:
+            raise ValueError("ProviderChain needs at least one provider")
+        if mode not in PROVIDER_MODES:
+            raise ValueError(f"Unknown provider mode: {mode}")
+        self.providers = list(providers)
+        self.mode = mode
+
+    def without(self, names: Collection[str]) -> Optional["ProviderChain"]:
+        """
+        Chain of the other providers, in the same mode.
+
+        Args:
+            names: Names of providers to leave out
+
+        Returns:
+            ProviderChain, or None if no provider is left
+        """
+        providers = [p for p in self.providers if p.name not in names]
+        return ProviderChain(providers, mode=self.mode) if providers else None
+
+    @staticmethod
+    def _has_artwork(albums: List[Album]) -> bool:
+        return any(album.images for album in albums)
+
+    def search_albums(self, query: str, limit: int = 10) -> List[Album]:
+        """
+        Search providers according to the chain's mode.
+
+        Providers that raise are treated as misses unless every provider
+        fails, in which case the first error is raised.
+
+        Args:
+            query: Album name to search for
+            limit: Maximum number of results
+
+        Returns:
+            Albums from the chosen provider, or an empty list
+        """
+        if self.mode == FALLBACK:
+            return self._fallback(query, limit)
+        return self._concurrent(query, limit)
+
+    def _fallback(self, query: str, limit: int) -> List[Album]:
+        errors = []
+        for provider in self.providers:
+            try:
+                albums = provider.search_albums(query, limit)
+            except Exception as e:
+                errors.append(e)
+                continue
+            if self._has_artwork(albums):
+                return albums
+        if len(errors) == len(self.providers):
+            raise errors[0]
+        return []
+
+    def _concurrent(self, query: str, limit: int) -> List[Album]:
+        errors = []
+        hits = {}
+        executor = ThreadPoolExecutor(max_workers=len(self.providers))
+        try:
+            futures = {
+                executor.submit(provider.search_albums, query, limit): provider
+                for provider in self.providers
+            }
+            for future in as_completed(futures):
+                try:
+                    albums = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if not self._has_artwork(albums):
+                    continue
+                if self.mode == RACE:
+                    return albums
+                hits[futures[future].name] = (futures[future], albums)
+        finally:
+            # Don't wait for slower providers once a race is won
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if hits:
+            # Ties go to the provider listed first
+            order = [p.name for p in self.providers]
+            ranked = [hits[name] for name in order if name in hits]
+            return max(
+                ranked,
+                key=lambda hit: hit[0].largest_image_size(hit[1])
+            )[1]
+        if len(errors) == len(self.providers):
+            raise errors[0]
+        return []
@@ -0,0 +1,107 @@
+"""Normalization of album search queries into canonical keys."""
+import re
+import unicodedata
+from typing import NamedTuple
+
+# Words that mark a bracketed edition or remaster suffix, not part of a title
+_EDITION_WORDS = (
+    r"remaster\w*|deluxe|edition|expanded|anniversary|bonus|reissue"
+    r"|mono|stereo|version|special|collector'?s|legacy"
+)
+# "Title (Remastered 2009)", "Title [Deluxe Edition]"
+_EDITION_BRACKETS = re.compile(
+    rf"\s*[(\[][^()\[\]]*\b(?:{_EDITION_WORDS})\b[^()\[\]]*[)\]]\s*$",
+    re.IGNORECASE
+)
+# "Title - 2009 Remaster", "Title - Remastered 2011", "Title - Deluxe
+# Edition". The whole suffix must be such a phrase: after a dash, bare
+# edition words are as likely the title or artist ("Artist - Special")
+_EDITION_PHRASE = (
+    r"(?:\d{4}\s+)?(?:digital(?:ly)?\s+)?remaster(?:ed)?"
+    r"(?:\s+(?:version|edition))?(?:\s+\d{4})?"
+    r"|[\w'’ ]*\b(?:edition|version)(?:\s+\d{4})?"
+)
+_EDITION_DASH = re.compile(
+    rf"\s+[-–—]\s+(?:{_EDITION_PHRASE})\s*$",
+    re.IGNORECASE
+)
+# "Title - Artist" ("by" is too common inside titles to split on)
+_ARTIST_SEPARATOR = re.compile(r"\s+[-–—]\s+")
+
+
+def strip_edition(text: str) -> str:
+    """
+    Remove trailing edition and remaster suffixes from a title.
+
+    Args:
+        text: Album title or query
+
+    Returns:
+        Title without suffixes such as "(Remastered 2009)"
+    """
+    while True:
+        stripped = _EDITION_DASH.sub("", _EDITION_BRACKETS.sub("", text))
+        if stripped == text or not stripped.strip():
+            return text.strip()
+        text = stripped
+
+
+def fold(text: str) -> str:
+    """
+    Fold text for comparison: NFKC, case folding, no punctuation.
+
+    Args:
+        text: Text to fold
+
+    Returns:
+        Lower-case words separated by single spaces
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = text.replace("&", " and ").replace("'", "").replace("’", "")
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+class AlbumQuery(NamedTuple):
+    """A search query split into title and artist."""
+
+    text: str
+    title: str
+    artist: str
+
+    @property
+    def key(self) -> str:
+        """
+        Canonical key; equivalent queries share it.
+
+        Title and artist are sorted so "Title - Artist" and
+        "Artist - Title" collapse to the same key.
+        """
+        if not self.artist:
+            return fold(self.title)
+        return " | ".join(sorted((fold(self.title), fold(self.artist))))
+
+    @property
+    def search_text(self) -> str:
+        """Cleaned query text to send to artwork providers."""
+        return " ".join(part for part in (self.title, self.artist) if part)
+
+
+def parse_query(text: str) -> AlbumQuery:
+    """
+    Normalize a query and split it into title and artist if given as
+    "Title - Artist" (or "Artist - Title").
+
+    Args:
+        text: Query as typed or read from a batch file
+
+    Returns:
+        AlbumQuery with edition suffixes removed
+    """
+    cleaned = " ".join(unicodedata.normalize("NFKC", text).split())
+    cleaned = strip_edition(cleaned)
+    parts = _ARTIST_SEPARATOR.split(cleaned, maxsplit=1)
+    if len(parts) == 2 and all(part.strip() for part in parts):
+        title, artist = strip_edition(parts[0]), strip_edition(parts[1])
+    else:
+        title, artist = cleaned, ""
+    return AlbumQuery(text, title, artist)
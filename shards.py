@@ -0,0 +1,298 @@
+"""Splitting batches across hosts and merging the results back."""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Optional, Dict, Any, Iterator, List, Sequence, Tuple
+
+from album_service import FilenameUtil
+from cache import NegativeCache
+from library import ArtworkIndex
+from models import Album
+from sync import file_digest
+
+SHARD_JOURNAL_PREFIX = ".shard-"
+
+# Outcomes counted by merge_shards
+MERGED = "merged"
+UNCHANGED = "unchanged"
+CONFLICTS = "conflicts"
+MISSING = "missing"
+MISSES = "misses"
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification such as "2/4".
+
+    Args:
+        text: "I/N" with 1 <= I <= N
+
+    Returns:
+        Tuple of (zero-based shard index, shard count)
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+    """
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(
+            f"Shard must look like I/N, e.g. 1/4: {text!r}"
+        ) from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}: {text!r}")
+    return index - 1, count
+
+
+def shard_of(key: str, count: int) -> int:
+    """
+    Shard a normalized query key belongs to.
+
+    Uses a cryptographic hash rather than hash(), which is randomized
+    per process, so every host computes the same partition.
+
+    Args:
+        key: Canonical query key (AlbumQuery.key) or "id:<album id>"
+        count: Number of shards
+
+    Returns:
+        Zero-based shard index
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def journal_filename(index: int, count: int) -> str:
+    """File name of a shard's journal inside its artworks directory."""
+    return f"{SHARD_JOURNAL_PREFIX}{index + 1}-of-{count}.jsonl"
+
+
+class ShardJournal:
+    """
+    Append-only record of what one shard downloaded and missed.
+
+    Kept as JSON lines next to the shard's artwork, so a shard's
+    artworks directory can be copied off its host and merged on its own.
+    Each record is flushed as it is written, so the journal survives an
+    interrupted run. Safe to share between threads.
+    """
+
+    def __init__(self, artworks_dir: str, index: int, count: int):
+        """
+        Open (or continue) a shard's journal.
+
+        Args:
+            artworks_dir: The shard's artworks directory
+            index: Zero-based shard index
+            count: Number of shards
+
+        Raises:
+            OSError: If the journal can't be opened
+        """
+        self.artworks_dir = artworks_dir
+        self.path = os.path.join(artworks_dir, journal_filename(index, count))
+        os.makedirs(artworks_dir, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def record_download(self, path: str, album: Album, artist: str) -> None:
+        """
+        Record saved artwork.
+
+        Args:
+            path: Saved artwork file path
+            album: Album the artwork belongs to
+            artist: Artist name
+        """
+        self._write({
+            "path": os.path.relpath(path, self.artworks_dir),
+            "title": album.name, "artist": artist,
+            "album_id": album.id, "provider": album.provider,
+        })
+
+    def record_miss(self, key: str, reason: str) -> None:
+        """
+        Record a negative cache entry.
+
+        Args:
+            key: Negative cache key
+            reason: NOT_FOUND or NO_ARTWORK
+        """
+        self._write({"miss": key, "reason": reason})
+
+    def close(self) -> None:
+        """Close the journal file."""
+        with self._lock:
+            self._file.close()
+
+    @staticmethod
+    def read(path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Read a journal's records, skipping a truncated last line.
+
+        Args:
+            path: Journal file path
+
+        Returns:
+            Iterator of record dictionaries
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+
+
+def find_journals(shard_dir: str) -> List[str]:
+    """
+    Shard journals in a shard's artworks directory.
+
+    Args:
+        shard_dir: Artworks directory copied from a shard
+
+    Returns:
+        Sorted journal paths
+    """
+    pattern = SHARD_JOURNAL_PREFIX + "*.jsonl"
+    return sorted(glob.glob(os.path.join(glob.escape(shard_dir), pattern)))
+
+
+def _copy_into(source: str, target: str) -> None:
+    """Copy a file into place atomically."""
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(source, temp_path)
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _merge_file(source: str, target: str, album_id: str,
+                library: ArtworkIndex) -> Tuple[str, str]:
+    """
+    Copy one shard file into the library unless it is already there.
+
+    Returns:
+        Tuple of (outcome, path the artwork ended up at)
+    """
+    for disambiguate in (False, True):
+        if disambiguate:
+            if not album_id:
+                break
+            stem, extension = os.path.splitext(target)
+            target = f"{stem} [{FilenameUtil.sanitize(album_id)[:12]}]{extension}"
+        if not os.path.exists(target):
+            _copy_into(source, target)
+            return MERGED, target
+        if file_digest(source) == file_digest(target):
+            return UNCHANGED, target
+        if album_id and library.album_id_at(target) == album_id:
+            # Newer download of the same album
+            _copy_into(source, target)
+            return MERGED, target
+    return CONFLICTS, target
+
+
+def _contained_path(root: str, relpath: str) -> Optional[str]:
+    """
+    Join a journal path onto a directory, refusing paths that leave it.
+
+    Args:
+        root: Directory the path is relative to
+        relpath: Relative path from a shard journal
+
+    Returns:
+        Joined path, or None if it is absolute or resolves (through
+        ``..`` components or symlinks) outside the directory
+    """
+    if not relpath or os.path.isabs(relpath):
+        return None
+    real_root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(real_root, relpath))
+    if os.path.commonpath([real_root, path]) != real_root or path == real_root:
+        return None
+    return os.path.join(root, os.path.normpath(relpath))
+
+
+def merge_shards(shard_dirs: Sequence[str], library: ArtworkIndex,
+                 negative_cache: Optional[NegativeCache] = None) -> Dict[str, int]:
+    """
+    Merge shards' artwork, journals and misses into one library.
+
+    Artwork listed in each shard's journal is copied into the library's
+    artworks directory and indexed with its album metadata. If the same
+    path already holds a different album's artwork, the album ID is
+    added to the file name, as for downloads. Recorded misses go into
+    the negative cache.
+
+    Args:
+        shard_dirs: Artworks directories copied from the shards
+        library: Index of the combined artworks directory (saved by the
+            caller)
+        negative_cache: Combined negative cache (None drops misses)
+
+    Returns:
+        Dictionary with MERGED, UNCHANGED, CONFLICTS, MISSING and MISSES
+        counts
+
+    Raises:
+        ValueError: If a directory holds no shard journal or is the
+            combined artworks directory itself
+    """
+    counts = {MERGED: 0, UNCHANGED: 0, CONFLICTS: 0, MISSING: 0, MISSES: 0}
+    target_root = os.path.abspath(library.artworks_dir)
+    for shard_dir in shard_dirs:
+        if os.path.abspath(shard_dir) == target_root:
+            raise ValueError(
+                f"Can't merge the artworks directory into itself: {shard_dir}"
+            )
+        journals = find_journals(shard_dir)
+        if not journals:
+            raise ValueError(f"No shard journal in {shard_dir}")
+
+        for journal in journals:
+            for record in ShardJournal.read(journal):
+                if "miss" in record:
+                    if negative_cache is not None and record.get("reason"):
+                        negative_cache.record(record["miss"], record["reason"])
+                        counts[MISSES] += 1
+                    continue
+                relpath = record.get("path") or ""
+                source = _contained_path(shard_dir, relpath)
+                target = _contained_path(library.artworks_dir, relpath)
+                if source is None or target is None:
+                    continue
+                if not os.path.isfile(source):
+                    counts[MISSING] += 1
+                    continue
+                album = Album(
+                    id=record.get("album_id") or "",
+                    name=record.get("title") or "",
+                    provider=record.get("provider") or "spotify"
+                )
+                outcome, target = _merge_file(source, target, album.id, library)
+                counts[outcome] += 1
+                if outcome != CONFLICTS:
+                    library.add(target, album, record.get("artist") or "")
+    return counts
@@ -1,25 +1,82 @@
 """Spotify API client wrapper."""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
 import spotipy
+from requests.adapters import HTTPAdapter
+from spotipy.cache_handler import MemoryCacheHandler
 from spotipy.oauth2 import SpotifyClientCredentials
-from typing import Optional, List, Dict, Any
+from urllib3.util.retry import Retry
+from typing import Optional, List, Dict, Any, Callable, Sequence
+from models import Album
 
 
 class SpotifyClient:
     """Wrapper for Spotify API operations."""
 
-    def __init__(self, client_id: str, client_secret: str):
+    # Spotify API limits for the search endpoint
+    MAX_PAGE_SIZE = 50
+    MAX_OFFSET = 1000
+
+    def __init__(self, client_id: str, client_secret: str,
+                 requests_timeout: float = 5, retries: int = 3,
+                 backoff_factor: float = 0.3,
+                 session: Optional[requests.Session] = None,
+                 status_forcelist: Optional[Sequence[int]] = None):
         """
         Initialize Spotify client with credentials.
 
         Args:
             client_id: Spotify client ID
             client_secret: Spotify client secret
+            requests_timeout: API request timeout in seconds
+            retries: Maximum retries for failed or rate-limited requests
+            backoff_factor: Exponential backoff factor between retries
+            session: HTTP session for API and token requests, e.g. a
+                recording or replay session (None lets spotipy build its
+                own; the session's adapter then owns the retry policy)
+            status_forcelist: HTTP statuses retried (default: spotipy's,
+                which includes 429); no other status is retried, even
+                with a Retry-After header. Ignored when a session is given
         """
+        self.client_id = client_id
+        if session is None and status_forcelist is not None:
+            # spotipy's own session would still retry a 429 or 503 that
+            # has a Retry-After header
+            session = requests.Session()
+            adapter = HTTPAdapter(max_retries=Retry(
+                total=retries, read=False, status=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=tuple(status_forcelist),
+                allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+                respect_retry_after_header=False
+            ))
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        session_options = {}
+        if session is not None:
+            session_options['requests_session'] = session
+        retry_options = {}
+        if status_forcelist is not None:
+            retry_options['status_forcelist'] = tuple(status_forcelist)
         auth_manager = SpotifyClientCredentials(
             client_id=client_id,
-            client_secret=client_secret
+            client_secret=client_secret,
+            # Spotipy would otherwise write the token to ./.cache
+            cache_handler=MemoryCacheHandler(),
+            **session_options
+        )
+        self.sp = spotipy.Spotify(
+            auth_manager=auth_manager,
+            requests_timeout=requests_timeout,
+            retries=retries,
+            status_retries=retries,
+            backoff_factor=backoff_factor,
+            **session_options,
+            **retry_options
         )
-        self.sp = spotipy.Spotify(auth_manager=auth_manager)
 
     def test_credentials(self) -> bool:
         """
@@ -34,46 +91,340 @@ class SpotifyClient:
         except spotipy.exceptions.SpotifyException:
             return False
 
-    def search_albums(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def search_albums(self, query: str, limit: int = 10,
+                      offset: int = 0) -> List[Album]:
         """
         Search for albums matching the query.
 
         Args:
             query: Album name to search for
             limit: Maximum number of results (default: 10)
+            offset: Index of the first result to return (default: 0)
+
+        Returns:
+            List of album records
+        """
+        results = self.sp.search(q=query, type='album', limit=limit,
+                                 offset=offset)
+        return [Album.from_spotify(item) for item in results['albums']['items']
+                if item]
+
+    def get_album(self, album_id: str) -> Optional[Album]:
+        """
+        Look up an album by its Spotify ID.
+
+        Args:
+            album_id: Spotify album ID
 
         Returns:
-            List of album dictionaries from Spotify API
+            Album record, or None if Spotify doesn't know the ID
+        """
+        try:
+            data = self.sp.album(album_id)
+        except spotipy.exceptions.SpotifyException as e:
+            if e.http_status in (400, 404):
+                return None
+            raise
+        return Album.from_spotify(data) if data else None
+
+    def search_albums_paginated(
+            self, query: str, max_results: int = 50, page_size: int = 10,
+            is_confident: Optional[Callable[[Album], bool]] = None,
+            workers: int = 1) -> List[Album]:
         """
-        results = self.sp.search(q=query, type='album', limit=limit)
-        return results['albums']['items']
+        Search for albums across several result pages.
+
+        Pages are requested with increasing offsets until ``max_results``
+        albums have been seen, Spotify runs out of results, or
+        ``is_confident`` accepts an album. With ``workers`` > 1 the pages
+        are fetched in parallel; pages not yet started when a confident
+        hit arrives are cancelled.
+
+        Args:
+            query: Album name to search for
+            max_results: Maximum number of results to fetch
+            page_size: Results per request (capped at MAX_PAGE_SIZE)
+            is_confident: Predicate marking an album as a confident match
+            workers: Number of pages to fetch concurrently
+
+        Returns:
+            List of album records in Spotify's result order
+        """
+        page_size = max(1, min(page_size, self.MAX_PAGE_SIZE))
+        max_results = max(0, min(max_results, self.MAX_OFFSET))
+        offsets = list(range(0, max_results, page_size))
+
+        def fetch(offset: int) -> List[Album]:
+            limit = min(page_size, max_results - offset)
+            return self.search_albums(query, limit=limit, offset=offset)
+
+        def is_last(offset: int, page: List[Album]) -> bool:
+            # A short page means Spotify has no more results
+            if len(page) < min(page_size, max_results - offset):
+                return True
+            return is_confident is not None and any(map(is_confident, page))
+
+        albums: List[Album] = []
+        if workers <= 1 or len(offsets) <= 1:
+            for offset in offsets:
+                page = fetch(offset)
+                albums.extend(page)
+                if is_last(offset, page):
+                    break
+            return albums
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(fetch, offset) for offset in offsets]
+            for offset, future in zip(offsets, futures):
+                page = future.result()
+                albums.extend(page)
+                if is_last(offset, page):
+                    for pending in futures:
+                        pending.cancel()
+                    break
+        return albums
 
     @staticmethod
-    def get_album_image_url(album: Dict[str, Any]) -> Optional[str]:
+    def get_album_image_url(album: Optional[Album]) -> Optional[str]:
         """
         Extract the largest image URL from an album.
 
         Args:
-            album: Album dictionary from Spotify API
+            album: Album record
 
         Returns:
             Image URL if available, None otherwise
         """
-        if not album or not album.get('images'):
-            return None
-        return album['images'][0]['url']
+        return album.image_url if album else None
 
     @staticmethod
-    def get_artist_name(album: Dict[str, Any]) -> str:
+    def get_artist_name(album: Optional[Album]) -> str:
         """
         Extract the primary artist name from an album.
 
         Args:
-            album: Album dictionary from Spotify API
+            album: Album record
 
         Returns:
             Artist name or "Unknown Artist" if not available
         """
-        if album and album.get('artists') and len(album['artists']) > 0:
-            return album['artists'][0]['name']
+        if album and album.artist:
+            return album.artist
         return "Unknown Artist"
+
+
+class CredentialStats:
+    """Request and rate-limit bookkeeping for one credential set."""
+
+    def __init__(self, window: float = 30.0):
+        """
+        Initialize stats.
+
+        Args:
+            window: Seconds of history used for the request rate
+        """
+        self.window = window
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.cooldown_until = 0.0
+        self._recent: deque = deque()
+
+    def record_request(self, now: float) -> None:
+        """Count a request made at ``now``."""
+        self.requests += 1
+        self._recent.append(now)
+
+    def recent_requests(self, now: float) -> int:
+        """Number of requests made within the window before ``now``."""
+        while self._recent and self._recent[0] <= now - self.window:
+            self._recent.popleft()
+        return len(self._recent)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        """Stats as a dictionary for reporting."""
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "requests_per_second": self.recent_requests(now) / self.window,
+            "cooling_down": self.cooldown_until > now,
+        }
+
+
+class SpotifyClientPool(SpotifyClient):
+    """
+    Spreads Spotify requests over several credential sets.
+
+    Each request goes to the least-loaded credential that isn't cooling
+    down. A credential that gets a 429 response is benched for the
+    Retry-After period and the request is retried on another one, so
+    throughput scales with the number of apps configured.
+
+    The pooled clients should not retry 429s themselves (build them with
+    a ``status_forcelist`` that excludes 429, or a session using
+    client_retry()), or a rate-limited client sleeps instead of failing
+    over.
+    """
+
+    # Statuses the pooled clients should retry themselves
+    CLIENT_STATUS_FORCELIST = (500, 502, 503, 504)
+    DEFAULT_COOLDOWN = 30.0
+    MAX_WAIT = 60.0
+
+    def __init__(self, clients: Sequence[SpotifyClient],
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize client pool.
+
+        Args:
+            clients: Spotify clients, one per credential set
+            clock: Time function (for testing, default: time.monotonic)
+            sleep: Sleep function (for testing, default: time.sleep)
+
+        Raises:
+            ValueError: If no clients are given
+        """
+        if not clients:
+            raise ValueError("SpotifyClientPool needs at least one client")
+        self.clients = list(clients)
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = {id(client): CredentialStats() for client in self.clients}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def client_retry(cls, retry: Retry) -> Retry:
+        """
+        Adapt a retry policy for a pooled client's session.
+
+        Args:
+            retry: Retry policy to adapt
+
+        Returns:
+            Retry policy that leaves 429s, including ones with a
+            Retry-After header, to the pool
+        """
+        return retry.new(status_forcelist=cls.CLIENT_STATUS_FORCELIST,
+                         respect_retry_after_header=False)
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def test_credentials(self) -> bool:
+        """
+        Test every credential set, dropping the invalid ones.
+
+        Returns:
+            True if at least one credential set is valid, False otherwise
+        """
+        valid = [client for client in self.clients if client.test_credentials()]
+        with self._lock:
+            self.clients = valid
+        return bool(valid)
+
+    def _acquire(self) -> SpotifyClient:
+        """Pick the least-loaded available client, waiting out cooldowns."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                available = [
+                    client for client in self.clients
+                    if self.stats[id(client)].cooldown_until <= now
+                ]
+                if available:
+                    client = min(
+                        available,
+                        key=lambda c: self.stats[id(c)].recent_requests(now)
+                    )
+                    self.stats[id(client)].record_request(now)
+                    return client
+                wait = min(
+                    self.stats[id(c)].cooldown_until for c in self.clients
+                ) - now
+            self.sleep(min(max(wait, 0.0), self.MAX_WAIT))
+
+    def _bench(self, client: SpotifyClient,
+               error: spotipy.exceptions.SpotifyException) -> None:
+        """Put a rate-limited client into cooldown."""
+        headers = error.headers or {}
+        try:
+            cooldown = float(headers.get("Retry-After", self.DEFAULT_COOLDOWN))
+        except (TypeError, ValueError):
+            cooldown = self.DEFAULT_COOLDOWN
+        with self._lock:
+            stats = self.stats[id(client)]
+            stats.rate_limited += 1
+            stats.cooldown_until = self.clock() + cooldown
+
+    def call(self, operation: Callable[[SpotifyClient], Any]) -> Any:
+        """
+        Run an operation on a pooled client, failing over on 429s.
+
+        Args:
+            operation: Function taking a SpotifyClient
+
+        Returns:
+            The operation's result
+
+        Raises:
+            spotipy.exceptions.SpotifyException: For non-429 errors, or
+                when every attempt was rate limited
+        """
+        attempts = len(self.clients) + 1
+        for attempt in range(attempts):
+            client = self._acquire()
+            try:
+                return operation(client)
+            except spotipy.exceptions.SpotifyException as e:
+                if e.http_status != 429:
+                    with self._lock:
+                        self.stats[id(client)].errors += 1
+                    raise
+                self._bench(client, e)
+                if attempt == attempts - 1:
+                    raise
+
+    def search_albums(self, query: str, limit: int = 10,
+                      offset: int = 0) -> List[Album]:
+        """
+        Search for albums on the next available credential set.
+
+        Args:
+            query: Album name to search for
+            limit: Maximum number of results (default: 10)
+            offset: Index of the first result to return (default: 0)
+
+        Returns:
+            List of album records
+        """
+        return self.call(
+            lambda client: client.search_albums(query, limit=limit, offset=offset)
+        )
+
+    def get_album(self, album_id: str) -> Optional[Album]:
+        """
+        Look up an album by ID on the next available credential set.
+
+        Args:
+            album_id: Spotify album ID
+
+        Returns:
+            Album record, or None if Spotify doesn't know the ID
+        """
+        return self.call(lambda client: client.get_album(album_id))
+
+    def credential_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-credential request and rate-limit stats.
+
+        Returns:
+            Dictionary of masked client ID to stats dictionary
+        """
+        now = self.clock()
+        with self._lock:
+            return {
+                f"{client.client_id[:6]}...": self.stats[id(client)].snapshot(now)
+                for client in self.clients
+            }
@@ -0,0 +1,253 @@
+"""Mirror the artwork library into a device or network folder."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Tuple
+
+from PIL import Image
+
+from album_service import ImageEncoder
+from library import iter_artwork_files
+
+SYNC_MANIFEST_FILENAME = ".artwork_sync.json"
+MANIFEST_VERSION = 1
+
+# Outcomes counted by ArtworkSync.run
+COPIED = "copied"
+UNCHANGED = "unchanged"
+DELETED = "deleted"
+FAILED = "failed"
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-1 of a file's contents.
+
+    Args:
+        path: File path
+
+    Returns:
+        Hexadecimal digest
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtworkSync:
+    """
+    Copies new and changed artwork into a target directory.
+
+    A manifest in the target directory records each source file's size,
+    modification time and hash. Files whose size and modification time
+    are unchanged are skipped without being read; files that were touched
+    but whose hash is unchanged aren't copied again. Copies run in
+    parallel and use shutil.copyfile, which uses os.sendfile where the
+    platform supports it. Optionally, artwork is resized and re-encoded
+    for small-screen devices instead of being copied.
+    """
+
+    def __init__(self, source_dir: str, target_dir: str, workers: int = 4,
+                 max_size: int = 0, encoder: Optional[ImageEncoder] = None,
+                 delete: bool = False):
+        """
+        Initialize artwork sync.
+
+        Args:
+            source_dir: Artwork library to mirror
+            target_dir: Destination folder
+            workers: Files copied in parallel
+            max_size: Resize artwork to fit within this many pixels per
+                side (0 copies files unchanged)
+            encoder: Encoder for resized artwork (default: JPEG)
+            delete: Remove previously synced files that are no longer in
+                the source
+
+        Raises:
+            ValueError: If the target is inside the source or max_size is
+                negative
+        """
+        source = os.path.abspath(source_dir)
+        target = os.path.abspath(target_dir)
+        if target == source or target.startswith(source + os.sep):
+            raise ValueError("Sync target must be outside the artworks directory")
+        if max_size < 0:
+            raise ValueError("Sync image size must be 0 or more")
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.workers = workers
+        self.max_size = max_size
+        self.encoder = encoder or ImageEncoder()
+        self.delete = delete
+        self.manifest_path = os.path.join(target_dir, SYNC_MANIFEST_FILENAME)
+        self._lock = threading.Lock()
+
+    def load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Load the target's manifest, starting empty if missing or stale."""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+        # Files synced with other resize settings have to be redone
+        if (not isinstance(data, dict)
+                or data.get('version') != MANIFEST_VERSION
+                or data.get('variant') != self.variant):
+            return {}
+        return data.get('files', {})
+
+    def save_manifest(self, files: Dict[str, Dict[str, Any]]) -> None:
+        """Atomically write the manifest."""
+        data = {'version': MANIFEST_VERSION, 'variant': self.variant,
+                'files': files}
+        fd, temp_path = tempfile.mkstemp(dir=self.target_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, self.manifest_path)
+
+    @property
+    def variant(self) -> str:
+        """Description of how files are transformed, e.g. 'original'."""
+        if not self.max_size:
+            return 'original'
+        return f'{self.max_size}px-{self.encoder.fmt}-q{self.encoder.quality}'
+
+    def target_relpath(self, relpath: str) -> str:
+        """Target path for a source file relative to the target directory."""
+        if not self.max_size:
+            return relpath
+        return os.path.splitext(relpath)[0] + self.encoder.extension
+
+    def _needs_copy(self, relpath: str, size: int, mtime: float,
+                    entry: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
+        """
+        Decide whether a source file has to be copied.
+
+        Returns:
+            Tuple of (copy needed, source digest if it was computed)
+        """
+        if entry is None:
+            return True, None
+        target = os.path.join(self.target_dir, entry['target'])
+        if not os.path.exists(target):
+            return True, None
+        if entry['size'] == size and entry['mtime'] == mtime:
+            return False, entry.get('sha1')
+        digest = file_digest(os.path.join(self.source_dir, relpath))
+        return digest != entry.get('sha1'), digest
+
+    def _copy(self, relpath: str) -> str:
+        """Copy (or resize) one file into place atomically."""
+        source = os.path.join(self.source_dir, relpath)
+        target = os.path.join(self.target_dir, self.target_relpath(relpath))
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            if self.max_size:
+                with Image.open(source) as img:
+                    img.thumbnail((self.max_size, self.max_size))
+                    with open(temp_path, 'wb') as f:
+                        self.encoder.save(img, f)
+            else:
+                shutil.copyfile(source, temp_path)
+                # Not every device filesystem keeps timestamps
+                try:
+                    shutil.copystat(source, temp_path)
+                except OSError:
+                    pass
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return target
+
+    def run(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Bring the target directory up to date.
+
+        Args:
+            dry_run: Count what would change without copying or deleting
+
+        Returns:
+            Dictionary with COPIED, UNCHANGED, DELETED and FAILED counts,
+            plus 'bytes' copied from the source
+        """
+        os.makedirs(self.target_dir, exist_ok=True)
+        manifest = self.load_manifest()
+        counts = {COPIED: 0, UNCHANGED: 0, DELETED: 0, FAILED: 0, 'bytes': 0}
+        files: Dict[str, Dict[str, Any]] = {}
+
+        def sync_file(relpath: str, size: int, mtime: float) -> None:
+            entry = manifest.get(relpath)
+            needed, digest = self._needs_copy(relpath, size, mtime, entry)
+            if needed and not dry_run:
+                self._copy(relpath)
+                digest = digest or file_digest(
+                    os.path.join(self.source_dir, relpath)
+                )
+            with self._lock:
+                if needed:
+                    counts[COPIED] += 1
+                    counts['bytes'] += size
+                else:
+                    counts[UNCHANGED] += 1
+                files[relpath] = {
+                    'size': size, 'mtime': mtime, 'sha1': digest,
+                    'target': self.target_relpath(relpath),
+                }
+
+        futures: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for file_entry in iter_artwork_files(self.source_dir):
+                stat = file_entry.stat()
+                relpath = os.path.relpath(file_entry.path, self.source_dir)
+                entry = manifest.get(relpath)
+                if (entry and entry['size'] == stat.st_size
+                        and entry['mtime'] == stat.st_mtime
+                        and os.path.exists(
+                            os.path.join(self.target_dir, entry['target']))):
+                    # Common case; not worth a trip through the pool
+                    with self._lock:
+                        counts[UNCHANGED] += 1
+                        files[relpath] = entry
+                    continue
+                future = executor.submit(sync_file, relpath, stat.st_size,
+                                         stat.st_mtime)
+                futures[future] = relpath
+
+        for future, relpath in futures.items():
+            if future.exception() is None:
+                continue
+            # Unreadable or undecodable (e.g. a decompression bomb) source;
+            # keeping its entry keeps the previous copy from being deleted
+            counts[FAILED] += 1
+            if relpath in manifest:
+                files[relpath] = manifest[relpath]
+
+        for relpath in set(manifest) - set(files):
+            if not self.delete:
+                files[relpath] = manifest[relpath]
+                continue
+            counts[DELETED] += 1
+            if not dry_run:
+                target = os.path.join(self.target_dir, manifest[relpath]['target'])
+                try:
+                    os.remove(target)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    counts[FAILED] += 1
+                    files[relpath] = manifest[relpath]
+
+        if not dry_run:
+            self.save_manifest(files)
+        return counts
@@ -1,9 +1,19 @@
 """Tests for album services."""
 import os
 import tempfile
+import threading
 import unittest
-from unittest.mock import Mock, patch
-from album_service import AlbumSelector, AlbumDownloader, FilenameUtil
+from unittest.mock import ANY, Mock, patch
+from PIL import Image
+from models import Album
+from album_service import (
+    AlbumSelector, AutoSelector, AlbumDownloader, AlbumMatcher, FilenameUtil,
+    ImageEncoder, ImageAnalyzer, DuplicateFinder, TOO_SMALL, NOT_SQUARE,
+    BLANK, PLACEHOLDER, PathTemplate, ArtworkPrefetcher
+)
+import requests
+import transport
+from transport import Http2Adapter
 
 
 class TestAlbumSelector(unittest.TestCase):
@@ -13,7 +23,7 @@ class TestAlbumSelector(unittest.TestCase):
         """Set up test fixtures."""
         self.mock_output = Mock()
         self.selector = AlbumSelector(self.mock_output)
-        self.get_artist_name = lambda album: album.get('artist', 'Unknown')
+        self.get_artist_name = lambda album: album.artist or 'Unknown'
 
     def test_choose_from_empty_list_returns_none(self):
         """Test that empty list returns None."""
@@ -23,40 +33,121 @@ class TestAlbumSelector(unittest.TestCase):
     def test_choose_valid_selection(self):
         """Test valid album selection."""
         albums = [
-            {'name': 'Album 1', 'artist': 'Artist 1'},
-            {'name': 'Album 2', 'artist': 'Artist 2'}
+            Album('', 'Album 1', 'Artist 1'),
+            Album('', 'Album 2', 'Artist 2')
         ]
         self.mock_output.prompt = Mock(return_value="2")
 
         result = self.selector.choose_from_list(albums, self.get_artist_name)
-        self.assertEqual(result['name'], 'Album 2')
+        self.assertEqual(result.name, 'Album 2')
 
     def test_choose_invalid_selection_defaults_to_first(self):
         """Test invalid input defaults to first album."""
         albums = [
-            {'name': 'Album 1', 'artist': 'Artist 1'},
-            {'name': 'Album 2', 'artist': 'Artist 2'}
+            Album('', 'Album 1', 'Artist 1'),
+            Album('', 'Album 2', 'Artist 2')
         ]
         self.mock_output.prompt = Mock(return_value="invalid")
 
         result = self.selector.choose_from_list(albums, self.get_artist_name)
-        self.assertEqual(result['name'], 'Album 1')
+        self.assertEqual(result.name, 'Album 1')
 
     def test_choose_out_of_range_defaults_to_first(self):
         """Test out of range selection defaults to first."""
-        albums = [{'name': 'Album 1', 'artist': 'Artist 1'}]
+        albums = [Album('', 'Album 1', 'Artist 1')]
         self.mock_output.prompt = Mock(return_value="99")
 
         result = self.selector.choose_from_list(albums, self.get_artist_name)
-        self.assertEqual(result['name'], 'Album 1')
+        self.assertEqual(result.name, 'Album 1')
 
     def test_choose_first_album(self):
         """Test selecting first album."""
-        albums = [{'name': 'Album 1', 'artist': 'Artist 1'}]
+        albums = [Album('', 'Album 1', 'Artist 1')]
         self.mock_output.prompt = Mock(return_value="1")
 
         result = self.selector.choose_from_list(albums, self.get_artist_name)
-        self.assertEqual(result['name'], 'Album 1')
+        self.assertEqual(result.name, 'Album 1')
+
+    def test_on_list_runs_before_prompt(self):
+        """Test that the listed albums are handed over before waiting."""
+        albums = [Album('', 'Album 1', 'Artist 1')]
+        events = []
+        selector = AlbumSelector(self.mock_output,
+                                 on_list=lambda listed: events.append(listed))
+        self.mock_output.prompt = Mock(
+            side_effect=lambda message: events.append('prompt') or "1"
+        )
+
+        selector.choose_from_list(albums, self.get_artist_name)
+        self.assertEqual(events, [albums, 'prompt'])
+
+
+class TestArtworkPrefetcher(unittest.TestCase):
+    """Test cases for ArtworkPrefetcher."""
+
+    def setUp(self):
+        """Create a prefetcher whose session answers per URL."""
+        self.responses = {}
+        self.session = Mock()
+        self.session.get.side_effect = (
+            lambda url, timeout: self.responses[url]
+        )
+        self.prefetcher = ArtworkPrefetcher(self.session, timeout=4, count=2)
+
+    def tearDown(self):
+        """Stop the fetch threads."""
+        self.prefetcher.close()
+
+    def test_take_returns_prefetched_image(self):
+        """Test that the first listed images are fetched in the background."""
+        self.responses['a'] = Mock(status_code=200, content=b'a')
+        self.responses['b'] = Mock(status_code=200, content=b'b')
+
+        self.prefetcher.start(['a', None, 'a', 'b', 'c'])
+
+        self.assertIs(self.prefetcher.take('b'), self.responses['b'])
+        self.assertEqual(
+            sorted(call.args[0] for call in self.session.get.call_args_list),
+            ['a', 'b']
+        )
+        self.session.get.assert_called_with('b', timeout=4)
+        # The other candidates were discarded with the choice
+        self.assertIsNone(self.prefetcher.take('a'))
+        self.assertEqual((self.prefetcher.hits, self.prefetcher.misses), (1, 1))
+
+    def test_take_waits_for_fetch_in_flight(self):
+        """Test that a chosen image still downloading is waited for."""
+        release = threading.Event()
+        response = Mock(status_code=200)
+
+        def slow_get(url, timeout):
+            release.wait(5)
+            return response
+
+        self.session.get.side_effect = slow_get
+        self.prefetcher.start(['a'])
+        threading.Timer(0.05, release.set).start()
+
+        self.assertIs(self.prefetcher.take('a'), response)
+
+    def test_failed_fetches_are_left_to_the_download(self):
+        """Test that errors and non-200 answers aren't handed over."""
+        def get(url, timeout):
+            if url == 'b':
+                raise requests.exceptions.Timeout()
+            return Mock(status_code=404)
+
+        self.session.get.side_effect = get
+        self.prefetcher.start(['a', 'b'])
+
+        self.assertIsNone(self.prefetcher.take('a'))
+        self.prefetcher.start(['b'])
+        self.assertIsNone(self.prefetcher.take('b'))
+
+    def test_invalid_count_raises_value_error(self):
+        """Test that a prefetcher needs at least one image."""
+        with self.assertRaises(ValueError):
+            ArtworkPrefetcher(self.session, count=0)
 
 
 class TestAlbumDownloader(unittest.TestCase):
@@ -97,7 +188,48 @@ class TestAlbumDownloader(unittest.TestCase):
             "https://example.com/image.jpg",
             timeout=5
         )
-        mock_img.save.assert_called_once_with(self.temp_file.name)
+        mock_img.save.assert_called_once_with(ANY, format='JPEG')
+
+    @patch('album_service.requests.get')
+    @patch('album_service.Image.open')
+    def test_failed_save_keeps_existing_artwork(self, mock_image_open, mock_get):
+        """Test that saves go through a temporary file."""
+        with open(self.temp_file.name, 'wb') as f:
+            f.write(b'old artwork')
+        mock_get.return_value = Mock(content=b'fake image data')
+
+        def save(f, format):
+            f.write(b'half an im')
+            raise OSError("disk full")
+
+        mock_image_open.return_value.save.side_effect = save
+
+        self.assertFalse(self.downloader.download("https://x/new.jpg",
+                                                  self.temp_file.name))
+        with open(self.temp_file.name, 'rb') as f:
+            self.assertEqual(f.read(), b'old artwork')
+        directory, name = os.path.split(self.temp_file.name)
+        self.assertFalse([leftover for leftover in os.listdir(directory)
+                          if leftover.startswith('.' + name)])
+
+    @patch('album_service.requests.get')
+    @patch('album_service.Image.open')
+    def test_download_uses_encoder(self, mock_image_open, mock_get):
+        """Test that a configured encoder performs the save."""
+        mock_get.return_value = Mock(content=b'fake image data')
+        mock_img = Mock()
+        mock_image_open.return_value = mock_img
+        encoder = Mock()
+        downloader = AlbumDownloader(self.mock_output, encoder=encoder)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'out.webp')
+            result = downloader.download("https://example.com/image.jpg", path)
+            self.assertEqual(os.listdir(directory), ['out.webp'])
+
+        self.assertTrue(result)
+        encoder.save.assert_called_once_with(mock_img, ANY)
+        mock_img.save.assert_not_called()
 
     @patch('album_service.requests.get')
     def test_download_timeout(self, mock_get):
@@ -114,6 +246,22 @@ class TestAlbumDownloader(unittest.TestCase):
         self.mock_output.error.assert_called_once()
         self.assertIn("timed out", self.mock_output.error.call_args[0][0])
 
+    @patch('album_service.requests.get')
+    def test_download_records_missing_image_status(self, mock_get):
+        """Test that a 404 is reported through last_status."""
+        import requests
+        response = requests.Response()
+        response.status_code = 404
+        mock_get.return_value = response
+
+        self.assertFalse(self.downloader.download("https://x/gone.jpg",
+                                                  self.temp_file.name))
+        self.assertEqual(self.downloader.last_status(), 404)
+
+        mock_get.side_effect = requests.exceptions.Timeout()
+        self.downloader.download("https://x/slow.jpg", self.temp_file.name)
+        self.assertIsNone(self.downloader.last_status())
+
     @patch('album_service.requests.get')
     def test_download_connection_error(self, mock_get):
         """Test connection error handling."""
@@ -146,6 +294,345 @@ class TestAlbumDownloader(unittest.TestCase):
         self.assertIn("Failed to process image", self.mock_output.error.call_args[0][0])
 
 
+class TestAutoSelector(unittest.TestCase):
+    """Test cases for AutoSelector class."""
+
+    def test_picks_first_album(self):
+        """Test that the first album is chosen without prompting."""
+        albums = [Album('1', 'Album 1'), Album('2', 'Album 2')]
+        self.assertEqual(AutoSelector().choose_from_list(albums, None), albums[0])
+        self.assertIsNone(AutoSelector().choose_from_list([], None))
+
+
+class TestAlbumMatcher(unittest.TestCase):
+    """Test cases for AlbumMatcher class."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.matcher = AlbumMatcher(lambda album: album.artist)
+
+    def test_exact_name_scores_one(self):
+        """Test that an exact, case-insensitive name match scores 1.0."""
+        album = Album('', 'Abbey Road', 'The Beatles')
+        self.assertEqual(self.matcher.score('abbey road', album), 1.0)
+
+    def test_artist_in_query_scores_high(self):
+        """Test that queries including the artist still match."""
+        album = Album('', 'Abbey Road', 'The Beatles')
+        self.assertGreater(
+            self.matcher.score('The Beatles Abbey Road', album), 0.95
+        )
+
+    def test_rank_orders_best_first(self):
+        """Test that ranking puts the closest match first."""
+        albums = [
+            Album('', 'Greatest Hits Vol. 2', 'Queen'),
+            Album('', 'Greatest Hits', 'Queen'),
+        ]
+        ranked = self.matcher.rank('Greatest Hits', albums)
+        self.assertEqual(ranked[0].name, 'Greatest Hits')
+
+
+class TestDownloaderSession(unittest.TestCase):
+    """Test cases for pooled download sessions."""
+
+    def test_create_session_configures_pool_and_retries(self):
+        """Test that the session adapter uses the pool and retry settings."""
+        session = AlbumDownloader.create_session(
+            pool_connections=2, pool_maxsize=16, max_retries=5
+        )
+        adapter = session.get_adapter('https://i.scdn.co/image/x')
+        self.assertEqual(adapter._pool_maxsize, 16)
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertIn(429, adapter.max_retries.status_forcelist)
+
+    @unittest.skipIf(transport.httpx is None, "httpx[http2] is not installed")
+    def test_create_session_uses_http2_for_images(self):
+        """Test that HTTP/2 sessions keep the stream limit and retries."""
+        session = AlbumDownloader.create_session(
+            max_retries=5, http2_streams=20, http2_connections=3
+        )
+        adapter = session.get_adapter('https://i.scdn.co/image/x')
+        self.assertIsInstance(adapter, Http2Adapter)
+        self.assertEqual(adapter.max_streams, 20)
+        self.assertEqual(adapter.max_retries.total, 5)
+        session.close()
+
+    def test_download_uses_session(self):
+        """Test that a provided session is used for requests."""
+        session = Mock()
+        session.get.side_effect = Exception("stop")
+        downloader = AlbumDownloader(Mock(), timeout=7, session=session)
+
+        with self.assertRaises(Exception):
+            downloader.download("https://example.com/image.jpg", "out.jpg")
+        session.get.assert_called_once_with(
+            "https://example.com/image.jpg", timeout=7
+        )
+
+    @patch('album_service.Image.open')
+    def test_download_uses_prefetched_image(self, mock_image_open):
+        """Test that a prefetched image isn't requested again."""
+        session = Mock()
+        prefetcher = Mock()
+        prefetcher.take.return_value = Mock(status_code=200, content=b'image')
+        downloader = AlbumDownloader(Mock(), session=session,
+                                     prefetcher=prefetcher)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'out.jpg')
+            self.assertTrue(downloader.download("https://i.scdn.co/a", path))
+
+        prefetcher.take.assert_called_once_with("https://i.scdn.co/a")
+        session.get.assert_not_called()
+        mock_image_open.return_value.save.assert_called_once_with(
+            ANY, format='JPEG'
+        )
+        self.assertEqual(downloader.bytes_downloaded, 5)
+
+
+class TestImageEncoder(unittest.TestCase):
+    """Test cases for ImageEncoder class."""
+
+    def setUp(self):
+        """Set up a temporary output directory and source image."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.img = Image.new('RGBA', (64, 64), (200, 10, 10, 255))
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_unknown_format_raises(self):
+        """Test that an unknown format is rejected."""
+        with self.assertRaises(ValueError):
+            ImageEncoder('bmp')
+
+    def test_invalid_quality_raises(self):
+        """Test that out-of-range quality is rejected."""
+        with self.assertRaises(ValueError):
+            ImageEncoder('jpeg', quality=0)
+
+    def test_jpg_alias_and_extension(self):
+        """Test that 'jpg' maps to JPEG with a .jpg extension."""
+        encoder = ImageEncoder('jpg')
+        self.assertEqual(encoder.fmt, 'jpeg')
+        self.assertEqual(encoder.extension, '.jpg')
+
+    def test_save_progressive_jpeg_converts_rgba(self):
+        """Test saving a progressive JPEG from an RGBA source."""
+        path = os.path.join(self.temp_dir, 'cover.jpg')
+        ImageEncoder('jpeg', quality=70, progressive=True).save(self.img, path)
+
+        with Image.open(path) as saved:
+            self.assertEqual(saved.format, 'JPEG')
+            self.assertEqual(saved.mode, 'RGB')
+            self.assertTrue(saved.info.get('progressive'))
+
+    def test_save_webp(self):
+        """Test saving WebP output."""
+        if not ImageEncoder.is_supported('webp'):
+            self.skipTest("WebP not supported by this Pillow build")
+        path = os.path.join(self.temp_dir, 'cover.webp')
+        ImageEncoder('webp', optimize=True).save(self.img, path)
+
+        with Image.open(path) as saved:
+            self.assertEqual(saved.format, 'WEBP')
+
+    def test_strip_metadata_drops_icc_profile(self):
+        """Test that stripping metadata removes the ICC profile."""
+        self.img.info['icc_profile'] = b'fake profile'
+        kept = ImageEncoder('jpeg').save_options(self.img)
+        stripped = ImageEncoder('jpeg', strip_metadata=True).save_options(self.img)
+
+        self.assertEqual(kept['icc_profile'], b'fake profile')
+        self.assertNotIn('icc_profile', stripped)
+
+
+def _artwork(size=(400, 400), seed=0):
+    """Build a blocky random test image; equal seeds look the same."""
+    import numpy as np
+    blocks = np.random.default_rng(seed).integers(0, 256, (8, 8), dtype=np.uint8)
+    return Image.fromarray(blocks).resize(size, Image.Resampling.NEAREST).convert('RGB')
+
+
+class TestImageAnalyzer(unittest.TestCase):
+    """Test cases for ImageAnalyzer class."""
+
+    def test_good_artwork_has_no_problems(self):
+        """Test that a large, square, detailed image passes."""
+        report = ImageAnalyzer(min_size=300).analyze(_artwork())
+        self.assertEqual(report.problems, ())
+        self.assertEqual((report.width, report.height), (400, 400))
+
+    def test_small_and_non_square_flagged(self):
+        """Test that dimension problems are reported."""
+        report = ImageAnalyzer(min_size=300).analyze(_artwork((200, 100)))
+        self.assertIn(TOO_SMALL, report.problems)
+        self.assertIn(NOT_SQUARE, report.problems)
+
+    def test_blank_image_flagged(self):
+        """Test that a uniform image is reported as blank."""
+        report = ImageAnalyzer().analyze(Image.new('RGB', (400, 400), 'grey'))
+        self.assertIn(BLANK, report.problems)
+
+    def test_known_placeholder_flagged(self):
+        """Test that an image matching a placeholder hash is reported."""
+        placeholder = _artwork()
+        _, dhash, _ = ImageAnalyzer.hashes(placeholder)
+        analyzer = ImageAnalyzer(placeholder_hashes=[dhash])
+
+        resized = placeholder.resize((640, 640))
+        self.assertIn(PLACEHOLDER, analyzer.analyze(resized).problems)
+        self.assertNotIn(
+            PLACEHOLDER, analyzer.analyze(_artwork(seed=1)).problems
+        )
+
+    def test_parse_hashes(self):
+        """Test parsing comma-separated hexadecimal hashes."""
+        self.assertEqual(ImageAnalyzer.parse_hashes("ff, 0a,"), [255, 10])
+        with self.assertRaises(ValueError):
+            ImageAnalyzer.parse_hashes("xyz")
+
+    def test_open_safely_rejects_truncated_data(self):
+        """Test that corrupt image bytes raise instead of saving."""
+        from io import BytesIO
+        buffer = BytesIO()
+        _artwork().save(buffer, 'JPEG')
+        with self.assertRaises(Exception):
+            ImageAnalyzer.open_safely(buffer.getvalue()[:200])
+
+    @patch('album_service.requests.get')
+    def test_downloader_skips_placeholder(self, mock_get):
+        """Test that the downloader doesn't save placeholder artwork."""
+        from io import BytesIO
+        buffer = BytesIO()
+        Image.new('RGB', (400, 400), 'white').save(buffer, 'PNG')
+        mock_get.return_value = Mock(content=buffer.getvalue())
+        mock_output = Mock()
+        downloader = AlbumDownloader(mock_output, analyzer=ImageAnalyzer())
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'cover.jpg')
+            self.assertFalse(downloader.download("https://x/img", path))
+            self.assertFalse(os.path.exists(path))
+        mock_output.error.assert_called_once()
+
+
+    @patch('album_service.requests.get')
+    def test_downloader_writes_processed_bytes(self, mock_get):
+        """Test that a process pool's encoded output is written as-is."""
+        mock_get.return_value = Mock(content=b'source')
+        processor = Mock()
+        processor.process.return_value = Mock(data=b'encoded', report=None)
+        downloader = AlbumDownloader(Mock(), processor=processor)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'artist', 'cover.jpg')
+            self.assertTrue(downloader.download("https://x/img", path))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'encoded')
+        processor.process.assert_called_once_with(b'source')
+
+
+class TestDuplicateFinder(unittest.TestCase):
+    """Test cases for DuplicateFinder class."""
+
+    def setUp(self):
+        """Create an artwork directory with duplicates and a broken file."""
+        self.temp_dir = tempfile.mkdtemp()
+        _artwork().save(os.path.join(self.temp_dir, 'a.jpg'), quality=90)
+        _artwork((600, 600)).save(os.path.join(self.temp_dir, 'a copy.png'))
+        _artwork(seed=1).save(os.path.join(self.temp_dir, 'b.jpg'))
+        Image.new('RGB', (300, 300), 'black').save(
+            os.path.join(self.temp_dir, 'blank.jpg')
+        )
+        with open(os.path.join(self.temp_dir, 'broken.jpg'), 'wb') as f:
+            f.write(b'not an image')
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_analyze_directory(self):
+        """Test that duplicates, blanks and broken files are reported."""
+        finder = DuplicateFinder(ImageAnalyzer(max_distance=5), workers=2)
+        report = finder.analyze_directory(self.temp_dir)
+
+        names = [sorted(os.path.basename(p) for p in group)
+                 for group in report['duplicates']]
+        self.assertEqual(names, [['a copy.png', 'a.jpg']])
+        self.assertEqual([os.path.basename(p) for p in report['blank']],
+                         ['blank.jpg'])
+        self.assertEqual([os.path.basename(p) for p in report['broken']],
+                         ['broken.jpg'])
+
+    def test_find_pairs(self):
+        """Test that indexed and blocked pair searches agree."""
+        import numpy as np
+        finder = DuplicateFinder(ImageAnalyzer(max_distance=2))
+        finder.BLOCK_SIZE = 3
+        hashes = np.array([0b1111, 0xFF00, 0xF0F0F0, 0x0F0F0F, 0xFF01, 0b0111],
+                          dtype=np.uint64)
+
+        pairs = finder.find_pairs(hashes)
+        self.assertEqual(pairs, [(0, 5, 1), (1, 4, 1)])
+        self.assertEqual(finder._find_pairs_blocked(hashes), pairs)
+        self.assertEqual(finder.group_pairs(6, pairs), [[0, 5], [1, 4]])
+
+
+class TestPathTemplate(unittest.TestCase):
+    """Test cases for PathTemplate class."""
+
+    album = Album('abc123', 'Greatest Hits', year='1981')
+
+    def test_default_template_uses_album_name(self):
+        """Test that the default layout matches the flat album-name files."""
+        self.assertEqual(PathTemplate().render(self.album), 'Greatest Hits.jpg')
+
+    def test_artist_directory_and_year(self):
+        """Test directories, fields and a replaced template extension."""
+        template = PathTemplate('{artist}/{album} [{year}].jpg', extension='.webp')
+        self.assertEqual(
+            template.render(self.album, 'AC/DC'),
+            os.path.join('AC_DC', 'Greatest Hits [1981].webp')
+        )
+
+    def test_missing_field_drops_empty_brackets(self):
+        """Test that a missing year doesn't leave '[]' behind."""
+        template = PathTemplate('{album} ({year})')
+        self.assertEqual(template.render(Album('', 'Demo')), 'Demo.jpg')
+
+    def test_disambiguate_appends_album_id(self):
+        """Test the collision-avoiding file name."""
+        self.assertEqual(PathTemplate().render(self.album, disambiguate=True),
+                         'Greatest Hits [abc123].jpg')
+
+    def test_shards_prefix_hash_directories(self):
+        """Test hash-sharded subdirectories are stable two-hex-digit names."""
+        path = PathTemplate(shards=2).render(self.album)
+        parts = path.split(os.sep)
+        self.assertEqual(len(parts), 3)
+        self.assertRegex(parts[0], '^[0-9a-f]{2}$')
+        self.assertEqual(parts[2], 'Greatest Hits.jpg')
+        self.assertEqual(PathTemplate(shards=2).render(self.album), path)
+
+    def test_invalid_templates_raise(self):
+        """Test that unknown fields, absolute paths and bad shards raise."""
+        for template in ('{genre}/{album}', '/etc/{album}', ''):
+            with self.assertRaises(ValueError):
+                PathTemplate(template)
+        with self.assertRaises(ValueError):
+            PathTemplate(shards=4)
+
+    def test_dot_components_removed(self):
+        """Test that field values can't escape the artworks directory."""
+        self.assertEqual(PathTemplate('{artist}/{album}').render(
+            Album('', 'x'), '..'), os.path.join('_', 'x.jpg'))
+
+
 class TestFilenameUtil(unittest.TestCase):
     """Test cases for FilenameUtil class."""
 
@@ -161,6 +648,23 @@ class TestFilenameUtil(unittest.TestCase):
         clean = FilenameUtil.sanitize(valid)
         self.assertEqual(clean, valid)
 
+    def test_sanitize_normalizes_unicode(self):
+        """Test that decomposed characters are composed (NFC)."""
+        self.assertEqual(FilenameUtil.sanitize('Bjo\u0308rk'), 'Bj\u00f6rk')
+
+    def test_sanitize_reserved_and_trailing_characters(self):
+        """Test Windows device names, trailing dots and control characters."""
+        self.assertEqual(FilenameUtil.sanitize('CON'), 'CON_')
+        self.assertEqual(FilenameUtil.sanitize('nul.txt'), 'nul.txt_')
+        self.assertEqual(FilenameUtil.sanitize('Help! ...'), 'Help!')
+        self.assertEqual(FilenameUtil.sanitize('a\tb\n'), 'a_b_')
+        self.assertEqual(FilenameUtil.sanitize('...'), '_')
+
+    def test_sanitize_truncates_to_utf8_bytes(self):
+        """Test truncation without splitting a multi-byte character."""
+        clean = FilenameUtil.sanitize('\u00e9' * 150, max_bytes=201)
+        self.assertEqual(clean, '\u00e9' * 100)
+
     def test_sanitize_handles_all_invalid_chars(self):
         """Test all invalid characters are handled."""
         for char in '<>:"/\\|?*':
@@ -1,7 +1,23 @@
 """Tests for main application."""
+import os
+import sqlite3
+import tempfile
+import threading
 import unittest
 from unittest.mock import Mock, patch
-from app import AlbumArtworkApp
+import requests
+from app import (
+    AlbumArtworkApp, build_arg_parser, build_encoder, build_analyzer,
+    build_catalog, build_folder_watcher, load_settings, main, watch_folder
+)
+from album_service import AutoSelector
+from batch_input import BatchItem
+from cache import NegativeCache
+from config import Settings
+from library import ArtworkIndex
+from shards import parse_shard
+from models import Album, ImageVariant
+from providers import ProviderChain
 
 
 class TestAlbumArtworkApp(unittest.TestCase):
@@ -33,7 +49,7 @@ class TestAlbumArtworkApp(unittest.TestCase):
     @patch('app.SpotifyClient')
     def test_initialization_creates_spotify_client(self, mock_client_class):
         """Test initialization creates Spotify client when not provided."""
-        self.mock_credentials.get_or_prompt.return_value = ("id", "secret")
+        self.mock_credentials.get_all_or_prompt.return_value = [("id", "secret")]
 
         mock_client = Mock()
         mock_client.test_credentials.return_value = True
@@ -44,13 +60,15 @@ class TestAlbumArtworkApp(unittest.TestCase):
             credentials_manager=self.mock_credentials
         )
 
-        mock_client_class.assert_called_once_with("id", "secret")
+        mock_client_class.assert_called_once_with(
+            "id", "secret", requests_timeout=5, retries=3, backoff_factor=0.3
+        )
         mock_client.test_credentials.assert_called_once()
 
     @patch('app.SpotifyClient')
     def test_initialization_fails_with_invalid_credentials(self, mock_client_class):
         """Test initialization raises ValueError with invalid credentials."""
-        self.mock_credentials.get_or_prompt.return_value = ("id", "secret")
+        self.mock_credentials.get_all_or_prompt.return_value = [("id", "secret")]
 
         mock_client = Mock()
         mock_client.test_credentials.return_value = False
@@ -62,9 +80,70 @@ class TestAlbumArtworkApp(unittest.TestCase):
                 credentials_manager=self.mock_credentials
             )
 
+    @patch('app.SpotifyClientPool')
+    @patch('app.SpotifyClient')
+    def test_initialization_pools_multiple_credentials(self, mock_client_class,
+                                                       mock_pool_class):
+        """Test that several credential sets are combined into a pool."""
+        self.mock_credentials.get_all_or_prompt.return_value = [
+            ("id1", "secret1"), ("id2", "secret2")
+        ]
+        mock_pool_class.CLIENT_STATUS_FORCELIST = (500, 502, 503, 504)
+        mock_pool_class.return_value.test_credentials.return_value = True
+
+        app = AlbumArtworkApp(
+            output=self.mock_output,
+            credentials_manager=self.mock_credentials
+        )
+
+        self.assertEqual(mock_client_class.call_count, 2)
+        for call in mock_client_class.call_args_list:
+            self.assertNotIn(429, call.kwargs['status_forcelist'])
+        self.assertIs(app.spotify_client, mock_pool_class.return_value)
+
+    def test_missing_image_falls_back_to_next_provider(self):
+        """Test that a 404 on the chosen artwork tries the other providers."""
+        listed = Album('itunes:1', 'Blue', provider='itunes',
+                       images=(ImageVariant('https://x/gone.jpg', 0, 0),))
+        found = Album('mbid:1', 'Blue', provider='coverartarchive',
+                      images=(ImageVariant('https://x/blue.jpg', 1200, 1200),))
+        itunes, caa = Mock(), Mock()
+        itunes.name, caa.name = 'itunes', 'coverartarchive'
+        itunes.search_albums.return_value = [listed]
+        caa.search_albums.return_value = [found]
+        self.app.provider_chain = ProviderChain([itunes, caa])
+        self.mock_selector.choose_from_list.side_effect = (
+            lambda albums, artist_fn: albums[0]
+        )
+        self.mock_spotify.get_album_image_url.side_effect = lambda a: a.image_url
+        self.mock_spotify.get_artist_name.return_value = 'Joni Mitchell'
+        status = {}
+
+        def download(url, path):
+            status['code'] = 404 if url.endswith('gone.jpg') else 200
+            return status['code'] == 200
+
+        self.mock_downloader.download.side_effect = download
+        self.mock_downloader.last_status.side_effect = lambda: status['code']
+
+        self.assertEqual(self.app.process_album('Blue'), 'done')
+        self.assertEqual(
+            [c.args[0] for c in self.mock_downloader.download.call_args_list],
+            ['https://x/gone.jpg', 'https://x/blue.jpg']
+        )
+        self.assertEqual(itunes.search_albums.call_count, 1)
+
+        # Nothing left to try once every provider's artwork is missing
+        caa.search_albums.return_value = [
+            Album('mbid:2', 'Court and Spark', provider='coverartarchive',
+                  images=(ImageVariant('https://x/gone.jpg', 250, 250),))
+        ]
+        self.app.settings = Settings({'search_cache_size': 0})
+        self.assertEqual(self.app.process_album('Court and Spark'), 'failed')
+
     def test_find_and_select_album(self):
         """Test finding and selecting an album."""
-        mock_albums = [{'name': 'Test Album'}]
+        mock_albums = [Album('', 'Test Album')]
         self.mock_spotify.search_albums.return_value = mock_albums
         self.mock_selector.choose_from_list.return_value = mock_albums[0]
 
@@ -76,9 +155,56 @@ class TestAlbumArtworkApp(unittest.TestCase):
             limit=10
         )
 
+    def test_search_uses_provider_chain(self):
+        """Test that extra providers route searches through a chain."""
+        app = AlbumArtworkApp(
+            output=self.mock_output,
+            credentials_manager=self.mock_credentials,
+            spotify_client=self.mock_spotify,
+            album_selector=self.mock_selector,
+            album_downloader=self.mock_downloader,
+            settings=Settings({'providers': 'itunes,spotify',
+                               'provider_mode': 'race'})
+        )
+        self.assertEqual(
+            [p.name for p in app.provider_chain.providers], ['itunes', 'spotify']
+        )
+        app.provider_chain = Mock()
+        app.provider_chain.search_albums.return_value = [Album('', 'X')]
+
+        self.assertEqual(app.search('X'), [Album('', 'X')])
+        app.provider_chain.search_albums.assert_called_once_with('X', 10)
+
+    def test_search_paginates_when_configured(self):
+        """Test that a larger max_results uses the paginated, ranked search."""
+        self.app.settings = Settings({'search_max_results': 30})
+        self.mock_spotify.get_artist_name.side_effect = lambda a: 'Queen'
+        self.mock_spotify.search_albums_paginated.return_value = [
+            Album('', 'Greatest Hits III'), Album('', 'Greatest Hits')
+        ]
+
+        result = self.app.search("Greatest Hits")
+
+        self.assertEqual(result[0].name, 'Greatest Hits')
+        kwargs = self.mock_spotify.search_albums_paginated.call_args.kwargs
+        self.assertEqual(kwargs['max_results'], 30)
+        self.assertEqual(kwargs['workers'], 1)
+        self.mock_spotify.search_albums.assert_not_called()
+
+    def test_search_wide_fetches_in_parallel(self):
+        """Test that wide mode scans in parallel with the configured concurrency."""
+        self.app.settings = Settings({'search_wide': True, 'concurrency': 6})
+        self.mock_spotify.search_albums_paginated.return_value = []
+
+        self.app.search("Greatest Hits")
+
+        kwargs = self.mock_spotify.search_albums_paginated.call_args.kwargs
+        self.assertEqual(kwargs['max_results'], 50)
+        self.assertEqual(kwargs['workers'], 6)
+
     def test_download_album_artwork_success(self):
         """Test successful album artwork download."""
-        album = {'name': 'Test Album', 'artists': [{'name': 'Test Artist'}]}
+        album = Album('t1', 'Test Album', 'Test Artist')
         self.mock_spotify.get_album_image_url.return_value = "https://example.com/image.jpg"
         self.mock_spotify.get_artist_name.return_value = "Test Artist"
         self.mock_downloader.download.return_value = True
@@ -90,7 +216,7 @@ class TestAlbumArtworkApp(unittest.TestCase):
 
     def test_download_album_artwork_no_image(self):
         """Test download when no image is available."""
-        album = {'name': 'Test Album'}
+        album = Album('', 'Test Album')
         self.mock_spotify.get_album_image_url.return_value = None
 
         result = self.app.download_album_artwork(album)
@@ -98,6 +224,484 @@ class TestAlbumArtworkApp(unittest.TestCase):
         self.assertFalse(result)
         self.mock_output.info.assert_called_with("No album artwork found.")
 
+    def test_fetch_artwork_records_not_found(self):
+        """Test that an empty search is recorded in the negative cache."""
+        cache = Mock()
+        cache.get.return_value = None
+        self.app.negative_cache = cache
+        self.mock_spotify.search_albums.return_value = []
+        self.mock_selector.choose_from_list.return_value = None
+
+        self.assertFalse(self.app.fetch_artwork("Missing Album"))
+
+        cache.record.assert_called_once_with("query:missing album", "not_found")
+        cache.save.assert_called_once()
+
+    def test_fetch_artwork_records_album_without_images(self):
+        """Test that an album without artwork is recorded as a miss."""
+        cache = Mock()
+        cache.get.return_value = None
+        self.app.negative_cache = cache
+        self.mock_selector.choose_from_list.return_value = Album('a1', 'No Art')
+        self.mock_spotify.get_album_image_url.return_value = None
+
+        self.assertFalse(self.app.fetch_artwork("No Art"))
+
+        cache.record.assert_called_once_with("album:a1", "no_artwork")
+
+    def test_album_without_artwork_does_not_block_query(self):
+        """Test that a cached cover-less album only skips that album."""
+        cache = Mock()
+        cache.get.side_effect = lambda key: (
+            "no_artwork" if key == "album:a1" else None
+        )
+        self.app.negative_cache = cache
+        self.mock_spotify.search_albums.return_value = [Album('a1', 'Live'),
+                                                        Album('a2', 'Live')]
+        self.mock_spotify.get_album_image_url.return_value = "http://x/img"
+        self.mock_spotify.get_artist_name.return_value = "Artist"
+        self.mock_downloader.download.return_value = True
+
+        self.mock_selector.choose_from_list.return_value = Album('a1', 'Live')
+        self.assertEqual(self.app.process_album("Live"), "skipped")
+        self.mock_downloader.download.assert_not_called()
+
+        self.mock_selector.choose_from_list.return_value = Album('a2', 'Live')
+        self.assertEqual(self.app.process_album("Live"), "done")
+        self.mock_downloader.download.assert_called_once()
+
+    def test_fetch_artwork_skips_cached_miss(self):
+        """Test that a cached miss skips the Spotify search."""
+        cache = Mock()
+        cache.get.return_value = "not_found"
+        self.app.negative_cache = cache
+
+        self.assertFalse(self.app.fetch_artwork("Missing Album"))
+
+        self.mock_spotify.search_albums.assert_not_called()
+        self.mock_output.info.assert_called_with(
+            "No matching album found (cached result)."
+        )
+
+    def test_empty_cache_and_library_are_used(self):
+        """Test that a fresh (empty, so falsy-sized) cache and index record."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.app.artworks_dir = temp_dir
+            self.app.negative_cache = NegativeCache(
+                os.path.join(temp_dir, 'cache.json'), ttl=60
+            )
+            self.app.library = ArtworkIndex(
+                os.path.join(temp_dir, 'index.json'), temp_dir
+            )
+            self.mock_spotify.search_albums.return_value = []
+            self.mock_selector.choose_from_list.return_value = None
+
+            self.app.fetch_artwork("Missing Album")
+
+            self.assertEqual(len(self.app.negative_cache), 1)
+
+            def download(url, path):
+                open(path, 'wb').close()
+                return True
+
+            self.mock_downloader.download.side_effect = download
+            self.mock_spotify.get_album_image_url.return_value = "http://x/img"
+            self.mock_spotify.get_artist_name.return_value = "Joni Mitchell"
+
+            self.assertTrue(self.app.download_album_artwork(Album('abc', 'Blue')))
+
+            self.assertEqual(len(self.app.library), 1)
+            self.assertIsNotNone(self.app.library.find_album('abc'))
+
+    def test_equivalent_searches_share_one_upstream_call(self):
+        """Test that normalized-equal queries hit Spotify once."""
+        self.mock_spotify.search_albums.return_value = [Album('', 'Abbey Road')]
+
+        first = self.app.search("Abbey Road (Remastered 2009)")
+        second = self.app.search("abbey road")
+
+        self.assertEqual(first, second)
+        self.mock_spotify.search_albums.assert_called_once_with(
+            "Abbey Road", limit=10
+        )
+
+    def test_failed_search_not_cached(self):
+        """Test that an upstream error is retried by the next query."""
+        self.mock_spotify.search_albums.side_effect = [Exception("503"), []]
+
+        with self.assertRaises(Exception):
+            self.app.search("Abbey Road")
+        self.assertEqual(self.app.search("Abbey Road"), [])
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_run_batch_skips_duplicate_queries(self, mock_ensure_dir):
+        """Test that equivalent batch lines are only processed once."""
+        mock_ensure_dir.return_value = True
+        progress = Mock(counts={})
+        with patch.object(self.app, 'process_album', return_value="done") as process:
+            self.app.run_batch(
+                ["Abbey Road", "abbey road (Remastered)", "Blue"],
+                progress=progress
+            )
+
+        self.assertEqual(process.call_count, 2)
+        progress.update.assert_any_call("skipped")
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_run_batch_consumes_input_as_it_goes(self, mock_ensure_dir):
+        """Test that a lazy input is only read a queue's length ahead."""
+        mock_ensure_dir.return_value = True
+        self.app.settings = Settings({'concurrency': 2, 'batch_queue_size': 3})
+        consumed = []
+        ahead = []
+
+        def albums():
+            for i in range(50):
+                consumed.append(i)
+                yield f"Album {i}"
+
+        def process_album(name, album_id=None):
+            ahead.append(len(consumed) - int(name.split()[1]))
+            return "done"
+
+        self.app.process_album = Mock(side_effect=process_album)
+        self.app.run_batch(albums(), progress=Mock(counts={}))
+
+        self.assertEqual(self.app.process_album.call_count, 50)
+        # Queue size, one album per worker, and the one being put
+        self.assertLessEqual(max(ahead), 3 + 2 + 1)
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_run_batch_looks_up_album_ids(self, mock_ensure_dir):
+        """Test that rows with a Spotify ID skip the search."""
+        mock_ensure_dir.return_value = True
+        album = Album('4aawyAB9vmqN3uQ7FjRGTy', 'Abbey Road', 'The Beatles')
+        self.mock_spotify.get_album.return_value = album
+        self.mock_spotify.get_album_image_url.return_value = 'https://x/1.jpg'
+        self.mock_spotify.get_artist_name.return_value = 'The Beatles'
+        self.mock_downloader.download.return_value = True
+
+        self.app.run_batch([BatchItem('Abbey Road - The Beatles', album.id),
+                            BatchItem('', album.id)], progress=Mock(counts={}))
+
+        self.mock_spotify.get_album.assert_called_once_with(album.id)
+        self.mock_spotify.search_albums.assert_not_called()
+        self.mock_downloader.download.assert_called_once()
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_shards_split_a_batch(self, mock_ensure_dir):
+        """Test that the shards of a batch cover it exactly once."""
+        mock_ensure_dir.return_value = True
+        names = [f"Album {i}" for i in range(40)]
+        processed = []
+        for shard in ('1/3', '2/3', '3/3'):
+            self.app.settings = Settings({'shard': shard})
+            self.app.shard = parse_shard(shard)
+            self.app.process_album = Mock(return_value="done")
+            self.app.run_batch(names + ["album 0"], progress=Mock(counts={}))
+            processed.append(
+                [call[0][0] for call in self.app.process_album.call_args_list]
+            )
+
+        self.assertEqual(sorted(sum(processed, [])), sorted(names))
+        self.assertTrue(all(processed))
+
+    def test_download_recorded_in_shard_journal(self):
+        """Test that downloads and misses go to the shard journal."""
+        self.app.journal = Mock()
+        self.mock_spotify.get_album_image_url.return_value = "https://x/1.jpg"
+        self.mock_spotify.get_artist_name.return_value = "Joni Mitchell"
+        self.mock_downloader.download.return_value = True
+        album = Album('blue', 'Blue')
+
+        self.app.download_album_artwork(album)
+        self.app._record_miss('query:nothing', 'not_found')
+
+        self.app.journal.record_download.assert_called_once_with(
+            '/tmp/test_artworks/Blue.jpg', album, 'Joni Mitchell'
+        )
+        self.app.journal.record_miss.assert_called_once_with(
+            'query:nothing', 'not_found'
+        )
+
+    def test_process_album_skips_album_in_library(self):
+        """Test that an album already in the library isn't searched for."""
+        library = Mock()
+        library.find_title.return_value = "/tmp/test_artworks/Abbey Road.jpg"
+        self.app.library = library
+
+        self.assertEqual(
+            self.app.process_album("Abbey Road - The Beatles"), "skipped"
+        )
+
+        library.find_title.assert_called_once_with("Abbey Road", "The Beatles")
+        self.mock_spotify.search_albums.assert_not_called()
+
+    def test_same_title_by_another_artist_is_downloaded(self):
+        """Test that a saved title only skips the same artist's album."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.app.artworks_dir = temp_dir
+            self.app.library = ArtworkIndex(
+                os.path.join(temp_dir, 'index.json'), temp_dir
+            )
+            saved = os.path.join(temp_dir, 'Greatest Hits.jpg')
+            open(saved, 'wb').close()
+            self.app.library.add(saved, Album('queen', 'Greatest Hits'), 'Queen')
+
+            def download(url, path):
+                open(path, 'wb').close()
+                return True
+
+            self.mock_downloader.download.side_effect = download
+            self.mock_spotify.get_album_image_url.return_value = "http://x/img"
+            self.mock_spotify.get_artist_name.side_effect = (
+                lambda album: 'ABBA' if album.id == 'abba' else 'Queen'
+            )
+            self.mock_spotify.search_albums.return_value = [
+                Album('abba', 'Greatest Hits')
+            ]
+            self.mock_selector.choose_from_list.side_effect = (
+                lambda albums, artist_fn: albums[0]
+            )
+
+            self.assertEqual(
+                self.app.process_album("Greatest Hits - Queen"), "skipped"
+            )
+            for query in ("Greatest Hits - ABBA", "Greatest Hits"):
+                self.assertEqual(self.app.process_album(query), "done")
+            self.assertEqual(self.mock_downloader.download.call_count, 1)
+            self.assertIsNotNone(self.app.library.find_album('abba'))
+            self.assertIsNotNone(self.app.library.find_album('queen'))
+
+    def test_download_records_artwork_in_library(self):
+        """Test that downloads are checked against and added to the library."""
+        library = Mock()
+        library.find_album.return_value = None
+        library.album_id_at.return_value = None
+        self.app.library = library
+        album = Album('abc', 'Blue')
+        self.mock_spotify.get_album_image_url.return_value = "http://x/img"
+        self.mock_spotify.get_artist_name.return_value = "Joni Mitchell"
+        self.mock_downloader.download.return_value = True
+
+        self.assertTrue(self.app.download_album_artwork(album))
+
+        library.find_album.assert_called_once_with('abc')
+        library.add.assert_called_once_with(
+            "/tmp/test_artworks/Blue.jpg", album, "Joni Mitchell"
+        )
+        library.save.assert_called_once()
+
+        library.find_album.return_value = "/tmp/test_artworks/Blue.jpg"
+        self.assertTrue(self.app.download_album_artwork(album))
+        self.mock_downloader.download.assert_called_once()
+
+    def test_download_records_album_in_catalog(self):
+        """Test that downloaded albums' metadata goes into the catalog."""
+        catalog = Mock()
+        self.app.catalog = catalog
+        album = Album('abc', 'Blue', total_tracks=10)
+        self.mock_spotify.get_album_image_url.return_value = "http://x/img"
+        self.mock_spotify.get_artist_name.return_value = "Joni Mitchell"
+        self.mock_downloader.download.return_value = False
+        self.app.download_album_artwork(album)
+        catalog.record.assert_not_called()
+
+        self.mock_downloader.download.return_value = True
+        self.app.download_album_artwork(album)
+
+        catalog.record.assert_called_once_with(
+            "/tmp/test_artworks/Blue.jpg", album, "Joni Mitchell"
+        )
+        catalog.commit.assert_called_once()
+
+    def test_catalog_error_does_not_fail_download(self):
+        """Test that a catalog write error is only a warning."""
+        catalog = Mock()
+        catalog.record.side_effect = sqlite3.OperationalError("disk I/O error")
+        self.app.catalog = catalog
+        self.mock_spotify.get_album_image_url.return_value = "http://x/img"
+        self.mock_spotify.get_artist_name.return_value = "Joni Mitchell"
+        self.mock_downloader.download.return_value = True
+
+        self.assertTrue(self.app.download_album_artwork(Album('abc', 'Blue')))
+        self.assertIn("disk I/O error", self.mock_output.warning.call_args[0][0])
+
+    def test_interactive_selection_prefetches_listed_artwork(self):
+        """Test that listed artwork is fetched while the user chooses."""
+        app = AlbumArtworkApp(
+            output=self.mock_output,
+            credentials_manager=self.mock_credentials,
+            spotify_client=self.mock_spotify,
+            settings=Settings({'prefetch_count': 2})
+        )
+        self.addCleanup(app.prefetcher.close)
+        self.assertIs(app.album_downloader.prefetcher, app.prefetcher)
+        self.assertEqual(app.prefetcher.count, 2)
+        self.assertIs(app.album_selector.on_list.__func__,
+                      AlbumArtworkApp.prefetch_artwork)
+
+        app.prefetcher = Mock()
+        self.mock_spotify.get_album_image_url.side_effect = (
+            lambda album: album.image_url
+        )
+        app.prefetch_artwork([
+            Album('a', 'A', images=(ImageVariant('http://x/a', 640, 640),)),
+            Album('b', 'B')
+        ])
+        app.prefetcher.start.assert_called_once_with(['http://x/a', None])
+
+    def test_saved_current_artwork_is_not_prefetched(self):
+        """Test that albums that can be revalidated aren't prefetched."""
+        self.app.prefetcher = Mock()
+        self.app.library = Mock()
+        self.app.library.find_album.side_effect = (
+            lambda album_id: '/tmp/test_artworks/A.jpg' if album_id == 'a' else None
+        )
+        self.app.validators = Mock()
+        self.app.validators.conditional_headers.return_value = {
+            'If-None-Match': '"abc"'
+        }
+        self.mock_spotify.get_album_image_url.side_effect = (
+            lambda album: album.image_url
+        )
+
+        self.app.prefetch_artwork([
+            Album('a', 'A', images=(ImageVariant('http://x/a', 640, 640),)),
+            Album('b', 'B', images=(ImageVariant('http://x/b', 640, 640),)),
+        ])
+
+        self.app.prefetcher.start.assert_called_once_with([None, 'http://x/b'])
+        self.app.validators.conditional_headers.assert_called_once_with(
+            '/tmp/test_artworks/A.jpg', 'http://x/a'
+        )
+
+    def test_no_prefetch_without_interactive_selection(self):
+        """Test that automatic selection and --prefetch 0 don't prefetch."""
+        for selector, count in ((AutoSelector(), 3), (None, 0)):
+            app = AlbumArtworkApp(
+                output=self.mock_output,
+                credentials_manager=self.mock_credentials,
+                spotify_client=self.mock_spotify,
+                album_selector=selector,
+                settings=Settings({'prefetch_count': count})
+            )
+            self.assertIsNone(app.prefetcher)
+            self.assertIsNone(app.album_downloader.prefetcher)
+
+    def test_artwork_path_avoids_other_albums(self):
+        """Test that same-named albums get distinct paths."""
+        first = Album('one', 'Greatest Hits')
+        second = Album('two', 'Greatest Hits')
+
+        path = self.app.artwork_path(first, 'Queen')
+        self.assertEqual(path, '/tmp/test_artworks/Greatest Hits.jpg')
+        self.assertEqual(self.app.artwork_path(first, 'Queen'), path)
+        self.assertEqual(self.app.artwork_path(second, 'ABBA'),
+                         '/tmp/test_artworks/Greatest Hits [two].jpg')
+
+    def test_finished_downloads_release_their_paths(self):
+        """Test that claims end with the download; the library takes over."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.app.artworks_dir = temp_dir
+            self.app.library = ArtworkIndex(
+                os.path.join(temp_dir, 'index.json'), temp_dir
+            )
+
+            def download(url, path):
+                open(path, 'wb').close()
+                return True
+
+            self.mock_downloader.download.side_effect = download
+            self.mock_spotify.get_album_image_url.return_value = "http://x/img"
+            self.mock_spotify.get_artist_name.return_value = "Queen"
+
+            self.app.download_album_artwork(Album('one', 'Greatest Hits'))
+            self.mock_downloader.download.side_effect = RuntimeError("boom")
+            with self.assertRaises(RuntimeError):
+                self.app.download_album_artwork(Album('two', 'Greatest Hits'))
+
+            self.assertEqual(self.app._claimed_paths, {})
+            self.assertEqual(
+                self.app.artwork_path(Album('three', 'Greatest Hits'), 'ABBA'),
+                os.path.join(temp_dir, 'Greatest Hits [three].jpg')
+            )
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_run_batch_counts_outcomes(self, mock_ensure_dir):
+        """Test that a batch reports done, failed and skipped albums."""
+        mock_ensure_dir.return_value = True
+        outcomes = {'a': 'done', 'b': 'failed', 'c': 'skipped', 'd': 'done'}
+        self.app.process_album = Mock(side_effect=lambda name: outcomes[name])
+        progress = Mock(counts={'done': 2, 'failed': 1, 'skipped': 1})
+
+        result = self.app.run_batch(['a\n', 'b', '', 'c', 'd'], progress=progress)
+
+        self.assertEqual(self.app.process_album.call_count, 4)
+        self.assertEqual(progress.update.call_count, 4)
+        progress.finish.assert_called_once()
+        self.assertEqual(result, {'done': 2, 'failed': 1, 'skipped': 1})
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_run_batch_counts_exceptions_as_failures(self, mock_ensure_dir):
+        """Test that an error in one album doesn't stop the batch."""
+        mock_ensure_dir.return_value = True
+        self.app.process_album = Mock(side_effect=RuntimeError("boom"))
+        progress = Mock(counts={})
+
+        self.app.run_batch(['a'], progress=progress)
+
+        progress.update.assert_called_once_with('failed')
+        self.assertIn("boom", self.mock_output.error.call_args[0][0])
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_watch_folder_processes_changed_albums(self, mock_ensure_dir):
+        """Test that changed album folders become searches."""
+        mock_ensure_dir.return_value = True
+        self.app.process_album = Mock(return_value='done')
+        watcher = Mock(root='/music')
+        watcher.run.side_effect = lambda callback, stop: [
+            callback(path) for path in ('/music/Queen/1981 - Greatest Hits',
+                                        '/music/Blue')
+        ]
+
+        watch_folder(self.app, watcher)
+
+        self.assertEqual(
+            sorted(call[0][0] for call in self.app.process_album.call_args_list),
+            ['Blue', 'Greatest Hits - Queen']
+        )
+
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_watch_folder_saves_once_folders_settle(self, mock_ensure_dir):
+        """Test that the library is saved per settled batch, not per album."""
+        mock_ensure_dir.return_value = True
+        self.app.library = Mock()
+        self.app.settings = Settings({'concurrency': 1})
+        queued = threading.Event()
+        in_batch = []
+
+        def process_album(query):
+            queued.wait(5)
+            in_batch.append(self.app._in_batch)
+
+        self.app.process_album = Mock(side_effect=process_album)
+        watcher = Mock(root='/music')
+
+        def run(callback, stop):
+            for i in range(3):
+                callback(f'/music/Album {i}')
+            queued.set()
+
+        watcher.run.side_effect = run
+
+        watch_folder(self.app, watcher)
+
+        self.assertEqual(in_batch, [True, True, True])
+        # Once when the three folders settled, once when watching ended
+        self.assertEqual(self.app.library.save.call_count, 2)
+        self.assertFalse(self.app._in_batch)
+
     @patch('app.FilenameUtil.ensure_directory')
     def test_run_exits_on_exit_command(self, mock_ensure_dir):
         """Test that run exits when user types 'exit'."""
@@ -118,6 +722,20 @@ class TestAlbumArtworkApp(unittest.TestCase):
 
         self.mock_output.info.assert_any_call("Please enter a valid album name.")
 
+    @patch('app.FilenameUtil.ensure_directory')
+    def test_run_reports_provider_errors_and_continues(self, mock_ensure_dir):
+        """Test that a failed search doesn't end the interactive session."""
+        mock_ensure_dir.return_value = True
+        self.mock_output.prompt.side_effect = ["Blue", "exit"]
+        self.app.process_album = Mock(
+            side_effect=requests.exceptions.InvalidJSONError("not JSON")
+        )
+
+        self.app.run()
+
+        self.assertIn("not JSON", self.mock_output.error.call_args[0][0])
+        self.mock_output.info.assert_any_call("Exiting the program.")
+
     @patch('app.FilenameUtil.ensure_directory')
     def test_run_returns_if_directory_creation_fails(self, mock_ensure_dir):
         """Test that run returns if directory cannot be created."""
@@ -141,5 +759,184 @@ class TestAlbumArtworkApp(unittest.TestCase):
         self.mock_output.info.assert_any_call("No matching album found.")
 
 
+class TestCommandLine(unittest.TestCase):
+    """Test cases for command-line parsing."""
+
+    def parse(self, *argv, environ=None):
+        """Parse flags against a missing config file."""
+        args = build_arg_parser().parse_args(
+            ['--config', '/nonexistent/config.toml', *argv]
+        )
+        return load_settings(args, environ=environ or {})
+
+    def test_default_encoder_is_jpeg(self):
+        """Test that no flags produce the configured default encoder."""
+        encoder = build_encoder(self.parse())
+        self.assertEqual(encoder.fmt, 'jpeg')
+        self.assertEqual(encoder.extension, '.jpg')
+
+    def test_encoder_flags(self):
+        """Test that encoding flags are passed to the encoder."""
+        encoder = build_encoder(self.parse(
+            '--format', 'jpeg', '--quality', '60', '--progressive',
+            '--optimize', '--strip-metadata'
+        ))
+        self.assertEqual(encoder.quality, 60)
+        self.assertTrue(encoder.progressive)
+        self.assertTrue(encoder.optimize)
+        self.assertTrue(encoder.strip_metadata)
+
+    def test_analyzer_settings(self):
+        """Test that validation flags configure or disable the analyzer."""
+        analyzer = build_analyzer(self.parse(
+            '--min-image-size', '500', '--set', 'placeholder_hashes=ff,10'
+        ))
+        self.assertEqual(analyzer.min_size, 500)
+        self.assertEqual(analyzer.placeholder_hashes.tolist(), [255, 16])
+        self.assertIsNone(build_analyzer(self.parse('--no-validate')))
+
+    def test_catalog_is_opt_in(self):
+        """Test that no catalog database is created unless asked for."""
+        self.assertIsNone(build_catalog(self.parse()))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'catalog.sqlite')
+            catalog = build_catalog(self.parse('--catalog', '--catalog-path', path))
+            catalog.close()
+            self.assertTrue(os.path.exists(path))
+
+    def test_flags_override_environment(self):
+        """Test that flags win over environment variables."""
+        settings = self.parse(
+            '--download-timeout', '3', '--set', 'pool_maxsize=32',
+            environ={
+                'ALBUM_ARTWORK_DOWNLOAD_TIMEOUT': '20',
+                'ALBUM_ARTWORK_MAX_RETRIES': '7',
+            }
+        )
+        self.assertEqual(settings.download_timeout, 3)
+        self.assertEqual(settings.pool_maxsize, 32)
+        self.assertEqual(settings.max_retries, 7)
+
+    def test_folder_watcher_settings(self):
+        """Test that watch flags configure the watcher and bad ones raise."""
+        with tempfile.TemporaryDirectory() as root:
+            watcher = build_folder_watcher(self.parse(
+                '--watch-backend', 'poll', '--watch-debounce', '5'
+            ), root)
+            self.assertEqual(watcher.backend, 'poll')
+            self.assertEqual(watcher.debounce, 5.0)
+            with self.assertRaises(ValueError):
+                build_folder_watcher(self.parse('--watch-interval', '0'), root)
+        with self.assertRaises(ValueError):
+            build_folder_watcher(self.parse(), '/nonexistent/music')
+
+    def test_main_reports_unavailable_http2(self):
+        """Test that an unusable HTTP/2 setup is a usage error."""
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as batch, \
+                patch('transport.httpx', None), \
+                patch('app.ConsoleOutput') as mock_output, \
+                patch.dict(os.environ, {'ALBUM_ARTWORK_CONFIG': '/nonexistent'}):
+            with self.assertRaises(SystemExit) as raised:
+                main(['--batch', batch.name, '--http2'])
+        self.assertEqual(raised.exception.code, 2)
+        self.assertIn('httpx', mock_output.return_value.error.call_args.args[0])
+
+    def test_main_exits_1_only_for_invalid_credentials(self):
+        """Test that ValueErrors after start-up aren't taken for bad credentials."""
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch('app.AlbumArtworkApp') as mock_app, \
+                patch('app.ConsoleOutput'), \
+                patch.dict(os.environ, {'ALBUM_ARTWORK_CONFIG': '/nonexistent'}):
+            argv = ['--artworks-dir', temp_dir, '--set', f'cache_dir={temp_dir}']
+            mock_app.side_effect = ValueError("Invalid credentials")
+            with self.assertRaises(SystemExit) as raised:
+                main(argv)
+            self.assertEqual(raised.exception.code, 1)
+
+            mock_app.side_effect = None
+            mock_app.return_value.run.side_effect = ValueError("boom")
+            with self.assertRaisesRegex(ValueError, "boom"):
+                main(argv)
+
+    def test_set_rejects_unknown_key(self):
+        """Test that --set rejects unknown settings."""
+        with patch('sys.stderr'):
+            with self.assertRaises(SystemExit):
+                build_arg_parser().parse_args(['--set', 'bogus=1'])
+
+    @patch('app.AlbumDownloader.create_session')
+    def test_app_passes_settings_to_downloader(self, mock_create_session):
+        """Test that a created downloader uses the configured timeout and pool."""
+        settings = Settings({'download_timeout': 42, 'pool_maxsize': 16})
+        app = AlbumArtworkApp(
+            output=Mock(),
+            credentials_manager=Mock(),
+            spotify_client=Mock(),
+            settings=settings
+        )
+
+        self.assertEqual(app.album_downloader.timeout, 42)
+        self.assertEqual(app.artworks_dir, settings.artworks_dir)
+        self.assertEqual(
+            mock_create_session.call_args.kwargs['pool_maxsize'], 16
+        )
+
+    @patch('app.SpotifyClient')
+    @patch('app.AlbumDownloader.create_session')
+    def test_adaptive_concurrency_limits_api_and_cdn(self, mock_create_session,
+                                                     mock_client_class):
+        """Test that --adaptive gives the API and CDN their own limits."""
+        mock_client_class.return_value.test_credentials.return_value = True
+        credentials = Mock()
+        credentials.get_all_or_prompt.return_value = [("id", "secret")]
+        output = Mock()
+        app = AlbumArtworkApp(
+            output=output, credentials_manager=credentials,
+            settings=Settings({'adaptive_concurrency': True, 'concurrency': 3,
+                               'max_concurrency': 12}),
+            artworks_dir="/tmp/test_artworks"
+        )
+
+        self.assertEqual(app.concurrency_limits(), {'api': 3, 'cdn': 3})
+        self.assertEqual(app.limiters['api'].maximum, 12)
+        self.assertIs(mock_create_session.call_args.kwargs['limiter'],
+                      app.limiters['cdn'])
+        api_session = mock_client_class.call_args.kwargs['session']
+        adapter = api_session.get_adapter('https://api.spotify.com/v1/search')
+        self.assertIs(adapter.limiter, app.limiters['api'])
+
+        app.process_album = Mock(return_value='done')
+        with patch('app.threading.Thread', wraps=threading.Thread) as thread:
+            app.run_batch(['a', 'b'], progress=Mock(counts={}, limits_source=None))
+        self.assertEqual(thread.call_count, 12)
+        output.event.assert_any_call('concurrency', limits={
+            'api': app.limiters['api'].snapshot(),
+            'cdn': app.limiters['cdn'].snapshot(),
+        })
+
+    def test_app_uses_encoder_extension(self):
+        """Test that save paths use the encoder's file extension."""
+        mock_spotify = Mock()
+        mock_spotify.get_album_image_url.return_value = "https://example.com/i.jpg"
+        mock_spotify.get_artist_name.return_value = "Artist"
+        mock_downloader = Mock()
+        encoder = Mock(extension='.webp')
+        app = AlbumArtworkApp(
+            output=Mock(),
+            credentials_manager=Mock(),
+            spotify_client=mock_spotify,
+            album_selector=Mock(),
+            album_downloader=mock_downloader,
+            artworks_dir="/tmp/test_artworks",
+            encoder=encoder
+        )
+
+        app.download_album_artwork(Album('', 'Album'))
+
+        mock_downloader.download.assert_called_once_with(
+            "https://example.com/i.jpg", "/tmp/test_artworks/Album.webp"
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
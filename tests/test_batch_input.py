@@ -0,0 +1,119 @@
+"""Tests for streaming batch input."""
+import csv
+import os
+import tempfile
+import unittest
+from batch_input import (
+    BatchItem, read_batch, count_rows, spotify_album_id, parse_csv,
+    parse_jsonl
+)
+
+ALBUM_ID = '4aawyAB9vmqN3uQ7FjRGTy'
+
+
+class TestBatchInput(unittest.TestCase):
+    """Test cases for batch file readers."""
+
+    def setUp(self):
+        """Create a temporary directory for input files."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write(self, name, text):
+        """Write an input file and return its path."""
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_text_lines(self):
+        """Test that text files give one query per non-blank line."""
+        path = self.write('albums.txt', 'Abbey Road\n\n  Blue  \n')
+        self.assertEqual(list(read_batch(path)),
+                         [BatchItem('Abbey Road'), BatchItem('Blue')])
+        self.assertEqual(count_rows(path), 2)
+
+    def test_csv_with_header(self):
+        """Test header names, column order and a spreadsheet BOM."""
+        path = self.write('albums.csv', (
+            '\ufeffSpotify ID,Artist,Title\n'
+            f'spotify:album:{ALBUM_ID},The Beatles,Abbey Road\n'
+            ',"Mitchell, Joni",Blue\n'
+        ))
+        self.assertEqual(list(read_batch(path)), [
+            BatchItem('Abbey Road - The Beatles', ALBUM_ID),
+            BatchItem('Blue - Mitchell, Joni'),
+        ])
+        self.assertEqual(count_rows(path), 2)
+
+    def test_csv_without_header(self):
+        """Test that headerless rows are album, artist, ID."""
+        items = list(parse_csv(['Abbey Road,The Beatles\n', 'Blue\n']))
+        self.assertEqual(items, [BatchItem('Abbey Road - The Beatles'),
+                                 BatchItem('Blue')])
+
+    def test_jsonl_reports_bad_lines(self):
+        """Test JSONL objects and strings, and that bad lines are skipped."""
+        invalid = []
+        lines = [
+            '{"album": "Abbey Road", "artist": "The Beatles"}\n',
+            '"Blue"\n',
+            '{not json\n',
+            '{"artist": "Nobody"}\n',
+            f'{{"id": "https://open.spotify.com/album/{ALBUM_ID}?si=x"}}\n',
+        ]
+        items = list(parse_jsonl(lines, lambda n, reason: invalid.append(n)))
+
+        self.assertEqual(items, [BatchItem('Abbey Road - The Beatles'),
+                                 BatchItem('Blue'), BatchItem('', ALBUM_ID)])
+        self.assertEqual(invalid, [3, 4])
+
+    def test_undecodable_lines_are_reported(self):
+        """Test that a bad byte loses only its own line."""
+        path = os.path.join(self.temp_dir.name, 'albums.csv')
+        with open(path, 'wb') as f:
+            f.write(b'Abbey Road,The Beatles\nBj\xf6rk,Debut\nBlue,Joni\n')
+        invalid = []
+        items = list(read_batch(
+            path, on_invalid=lambda n, reason: invalid.append((n, reason))
+        ))
+
+        self.assertEqual(items, [BatchItem('Abbey Road - The Beatles'),
+                                 BatchItem('Blue - Joni')])
+        self.assertEqual(invalid, [(2, 'not valid UTF-8 (byte 3)')])
+        self.assertEqual(count_rows(path), 3)
+
+    def test_oversized_csv_field_is_reported(self):
+        """Test that rows the csv module rejects are skipped, not raised."""
+        limit = csv.field_size_limit()
+        lines = ['Abbey Road\n', 'x' * (limit + 1) + '\n', 'Blue\n']
+        invalid = []
+        items = list(parse_csv(lines, lambda n, reason: invalid.append(n)))
+
+        self.assertEqual(items, [BatchItem('Abbey Road'), BatchItem('Blue')])
+        self.assertEqual(invalid, [2])
+
+    def test_reading_is_lazy(self):
+        """Test that rows are parsed only as they are consumed."""
+        path = self.write('albums.jsonl', '"a"\n' * 3 + '{broken\n')
+        invalid = []
+        rows = read_batch(path, on_invalid=lambda n, reason: invalid.append(n))
+
+        self.assertEqual(next(rows), BatchItem('a'))
+        self.assertEqual(invalid, [])
+        rows.close()
+
+    def test_spotify_album_id(self):
+        """Test IDs, URIs, URLs and non-Spotify values."""
+        self.assertEqual(spotify_album_id(ALBUM_ID), ALBUM_ID)
+        self.assertEqual(spotify_album_id(f'spotify:album:{ALBUM_ID}'), ALBUM_ID)
+        self.assertEqual(spotify_album_id('itunes:12345'), '')
+
+    def test_unknown_format_raises(self):
+        """Test that an unknown format is rejected up front."""
+        with self.assertRaises(ValueError):
+            read_batch('albums.txt', 'xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for persistent caches."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from cache import NegativeCache, NOT_FOUND, NO_ARTWORK
+
+
+class TestNegativeCache(unittest.TestCase):
+    """Test cases for NegativeCache class."""
+
+    def setUp(self):
+        """Set up a temporary cache file and a controllable clock."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'sub', 'negative.json')
+        self.now = 1000.0
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def make_cache(self, ttl=60, max_entries=100):
+        """Create a cache using the test clock."""
+        return NegativeCache(self.path, ttl=ttl, max_entries=max_entries,
+                             clock=lambda: self.now)
+
+    def test_make_key_normalizes_case_and_whitespace(self):
+        """Test that equivalent queries share a key."""
+        self.assertEqual(
+            NegativeCache.make_key('query', '  Abbey   ROAD '),
+            NegativeCache.make_key('query', 'abbey road')
+        )
+
+    def test_record_and_get(self):
+        """Test that a recorded miss is returned before it expires."""
+        cache = self.make_cache()
+        cache.record('query:x', NOT_FOUND)
+        self.assertEqual(cache.get('query:x'), NOT_FOUND)
+        self.assertIsNone(cache.get('query:y'))
+
+    def test_entry_expires_after_ttl(self):
+        """Test that misses are re-checked after the TTL."""
+        cache = self.make_cache(ttl=60)
+        cache.record('query:x', NO_ARTWORK)
+        self.now += 60
+        self.assertIsNone(cache.get('query:x'))
+        self.assertEqual(len(cache), 0)
+
+    def test_persists_across_instances(self):
+        """Test that saved misses are loaded by a new cache."""
+        cache = self.make_cache()
+        cache.record('query:x', NOT_FOUND)
+        self.assertTrue(cache.save())
+
+        reloaded = self.make_cache()
+        self.assertEqual(reloaded.get('query:x'), NOT_FOUND)
+
+    def test_max_entries_drops_oldest(self):
+        """Test that the oldest entries are evicted past max_entries."""
+        cache = self.make_cache(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.record(key, NOT_FOUND)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), NOT_FOUND)
+
+    def test_zero_ttl_disables_cache(self):
+        """Test that a TTL of zero records nothing."""
+        cache = self.make_cache(ttl=0)
+        cache.record('query:x', NOT_FOUND)
+        self.assertIsNone(cache.get('query:x'))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_corrupted_file_starts_empty(self):
+        """Test that a corrupted cache file is ignored."""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertEqual(len(self.make_cache()), 0)
+
+    def test_malformed_entries_are_dropped(self):
+        """Test that differently shaped entries don't break lookups."""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            json.dump({
+                'query:a': 'not_found',
+                'query:b': {'reason': NOT_FOUND},
+                'query:c': {'reason': NOT_FOUND, 'checked_at': 'yesterday'},
+                'query:d': {'reason': NO_ARTWORK, 'checked_at': 990},
+            }, f)
+
+        cache = self.make_cache()
+
+        for key in ('query:a', 'query:b', 'query:c'):
+            self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.get('query:d'), NO_ARTWORK)
+        self.assertTrue(cache.save())
+        with open(self.path) as f:
+            self.assertEqual(list(json.load(f)), ['query:d'])
+
+    def test_discard_removes_entry(self):
+        """Test that discarded entries are forgotten on save."""
+        cache = self.make_cache()
+        cache.record('query:x', NOT_FOUND)
+        cache.discard('query:x')
+        cache.save()
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Tests for the album metadata catalog."""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from PIL import Image
+from catalog import AlbumCatalog, CATALOG_FILENAME
+from models import Album, ImageVariant
+
+
+class TestAlbumCatalog(unittest.TestCase):
+    """Test cases for AlbumCatalog class."""
+
+    def setUp(self):
+        """Create an artworks directory with a catalog."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, CATALOG_FILENAME)
+        self.catalog = AlbumCatalog(self.db_path, self.temp_dir,
+                                    clock=lambda: 1000.0)
+        self.album = Album(
+            'abc', 'A Night at the Opera', artist='Queen', year='1975',
+            album_type='album', release_date='1975-11-21', total_tracks=12,
+            images=(ImageVariant('https://i.scdn.co/image/x', 640, 640),)
+        )
+
+    def tearDown(self):
+        """Close the catalog and clean up."""
+        self.catalog.close()
+        shutil.rmtree(self.temp_dir)
+
+    def save_image(self, name, size=(50, 40)):
+        """Save an artwork file and return its path."""
+        path = os.path.join(self.temp_dir, 'Queen', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGB', size).save(path, 'JPEG')
+        return path
+
+    def test_record_and_find(self):
+        """Test that a recorded album can be found by ID."""
+        path = self.save_image('Opera.jpg')
+        self.catalog.record(path, self.album)
+
+        row = self.catalog.find_album('abc')
+
+        self.assertEqual(row['path'], os.path.join('Queen', 'Opera.jpg'))
+        self.assertEqual(row['title'], 'A Night at the Opera')
+        self.assertEqual(row['artist'], 'Queen')
+        self.assertEqual(row['release_date'], '1975-11-21')
+        self.assertEqual(row['year'], 1975)
+        self.assertEqual(row['total_tracks'], 12)
+        self.assertEqual(row['provider'], 'spotify')
+        self.assertEqual(row['image_url'], 'https://i.scdn.co/image/x')
+        self.assertEqual((row['image_width'], row['image_height']), (50, 40))
+        self.assertEqual(row['downloaded_at'], 1000.0)
+        self.assertIsNone(self.catalog.find_album('other'))
+
+    def test_image_size_falls_back_to_provider(self):
+        """Test that unreadable files use the provider's dimensions."""
+        path = os.path.join(self.temp_dir, 'missing.jpg')
+        self.catalog.record(path, self.album)
+        row = self.catalog.find_album('abc')
+        self.assertEqual((row['image_width'], row['image_height']), (640, 640))
+
+    def test_redownload_replaces_row(self):
+        """Test that a path is recorded once, with the latest metadata."""
+        path = self.save_image('Opera.jpg')
+        self.catalog.record(path, self.album)
+        self.catalog.record(path, Album('abc', 'A Night at the Opera (2011)',
+                                        artist='Queen'))
+        self.assertEqual(len(self.catalog), 1)
+        self.assertEqual(self.catalog.find_album('abc')['title'],
+                         'A Night at the Opera (2011)')
+
+    def test_search_is_case_insensitive_and_indexed(self):
+        """Test artist and title lookups and that they use the indexes."""
+        self.catalog.record(self.save_image('Opera.jpg'), self.album)
+        self.catalog.record(self.save_image('Jazz.jpg'),
+                            Album('def', 'Jazz', artist='Queen', year='1978'))
+        self.catalog.record(self.save_image('Blue.jpg'),
+                            Album('ghi', 'Blue', artist='Joni Mitchell'))
+
+        self.assertEqual([row['title'] for row in self.catalog.search(artist='queen')],
+                         ['A Night at the Opera', 'Jazz'])
+        self.assertEqual([row['album_id'] for row in self.catalog.search(title='BLUE')],
+                         ['ghi'])
+        self.assertEqual(len(self.catalog.search(artist='Queen', title='jazz')), 1)
+
+        db = sqlite3.connect(self.db_path)
+        for column, index in (('artist', 'albums_artist'), ('title', 'albums_title')):
+            plan = db.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM albums WHERE {column} = 'x'"
+            ).fetchall()
+            self.assertIn(index, str(plan))
+        db.close()
+
+    def test_commit_makes_rows_visible_to_readers(self):
+        """Test that other connections see rows once committed."""
+        self.catalog.record(self.save_image('Opera.jpg'), self.album)
+        reader = sqlite3.connect(self.db_path)
+        count = "SELECT COUNT(*) FROM albums"
+        self.assertEqual(reader.execute(count).fetchone()[0], 0)
+
+        self.catalog.commit()
+
+        self.assertEqual(reader.execute(count).fetchone()[0], 1)
+        reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
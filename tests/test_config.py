@@ -4,7 +4,7 @@ import os
 import tempfile
 import unittest
 from unittest.mock import Mock
-from config import CredentialsManager, CREDENTIALS_FILE
+from config import CredentialsManager, CREDENTIALS_FILE, Settings
 
 
 class TestCredentialsManager(unittest.TestCase):
@@ -103,6 +103,44 @@ class TestCredentialsManager(unittest.TestCase):
         self.assertEqual(client_secret, "valid_secret")
         self.mock_output.error.assert_called_once()
 
+    def test_add_builds_credential_list(self):
+        """Test that added credentials are kept alongside the original."""
+        self.manager.save("id1", "secret1")
+        self.assertTrue(self.manager.add("id2", "secret2"))
+        self.assertTrue(self.manager.add("id1", "rotated"))
+
+        creds = self.manager.load_all()
+        self.assertEqual([c["client_id"] for c in creds], ["id2", "id1"])
+        self.assertEqual(creds[1]["client_secret"], "rotated")
+        self.assertEqual(self.manager.load()["client_id"], "id2")
+
+    def test_add_rejects_empty_credentials(self):
+        """Test that empty credentials are not added."""
+        self.assertFalse(self.manager.add("", "secret"))
+
+    def test_load_all_skips_incomplete_entries(self):
+        """Test that entries missing an ID or secret are ignored."""
+        with open(self.temp_file.name, 'w') as f:
+            json.dump({"credentials": [
+                {"client_id": "a", "client_secret": "b"},
+                {"client_id": "c"},
+            ]}, f)
+        self.assertEqual(len(self.manager.load_all()), 1)
+
+    def test_get_all_or_prompt_returns_every_set(self):
+        """Test that all saved credential sets are returned."""
+        self.manager.add("id1", "secret1")
+        self.manager.add("id2", "secret2")
+        creds = self.manager.get_all_or_prompt(self.mock_output)
+        self.assertEqual(creds, [("id1", "secret1"), ("id2", "secret2")])
+
+    def test_get_all_or_prompt_single_set(self):
+        """Test that a single saved set behaves like get_or_prompt."""
+        self.manager.save("saved_id", "saved_secret")
+        creds = self.manager.get_all_or_prompt(self.mock_output)
+        self.assertEqual(creds, [("saved_id", "saved_secret")])
+        self.mock_output.info.assert_called_once_with("Using saved Spotify credentials.")
+
     def test_credentials_file_default_location(self):
         """Test that default credentials file is in user home."""
         manager = CredentialsManager()
@@ -110,5 +148,100 @@ class TestCredentialsManager(unittest.TestCase):
         self.assertTrue(manager.credentials_file.endswith(".spotify_credentials.json"))
 
 
+class TestSettings(unittest.TestCase):
+    """Test cases for Settings class."""
+
+    def setUp(self):
+        """Set up a temporary directory for config files."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, content):
+        """Write a config file and return its path."""
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_defaults(self):
+        """Test that defaults match the module constants."""
+        settings = Settings()
+        self.assertEqual(settings.search_limit, 10)
+        self.assertEqual(settings.download_timeout, 10)
+        self.assertEqual(settings.output_format, 'jpeg')
+
+    def test_unknown_setting_raises(self):
+        """Test that unknown keys are rejected."""
+        with self.assertRaises(ValueError):
+            Settings({'no_such_setting': 1})
+
+    def test_invalid_value_raises(self):
+        """Test that values of the wrong type are rejected."""
+        with self.assertRaises(ValueError):
+            Settings({'concurrency': 'many'})
+        with self.assertRaises(ValueError):
+            Settings({'optimize_output': 'maybe'})
+
+    def test_layer_precedence(self):
+        """Test defaults < file < environment < overrides."""
+        path = self.write('config.toml', (
+            'concurrency = 8\n'
+            'pool_maxsize = 20\n'
+            'download_timeout = 15\n'
+        ))
+        environ = {
+            'ALBUM_ARTWORK_POOL_MAXSIZE': '30',
+            'ALBUM_ARTWORK_DOWNLOAD_TIMEOUT': '25',
+        }
+        settings = Settings.load(
+            path, environ=environ, overrides={'download_timeout': 35}
+        )
+        self.assertEqual(settings.concurrency, 8)
+        self.assertEqual(settings.pool_maxsize, 30)
+        self.assertEqual(settings.download_timeout, 35)
+        self.assertEqual(settings.search_limit, 10)
+
+    def test_fractional_timeouts(self):
+        """Test that timeouts keep their fractional seconds."""
+        path = self.write('config.toml', 'api_timeout = 1.5\n')
+        settings = Settings.load(
+            path, environ={'ALBUM_ARTWORK_DOWNLOAD_TIMEOUT': '2.5'}
+        )
+        self.assertEqual(settings.api_timeout, 1.5)
+        self.assertEqual(settings.download_timeout, 2.5)
+        self.assertEqual(Settings({'download_timeout': '0.5'}).download_timeout,
+                         0.5)
+
+    def test_json_file_and_bool_env(self):
+        """Test JSON config files and boolean environment values."""
+        path = self.write('config.json', json.dumps({'output_format': 'webp'}))
+        settings = Settings.load(
+            path, environ={'ALBUM_ARTWORK_STRIP_METADATA': 'yes'}
+        )
+        self.assertEqual(settings.output_format, 'webp')
+        self.assertIs(settings.strip_metadata, True)
+
+    def test_config_path_from_environment(self):
+        """Test that ALBUM_ARTWORK_CONFIG selects the config file."""
+        path = self.write('custom.toml', 'max_retries = 9\n')
+        settings = Settings.load(environ={'ALBUM_ARTWORK_CONFIG': path})
+        self.assertEqual(settings.max_retries, 9)
+
+    def test_corrupted_file_raises(self):
+        """Test that an unparseable config file raises ValueError."""
+        path = self.write('config.toml', 'concurrency = = 3')
+        with self.assertRaises(ValueError):
+            Settings.load(path, environ={})
+
+    def test_missing_file_uses_defaults(self):
+        """Test that a missing config file is not an error."""
+        settings = Settings.load('/nonexistent/config.toml', environ={})
+        self.assertEqual(settings, Settings())
+
+
 if __name__ == '__main__':
     unittest.main()
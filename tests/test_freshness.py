@@ -0,0 +1,227 @@
+"""Tests for the ETag/Last-Modified manifest and conditional downloads."""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from unittest.mock import Mock
+from PIL import Image
+import requests
+from album_service import AlbumDownloader, ArtworkPrefetcher
+from app import revalidate_artwork
+from config import Settings
+from freshness import ValidatorManifest, VALIDATORS_FILENAME
+
+
+def _jpeg(color):
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class _CDNHandler(BaseHTTPRequestHandler):
+    """Serves server.images[path] with an ETag, honouring If-None-Match."""
+
+    def do_GET(self):
+        body = self.server.images.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = '"%x"' % hash(body)
+        self.server.requests.append(
+            (self.path, self.headers.get('If-None-Match'))
+        )
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', 'Mon, 05 Oct 2026 10:00:00 GMT')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestValidatorManifest(unittest.TestCase):
+    """Test cases for ValidatorManifest."""
+
+    def setUp(self):
+        """Create an artworks directory with one saved file."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'Abbey Road.jpg')
+        with open(self.path, 'wb') as f:
+            f.write(b'artwork')
+        self.url = 'https://i.scdn.co/image/ab'
+        self.headers = {'ETag': '"v1"',
+                        'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'}
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_record_and_conditional_headers(self):
+        """Test that recorded validators become conditional headers."""
+        manifest = ValidatorManifest(self.temp_dir)
+        self.assertEqual(manifest.conditional_headers(self.path, self.url), {})
+
+        manifest.record(self.path, self.url, self.headers)
+
+        self.assertEqual(manifest.conditional_headers(self.path, self.url), {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Mon, 05 Oct 2026 10:00:00 GMT',
+        })
+        self.assertEqual(
+            manifest.conditional_headers(self.path, self.url + '?other'), {}
+        )
+        self.assertEqual(manifest.entries(), [(self.path, self.url)])
+
+    def test_changed_file_is_not_revalidated(self):
+        """Test that validators stop applying once the file changes."""
+        manifest = ValidatorManifest(self.temp_dir)
+        manifest.record(self.path, self.url, self.headers)
+        with open(self.path, 'ab') as f:
+            f.write(b' edited')
+
+        self.assertEqual(manifest.conditional_headers(self.path, self.url), {})
+
+    def test_response_without_validators_drops_entry(self):
+        """Test that a download without validators forgets old ones."""
+        manifest = ValidatorManifest(self.temp_dir)
+        manifest.record(self.path, self.url, self.headers)
+        manifest.record(self.path, self.url, {})
+        self.assertEqual(len(manifest), 0)
+
+    def test_revalidated_updates_resent_validators(self):
+        """Test that a 304's new ETag replaces the stored one."""
+        manifest = ValidatorManifest(self.temp_dir)
+        manifest.record(self.path, self.url, self.headers)
+        manifest.revalidated(self.path, {'ETag': '"v2"'})
+
+        headers = manifest.conditional_headers(self.path, self.url)
+        self.assertEqual(headers['If-None-Match'], '"v2"')
+        self.assertEqual(headers['If-Modified-Since'],
+                         'Mon, 05 Oct 2026 10:00:00 GMT')
+
+    def test_save_and_load(self):
+        """Test that the manifest persists as a sidecar file."""
+        manifest = ValidatorManifest(self.temp_dir)
+        manifest.record(self.path, self.url, self.headers)
+        self.assertTrue(manifest.save())
+        self.assertTrue(
+            os.path.exists(os.path.join(self.temp_dir, VALIDATORS_FILENAME))
+        )
+
+        reloaded = ValidatorManifest(self.temp_dir)
+        self.assertEqual(reloaded.conditional_headers(self.path, self.url)
+                         ['If-None-Match'], '"v1"')
+
+    def test_corrupt_manifest_starts_empty(self):
+        """Test that an unreadable manifest is ignored."""
+        with open(os.path.join(self.temp_dir, VALIDATORS_FILENAME), 'w') as f:
+            f.write('{not json')
+        self.assertEqual(len(ValidatorManifest(self.temp_dir)), 0)
+
+
+class TestConditionalDownload(unittest.TestCase):
+    """Test cases for revalidating saved artwork over HTTP."""
+
+    def setUp(self):
+        """Start a local image server and create an artworks directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _CDNHandler)
+        self.server.images = {'/a': _jpeg('red'), '/b': _jpeg('blue')}
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        # Solid test images would be rejected as blank placeholders
+        self.settings = Settings({'artworks_dir': self.temp_dir,
+                                  'concurrency': 2, 'validate_artwork': False})
+
+    def tearDown(self):
+        """Stop the server and clean up."""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_unchanged_artwork_is_not_downloaded_again(self):
+        """Test that a second download is answered with 304."""
+        manifest = ValidatorManifest(self.temp_dir)
+        downloader = AlbumDownloader(Mock(), manifest=manifest)
+        path = os.path.join(self.temp_dir, 'a.jpg')
+
+        self.assertTrue(downloader.download(self.base + '/a', path))
+        mtime = os.stat(path).st_mtime_ns
+        first_bytes = downloader.bytes_downloaded
+        self.assertTrue(downloader.download(self.base + '/a', path))
+
+        self.assertEqual(downloader.not_modified, 1)
+        self.assertEqual(downloader.bytes_downloaded, first_bytes)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        self.assertIsNone(self.server.requests[0][1])
+        self.assertIsNotNone(self.server.requests[1][1])
+
+    def test_prefetched_copy_does_not_skip_revalidation(self):
+        """Test that a saved, current file is revalidated, not re-saved."""
+        manifest = ValidatorManifest(self.temp_dir)
+        session = requests.Session()
+        prefetcher = ArtworkPrefetcher(session, timeout=4)
+        downloader = AlbumDownloader(Mock(), session=session, manifest=manifest,
+                                     prefetcher=prefetcher)
+        path = os.path.join(self.temp_dir, 'a.jpg')
+        self.assertTrue(downloader.download(self.base + '/a', path))
+        mtime = os.stat(path).st_mtime_ns
+
+        prefetcher.start([self.base + '/a'])
+        self.assertTrue(downloader.download(self.base + '/a', path))
+        prefetcher.close()
+        session.close()
+
+        self.assertEqual(downloader.not_modified, 1)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        self.assertIsNotNone(self.server.requests[-1][1])
+
+    def test_304_without_conditional_request_fails(self):
+        """Test that a 304 for a file we have no validators for fails."""
+        response = Mock(status_code=304, content=b'')
+        session = Mock()
+        session.get.return_value = response
+        downloader = AlbumDownloader(Mock(), session=session,
+                                     manifest=ValidatorManifest(self.temp_dir))
+
+        self.assertFalse(downloader.download(
+            self.base + '/a', os.path.join(self.temp_dir, 'a.jpg')
+        ))
+
+    def test_revalidate_artwork_updates_only_changed_files(self):
+        """Test a full revalidation of the artworks directory."""
+        manifest = ValidatorManifest(self.temp_dir)
+        downloader = AlbumDownloader(Mock(), manifest=manifest)
+        for name in ('a', 'b'):
+            downloader.download(f'{self.base}/{name}',
+                                os.path.join(self.temp_dir, f'{name}.jpg'))
+        manifest.save()
+        self.server.images['/b'] = _jpeg('green')
+        self.server.requests.clear()
+
+        counts = revalidate_artwork(self.settings, Mock())
+
+        self.assertEqual(counts, {'unchanged': 1, 'updated': 1, 'failed': 0})
+        self.assertTrue(all(etag for _, etag in self.server.requests))
+        with Image.open(os.path.join(self.temp_dir, 'b.jpg')) as img:
+            self.assertGreater(img.getpixel((4, 4))[1], 100)
+        # The new validators were saved, so nothing changes a second time
+        counts = revalidate_artwork(self.settings, Mock())
+        self.assertEqual(counts, {'unchanged': 2, 'updated': 0, 'failed': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Tests for the image process pool."""
+import unittest
+from io import BytesIO
+from PIL import Image
+from album_service import ImageEncoder, ImageAnalyzer, PLACEHOLDER
+from image_pool import ImageProcessPool
+
+
+def _encode(img, fmt='PNG'):
+    """Encode an image to bytes."""
+    buffer = BytesIO()
+    img.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class TestImageProcessPool(unittest.TestCase):
+    """Test cases for ImageProcessPool class."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start one pool for all tests; workers are slow to spawn."""
+        placeholder = Image.new('RGB', (400, 400), 'white')
+        placeholder.paste(Image.new('RGB', (200, 400), 'black'))
+        _, dhash, _ = ImageAnalyzer.hashes(placeholder)
+        cls.placeholder = placeholder
+        cls.pool = ImageProcessPool(
+            ImageEncoder('jpeg', quality=80, progressive=True),
+            analyzer=ImageAnalyzer(placeholder_hashes=[dhash]),
+            workers=2
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the pool."""
+        cls.pool.close()
+
+    def test_process_encodes_in_worker(self):
+        """Test that images come back encoded with the pool's encoder."""
+        source = Image.radial_gradient('L').resize((320, 320)).convert('RGBA')
+        processed = self.pool.process(_encode(source))
+
+        self.assertEqual(processed.report.problems, ())
+        with Image.open(BytesIO(processed.data)) as result:
+            self.assertEqual(result.format, 'JPEG')
+            self.assertEqual(result.size, (320, 320))
+            self.assertTrue(result.info.get('progressive'))
+
+    def test_rejected_image_returns_no_data(self):
+        """Test that placeholder artwork isn't encoded."""
+        processed = self.pool.process(_encode(self.placeholder, 'JPEG'))
+        self.assertIsNone(processed.data)
+        self.assertIn(PLACEHOLDER, processed.report.problems)
+
+    def test_corrupt_image_raises(self):
+        """Test that decoding errors are raised to the caller."""
+        with self.assertRaises(Exception):
+            self.pool.process(b'not an image')
+
+
+if __name__ == '__main__':
+    unittest.main()
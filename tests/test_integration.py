@@ -5,6 +5,7 @@ import unittest
 from unittest.mock import Mock, patch
 from app import AlbumArtworkApp
 from config import CredentialsManager
+from models import Album, ImageVariant
 from output import ConsoleOutput
 
 
@@ -32,11 +33,10 @@ class TestFullIntegration(unittest.TestCase):
         # Setup mocks
         mock_spotify = Mock()
         mock_spotify.test_credentials.return_value = True
-        test_album = {
-            'name': 'Test Album',
-            'artists': [{'name': 'Test Artist'}],
-            'images': [{'url': 'https://example.com/image.jpg'}]
-        }
+        test_album = Album(
+            'a1', 'Test Album', 'Test Artist',
+            images=(ImageVariant('https://example.com/image.jpg'),)
+        )
         mock_spotify.search_albums.return_value = [test_album]
         mock_spotify.get_artist_name.return_value = "Test Artist"
         mock_spotify.get_album_image_url.return_value = "https://example.com/image.jpg"
@@ -61,7 +61,7 @@ class TestFullIntegration(unittest.TestCase):
         # Test album search and selection
         album = app.find_and_select_album("Test Album")
         self.assertIsNotNone(album)
-        self.assertEqual(album['name'], 'Test Album')
+        self.assertEqual(album.name, 'Test Album')
 
     @patch('app.SpotifyClient')
     def test_app_initialization_with_saved_credentials(self, mock_spotify_class):
@@ -0,0 +1,108 @@
+"""Tests for the artwork library index."""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from library import ArtworkIndex
+from models import Album
+
+
+class TestArtworkIndex(unittest.TestCase):
+    """Test cases for ArtworkIndex class."""
+
+    def setUp(self):
+        """Create an artworks directory and an index path."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.artworks_dir = os.path.join(self.temp_dir, 'artworks')
+        os.makedirs(os.path.join(self.artworks_dir, 'sub'))
+        self.index_path = os.path.join(self.temp_dir, 'index.json')
+        self.write('Abbey Road.jpg', b'abbey')
+        self.write(os.path.join('sub', 'Blue.png'), b'blue')
+        self.write('notes.txt', b'not artwork')
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, relpath, data):
+        """Write a file below the artworks directory."""
+        path = os.path.join(self.artworks_dir, relpath)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_refresh_indexes_artwork_files(self):
+        """Test that refresh finds artwork files in subdirectories."""
+        index = ArtworkIndex(self.index_path, self.artworks_dir)
+        counts = index.refresh()
+
+        self.assertEqual(counts['added'], 2)
+        self.assertEqual(len(index), 2)
+        self.assertTrue(index.find('abbey  ROAD').endswith('Abbey Road.jpg'))
+        self.assertIsNone(index.find('Revolver'))
+
+    def test_refresh_is_incremental(self):
+        """Test that only new or changed files are re-hashed."""
+        hash_fn = Mock(return_value=(0xABC, 40.0))
+        index = ArtworkIndex(self.index_path, self.artworks_dir)
+        index.refresh(hash_fn=hash_fn)
+        index.save()
+        self.assertEqual(hash_fn.call_count, 2)
+
+        path = self.write('Abbey Road.jpg', b'abbey road, remastered')
+        os.remove(os.path.join(self.artworks_dir, 'sub', 'Blue.png'))
+        reloaded = ArtworkIndex(self.index_path, self.artworks_dir)
+        counts = reloaded.refresh(hash_fn=hash_fn)
+
+        self.assertEqual(counts, {'added': 0, 'changed': 1, 'removed': 1,
+                                  'unchanged': 0})
+        self.assertEqual(hash_fn.call_count, 3)
+        self.assertEqual(reloaded.hashes(), [(path, (0xABC, 40.0))])
+
+    def test_add_records_album_metadata(self):
+        """Test lookups by album ID and artist + title after a download."""
+        index = ArtworkIndex(self.index_path, self.artworks_dir)
+        path = self.write('Greatest Hits.jpg', b'hits')
+        index.add(path, Album('abc123', 'Greatest Hits'), 'Queen')
+
+        self.assertEqual(index.find_album('abc123'), path)
+        self.assertEqual(index.find('queen greatest hits'), path)
+        self.assertEqual(index.find('Queen - Greatest Hits'), path)
+        self.assertEqual([p for p, _ in index.search('queen hits')], [path])
+        self.assertEqual(index.find_title('greatest hits', 'QUEEN'), path)
+        self.assertIsNone(index.find_title('Greatest Hits', 'ABBA'))
+
+        os.remove(path)
+        self.assertIsNone(index.find_album('abc123'))
+
+    def test_add_replacing_entry_updates_only_its_lookups(self):
+        """Test that re-downloading over a file moves its lookups."""
+        index = ArtworkIndex(self.index_path, self.artworks_dir)
+        path = self.write('Greatest Hits.jpg', b'hits')
+        index.add(path, Album('old', 'Greatest Hits'), 'Queen')
+
+        with patch.object(index, '_rebuild_lookups') as rebuild:
+            index.add(path, Album('new', 'Gold'), 'ABBA')
+        rebuild.assert_not_called()
+
+        self.assertIsNone(index.find_album('old'))
+        self.assertIsNone(index.find_title('Greatest Hits', 'Queen'))
+        self.assertIsNone(index.find('queen greatest hits'))
+        self.assertEqual(index.find_album('new'), path)
+        self.assertEqual(index.find_title('gold', 'abba'), path)
+        # The file name still finds it
+        self.assertEqual(index.find('greatest hits'), path)
+
+    def test_index_of_other_directory_ignored(self):
+        """Test that a saved index for another directory isn't loaded."""
+        index = ArtworkIndex(self.index_path, self.artworks_dir)
+        index.refresh()
+        index.save()
+
+        other = ArtworkIndex(self.index_path, self.temp_dir)
+        self.assertEqual(len(other), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
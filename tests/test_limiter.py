@@ -0,0 +1,197 @@
+"""Tests for adaptive concurrency limits."""
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+import requests
+from limiter import AdaptiveLimiter
+from transport import LimitedAdapter, Transport, build_retry
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """Test cases for AdaptiveLimiter."""
+
+    def setUp(self):
+        """Use a controllable clock."""
+        self.now = 0.0
+
+    def make_limiter(self, **options):
+        """Create a limiter using the test clock."""
+        return AdaptiveLimiter('cdn', clock=lambda: self.now, **options)
+
+    def run_requests(self, limiter, count, latency=0.1, overloaded=False):
+        """Complete requests with every slot in use."""
+        for _ in range(count):
+            slots = limiter.current
+            started = [limiter.acquire() for _ in range(slots)]
+            self.now += latency
+            for start in started:
+                limiter.release(start, overloaded)
+
+    def test_grows_while_saturated_and_healthy(self):
+        """Test additive increase of about one slot per limit requests."""
+        limiter = self.make_limiter(initial=4, maximum=8)
+        self.run_requests(limiter, 2)
+        self.assertEqual(limiter.current, 5)
+        self.run_requests(limiter, 20)
+        self.assertEqual(limiter.current, 8)
+
+    def test_does_not_grow_when_idle(self):
+        """Test that a limit that isn't reached doesn't grow."""
+        limiter = self.make_limiter(initial=4)
+        for _ in range(50):
+            limiter.release(limiter.acquire())
+        self.assertEqual(limiter.current, 4)
+
+    def test_overload_halves_once_per_burst(self):
+        """Test multiplicative decrease, once per burst of failures."""
+        limiter = self.make_limiter(initial=16)
+        started = [limiter.acquire() for _ in range(16)]
+        self.now += 0.1
+        for start in started:
+            limiter.release(start, overloaded=True)
+        self.assertEqual(limiter.current, 8)
+
+        self.now += 0.1
+        limiter.release(limiter.acquire(), overloaded=True)
+        self.assertEqual(limiter.current, 4)
+        self.assertEqual(limiter.snapshot()['decreases'], 2)
+
+    def test_never_below_minimum(self):
+        """Test that decreases stop at the minimum."""
+        limiter = self.make_limiter(initial=2, minimum=2)
+        for _ in range(5):
+            self.now += 0.1
+            limiter.release(limiter.acquire(), overloaded=True)
+        self.assertEqual(limiter.current, 2)
+
+    def test_latency_spike_stops_growth(self):
+        """Test that growth stops while p95 latency is well above its best."""
+        limiter = self.make_limiter(initial=4, maximum=64, window=20)
+        self.run_requests(limiter, 10, latency=0.1)
+        grown = limiter.current
+        self.run_requests(limiter, 10, latency=1.0)
+        self.assertLessEqual(limiter.current, grown + 1)
+        self.assertEqual(limiter.snapshot()['p95_ms'], 1000)
+
+    def test_acquire_waits_for_free_slot(self):
+        """Test that requests beyond the limit wait for a release."""
+        limiter = AdaptiveLimiter('api', initial=1)
+        first = limiter.acquire()
+        acquired = threading.Event()
+
+        def second():
+            limiter.release(limiter.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(first)
+        self.assertTrue(acquired.wait(2))
+        thread.join()
+
+    def test_invalid_limits_raise_value_error(self):
+        """Test that out-of-range settings are rejected."""
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter('api', minimum=0)
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter('api', minimum=4, maximum=2)
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter('api', decrease=1.0)
+
+    def test_converges_below_server_capacity(self):
+        """Test AIMD against a simulated server that rate limits above 12."""
+        limiter = AdaptiveLimiter('api', initial=2, maximum=64)
+        capacity = 12
+        active = [0]
+        lock = threading.Lock()
+        stop = time.monotonic() + 1.0
+        limits = []
+
+        def worker():
+            while time.monotonic() < stop:
+                start = limiter.acquire()
+                with lock:
+                    active[0] += 1
+                    overloaded = active[0] > capacity
+                time.sleep(0.002)
+                with lock:
+                    active[0] -= 1
+                limiter.release(start, overloaded)
+                limits.append(limiter.current)
+
+        threads = [threading.Thread(target=worker) for _ in range(64)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertGreater(max(limits), 2)
+        self.assertLessEqual(limiter.current, 2 * capacity)
+        self.assertGreater(limiter.snapshot()['decreases'], 0)
+
+
+class TestLimitedAdapter(unittest.TestCase):
+    """Test cases for LimitedAdapter."""
+
+    def setUp(self):
+        """Wrap a mock adapter."""
+        self.limiter = Mock()
+        self.limiter.acquire.return_value = 1.0
+        self.inner = Mock()
+        self.adapter = LimitedAdapter(self.inner, self.limiter)
+        self.request = requests.Request('GET', 'https://i.scdn.co/x').prepare()
+
+    def test_reports_status_outcomes(self):
+        """Test that 429 and 5xx count as overload and 404 doesn't."""
+        for status, overloaded in ((200, False), (404, False),
+                                   (429, True), (503, True)):
+            self.inner.send.return_value = Mock(status_code=status)
+            self.adapter.send(self.request, timeout=5)
+            self.limiter.release.assert_called_with(1.0, overloaded)
+
+    def test_reports_timeouts(self):
+        """Test that transport errors count as overload and propagate."""
+        self.inner.send.side_effect = requests.exceptions.Timeout()
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.adapter.send(self.request, timeout=5)
+        self.limiter.release.assert_called_once_with(1.0, True)
+
+    def test_retried_overload_decreases_limit(self):
+        """Test that a 429 retried into a success still counts."""
+        limiter = AdaptiveLimiter('cdn', initial=4)
+        sleeps = []
+        adapter = LimitedAdapter(self.inner, limiter,
+                                 max_retries=build_retry(3, 0.3),
+                                 sleep=sleeps.append)
+        limited = requests.Response()
+        limited.status_code = 429
+        limited.headers['Retry-After'] = '2'
+        limited.raw = Mock()
+        ok = requests.Response()
+        ok.status_code = 200
+        ok._content = b''
+        self.inner.send.side_effect = [limited, ok]
+
+        self.assertIs(adapter.send(self.request, timeout=5), ok)
+        self.assertEqual(self.inner.send.call_count, 2)
+        self.assertEqual(sleeps, [2])
+        self.assertEqual(limiter.current, 2)
+        self.assertEqual(limiter.snapshot()['overloads'], 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_transport_wraps_every_adapter(self):
+        """Test that sessions created with a limiter count every request."""
+        limiter = AdaptiveLimiter('api')
+        session = Transport().create_session(limiter=limiter)
+        for prefix in ('https://', 'http://'):
+            adapter = session.get_adapter(prefix + 'api.spotify.com/v1')
+            self.assertIsInstance(adapter, LimitedAdapter)
+            self.assertIs(adapter.limiter, limiter)
+            # The wrapped adapter must not retry behind the limiter's back
+            self.assertEqual(adapter.adapter.max_retries.total, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
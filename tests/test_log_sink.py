@@ -0,0 +1,88 @@
+"""Tests for the logging backend."""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from log_sink import LogSink
+
+
+class TestLogSink(unittest.TestCase):
+    """Test cases for LogSink class."""
+
+    def setUp(self):
+        """Set up a temporary log directory and captured console."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.temp_dir, 'run.log')
+        self.printed = []
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def read_records(self):
+        """Read JSON records from the log file."""
+        with open(self.log_file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_console_text_written_by_writer_thread(self):
+        """Test that console text is printed from the background thread."""
+        threads = []
+
+        def print_fn(text):
+            threads.append(threading.current_thread())
+            self.printed.append(text)
+
+        sink = LogSink(print_fn=print_fn)
+        sink.log(logging.INFO, "hello", text="hello!")
+        sink.flush()
+        sink.close()
+
+        self.assertEqual(self.printed, ["hello!"])
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_level_filter(self):
+        """Test that records below the level are dropped."""
+        sink = LogSink(level="warning", print_fn=self.printed.append)
+        sink.log(logging.INFO, "quiet", text="quiet")
+        sink.log(logging.ERROR, "loud", text="loud")
+        sink.close()
+
+        self.assertEqual(self.printed, ["loud"])
+
+    def test_json_records_with_fields(self):
+        """Test structured fields in the log file; file-only records."""
+        sink = LogSink(print_fn=self.printed.append, log_file=self.log_file)
+        sink.log(logging.INFO, "search", query="Abbey Road",
+                 album_id="abc", stage="search", duration=0.25)
+        sink.close()
+
+        records = self.read_records()
+        self.assertEqual(self.printed, [])
+        self.assertEqual(records[0]["message"], "search")
+        self.assertEqual(records[0]["level"], "info")
+        self.assertEqual(records[0]["query"], "Abbey Road")
+        self.assertEqual(records[0]["album_id"], "abc")
+        self.assertEqual(records[0]["duration"], 0.25)
+
+    def test_file_rotation(self):
+        """Test that the log file rotates once it exceeds max_bytes."""
+        sink = LogSink(print_fn=self.printed.append, log_file=self.log_file,
+                       max_bytes=200, backup_count=2)
+        for i in range(20):
+            sink.log(logging.INFO, f"message {i}")
+        sink.close()
+
+        self.assertTrue(os.path.exists(self.log_file + '.1'))
+        self.assertFalse(os.path.exists(self.log_file + '.3'))
+
+    def test_unknown_level_raises(self):
+        """Test that an unknown level is rejected."""
+        with self.assertRaises(ValueError):
+            LogSink(level="chatty")
+
+
+if __name__ == '__main__':
+    unittest.main()
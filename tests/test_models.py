@@ -0,0 +1,71 @@
+"""Tests for album records."""
+import sys
+import unittest
+from models import Album, ImageVariant
+
+
+class TestAlbum(unittest.TestCase):
+    """Test cases for Album class."""
+
+    data = {
+        'id': 'abc123',
+        'name': 'Greatest Hits',
+        'artists': [{'name': 'Queen'}, {'name': 'Guest'}],
+        'release_date': '1981-10-26',
+        'total_tracks': 17,
+        'album_type': 'compilation',
+        'images': [
+            {'url': 'https://x/64', 'width': 64, 'height': 64},
+            {'url': 'https://x/640', 'width': 640, 'height': 640},
+            {'url': 'https://x/300', 'width': 300, 'height': 300},
+        ],
+        'available_markets': ['GB', 'US'] * 90,
+        'external_urls': {'spotify': 'https://open.spotify.com/album/abc123'},
+    }
+
+    def test_from_spotify_keeps_used_fields(self):
+        """Test that the record holds only what the application reads."""
+        album = Album.from_spotify(self.data)
+
+        self.assertEqual(album.id, 'abc123')
+        self.assertEqual(album.name, 'Greatest Hits')
+        self.assertEqual(album.artist, 'Queen')
+        self.assertEqual(album.year, '1981')
+        self.assertEqual(album.release_date, '1981-10-26')
+        self.assertEqual(album.total_tracks, 17)
+        self.assertEqual(album.album_type, 'compilation')
+        self.assertEqual(album.provider, 'spotify')
+
+    def test_images_sorted_largest_first(self):
+        """Test that the largest image is used whatever the input order."""
+        album = Album.from_spotify(self.data)
+
+        self.assertEqual(album.image_url, 'https://x/640')
+        self.assertEqual(album.image_area, 640 * 640)
+        self.assertEqual([image.width for image in album.images], [640, 300, 64])
+
+    def test_missing_fields(self):
+        """Test that sparse responses still produce a record."""
+        album = Album.from_spotify({'name': 'Demo', 'images': None})
+
+        self.assertEqual(album.id, '')
+        self.assertEqual(album.artist, '')
+        self.assertIsNone(album.image_url)
+        self.assertEqual(album.image_area, 0)
+
+    def test_records_are_immutable_and_hashable(self):
+        """Test that records can be shared between threads and cached."""
+        album = Album('abc123', 'Greatest Hits',
+                      images=(ImageVariant('https://x/640', 640, 640),))
+        with self.assertRaises(AttributeError):
+            album.name = 'Other'
+        self.assertEqual(len({album, Album.from_spotify(self.data)}), 2)
+
+    @unittest.skipIf(sys.version_info < (3, 10), "slots need Python 3.10")
+    def test_no_instance_dict(self):
+        """Test that records use __slots__ instead of a per-instance dict."""
+        self.assertFalse(hasattr(Album('1', 'x'), '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,12 @@
 """Tests for output utilities."""
+import io
+import logging
 import unittest
-from unittest.mock import Mock
-from output import ConsoleOutput, RED, GREEN, YELLOW, RESET
+from unittest.mock import Mock, patch
+from output import (
+    ConsoleOutput, ProgressReporter, RED, GREEN, YELLOW, RESET,
+    DONE, FAILED, SKIPPED
+)
 
 
 class TestConsoleOutput(unittest.TestCase):
@@ -59,5 +64,120 @@ class TestConsoleOutput(unittest.TestCase):
         self.assertEqual(self.mock_print.call_count, 4)
 
 
+class TestConsoleOutputWithSink(unittest.TestCase):
+    """Test cases for ConsoleOutput on top of a LogSink."""
+
+    def setUp(self):
+        """Set up a mocked sink."""
+        self.sink = Mock()
+        self.output = ConsoleOutput(sink=self.sink)
+
+    def test_error_goes_through_sink_with_fields(self):
+        """Test that messages are logged with level, text and fields."""
+        self.output.error("Failed", query="q")
+        self.sink.log.assert_called_once_with(
+            logging.ERROR, "Failed", text=f"{RED}Failed{RESET}", query="q"
+        )
+
+    def test_raw_print_strips_colors_for_log(self):
+        """Test that raw console text is logged without escape codes."""
+        self.output._print(f"{RED}1. Album{RESET}")
+        self.sink.log.assert_called_once_with(
+            logging.INFO, "1. Album", text=f"{RED}1. Album{RESET}"
+        )
+
+    def test_event_is_log_only(self):
+        """Test that events carry no console text."""
+        self.output.event("download", duration=1.5)
+        self.sink.log.assert_called_once_with(
+            logging.INFO, "download", stage="download", duration=1.5
+        )
+
+    def test_prompt_flushes_sink(self):
+        """Test that pending messages are written before prompting."""
+        with patch('builtins.input', return_value="x"):
+            self.output.prompt("Album: ")
+        self.sink.flush.assert_called_once()
+
+
+class TestProgressReporter(unittest.TestCase):
+    """Test cases for ProgressReporter class."""
+
+    def setUp(self):
+        """Set up a fake clock and an in-memory stream."""
+        self.now = 100.0
+        self.stream = io.StringIO()
+
+    def make_reporter(self, **kwargs):
+        """Create a reporter using the fake clock."""
+        return ProgressReporter(stream=self.stream, clock=lambda: self.now,
+                                **kwargs)
+
+    def test_render_counts_rate_and_eta(self):
+        """Test the status line contents."""
+        reporter = self.make_reporter(
+            total=100, is_tty=False, bytes_source=lambda: 10 * 1024 * 1024
+        )
+        for outcome in (DONE,) * 7 + (FAILED, SKIPPED, SKIPPED):
+            reporter.counts[outcome] += 1
+        self.now += 5
+
+        line = reporter.render()
+
+        self.assertIn("10/100 processed: 7 done, 1 failed, 2 skipped", line)
+        self.assertIn("2.0 albums/s", line)
+        self.assertIn("2.00 MB/s", line)
+        self.assertIn("ETA 45s", line)
+
+    def test_render_shows_concurrency_limits(self):
+        """Test that adaptive concurrency limits appear on the status line."""
+        reporter = self.make_reporter(
+            is_tty=False, limits_source=lambda: {'api': 6, 'cdn': 14}
+        )
+        self.assertIn("limit api 6, cdn 14", reporter.render())
+
+    def test_tty_redraws_are_rate_limited(self):
+        """Test that a terminal is redrawn at most once per interval."""
+        reporter = self.make_reporter(total=10, is_tty=True, min_interval=1.0)
+        reporter.update(DONE)
+        reporter.update(DONE)
+        self.now += 1.0
+        reporter.update(DONE)
+
+        self.assertEqual(self.stream.getvalue().count("\r"), 2)
+        self.assertNotIn("\n", self.stream.getvalue())
+
+    def test_non_tty_writes_periodic_lines(self):
+        """Test that non-terminal output gets whole log lines."""
+        reporter = self.make_reporter(is_tty=False, log_interval=10.0)
+        reporter.update(DONE)
+        self.now += 5
+        reporter.update(FAILED)
+        self.now += 5
+        reporter.update(DONE)
+        reporter.finish()
+
+        lines = self.stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertNotIn("\r", self.stream.getvalue())
+        self.assertTrue(lines[-1].startswith("3 processed: 2 done, 1 failed"))
+
+    def test_print_keeps_status_line_below_messages(self):
+        """Test that messages are printed above the redrawn status line."""
+        reporter = self.make_reporter(is_tty=True)
+        reporter.update(DONE)
+        reporter.print("Saved cover")
+
+        text = self.stream.getvalue()
+        self.assertIn("Saved cover\n", text)
+        self.assertTrue(text.endswith(reporter.render()))
+
+    def test_format_duration(self):
+        """Test human-readable durations."""
+        self.assertEqual(ProgressReporter.format_duration(12), "12s")
+        self.assertEqual(ProgressReporter.format_duration(250), "4m10s")
+        self.assertEqual(ProgressReporter.format_duration(3720), "1h02m")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,192 @@
+"""Tests for memory and CPU profiling."""
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from io import BytesIO
+from unittest.mock import Mock, patch
+from PIL import Image
+from album_service import AlbumDownloader
+from app import AlbumArtworkApp, build_arg_parser, build_profiler, load_settings
+from config import Settings
+from profiler import Profiler, CPU_PROFILE_FILENAME, REPORT_FILENAME
+
+# Allocations kept alive by test_stage_reports_retained_allocations
+_kept = []
+
+
+def _busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+class TestProfiler(unittest.TestCase):
+    """Test cases for Profiler."""
+
+    def setUp(self):
+        """Create an output directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.profiler = Profiler(self.temp_dir, sample_every=1)
+
+    def tearDown(self):
+        """Stop profiling and clean up."""
+        self.profiler.stop()
+        _kept.clear()
+        shutil.rmtree(self.temp_dir)
+
+    def test_stage_reports_retained_allocations(self):
+        """Test that a stage that keeps memory alive is attributed."""
+        self.profiler.start()
+        with self.profiler.stage("decode"):
+            _kept.append(bytearray(512 * 1024))
+        with self.profiler.stage("save"):
+            bytearray(512 * 1024)
+
+        stats = self.profiler.stage_stats()
+        self.assertEqual(stats["decode"]["calls"], 1)
+        self.assertGreaterEqual(stats["decode"]["retained_bytes"], 512 * 1024)
+        self.assertLess(stats["save"]["retained_bytes"], 64 * 1024)
+
+    def test_sampling_skips_snapshots(self):
+        """Test that only every Nth call of a stage is measured."""
+        profiler = Profiler(self.temp_dir, sample_every=3)
+        profiler.start()
+        try:
+            for _ in range(7):
+                with profiler.stage("download"):
+                    pass
+            stats = profiler.stage_stats()["download"]
+        finally:
+            profiler.stop()
+        self.assertEqual((stats["calls"], stats["sampled"]), (7, 3))
+
+    def test_stop_writes_reports_and_merges_thread_profiles(self):
+        """Test the report, snapshot and CPU profile written on stop."""
+        self.profiler.start()
+
+        def worker():
+            with self.profiler.stage("download"):
+                _busy_work(20000)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        summary = self.profiler.stop()
+
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(summary["stages"]["download"]["calls"], 1)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.temp_dir, "snapshot-0001.tracemalloc")
+        ))
+        with open(os.path.join(self.temp_dir, REPORT_FILENAME)) as f:
+            self.assertIn("[download] 1 call(s)", f.read())
+        stats = pstats.Stats(os.path.join(self.temp_dir, CPU_PROFILE_FILENAME))
+        self.assertTrue(any(name == "_busy_work"
+                            for _, _, name in stats.stats))
+
+    def test_periodic_snapshots_are_logged(self):
+        """Test that snapshots are taken and logged every interval."""
+        profiler = Profiler(self.temp_dir, interval=0.05)
+        profiler.output = Mock()
+        profiler.start()
+        try:
+            deadline = time.monotonic() + 5
+            while profiler.snapshots < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            profiler.stop()
+        self.assertGreaterEqual(profiler.snapshots, 2)
+        stage, fields = profiler.output.event.call_args_list[0]
+        self.assertEqual(stage, ("memory",))
+        self.assertIn("current", fields)
+
+    def test_stage_without_start_is_a_no_op(self):
+        """Test that stages don't trace anything until profiling starts."""
+        with self.profiler.stage("search"):
+            pass
+        self.assertEqual(self.profiler.stage_stats(), {})
+        self.assertEqual(self.profiler.stop(), {})
+
+    def test_invalid_settings_raise_value_error(self):
+        """Test that out-of-range settings are rejected."""
+        with self.assertRaises(ValueError):
+            Profiler(self.temp_dir, interval=0)
+        with self.assertRaises(ValueError):
+            Profiler(self.temp_dir, top=0)
+
+
+class TestProfiledPipeline(unittest.TestCase):
+    """Test cases for the stages reported by the app and downloader."""
+
+    def setUp(self):
+        """Start a profiler."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.profiler = Profiler(os.path.join(self.temp_dir, "profile"))
+        self.profiler.start()
+
+    def tearDown(self):
+        """Stop profiling and clean up."""
+        self.profiler.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_downloader_reports_download_decode_and_save(self):
+        """Test the downloader's stages."""
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), 'red').save(buffer, 'JPEG')
+        session = Mock()
+        session.get.return_value = Mock(status_code=200,
+                                        content=buffer.getvalue())
+        downloader = AlbumDownloader(Mock(), session=session,
+                                     profiler=self.profiler)
+
+        self.assertTrue(downloader.download(
+            'https://i.scdn.co/image/ab', os.path.join(self.temp_dir, 'a.jpg')
+        ))
+
+        stats = self.profiler.stage_stats()
+        self.assertEqual(
+            {name: stats[name]["calls"] for name in stats},
+            {"download": 1, "decode": 1, "save": 1}
+        )
+
+    def test_app_reports_search(self):
+        """Test that provider searches are a stage."""
+        spotify = Mock()
+        spotify.search_albums.return_value = []
+        app = AlbumArtworkApp(
+            output=Mock(), credentials_manager=Mock(), spotify_client=spotify,
+            album_downloader=Mock(), artworks_dir=self.temp_dir,
+            profiler=self.profiler
+        )
+
+        app.search("Abbey Road")
+        app.search("abbey road")
+
+        self.assertEqual(self.profiler.stage_stats()["search"]["calls"], 1)
+
+
+class TestBuildProfiler(unittest.TestCase):
+    """Test cases for building the profiler from settings."""
+
+    def test_off_by_default(self):
+        """Test that profiling is opt-in."""
+        self.assertIsNone(build_profiler(Settings()))
+
+    @patch('app.time.strftime', return_value='20261019-120000')
+    def test_profile_flag(self, _):
+        """Test that --profile writes under the cache directory."""
+        args = build_arg_parser().parse_args(['--profile',
+                                              '--profile-interval', '5'])
+        settings = load_settings(args, environ={})
+        profiler = build_profiler(settings)
+        self.assertEqual(profiler.directory, os.path.join(
+            settings.cache_dir, 'profiles', '20261019-120000'
+        ))
+        self.assertEqual(profiler.interval, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,282 @@
+"""Tests for artwork providers."""
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+import requests
+from models import Album, ImageVariant
+from providers import (
+    ArtworkProvider, ProviderChain, SpotifyProvider, ITunesProvider,
+    CoverArtArchiveProvider, parse_provider_names
+)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Serves canned iTunes and MusicBrainz search responses."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == '/search':
+            body = {'results': [{
+                'collectionId': 42,
+                'collectionName': params['term'][0],
+                'artistName': 'Stub Artist',
+                'artworkUrl100': 'https://is1.example/abc/100x100bb.jpg',
+                'releaseDate': '1969-09-26T07:00:00Z',
+                'trackCount': 17,
+            }]}
+        elif url.path == '/ws/2/release-group/':
+            body = {'release-groups': [{
+                'id': 'mb-1',
+                'title': params['query'][0],
+                'artist-credit': [{'name': 'Stub Artist'}],
+                'first-release-date': '1969-09-26',
+                'primary-type': 'Album',
+            }, {
+                'id': 'mb-2',
+                'title': params['query'][0] + ' (Demos)',
+            }]}
+            self.server.user_agents.append(self.headers['User-Agent'])
+        elif url.path == '/release-group/mb-1':
+            body = {'images': [{
+                'front': False,
+                'image': 'https://caa.example/back.jpg',
+                'thumbnails': {'500': 'https://caa.example/back-500.jpg'},
+            }, {
+                'front': True,
+                'image': 'https://caa.example/front.jpg',
+                'thumbnails': {
+                    '250': 'https://caa.example/front-250.jpg',
+                    '1200': 'https://caa.example/front-1200.jpg',
+                    'small': 'https://caa.example/front-250.jpg',
+                },
+            }]}
+        elif url.path.startswith('/html/'):
+            # E.g. a captive portal or an error page from a proxy
+            payload = b'<html>Service Unavailable</html>'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpProviders(unittest.TestCase):
+    """Test providers against a local stub server."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stub server."""
+        cls.server = HTTPServer(('127.0.0.1', 0), _StubHandler)
+        cls.server.user_agents = []
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stub server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_itunes_results_are_normalized(self):
+        """Test that iTunes results become album records."""
+        provider = ITunesProvider(base_url=self.base_url)
+        albums = provider.search_albums('Abbey Road', limit=5)
+
+        self.assertEqual(len(albums), 1)
+        album = albums[0]
+        self.assertEqual(album.name, 'Abbey Road')
+        self.assertEqual(album.artist, 'Stub Artist')
+        self.assertEqual(album.year, '1969')
+        self.assertEqual(album.provider, 'itunes')
+        self.assertIn('1200x1200bb', album.image_url)
+        # Larger sizes are requested but not promised
+        self.assertEqual(album.images[0].width, 0)
+        self.assertEqual(album.images[-1],
+                         ImageVariant('https://is1.example/abc/100x100bb.jpg',
+                                      100, 100))
+
+    def test_coverartarchive_results_are_normalized(self):
+        """Test MusicBrainz results with Cover Art Archive image URLs."""
+        provider = CoverArtArchiveProvider(
+            musicbrainz_url=self.base_url, coverart_url=self.base_url
+        )
+        albums = provider.search_albums('Abbey Road')
+
+        self.assertEqual(albums[0].id, 'mbid:mb-1')
+        self.assertEqual(albums[0].artist, 'Stub Artist')
+        self.assertEqual(albums[0].images, (
+            ImageVariant('https://caa.example/front-1200.jpg', 1200, 1200),
+            ImageVariant('https://caa.example/front-250.jpg', 250, 250),
+            ImageVariant('https://caa.example/front.jpg', 0, 0),
+        ))
+        # The archive has nothing for the second release group
+        self.assertEqual(albums[1].images, ())
+        self.assertIn('AlbumArtworkDownloader', self.server.user_agents[-1])
+
+
+    def test_non_json_replies_are_request_errors(self):
+        """Test that an HTML reply counts as a provider miss."""
+        providers = (
+            ITunesProvider(base_url=self.base_url + '/html'),
+            CoverArtArchiveProvider(musicbrainz_url=self.base_url + '/html',
+                                    coverart_url=self.base_url),
+        )
+        for provider in providers:
+            with self.assertRaises(requests.exceptions.RequestException):
+                provider.search_albums('Abbey Road')
+
+        working = _FakeProvider('working', [_album('ok', 600)])
+        chain = ProviderChain([providers[0], working])
+        self.assertEqual(chain.search_albums('q')[0].name, 'ok')
+
+
+class _FakeProvider(ArtworkProvider):
+    """Provider returning canned results after a delay."""
+
+    def __init__(self, name, albums=None, delay=0.0, error=None):
+        self.name = name
+        self.albums = albums or []
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def search_albums(self, query, limit=10):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.albums
+
+
+def _album(name, size):
+    return Album(name, name,
+                 images=(ImageVariant(f'https://x/{name}', size, size),))
+
+
+class TestProviderChain(unittest.TestCase):
+    """Test cases for ProviderChain class."""
+
+    def test_fallback_stops_at_first_hit(self):
+        """Test that later providers aren't asked after a hit."""
+        first = _FakeProvider('a', [Album('none', 'No art')])
+        second = _FakeProvider('b', [_album('b', 600)])
+        third = _FakeProvider('c', [_album('c', 600)])
+
+        albums = ProviderChain([first, second, third]).search_albums('q')
+
+        self.assertEqual(albums[0].name, 'b')
+        self.assertEqual(third.calls, 0)
+
+    def test_race_takes_fastest_hit(self):
+        """Test that race mode returns the first provider to answer."""
+        slow = _FakeProvider('slow', [_album('slow', 3000)], delay=0.5)
+        fast = _FakeProvider('fast', [_album('fast', 300)])
+
+        started = time.monotonic()
+        albums = ProviderChain([slow, fast], mode='race').search_albums('q')
+
+        self.assertEqual(albums[0].name, 'fast')
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_best_takes_highest_resolution(self):
+        """Test that best mode compares image sizes across providers."""
+        small = _FakeProvider('small', [_album('small', 640)])
+        large = _FakeProvider('large', [_album('large', 1200)], delay=0.05)
+
+        albums = ProviderChain([small, large], mode='best').search_albums('q')
+
+        self.assertEqual(albums[0].name, 'large')
+
+    def test_best_credits_itunes_upscaled_sizes(self):
+        """Test that iTunes' unsized 1200/600 variants aren't ranked as 0."""
+        itunes = _FakeProvider('itunes')
+        itunes.nominal_size = ITunesProvider.nominal_size
+        itunes.albums = [ITunesProvider()._to_album({
+            'collectionId': 1, 'collectionName': 'itunes',
+            'artworkUrl100': 'https://is1.example/a/100x100bb.jpg',
+        })]
+
+        for spotify_size, winner in ((64, 'itunes'), (640, 'spotify'),
+                                     (600, 'spotify')):
+            spotify = _FakeProvider('spotify', [_album('spotify', spotify_size)])
+            albums = ProviderChain([spotify, itunes], mode='best').search_albums('q')
+            self.assertEqual(albums[0].name, winner)
+
+        # Without the upscaled variants the 100x100 original is the floor
+        itunes.albums = [Album('itunes', 'itunes', images=(
+            ImageVariant('https://is1.example/a/100x100bb.jpg', 100, 100),
+        ))]
+        spotify = _FakeProvider('spotify', [_album('spotify', 64)])
+        albums = ProviderChain([spotify, itunes], mode='best').search_albums('q')
+        self.assertEqual(albums[0].name, 'itunes')
+
+    def test_best_credits_every_known_variant(self):
+        """Test that an unsized first variant doesn't hide sized ones."""
+        archive = _FakeProvider('coverartarchive', [Album('caa', 'caa', images=(
+            ImageVariant('https://caa/front.jpg', 0, 0),
+            ImageVariant('https://caa/front-1200.jpg', 1200, 1200),
+        ))])
+        spotify = _FakeProvider('spotify', [_album('spotify', 640)])
+
+        albums = ProviderChain([spotify, archive], mode='best').search_albums('q')
+
+        self.assertEqual(albums[0].name, 'caa')
+
+    def test_without_leaves_out_named_providers(self):
+        """Test that a chain can be narrowed to the untried providers."""
+        chain = ProviderChain([_FakeProvider('a'), _FakeProvider('b')],
+                              mode='best')
+        rest = chain.without({'a'})
+        self.assertEqual([p.name for p in rest.providers], ['b'])
+        self.assertEqual(rest.mode, 'best')
+        self.assertIsNone(chain.without({'a', 'b'}))
+
+    def test_errors_are_misses_unless_all_fail(self):
+        """Test that one failing provider doesn't fail the search."""
+        broken = _FakeProvider('broken', error=RuntimeError('down'))
+        working = _FakeProvider('working', [_album('ok', 600)])
+
+        for mode in ('fallback', 'race', 'best'):
+            chain = ProviderChain([broken, working], mode=mode)
+            self.assertEqual(chain.search_albums('q')[0].name, 'ok')
+
+        with self.assertRaises(RuntimeError):
+            ProviderChain([broken], mode='race').search_albums('q')
+
+    def test_spotify_provider_passes_results_through(self):
+        """Test that Spotify results keep their provider tag."""
+        provider = SpotifyProvider(lambda query, limit: [Album('1', query)])
+        self.assertEqual(provider.search_albums('x'), [Album('1', 'x')])
+        self.assertEqual(provider.search_albums('x')[0].provider, 'spotify')
+
+    def test_parse_provider_names(self):
+        """Test parsing and validating provider lists."""
+        self.assertEqual(
+            parse_provider_names(' Spotify, itunes '), ['spotify', 'itunes']
+        )
+        with self.assertRaises(ValueError):
+            parse_provider_names('spotify,napster')
+        with self.assertRaises(ValueError):
+            ProviderChain([], mode='race')
+
+
+if __name__ == '__main__':
+    unittest.main()
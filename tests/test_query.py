@@ -0,0 +1,70 @@
+"""Tests for query normalization."""
+import unittest
+from query import parse_query, strip_edition, fold
+
+
+class TestQueryNormalization(unittest.TestCase):
+    """Test cases for query normalization functions."""
+
+    def test_equivalent_queries_share_key(self):
+        """Test that case, width and edition variants collapse."""
+        keys = {parse_query(text).key for text in (
+            "Abbey Road (Remastered 2009)",
+            "abbey road",
+            "ABBEY  ROAD [Super Deluxe Edition]",
+            "Abbey Road - 2009 Remaster",
+            "Ａｂｂｅｙ Ｒｏａｄ",
+        )}
+        self.assertEqual(keys, {"abbey road"})
+
+    def test_artist_split_is_order_independent(self):
+        """Test that 'Title - Artist' and 'Artist - Title' collapse."""
+        first = parse_query("Abbey Road - The Beatles")
+        second = parse_query("The Beatles – Abbey Road (Remastered)")
+
+        self.assertEqual(first.title, "Abbey Road")
+        self.assertEqual(first.artist, "The Beatles")
+        self.assertEqual(first.search_text, "Abbey Road The Beatles")
+        self.assertEqual(first.key, second.key)
+        self.assertNotEqual(first.key, parse_query("Abbey Road").key)
+
+    def test_strip_edition_keeps_plain_titles(self):
+        """Test that titles made only of edition words are kept."""
+        self.assertEqual(strip_edition("Stereo"), "Stereo")
+        self.assertEqual(strip_edition("Live (1975)"), "Live (1975)")
+        self.assertEqual(
+            strip_edition("Led Zeppelin IV (Deluxe Edition) [Remastered]"),
+            "Led Zeppelin IV"
+        )
+
+    def test_dash_suffix_must_be_an_edition_phrase(self):
+        """Test that only remaster and edition phrases follow a dash."""
+        for text in ("Abbey Road - 2009 Remaster", "Abbey Road - Remastered 2009",
+                     "Abbey Road - Remastered", "Abbey Road - Super Deluxe Edition",
+                     "Abbey Road - Mono Version"):
+            self.assertEqual(strip_edition(text), "Abbey Road")
+        for text in ("Pet Shop Boys - Special", "The Beatles - Mono Masters",
+                     "Artist - The Stereo Years", "Legacy - Bonus Tracks"):
+            self.assertEqual(strip_edition(text), text)
+
+    def test_edition_words_after_dash_keep_distinct_keys(self):
+        """Test that artist-named queries don't collapse onto the artist."""
+        keys = {parse_query(text).key for text in (
+            "Pet Shop Boys - Special", "The Beatles - Mono Masters",
+            "The Beatles", "Pet Shop Boys",
+        )}
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(parse_query("The Beatles - Mono Masters").title,
+                         "The Beatles")
+        self.assertEqual(parse_query("The Beatles - Mono Masters").artist,
+                         "Mono Masters")
+
+    def test_fold_removes_punctuation(self):
+        """Test case folding and punctuation handling."""
+        self.assertEqual(fold("Sgt. Pepper's Lonely Hearts"), "sgt peppers lonely hearts")
+        self.assertEqual(fold("Simon & Garfunkel"), "simon and garfunkel")
+        self.assertEqual(fold("Straße"), "strasse")
+
+
+if __name__ == '__main__':
+    unittest.main()
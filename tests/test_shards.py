@@ -0,0 +1,131 @@
+"""Tests for sharded batches and shard merging."""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from cache import NegativeCache, NOT_FOUND
+from library import ArtworkIndex
+from models import Album
+from shards import (
+    ShardJournal, parse_shard, shard_of, merge_shards, find_journals,
+    MERGED, UNCHANGED, MISSING, MISSES
+)
+
+
+class TestShardPartition(unittest.TestCase):
+    """Test cases for shard parsing and partitioning."""
+
+    def test_parse_shard(self):
+        """Test valid and invalid shard specifications."""
+        self.assertEqual(parse_shard('1/4'), (0, 4))
+        self.assertEqual(parse_shard('4/4'), (3, 4))
+        for text in ('0/4', '5/4', '1/0', '1', 'a/b', '1/2/3'):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_partition_is_stable_and_even(self):
+        """Test that keys spread evenly and always land in the same shard."""
+        keys = [f'album {i}' for i in range(4000)]
+        sizes = [0] * 4
+        for key in keys:
+            sizes[shard_of(key, 4)] += 1
+        self.assertTrue(all(800 < size < 1200 for size in sizes), sizes)
+        # Fixed value: the partition must not change between releases
+        self.assertEqual(shard_of('abbey road', 4), shard_of('abbey road', 4))
+        self.assertEqual([shard_of(key, 1) for key in keys[:10]], [0] * 10)
+
+
+class TestMergeShards(unittest.TestCase):
+    """Test cases for ShardJournal and merge_shards."""
+
+    def setUp(self):
+        """Create two shard directories and an empty combined library."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.target = os.path.join(self.temp_dir, 'artworks')
+        self.shards = [os.path.join(self.temp_dir, f'shard{i}') for i in (1, 2)]
+        self.library = ArtworkIndex(
+            os.path.join(self.temp_dir, 'index.json'), self.target
+        )
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def download(self, shard, index, name, album_id, data):
+        """Save a file in a shard and record it in the shard's journal."""
+        path = os.path.join(self.shards[shard], name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        journal = ShardJournal(self.shards[shard], index, 2)
+        journal.record_download(path, Album(album_id, name[:-4]), 'Artist')
+        journal.close()
+
+    def test_merge_copies_and_indexes(self):
+        """Test that artwork from every shard ends up indexed in one place."""
+        self.download(0, 0, 'Blue.jpg', 'blue', b'blue')
+        self.download(1, 1, os.path.join('Queen', 'Innuendo.jpg'), 'inn', b'inn')
+        journal = ShardJournal(self.shards[1], 1, 2)
+        journal.record_miss('query:nothing', NOT_FOUND)
+        journal.close()
+        cache = NegativeCache(os.path.join(self.temp_dir, 'cache.json'), ttl=60)
+
+        counts = merge_shards(self.shards, self.library, cache)
+
+        self.assertEqual(counts[MERGED], 2)
+        self.assertEqual(counts[MISSES], 1)
+        self.assertEqual(cache.get('query:nothing'), NOT_FOUND)
+        self.assertEqual(
+            self.library.find_album('inn'),
+            os.path.join(self.target, 'Queen', 'Innuendo.jpg')
+        )
+        self.assertEqual(self.library.find('Blue Artist'),
+                         os.path.join(self.target, 'Blue.jpg'))
+
+        again = merge_shards(self.shards, self.library, cache)
+        self.assertEqual(again[UNCHANGED], 2)
+
+    def test_same_path_different_album_is_disambiguated(self):
+        """Test that two albums saved under one name are both kept."""
+        self.download(0, 0, 'Greatest Hits.jpg', 'queen', b'queen')
+        self.download(1, 1, 'Greatest Hits.jpg', 'abba', b'abba')
+
+        counts = merge_shards(self.shards, self.library)
+
+        self.assertEqual(counts[MERGED], 2)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.target, 'Greatest Hits [abba].jpg')
+        ))
+
+    def test_paths_leaving_the_directories_are_skipped(self):
+        """Test that journal paths can't read or write outside the shards."""
+        self.download(0, 0, 'Blue.jpg', 'blue', b'blue')
+        outside = os.path.join(self.temp_dir, 'outside.jpg')
+        with open(outside, 'wb') as f:
+            f.write(b'secret')
+        os.symlink(outside, os.path.join(self.shards[0], 'link.jpg'))
+        journal = find_journals(self.shards[0])[0]
+        with open(journal, 'a', encoding='utf-8') as f:
+            for path in ('sub/../../outside.jpg', 'link.jpg', '.'):
+                f.write(json.dumps({'path': path, 'album_id': 'x'}) + '\n')
+
+        counts = merge_shards(self.shards[:1], self.library)
+
+        self.assertEqual(counts[MERGED], 1)
+        self.assertEqual(sorted(os.listdir(self.target)), ['Blue.jpg'])
+        self.assertIsNone(self.library.find_album('x'))
+
+    def test_missing_files_and_journals(self):
+        """Test files lost in transfer and directories without a journal."""
+        self.download(0, 0, 'Blue.jpg', 'blue', b'blue')
+        os.remove(os.path.join(self.shards[0], 'Blue.jpg'))
+        self.assertEqual(len(find_journals(self.shards[0])), 1)
+
+        self.assertEqual(merge_shards(self.shards[:1], self.library)[MISSING], 1)
+        with self.assertRaises(ValueError):
+            merge_shards([self.temp_dir], self.library)
+
+
+if __name__ == '__main__':
+    unittest.main()
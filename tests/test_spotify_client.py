@@ -1,8 +1,14 @@
 """Tests for Spotify client."""
+import json
+import threading
 import unittest
-from unittest.mock import Mock, patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import ANY, Mock, patch
 import spotipy
-from spotify_client import SpotifyClient
+from spotipy.cache_handler import MemoryCacheHandler
+from spotify_client import SpotifyClient, SpotifyClientPool
+from models import Album
+from transport import build_retry
 
 
 class TestSpotifyClient(unittest.TestCase):
@@ -20,8 +26,11 @@ class TestSpotifyClient(unittest.TestCase):
         client = SpotifyClient("id", "secret")
         mock_auth.assert_called_once_with(
             client_id="id",
-            client_secret="secret"
+            client_secret="secret",
+            cache_handler=ANY
         )
+        self.assertIsInstance(mock_auth.call_args.kwargs['cache_handler'],
+                              MemoryCacheHandler)
         mock_spotify.assert_called_once()
 
     def test_test_credentials_returns_true_on_success(self):
@@ -53,11 +62,12 @@ class TestSpotifyClient(unittest.TestCase):
 
         albums = self.client.search_albums("test query")
         self.assertEqual(len(albums), 2)
-        self.assertEqual(albums[0]['name'], 'Album 1')
+        self.assertEqual(albums[0].name, 'Album 1')
         self.client.sp.search.assert_called_once_with(
             q="test query",
             type='album',
-            limit=10
+            limit=10,
+            offset=0
         )
 
     def test_search_albums_with_custom_limit(self):
@@ -70,34 +80,117 @@ class TestSpotifyClient(unittest.TestCase):
         self.client.sp.search.assert_called_once_with(
             q="test",
             type='album',
-            limit=5
+            limit=5,
+            offset=0
         )
 
+    def test_get_album_by_id(self):
+        """Test ID lookups, with unknown IDs returning None."""
+        self.client.sp = Mock()
+        self.client.sp.album.return_value = {'id': 'abc', 'name': 'Blue'}
+        self.assertEqual(self.client.get_album('abc').name, 'Blue')
+
+        self.client.sp.album.side_effect = spotipy.exceptions.SpotifyException(
+            404, -1, "not found"
+        )
+        self.assertIsNone(self.client.get_album('missing'))
+
+    def _fake_pages(self, total):
+        """Make sp.search serve `total` numbered albums by offset/limit."""
+        catalog = [{'name': f'Album {i}'} for i in range(total)]
+
+        def search(q, type, limit, offset):
+            return {'albums': {'items': catalog[offset:offset + limit]}}
+
+        self.client.sp = Mock()
+        self.client.sp.search.side_effect = search
+
+    def test_paginated_search_fetches_until_max_results(self):
+        """Test that pages are requested with increasing offsets."""
+        self._fake_pages(100)
+
+        albums = self.client.search_albums_paginated(
+            "hits", max_results=25, page_size=10
+        )
+
+        self.assertEqual(len(albums), 25)
+        offsets = [c.kwargs['offset'] for c in self.client.sp.search.call_args_list]
+        limits = [c.kwargs['limit'] for c in self.client.sp.search.call_args_list]
+        self.assertEqual(offsets, [0, 10, 20])
+        self.assertEqual(limits, [10, 10, 5])
+
+    def test_paginated_search_stops_when_results_run_out(self):
+        """Test that a short page ends the scan."""
+        self._fake_pages(13)
+
+        albums = self.client.search_albums_paginated(
+            "hits", max_results=50, page_size=10
+        )
+
+        self.assertEqual(len(albums), 13)
+        self.assertEqual(self.client.sp.search.call_count, 2)
+
+    def test_paginated_search_stops_on_confident_hit(self):
+        """Test early termination once a confident match is found."""
+        self._fake_pages(100)
+
+        albums = self.client.search_albums_paginated(
+            "hits", max_results=50, page_size=10,
+            is_confident=lambda album: album.name == 'Album 14'
+        )
+
+        self.assertEqual(len(albums), 20)
+        self.assertEqual(self.client.sp.search.call_count, 2)
+
+    def test_paginated_search_parallel_keeps_order(self):
+        """Test that parallel page fetches are returned in result order."""
+        self._fake_pages(100)
+
+        albums = self.client.search_albums_paginated(
+            "hits", max_results=50, page_size=10, workers=5
+        )
+
+        self.assertEqual(
+            [a.name for a in albums], [f'Album {i}' for i in range(50)]
+        )
+
+    def test_paginated_search_parallel_stops_on_confident_hit(self):
+        """Test that a parallel scan truncates after the confident page."""
+        self._fake_pages(100)
+
+        albums = self.client.search_albums_paginated(
+            "hits", max_results=50, page_size=10, workers=2,
+            is_confident=lambda album: album.name == 'Album 3'
+        )
+
+        self.assertEqual(len(albums), 10)
+
     def test_get_album_image_url_returns_first_image(self):
         """Test that first image URL is returned."""
-        album = {
+        album = Album.from_spotify({
             'images': [
                 {'url': 'https://example.com/large.jpg'},
                 {'url': 'https://example.com/small.jpg'}
             ]
-        }
+        })
         url = SpotifyClient.get_album_image_url(album)
         self.assertEqual(url, 'https://example.com/large.jpg')
 
     def test_get_album_image_url_returns_none_for_no_images(self):
         """Test that None is returned when no images available."""
         self.assertIsNone(SpotifyClient.get_album_image_url(None))
-        self.assertIsNone(SpotifyClient.get_album_image_url({}))
-        self.assertIsNone(SpotifyClient.get_album_image_url({'images': []}))
+        self.assertIsNone(
+            SpotifyClient.get_album_image_url(Album.from_spotify({'images': []}))
+        )
 
     def test_get_artist_name_returns_first_artist(self):
         """Test that first artist name is returned."""
-        album = {
+        album = Album.from_spotify({
             'artists': [
                 {'name': 'Artist 1'},
                 {'name': 'Artist 2'}
             ]
-        }
+        })
         name = SpotifyClient.get_artist_name(album)
         self.assertEqual(name, 'Artist 1')
 
@@ -108,19 +201,152 @@ class TestSpotifyClient(unittest.TestCase):
             "Unknown Artist"
         )
         self.assertEqual(
-            SpotifyClient.get_artist_name({}),
-            "Unknown Artist"
-        )
-        self.assertEqual(
-            SpotifyClient.get_artist_name({'artists': []}),
+            SpotifyClient.get_artist_name(Album.from_spotify({'artists': []})),
             "Unknown Artist"
         )
 
     def test_get_artist_name_with_single_artist(self):
         """Test getting artist name with single artist."""
-        album = {'artists': [{'name': 'Solo Artist'}]}
+        album = Album.from_spotify({'artists': [{'name': 'Solo Artist'}]})
         self.assertEqual(SpotifyClient.get_artist_name(album), 'Solo Artist')
 
 
+def _rate_limited(retry_after="5"):
+    return spotipy.exceptions.SpotifyException(
+        429, -1, "rate limited", headers={"Retry-After": retry_after}
+    )
+
+
+class TestSpotifyClientPool(unittest.TestCase):
+    """Test cases for SpotifyClientPool class."""
+
+    def setUp(self):
+        """Set up pooled mock clients and a fake clock."""
+        self.now = 0.0
+        self.sleeps = []
+        self.clients = [Mock(client_id=f"id{i}-abcdef") for i in range(3)]
+        for client in self.clients:
+            client.search_albums.return_value = [{'name': client.client_id}]
+        self.pool = SpotifyClientPool(
+            self.clients, clock=lambda: self.now, sleep=self._sleep
+        )
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def test_requests_are_spread_across_credentials(self):
+        """Test that consecutive searches use different credentials."""
+        for _ in range(6):
+            self.pool.search_albums("q")
+        for client in self.clients:
+            self.assertEqual(client.search_albums.call_count, 2)
+
+    def test_fails_over_on_rate_limit(self):
+        """Test that a 429 benches the client and retries elsewhere."""
+        self.clients[0].search_albums.side_effect = _rate_limited()
+
+        result = self.pool.search_albums("q")
+
+        self.assertNotEqual(result, [{'name': 'id0-abcdef'}])
+        stats = self.pool.credential_stats()
+        self.assertEqual(stats['id0-ab...']['rate_limited'], 1)
+        self.assertTrue(stats['id0-ab...']['cooling_down'])
+        benched = self.pool.stats[id(self.clients[0])]
+        self.assertEqual(benched.rate_limited, 1)
+        self.assertEqual(benched.cooldown_until, 5.0)
+
+        # The benched client is skipped until its cooldown ends
+        for _ in range(4):
+            self.pool.search_albums("q")
+        self.assertEqual(self.clients[0].search_albums.call_count, 1)
+
+    def test_rate_limit_with_retry_after_fails_over_without_sleeping(self):
+        """Test that pooled clients leave a Retry-After 429 to the pool."""
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.headers['Authorization'] == 'Bearer limited':
+                    self.send_response(429)
+                    self.send_header('Retry-After', '30')
+                    body = b'{}'
+                else:
+                    self.send_response(200)
+                    body = json.dumps({'albums': {'items': [
+                        {'id': 'a1', 'name': 'Blue', 'images': []}
+                    ]}}).encode()
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        clients = []
+        for token in ('limited', 'ok'):
+            client = SpotifyClient(
+                token, 'secret', retries=3,
+                status_forcelist=SpotifyClientPool.CLIENT_STATUS_FORCELIST
+            )
+            client.sp.prefix = f'http://127.0.0.1:{server.server_port}/v1/'
+            client.sp.auth_manager = Mock()
+            client.sp.auth_manager.get_access_token.return_value = token
+            clients.append(client)
+        pool = SpotifyClientPool(clients, clock=lambda: self.now,
+                                 sleep=self._sleep)
+
+        with patch('urllib3.util.retry.time.sleep') as retry_sleep:
+            albums = pool.search_albums('Blue')
+
+        self.assertEqual([album.id for album in albums], ['a1'])
+        retry_sleep.assert_not_called()
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(pool.stats[id(clients[0])].cooldown_until, 30.0)
+
+    def test_client_retry_ignores_retry_after(self):
+        """Test that the pooled retry policy never retries a 429."""
+        retry = SpotifyClientPool.client_retry(build_retry(3))
+        self.assertFalse(retry.is_retry('GET', 429, has_retry_after=True))
+        self.assertTrue(retry.is_retry('GET', 503))
+
+    def test_waits_when_every_credential_is_cooling_down(self):
+        """Test that the pool sleeps until the first cooldown ends."""
+        for i, client in enumerate(self.clients):
+            self.pool.stats[id(client)].cooldown_until = 10.0 + i
+
+        self.pool.search_albums("q")
+
+        self.assertEqual(self.sleeps, [10.0])
+        self.clients[0].search_albums.assert_called_once()
+
+    def test_other_errors_are_raised(self):
+        """Test that non-429 errors are not retried."""
+        self.clients[0].search_albums.side_effect = (
+            spotipy.exceptions.SpotifyException(400, -1, "bad request")
+        )
+        with self.assertRaises(spotipy.exceptions.SpotifyException):
+            self.pool.search_albums("q")
+        self.assertEqual(self.pool.stats[id(self.clients[0])].errors, 1)
+
+    def test_test_credentials_drops_invalid_clients(self):
+        """Test that invalid credentials are removed from the pool."""
+        self.clients[1].test_credentials.return_value = False
+        self.assertTrue(self.pool.test_credentials())
+        self.assertEqual(len(self.pool), 2)
+
+    def test_paginated_search_uses_pool(self):
+        """Test that result pages are spread across credentials."""
+        for client in self.clients:
+            client.search_albums.return_value = [{}] * 10
+        self.pool.search_albums_paginated("q", max_results=30, page_size=10)
+        for client in self.clients:
+            self.assertEqual(client.search_albums.call_count, 1)
+
+
 if __name__ == '__main__':
     unittest.main()
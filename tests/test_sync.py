@@ -0,0 +1,131 @@
+"""Tests for artwork sync."""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from PIL import Image
+from sync import ArtworkSync, COPIED, UNCHANGED, DELETED, FAILED
+
+
+class TestArtworkSync(unittest.TestCase):
+    """Test cases for ArtworkSync class."""
+
+    def setUp(self):
+        """Create a source library and an empty target."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, 'artworks')
+        self.target = os.path.join(self.temp_dir, 'device')
+        os.makedirs(os.path.join(self.source, 'Queen'))
+        self.write('Blue.jpg', b'blue')
+        self.write(os.path.join('Queen', 'Greatest Hits.jpg'), b'hits')
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, relpath, data, mtime=None):
+        """Write a source file, optionally with a given mtime."""
+        path = os.path.join(self.source, relpath)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_first_sync_copies_everything(self):
+        """Test that an empty target receives every file."""
+        counts = ArtworkSync(self.source, self.target, workers=2).run()
+
+        self.assertEqual(counts[COPIED], 2)
+        self.assertEqual(counts['bytes'], 8)
+        with open(os.path.join(self.target, 'Queen', 'Greatest Hits.jpg'), 'rb') as f:
+            self.assertEqual(f.read(), b'hits')
+
+    def test_resync_copies_only_changes(self):
+        """Test that unchanged files are skipped and touched files hashed."""
+        ArtworkSync(self.source, self.target).run()
+        self.write('Blue.jpg', b'blue', mtime=1)
+        self.write('Revolver.jpg', b'revolver')
+
+        with patch('sync.shutil.copyfile', wraps=shutil.copyfile) as copyfile:
+            counts = ArtworkSync(self.source, self.target).run()
+
+        self.assertEqual(counts[COPIED], 1)
+        self.assertEqual(counts[UNCHANGED], 2)
+        copyfile.assert_called_once()
+        self.assertTrue(copyfile.call_args[0][0].endswith('Revolver.jpg'))
+
+    def test_changed_content_is_copied(self):
+        """Test that a file with new content replaces the target."""
+        ArtworkSync(self.source, self.target).run()
+        self.write('Blue.jpg', b'bluer', mtime=1)
+
+        counts = ArtworkSync(self.source, self.target).run()
+
+        self.assertEqual(counts[COPIED], 1)
+        with open(os.path.join(self.target, 'Blue.jpg'), 'rb') as f:
+            self.assertEqual(f.read(), b'bluer')
+
+    def test_delete_removes_only_synced_files(self):
+        """Test that removed sources are deleted from the target when asked."""
+        ArtworkSync(self.source, self.target).run()
+        os.remove(os.path.join(self.source, 'Blue.jpg'))
+        with open(os.path.join(self.target, 'mine.txt'), 'w') as f:
+            f.write('not synced')
+
+        kept = ArtworkSync(self.source, self.target).run()
+        self.assertEqual(kept[DELETED], 0)
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'Blue.jpg')))
+
+        counts = ArtworkSync(self.source, self.target, delete=True).run()
+        self.assertEqual(counts[DELETED], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.target, 'Blue.jpg')))
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'mine.txt')))
+
+    def test_resized_variant(self):
+        """Test that artwork can be resized for small devices."""
+        Image.new('RGB', (800, 600), 'red').save(
+            os.path.join(self.source, 'Red.png')
+        )
+        counts = ArtworkSync(self.source, self.target, max_size=300).run()
+
+        self.assertEqual(counts[FAILED], 2)  # the placeholder bytes aren't images
+        with Image.open(os.path.join(self.target, 'Red.jpg')) as img:
+            self.assertEqual(img.size, (300, 225))
+            self.assertEqual(img.format, 'JPEG')
+
+    def test_failed_copy_keeps_previous_copy(self):
+        """Test that any error counts as failed without deleting the copy."""
+        red = os.path.join(self.source, 'Red.png')
+        Image.new('RGB', (800, 600), 'red').save(red)
+        ArtworkSync(self.source, self.target, max_size=300).run()
+        Image.new('RGB', (900, 600), 'red').save(red)
+        os.utime(red, (1, 1))
+
+        with patch('sync.Image.open',
+                   side_effect=Image.DecompressionBombError('too big')):
+            counts = ArtworkSync(self.source, self.target, max_size=300,
+                                 delete=True).run()
+
+        self.assertEqual(counts[FAILED], 3)
+        self.assertEqual(counts[DELETED], 0)
+        self.assertTrue(os.path.exists(os.path.join(self.target, 'Red.jpg')))
+        self.assertIn('Red.png',
+                      ArtworkSync(self.source, self.target,
+                                  max_size=300).load_manifest())
+
+    def test_dry_run_changes_nothing(self):
+        """Test that a dry run only counts."""
+        counts = ArtworkSync(self.source, self.target).run(dry_run=True)
+        self.assertEqual(counts[COPIED], 2)
+        self.assertEqual(os.listdir(self.target), [])
+
+    def test_target_inside_source_rejected(self):
+        """Test that syncing into the library itself is refused."""
+        with self.assertRaises(ValueError):
+            ArtworkSync(self.source, os.path.join(self.source, 'sub'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,384 @@
+"""Tests for record/replay HTTP transports."""
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import Mock
+from urllib.parse import urlsplit, parse_qs
+import requests
+from models import Album
+from spotify_client import SpotifyClient
+from transport import (
+    Transport, ResponseArchive, ReplayAdapter, RecordingAdapter, Http2Adapter,
+    build_retry, request_key, SPOTIFY_TOKEN_URL
+)
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """Serves a fixed body for any GET."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('ETag', '"abc"')
+        self.end_headers()
+        self.wfile.write(b'jpeg bytes for ' + self.path.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class _H2Server:
+    """
+    Cleartext HTTP/2 server (prior knowledge) for adapter tests.
+
+    GET /<name>?size=N&delay=S answers with N bytes after S seconds,
+    each response on its own timer so slow streams don't hold up others.
+    /status/<code> answers with that status.
+    """
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(16)
+        self.url = 'http://127.0.0.1:%d' % self.sock.getsockname()[1]
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(client,),
+                             daemon=True).start()
+
+    def _serve(self, client):
+        conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False)
+        )
+        lock = threading.Lock()
+        pending = {}
+
+        def flush():
+            # Send queued bodies as far as flow control allows
+            for stream_id, body in list(pending.items()):
+                while body:
+                    window = min(conn.local_flow_control_window(stream_id),
+                                 conn.max_outbound_frame_size)
+                    if window <= 0:
+                        break
+                    conn.send_data(stream_id, body[:window])
+                    body = body[window:]
+                pending[stream_id] = body
+                if not body:
+                    conn.end_stream(stream_id)
+                    del pending[stream_id]
+            client.sendall(conn.data_to_send())
+
+        def respond(stream_id, path):
+            url = urlsplit(path)
+            query = parse_qs(url.query)
+            status = 200
+            if url.path.startswith('/status/'):
+                status = int(url.path.rsplit('/', 1)[1])
+            body = b'x' * int(query.get('size', ['16'])[0])
+            try:
+                with lock:
+                    conn.send_headers(stream_id, [
+                        (':status', str(status)),
+                        ('content-type', 'image/jpeg'),
+                        ('content-length', str(len(body))),
+                    ])
+                    pending[stream_id] = body
+                    flush()
+            except OSError:
+                pass
+
+        with lock:
+            conn.initiate_connection()
+            client.sendall(conn.data_to_send())
+        try:
+            while True:
+                data = client.recv(65536)
+                if not data:
+                    return
+                with lock:
+                    for event in conn.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            headers = dict(event.headers)
+                            path = headers[b':path'].decode()
+                            with self._lock:
+                                self.requests += 1
+                            delay = float(parse_qs(urlsplit(path).query)
+                                          .get('delay', ['0'])[0])
+                            timer = threading.Timer(
+                                delay, respond, (event.stream_id, path)
+                            )
+                            timer.daemon = True
+                            timer.start()
+                        elif isinstance(event, h2.events.DataReceived):
+                            conn.acknowledge_received_data(
+                                event.flow_controlled_length, event.stream_id
+                            )
+                    flush()
+        except Exception:
+            pass
+        finally:
+            client.close()
+
+
+def _prepared(method, url, body=None):
+    return requests.Request(method, url, data=body).prepare()
+
+
+class TestTransport(unittest.TestCase):
+    """Test cases for recording and replaying responses."""
+
+    def setUp(self):
+        """Set up a temporary archive location."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive_path = os.path.join(self.temp_dir, 'archive.jsonl.gz')
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_request_key_ignores_headers_and_hashes_body(self):
+        """Test that keys depend on method, URL and body only."""
+        a = _prepared('GET', 'https://example.com/a?x=1')
+        b = _prepared('GET', 'https://example.com/a?x=1')
+        b.headers['Authorization'] = 'Bearer other'
+        self.assertEqual(request_key(a), request_key(b))
+        self.assertNotEqual(
+            request_key(_prepared('POST', 'https://example.com/t', 'a=1')),
+            request_key(_prepared('POST', 'https://example.com/t', 'a=2'))
+        )
+
+    def test_record_then_replay_round_trip(self):
+        """Test that recorded responses replay without a server."""
+        server = HTTPServer(('127.0.0.1', 0), _ImageHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f'http://127.0.0.1:{server.server_port}/cover.jpg'
+        try:
+            recorder = Transport('record', archive_path=self.archive_path)
+            live = recorder.create_session().get(url, timeout=5)
+            recorder.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        replay = Transport('replay', archive_path=self.archive_path)
+        replayed = replay.create_session().get(url, timeout=5)
+
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed.content, live.content)
+        self.assertEqual(replayed.headers['ETag'], '"abc"')
+
+    def test_replay_missing_response_raises_connection_error(self):
+        """Test that unrecorded requests fail like a network error."""
+        adapter = ReplayAdapter(ResponseArchive(self.archive_path))
+        session = requests.Session()
+        session.mount('https://', adapter)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            session.get('https://example.com/missing')
+
+    def test_replay_injects_latency_and_errors_with_retries(self):
+        """Test that injected 503s are retried under the retry policy."""
+        archive = ResponseArchive(self.archive_path)
+        sleep = Mock()
+        adapter = ReplayAdapter(
+            archive, latency=0.1, error_rate=1.0, seed=1,
+            max_retries=build_retry(max_retries=2, backoff_factor=0), sleep=sleep
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+
+        response = session.get('https://example.com/x')
+
+        self.assertEqual(response.status_code, 503)
+        # Three attempts, each with an injected delay
+        delays = [c.args[0] for c in sleep.call_args_list if c.args[0] > 0]
+        self.assertEqual(len(delays), 3)
+        for delay in delays:
+            self.assertTrue(0.05 <= delay <= 0.15)
+
+    def test_replay_requires_existing_archive(self):
+        """Test that replay mode rejects a missing archive."""
+        with self.assertRaises(ValueError):
+            Transport('replay', archive_path=self.archive_path)
+        with self.assertRaises(ValueError):
+            Transport('bogus')
+
+    def test_recording_redacts_access_token(self):
+        """Test that recorded token responses don't keep the real token."""
+        body = json.dumps({'access_token': 'secret', 'expires_in': 3600})
+        redacted = json.loads(RecordingAdapter._redact_token(body.encode()))
+        self.assertEqual(redacted['access_token'], 'replay-token')
+        self.assertEqual(redacted['expires_in'], 3600)
+
+    def test_spotify_client_searches_from_replay(self):
+        """Test a full Spotify search served from an archive."""
+        archive = ResponseArchive(self.archive_path)
+        token = _prepared('POST', SPOTIFY_TOKEN_URL,
+                          {'grant_type': 'client_credentials'})
+        archive.put(request_key(token), 200,
+                    {'content-type': 'application/json'},
+                    json.dumps({'access_token': 'replay-token',
+                                'token_type': 'Bearer',
+                                'expires_in': 3600}).encode())
+        search = _prepared(
+            'GET', 'https://api.spotify.com/v1/search',
+        )
+        search.prepare_url(search.url, {
+            'q': 'abbey road', 'limit': 1, 'offset': 0, 'type': 'album'
+        })
+        archive.put(request_key(search), 200,
+                    {'content-type': 'application/json'},
+                    json.dumps({'albums': {'items': [
+                        {'id': 'ar', 'name': 'Abbey Road'}
+                    ]}}).encode())
+        archive.save()
+
+        transport = Transport('replay', archive_path=self.archive_path)
+        client = SpotifyClient('id', 'secret',
+                               session=transport.create_session())
+        albums = client.search_albums('abbey road', limit=1)
+
+        self.assertEqual(albums, [Album('ar', 'Abbey Road')])
+
+
+@unittest.skipIf(httpx is None, "httpx[http2] is not installed")
+class TestHttp2Adapter(unittest.TestCase):
+    """Test cases for multiplexed HTTP/2 image fetching."""
+
+    def setUp(self):
+        self.server = _H2Server()
+        self.adapter = Http2Adapter(max_streams=8, connections=1,
+                                    prior_knowledge=True)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+
+    def tearDown(self):
+        self.session.close()
+        self.server.close()
+
+    def test_fetches_over_one_connection(self):
+        """Test that concurrent requests share a connection as streams."""
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(
+                lambda i: self.session.get(
+                    f'{self.server.url}/image/{i}?size=100000', timeout=5
+                ),
+                range(16)
+            ))
+
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertEqual({len(r.content) for r in responses}, {100000})
+        self.assertEqual(responses[0].headers['Content-Type'], 'image/jpeg')
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.requests, 16)
+
+    def test_slow_response_does_not_block_others(self):
+        """Test that a slow stream doesn't hold up the ones behind it."""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            slow = executor.submit(self.session.get,
+                                   f'{self.server.url}/slow?delay=1', timeout=5)
+            time.sleep(0.05)
+            start = time.monotonic()
+            fast = self.session.get(f'{self.server.url}/fast', timeout=5)
+            elapsed = time.monotonic() - start
+
+            self.assertEqual(fast.status_code, 200)
+            self.assertLess(elapsed, 0.5)
+            self.assertEqual(slow.result().status_code, 200)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_retries_server_errors(self):
+        """Test that retryable statuses are retried with backoff."""
+        sleep = Mock()
+        adapter = Http2Adapter(max_retries=build_retry(2, 0.5),
+                               prior_knowledge=True, sleep=sleep)
+        response = adapter.send(
+            _prepared('GET', f'{self.server.url}/status/503'), timeout=5
+        )
+        adapter.close()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_unreachable_host_raises_connection_error(self):
+        """Test that transport errors surface as requests exceptions."""
+        unused = socket.socket()
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+        unused.close()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.session.get(f'http://127.0.0.1:{port}/gone', timeout=1)
+
+    def test_transport_mounts_http2_for_live_https_only(self):
+        """Test that HTTP/2 is used for live https:// requests only."""
+        live = Transport().create_session(http2_streams=50)
+        self.assertIsInstance(live.get_adapter('https://i.scdn.co/x'),
+                              Http2Adapter)
+        self.assertEqual(live.get_adapter('https://i.scdn.co/x').max_streams, 50)
+        self.assertNotIsInstance(live.get_adapter('http://localhost/x'),
+                                 Http2Adapter)
+        live.close()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            recording = Transport('record', archive_path=os.path.join(
+                temp_dir, 'a.json.gz'
+            )).create_session(http2_streams=50)
+            self.assertIsInstance(recording.get_adapter('https://i.scdn.co/x'),
+                                  RecordingAdapter)
+
+    def test_verify_cert_and_proxies_are_honoured(self):
+        """Test that TLS and proxy options pick their own client."""
+        request = _prepared('GET', 'https://i.scdn.co/x')
+        default = self.adapter._client(request, True, None, {})
+        self.assertIs(self.adapter._client(request, True, None, None), default)
+        unverified = self.adapter._client(request, False, None, {})
+        proxied = self.adapter._client(
+            request, True, None, {'https': 'http://proxy.local:3128'}
+        )
+        self.assertEqual(len({id(default), id(unverified), id(proxied)}), 3)
+        self.assertEqual(len(proxied._mounts), 1)
+
+        with self.assertRaises(requests.exceptions.SSLError):
+            self.adapter.send(request, timeout=1, verify='/nonexistent/ca.pem')
+
+    def test_invalid_limits_raise_value_error(self):
+        """Test that stream and connection limits must be positive."""
+        with self.assertRaises(ValueError):
+            Http2Adapter(max_streams=0)
+        with self.assertRaises(ValueError):
+            Http2Adapter(connections=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+"""Tests for the music folder watcher."""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from watcher import (
+    DirectoryIndex, FolderWatcher, _InotifyBackend, album_directory,
+    album_query, has_audio
+)
+
+
+def _inotify_available():
+    try:
+        _InotifyBackend(tempfile.gettempdir()).close()
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+class TestAlbumFolders(unittest.TestCase):
+    """Test cases for mapping folders to album queries."""
+
+    def test_album_query_from_path(self):
+        """Test artist folders, year prefixes and combined names."""
+        root = os.path.join(os.sep, 'music')
+        cases = {
+            ('Queen', '1981 - Greatest Hits'): 'Greatest Hits - Queen',
+            ('Queen', '(1975) A Night at the Opera'): 'A Night at the Opera - Queen',
+            ('The Beatles - Abbey Road',): 'The Beatles - Abbey Road',
+            ('Beatles', 'The Beatles - Abbey Road'): 'The Beatles - Abbey Road',
+            ('Blue',): 'Blue',
+            ('Prince', '1999'): '1999 - Prince',
+        }
+        for parts, query in cases.items():
+            self.assertEqual(album_query(os.path.join(root, *parts), root), query)
+
+    def test_disc_folders_belong_to_album(self):
+        """Test that CD1/Disc 2 folders map to their parent."""
+        root = os.path.join(os.sep, 'music')
+        album = os.path.join(root, 'Queen', 'Live')
+        self.assertEqual(album_directory(os.path.join(album, 'CD1'), root), album)
+        self.assertEqual(album_directory(os.path.join(album, 'Disc 2'), root), album)
+        self.assertIsNone(album_directory(root, root))
+
+    def test_has_audio(self):
+        """Test that only folders with audio (or disc folders) count."""
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'Live', 'CD1'))
+            open(os.path.join(root, 'Live', 'CD1', '01.flac'), 'w').close()
+            open(os.path.join(root, 'cover.jpg'), 'w').close()
+            self.assertTrue(has_audio(os.path.join(root, 'Live')))
+            self.assertFalse(has_audio(root))
+
+
+class TestDirectoryIndex(unittest.TestCase):
+    """Test cases for DirectoryIndex class."""
+
+    def setUp(self):
+        """Create a small music folder."""
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'Queen', 'Greatest Hits'))
+        os.makedirs(os.path.join(self.root, 'Blue'))
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.root)
+
+    def test_rescan_reports_only_changed_directories(self):
+        """Test that untouched directories aren't reported again."""
+        index = DirectoryIndex(self.root)
+        self.assertEqual(len(index.scan()), 4)
+        self.assertEqual(index.scan(), set())
+
+        album = os.path.join(self.root, 'Queen', 'Innuendo')
+        os.makedirs(album)
+        blue = os.path.join(self.root, 'Blue')
+        open(os.path.join(blue, '01.mp3'), 'w').close()
+        os.utime(blue, ns=(1, 1))  # coarse-timestamp filesystems
+
+        self.assertEqual(index.scan(), {os.path.join(self.root, 'Queen'), album, blue})
+
+
+class TestFolderWatcher(unittest.TestCase):
+    """Test cases for FolderWatcher class."""
+
+    def setUp(self):
+        """Create a music folder with one album."""
+        self.root = tempfile.mkdtemp()
+        self.existing = os.path.join(self.root, 'Blue')
+        os.makedirs(self.existing)
+        open(os.path.join(self.existing, '01.mp3'), 'w').close()
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.root)
+
+    def watch(self, backend, catch_up=False):
+        """Start a watcher thread and return (reported albums, stop)."""
+        reported = []
+        stop = threading.Event()
+        watcher = FolderWatcher(self.root, debounce=0.2, interval=0.05,
+                                backend=backend)
+        thread = threading.Thread(
+            target=watcher.run, args=(reported.append, stop, catch_up)
+        )
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(stop.set)
+        time.sleep(0.2)  # let the backend take its baseline
+        return reported
+
+    def import_album(self):
+        """Copy an album in track by track; return its directory."""
+        album = os.path.join(self.root, 'Queen', 'Greatest Hits', 'CD1')
+        os.makedirs(album)
+        for track in range(5):
+            open(os.path.join(album, f'{track:02}.flac'), 'w').close()
+            time.sleep(0.02)
+        return os.path.dirname(album)
+
+    def wait_for(self, reported, count, timeout=5.0):
+        """Wait until `count` albums were reported, then a little longer."""
+        deadline = time.monotonic() + timeout
+        while len(reported) < count and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.3)
+
+    def check_import_reported_once(self, backend):
+        reported = self.watch(backend)
+        album = self.import_album()
+        self.wait_for(reported, 1)
+        self.assertEqual(reported, [album])
+
+    def test_polling_debounces_an_import(self):
+        """Test that a burst of new tracks reports the album once."""
+        self.check_import_reported_once('poll')
+
+    @unittest.skipUnless(_inotify_available(), "inotify not available")
+    def test_inotify_debounces_an_import(self):
+        """Test the inotify backend reports the album once."""
+        self.check_import_reported_once('inotify')
+
+    @unittest.skipUnless(_inotify_available(), "inotify not available")
+    def test_inotify_sees_album_moved_in(self):
+        """Test that an album tree moved into the folder is reported."""
+        reported = self.watch('inotify')
+        staging = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, staging, True)
+        os.makedirs(os.path.join(staging, 'Queen', 'Innuendo'))
+        open(os.path.join(staging, 'Queen', 'Innuendo', '01.mp3'), 'w').close()
+
+        shutil.move(os.path.join(staging, 'Queen'), self.root)
+        self.wait_for(reported, 1)
+
+        self.assertEqual(reported, [os.path.join(self.root, 'Queen', 'Innuendo')])
+
+    def test_catch_up_reports_existing_albums(self):
+        """Test that albums already present are reported at startup."""
+        reported = self.watch('poll', catch_up=True)
+        self.assertEqual(reported, [self.existing])
+
+    def test_invalid_settings_raise(self):
+        """Test that bad backends and intervals raise ValueError."""
+        with self.assertRaises(ValueError):
+            FolderWatcher(self.root, backend='fsevents')
+        with self.assertRaises(ValueError):
+            FolderWatcher(self.root, interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,679 @@
+"""HTTP transports for recording and replaying network traffic."""
+import asyncio
+import base64
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import random
+import ssl
+import threading
+import time
+from typing import Optional, Dict, Any, Iterable
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from urllib3.exceptions import InvalidHeader, MaxRetryError
+from urllib3.util.retry import Retry
+
+from limiter import AdaptiveLimiter, OVERLOAD_STATUSES
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 is optional: pip install "httpx[http2]"
+    httpx = None
+
+# Transport modes
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+MODES = (LIVE, RECORD, REPLAY)
+
+TRANSPORT_ARCHIVE_FILENAME = "transport_archive.jsonl.gz"
+
+# Response headers worth keeping in an archive
+RECORDED_HEADERS = (
+    "content-type", "etag", "last-modified", "retry-after", "cache-control"
+)
+
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+# HTTP statuses worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def build_retry(max_retries: int = 3, backoff_factor: float = 0.3) -> Retry:
+    """
+    Build the retry policy shared by all HTTP sessions.
+
+    Args:
+        max_retries: Maximum retries for failed or rate-limited requests
+        backoff_factor: Exponential backoff factor between retries
+
+    Returns:
+        urllib3 Retry configuration
+    """
+    return Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False
+    )
+
+
+def check_http2(max_streams: int = 100, connections: int = 2) -> None:
+    """
+    Check that HTTP/2 can be used with the given limits.
+
+    Args:
+        max_streams: Requests in flight at once across all connections
+        connections: Connections kept per host
+
+    Raises:
+        ValueError: If httpx or h2 isn't installed, or a limit is less
+            than 1
+    """
+    if httpx is None:
+        raise ValueError('HTTP/2 needs the httpx package: pip install "httpx[http2]"')
+    if importlib.util.find_spec("h2") is None:
+        raise ValueError('HTTP/2 needs the h2 package: pip install "httpx[http2]"')
+    if max_streams < 1 or connections < 1:
+        raise ValueError("HTTP/2 streams and connections must be at least 1")
+
+
+def request_key(request: requests.PreparedRequest) -> str:
+    """
+    Build the archive key for a request.
+
+    The key is the method and full URL, plus a digest of the body for
+    requests that have one. Headers are ignored so that changing access
+    tokens don't affect lookups.
+
+    Args:
+        request: Prepared request
+
+    Returns:
+        Archive key string
+    """
+    key = f"{request.method} {request.url}"
+    body = request.body
+    if body:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        key += " " + hashlib.sha1(body).hexdigest()[:16]
+    return key
+
+
+class ResponseArchive:
+    """Gzipped JSON-lines store of recorded HTTP responses."""
+
+    def __init__(self, path: str):
+        """
+        Initialize archive, loading any existing recordings.
+
+        Args:
+            path: Archive file path
+        """
+        self.path = path
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Load recordings from disk if the archive exists."""
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records[record["key"]] = record
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._records
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a recorded response.
+
+        Args:
+            key: Request key from request_key()
+
+        Returns:
+            Record dictionary or None if not recorded
+        """
+        return self._records.get(key)
+
+    def put(self, key: str, status: int, headers: Dict[str, str],
+            body: bytes) -> None:
+        """
+        Store a response, replacing any earlier recording for the key.
+
+        Args:
+            key: Request key from request_key()
+            status: HTTP status code
+            headers: Response headers to keep
+            body: Response body
+        """
+        record = {
+            "key": key,
+            "status": status,
+            "headers": headers,
+            "body": base64.b64encode(body).decode("ascii"),
+        }
+        with self._lock:
+            self._records[key] = record
+            self._dirty = True
+
+    def records(self) -> Iterable[Dict[str, Any]]:
+        """Iterate over all recorded responses."""
+        return list(self._records.values())
+
+    def save(self) -> None:
+        """Write the archive to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            records = list(self._records.values())
+            self._dirty = False
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(temp_path, self.path)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTP adapter that stores every response it receives in an archive."""
+
+    def __init__(self, archive: ResponseArchive, **kwargs):
+        """
+        Initialize recording adapter.
+
+        Args:
+            archive: Archive to record responses into
+            **kwargs: Passed to HTTPAdapter (pool sizes, max_retries)
+        """
+        self.archive = archive
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        body = response.content
+        if request.url.startswith(SPOTIFY_TOKEN_URL) and response.ok:
+            body = self._redact_token(body)
+        headers = {
+            name: response.headers[name]
+            for name in RECORDED_HEADERS if name in response.headers
+        }
+        self.archive.put(request_key(request), response.status_code,
+                         headers, body)
+        return response
+
+    @staticmethod
+    def _redact_token(body: bytes) -> bytes:
+        """Replace the access token so archives don't hold credentials."""
+        try:
+            token = json.loads(body)
+        except ValueError:
+            return body
+        token["access_token"] = "replay-token"
+        return json.dumps(token).encode("utf-8")
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    HTTP adapter that serves responses from an archive without a network.
+
+    Latency and server errors can be injected to exercise concurrency,
+    retry and backpressure behaviour reproducibly.
+    """
+
+    def __init__(self, archive: ResponseArchive, latency: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None,
+                 max_retries: Optional[Retry] = None,
+                 sleep=time.sleep):
+        """
+        Initialize replay adapter.
+
+        Args:
+            archive: Archive to serve responses from
+            latency: Mean delay per response in seconds (uniformly
+                jittered between 0.5x and 1.5x)
+            error_rate: Fraction of responses replaced by a 503 error
+            seed: Random seed for latency jitter and injected errors
+            max_retries: Retry policy applied to injected and recorded
+                retryable statuses
+            sleep: Sleep function (for testing, default: time.sleep)
+        """
+        super().__init__()
+        self.archive = archive
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_retries = max_retries or Retry(0, read=False)
+        self.sleep = sleep
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _roll(self):
+        """Draw (delay, inject_error) for one response."""
+        with self._random_lock:
+            jitter = self._random.uniform(0.5, 1.5)
+            failed = self._random.random() < self.error_rate
+        return self.latency * jitter, failed
+
+    def _serve(self, request) -> requests.Response:
+        """Build a single response for a request."""
+        delay, failed = self._roll()
+        if delay:
+            self.sleep(delay)
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers = CaseInsensitiveDict()
+        if failed:
+            response.status_code = 503
+            response.reason = "Service Unavailable (injected)"
+            response._content = b""
+            return response
+
+        record = self.archive.get(request_key(request))
+        if record is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded response for {request.method} {request.url}",
+                request=request
+            )
+        response.status_code = record["status"]
+        response.reason = "Replayed"
+        response.headers.update(record["headers"])
+        response._content = base64.b64decode(record["body"])
+        response.encoding = "utf-8" if "json" in response.headers.get(
+            "content-type", "") else None
+        return response
+
+    def send(self, request, **kwargs):
+        retries = self.max_retries
+        while True:
+            response = self._serve(request)
+            if not retries.is_retry(request.method, response.status_code):
+                return response
+            try:
+                retries = retries.increment(request.method, request.url)
+            except MaxRetryError as e:
+                if retries.raise_on_status:
+                    raise requests.exceptions.RetryError(e, request=request)
+                return response
+            self.sleep(retries.get_backoff_time())
+
+    def close(self):
+        pass
+
+
+class Http2Adapter(BaseAdapter):
+    """
+    HTTP adapter that sends requests over multiplexed HTTP/2 connections.
+
+    Concurrent requests to one host share a few connections as separate
+    streams instead of each holding an HTTP/1.1 connection, avoiding
+    per-connection TLS handshakes and head-of-line blocking behind slow
+    responses. Requires the optional ``httpx[http2]`` package.
+
+    requests' ``verify``, ``cert`` and ``proxies`` options are honoured,
+    with one client (and connection pool) per combination used.
+
+    The connections are driven by an asyncio client on one background
+    thread; calling threads wait for their own response. (httpx's
+    synchronous HTTP/2 client lets one waiting thread hold the socket
+    while others' responses sit unread.)
+    """
+
+    def __init__(self, max_streams: int = 100, connections: int = 2,
+                 max_retries: Optional[Retry] = None,
+                 prior_knowledge: bool = False, sleep=time.sleep):
+        """
+        Initialize HTTP/2 adapter.
+
+        Args:
+            max_streams: Requests in flight at once across all connections
+            connections: Connections kept per host
+            max_retries: Retry policy for failed or rate-limited requests
+            prior_knowledge: Speak HTTP/2 to ``http://`` URLs without
+                negotiating (for local test servers)
+            sleep: Sleep function (for testing, default: time.sleep)
+
+        Raises:
+            ValueError: If httpx or h2 isn't installed, or a limit is
+                less than 1
+        """
+        check_http2(max_streams, connections)
+        super().__init__()
+        self.connections = connections
+        self.prior_knowledge = prior_knowledge
+        # One client per (verify, cert, proxy) combination requested
+        self._clients: Dict[Any, Any] = {}
+        self._clients_lock = threading.Lock()
+        self.max_streams = max_streams
+        self.max_retries = max_retries or Retry(0, read=False)
+        self.sleep = sleep
+        self._streams = threading.BoundedSemaphore(max_streams)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="http2", daemon=True
+        )
+        self._thread.start()
+
+    @staticmethod
+    def _ssl_context(verify, cert) -> ssl.SSLContext:
+        """Build the TLS configuration requests' verify and cert ask for."""
+        if isinstance(verify, str):
+            if os.path.isdir(verify):
+                context = ssl.create_default_context(capath=verify)
+            else:
+                context = ssl.create_default_context(cafile=verify)
+        else:
+            context = httpx.create_ssl_context(verify=bool(verify),
+                                               trust_env=False)
+        if cert:
+            context.load_cert_chain(*((cert,) if isinstance(cert, str) else cert))
+        return context
+
+    def _client(self, request, verify, cert, proxies):
+        """Get the client for a request's TLS and proxy settings."""
+        proxy = select_proxy(request.url, proxies or {})
+        if cert is not None and not isinstance(cert, str):
+            cert = tuple(cert)
+        key = (verify, cert, proxy)
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                # Proxies come from requests (which reads the environment)
+                client = self._clients[key] = httpx.AsyncClient(
+                    http1=not self.prior_knowledge, http2=True,
+                    verify=self._ssl_context(verify, cert), proxy=proxy,
+                    trust_env=False,
+                    limits=httpx.Limits(
+                        max_connections=self.connections,
+                        max_keepalive_connections=self.connections
+                    ),
+                    follow_redirects=False
+                )
+            return client
+
+    def _send_once(self, request, timeout, verify=True, cert=None,
+                   proxies=None) -> requests.Response:
+        """Send one attempt and convert the reply to a requests Response."""
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            client = self._client(request, verify, cert, proxies)
+        except OSError as e:
+            # Unreadable CA bundle or client certificate
+            raise requests.exceptions.SSLError(e, request=request)
+        except ValueError as e:
+            raise requests.exceptions.InvalidProxyURL(e, request=request)
+        with self._streams:
+            try:
+                reply = asyncio.run_coroutine_threadsafe(client.request(
+                    request.method, request.url,
+                    headers=dict(request.headers), content=request.body,
+                    timeout=timeout
+                ), self._loop).result()
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(e, request=request)
+            except httpx.HTTPError as e:
+                raise requests.exceptions.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = reply.status_code
+        response.reason = reply.reason_phrase
+        response.headers = CaseInsensitiveDict(reply.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.elapsed = reply.elapsed
+        response._content = reply.content
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        retries = self.max_retries
+        while True:
+            try:
+                response = self._send_once(request, timeout, verify=verify,
+                                           cert=cert, proxies=proxies)
+            except requests.exceptions.SSLError:
+                raise
+            except requests.exceptions.ConnectionError as e:
+                try:
+                    retries = retries.increment(request.method, request.url,
+                                                error=e)
+                except MaxRetryError:
+                    raise e from None
+            else:
+                if not retries.is_retry(request.method, response.status_code):
+                    return response
+                try:
+                    retries = retries.increment(request.method, request.url)
+                except MaxRetryError as e:
+                    if retries.raise_on_status:
+                        raise requests.exceptions.RetryError(e, request=request)
+                    return response
+            self.sleep(retries.get_backoff_time())
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        with self._clients_lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            asyncio.run_coroutine_threadsafe(
+                client.aclose(), self._loop
+            ).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class LimitedAdapter(BaseAdapter):
+    """
+    Wraps another adapter, holding a slot of an AdaptiveLimiter for each
+    attempt and reporting its latency and outcome back to it.
+
+    The wrapped adapter should send each request once: retries happen
+    here, so that every 429 and 5xx reaches the limiter and no slot is
+    held while backing off.
+    """
+
+    def __init__(self, adapter: BaseAdapter, limiter: AdaptiveLimiter,
+                 max_retries: Optional[Retry] = None, sleep=time.sleep):
+        """
+        Initialize limited adapter.
+
+        Args:
+            adapter: Adapter that sends the requests
+            limiter: Concurrency limit shared by the service's sessions
+            max_retries: Retry policy for failed or rate-limited requests
+            sleep: Sleep function (for testing, default: time.sleep)
+        """
+        super().__init__()
+        self.adapter = adapter
+        self.limiter = limiter
+        self.max_retries = max_retries or Retry(0, read=False)
+        self.sleep = sleep
+
+    def _send_once(self, request, **kwargs) -> requests.Response:
+        """Send one attempt while holding a limiter slot."""
+        started = self.limiter.acquire()
+        overloaded = False
+        try:
+            response = self.adapter.send(request, **kwargs)
+            overloaded = response.status_code in OVERLOAD_STATUSES
+            return response
+        except requests.exceptions.RequestException:
+            # Timeouts and refused connections
+            overloaded = True
+            raise
+        finally:
+            self.limiter.release(started, overloaded)
+
+    @staticmethod
+    def _retry_after(retries: Retry, response: requests.Response) -> Optional[float]:
+        """Seconds a response's Retry-After header asks to wait, if honoured."""
+        if not retries.respect_retry_after_header:
+            return None
+        try:
+            return retries.get_retry_after(response)
+        except InvalidHeader:
+            return None
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        retries = self.max_retries
+        while True:
+            delay = None
+            try:
+                response = self._send_once(
+                    request, stream=stream, timeout=timeout, verify=verify,
+                    cert=cert, proxies=proxies
+                )
+            except requests.exceptions.ConnectionError as e:
+                try:
+                    retries = retries.increment(request.method, request.url,
+                                                error=e)
+                except MaxRetryError:
+                    raise e from None
+            else:
+                has_retry_after = bool(response.headers.get("Retry-After"))
+                if not retries.is_retry(request.method, response.status_code,
+                                        has_retry_after):
+                    return response
+                try:
+                    retries = retries.increment(request.method, request.url)
+                except MaxRetryError as e:
+                    if retries.raise_on_status:
+                        raise requests.exceptions.RetryError(e, request=request)
+                    return response
+                delay = self._retry_after(retries, response)
+                response.close()
+            self.sleep(retries.get_backoff_time() if delay is None else delay)
+
+    def close(self):
+        self.adapter.close()
+
+
+class Transport:
+    """Creates HTTP sessions for live, recording or replay operation."""
+
+    def __init__(self, mode: str = LIVE, archive_path: Optional[str] = None,
+                 latency: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Initialize transport.
+
+        Args:
+            mode: LIVE, RECORD or REPLAY
+            archive_path: Archive file (required for RECORD and REPLAY)
+            latency: Injected mean delay per replayed response in seconds
+            error_rate: Fraction of replayed responses turned into 503s
+            seed: Random seed for replayed latency and errors
+
+        Raises:
+            ValueError: If the mode is unknown, the archive path is
+                missing, or a replay archive doesn't exist
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown transport mode: {mode}")
+        if mode != LIVE and not archive_path:
+            raise ValueError(f"Transport mode {mode} requires an archive path")
+        if mode == REPLAY and not os.path.exists(archive_path):
+            raise ValueError(f"Replay archive not found: {archive_path}")
+
+        self.mode = mode
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.archive = ResponseArchive(archive_path) if mode != LIVE else None
+
+    @property
+    def is_live(self) -> bool:
+        """Whether requests go to the network without recording."""
+        return self.mode == LIVE
+
+    def create_session(self, pool_connections: int = 10,
+                       pool_maxsize: int = 10,
+                       max_retries: Optional[Retry] = None,
+                       http2_streams: int = 0,
+                       http2_connections: int = 2,
+                       limiter: Optional[AdaptiveLimiter] = None) -> requests.Session:
+        """
+        Create an HTTP session using this transport.
+
+        Args:
+            pool_connections: Number of host connection pools to cache
+            pool_maxsize: Maximum connections kept per host
+            max_retries: Retry policy for failed or rate-limited requests
+            http2_streams: Send live ``https://`` requests over HTTP/2
+                with up to this many in flight (0 uses HTTP/1.1; ignored
+                when recording or replaying)
+            http2_connections: HTTP/2 connections kept per host
+            limiter: Adaptive concurrency limit every attempt made through
+                the session counts against (None leaves it unlimited)
+
+        Returns:
+            Configured requests Session
+
+        Raises:
+            ValueError: If HTTP/2 is requested but httpx isn't installed
+        """
+        if limiter is not None:
+            # LimitedAdapter retries, so the limiter sees every attempt
+            limited_retries, max_retries = max_retries, Retry(0, read=False)
+        if self.mode == REPLAY:
+            adapter = ReplayAdapter(
+                self.archive, latency=self.latency,
+                error_rate=self.error_rate, seed=self.seed,
+                max_retries=max_retries
+            )
+        elif self.mode == RECORD:
+            adapter = RecordingAdapter(
+                self.archive, pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize, max_retries=max_retries
+            )
+        else:
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize, max_retries=max_retries
+            )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if http2_streams and self.mode == LIVE:
+            session.mount('https://', Http2Adapter(
+                max_streams=http2_streams, connections=http2_connections,
+                max_retries=max_retries
+            ))
+        if limiter is not None:
+            for prefix, mounted in list(session.adapters.items()):
+                session.mount(prefix, LimitedAdapter(
+                    mounted, limiter, max_retries=limited_retries
+                ))
+        return session
+
+    def close(self) -> None:
+        """Persist any recorded responses."""
+        if self.mode == RECORD:
+            self.archive.save()
@@ -0,0 +1,417 @@
+"""Watch a music folder and report album directories as they change."""
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import threading
+import time
+from typing import Optional, Dict, Callable, Iterator, List, Set, Tuple
+
+AUDIO_EXTENSIONS = (
+    '.mp3', '.flac', '.m4a', '.aac', '.ogg', '.oga', '.opus', '.wav',
+    '.aif', '.aiff', '.wma', '.ape', '.wv', '.alac', '.dsf'
+)
+
+WATCH_BACKENDS = ("auto", "inotify", "poll")
+
+# "CD1", "Disc 2", "disk 03": tracks of a multi-disc album
+_DISC_FOLDER = re.compile(r"^(?:cd|disc|disk)\s*\d+$", re.IGNORECASE)
+# "1969 - Abbey Road", "(1969) Abbey Road", "1969. Abbey Road"
+_YEAR_PREFIX = re.compile(r"^[(\[]?\d{4}[)\]]?\s*(?:[-–—.]\s*)?(?=\S)")
+
+# inotify constants from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def iter_directories(root: str) -> Iterator[str]:
+    """
+    Yield a directory and every directory below it, skipping hidden ones.
+
+    Args:
+        root: Directory to walk
+
+    Returns:
+        Iterator of directory paths, parents before children
+    """
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        yield path
+        try:
+            with os.scandir(path) as entries:
+                stack.extend(
+                    entry.path for entry in entries
+                    if not entry.name.startswith('.')
+                    and entry.is_dir(follow_symlinks=False)
+                )
+        except OSError:
+            continue
+
+
+def has_audio(directory: str) -> bool:
+    """
+    Check whether a directory, or one of its disc folders, holds audio.
+
+    Args:
+        directory: Album directory
+
+    Returns:
+        True if any audio file was found
+    """
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if _DISC_FOLDER.match(entry.name) and has_audio(entry.path):
+                        return True
+                elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    return True
+    except OSError:
+        pass
+    return False
+
+
+def album_directory(path: str, root: str) -> Optional[str]:
+    """
+    Album directory a changed directory belongs to.
+
+    Disc folders ("CD1", "Disc 2") belong to their parent.
+
+    Args:
+        path: Changed directory
+        root: Watched music folder
+
+    Returns:
+        Album directory, or None for the music folder itself
+    """
+    path = os.path.normpath(path)
+    root = os.path.normpath(root)
+    if _DISC_FOLDER.match(os.path.basename(path)):
+        path = os.path.dirname(path)
+    if path == root or not path.startswith(root + os.sep):
+        return None
+    return path
+
+
+def album_query(directory: str, root: str) -> str:
+    """
+    Build a search query from an album directory's path.
+
+    "Artist/1969 - Album" becomes "Album - Artist", which parse_query
+    splits back into title and artist. Folders already named
+    "Artist - Album" are used as they are.
+
+    Args:
+        directory: Album directory
+        root: Watched music folder
+
+    Returns:
+        Query text
+    """
+    parts = os.path.relpath(directory, root).split(os.sep)
+    name = _YEAR_PREFIX.sub("", parts[-1]).strip() or parts[-1]
+    if len(parts) < 2 or re.search(r"\s[-–—]\s", name):
+        return name
+    return f"{name} - {parts[-2]}"
+
+
+class DirectoryIndex:
+    """
+    Modification-time index of a directory tree.
+
+    Adding, removing or renaming an entry changes its directory's
+    modification time, so each scan only stats every directory and lists
+    the ones whose time changed.
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize an empty index.
+
+        Args:
+            root: Directory to index
+        """
+        self.root = root
+        # directory -> (mtime in ns, subdirectories)
+        self._dirs: Dict[str, Tuple[int, List[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._dirs)
+
+    def scan(self) -> Set[str]:
+        """
+        Update the index.
+
+        Returns:
+            Directories that are new or changed since the last scan
+        """
+        changed = set()
+        dirs = {}
+        stack = [self.root]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._dirs.get(path)
+            if cached and cached[0] == mtime:
+                subdirs = cached[1]
+            else:
+                try:
+                    with os.scandir(path) as entries:
+                        subdirs = [
+                            entry.path for entry in entries
+                            if not entry.name.startswith('.')
+                            and entry.is_dir(follow_symlinks=False)
+                        ]
+                except OSError:
+                    continue
+                changed.add(path)
+            dirs[path] = (mtime, subdirs)
+            stack.extend(subdirs)
+        self._dirs = dirs
+        return changed
+
+
+class _PollingBackend:
+    """Finds changed directories by rescanning a DirectoryIndex."""
+
+    def __init__(self, root: str, interval: float):
+        self.index = DirectoryIndex(root)
+        self.index.scan()
+        self.interval = interval
+        self._next_scan = time.monotonic() + interval
+
+    def wait(self, timeout: Optional[float], stop: threading.Event) -> Set[str]:
+        delay = max(self._next_scan - time.monotonic(), 0)
+        if timeout is not None and timeout < delay:
+            stop.wait(timeout)
+            return set()
+        if stop.wait(delay):
+            return set()
+        self._next_scan = time.monotonic() + self.interval
+        return self.index.scan()
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifyBackend:
+    """Receives changed directories from Linux inotify, via ctypes."""
+
+    MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_MOVED_FROM | _IN_CREATE | _IN_ONLYDIR
+    # Longest wait between checks of the stop event
+    MAX_WAIT = 1.0
+
+    def __init__(self, root: str):
+        """
+        Watch every directory below root.
+
+        Raises:
+            OSError: If inotify isn't available or the watch limit is hit
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            self._raise()
+        self._watches: Dict[int, str] = {}
+        try:
+            for directory in iter_directories(root):
+                self._add_watch(directory)
+        except OSError:
+            self.close()
+            raise
+
+    @staticmethod
+    def _raise(path: Optional[str] = None) -> None:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), path)
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            self._raise(path)
+        self._watches[wd] = path
+
+    def _forget(self, path: str) -> None:
+        """Stop watching a directory tree that was moved away."""
+        prefix = path + os.sep
+        for wd, watched in list(self._watches.items()):
+            if watched == path or watched.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def wait(self, timeout: Optional[float], stop: threading.Event) -> Set[str]:
+        if timeout is None or timeout > self.MAX_WAIT:
+            timeout = self.MAX_WAIT
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        touched = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            start = offset + _EVENT_HEADER.size
+            name = os.fsdecode(data[start:start + length].rstrip(b'\0'))
+            offset = start + length
+
+            if mask & _IN_Q_OVERFLOW:
+                # Events were dropped; treat every directory as changed
+                touched.update(self._watches.values())
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            parent = self._watches.get(wd)
+            if parent is None:
+                continue
+            path = os.path.join(parent, name)
+            if not mask & _IN_ISDIR:
+                touched.add(parent)
+            elif mask & _IN_MOVED_FROM:
+                self._forget(path)
+            elif not name.startswith('.'):
+                # Files may have landed before the watch was added, so the
+                # whole new tree counts as changed
+                for directory in iter_directories(path):
+                    try:
+                        self._add_watch(directory)
+                    except OSError:
+                        pass
+                    touched.add(directory)
+        return touched
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class FolderWatcher:
+    """
+    Reports album directories below a music folder as they change.
+
+    Changes come from inotify where available, otherwise from polling a
+    DirectoryIndex. Bursts of changes are debounced per album directory:
+    an album is reported once nothing in it has changed for ``debounce``
+    seconds, so a folder being imported track by track is handled once,
+    after the import.
+    """
+
+    def __init__(self, root: str, debounce: float = 2.0,
+                 interval: float = 10.0, backend: str = "auto"):
+        """
+        Initialize folder watcher.
+
+        Args:
+            root: Music folder to watch
+            debounce: Seconds an album must be quiet before it is reported
+            interval: Seconds between scans when polling
+            backend: "inotify", "poll", or "auto" (inotify, falling back
+                to polling)
+
+        Raises:
+            ValueError: If the backend is unknown or a time is invalid
+        """
+        if backend not in WATCH_BACKENDS:
+            raise ValueError(f"Unknown watch backend: {backend}")
+        if debounce < 0:
+            raise ValueError("Watch debounce must be 0 or more")
+        if interval <= 0:
+            raise ValueError("Watch interval must be greater than 0")
+        self.root = root
+        self.debounce = debounce
+        self.interval = interval
+        self.backend = backend
+
+    def _open_backend(self):
+        """Start the configured change source."""
+        if self.backend != "poll":
+            try:
+                return _InotifyBackend(self.root)
+            except (OSError, AttributeError):
+                if self.backend == "inotify":
+                    raise
+        return _PollingBackend(self.root, self.interval)
+
+    def album_directories(self) -> Iterator[str]:
+        """
+        Yield every album directory currently below the music folder.
+
+        Returns:
+            Iterator of directories holding audio files
+        """
+        seen = set()
+        for directory in iter_directories(self.root):
+            album = album_directory(directory, self.root)
+            if album and album not in seen and has_audio(album):
+                seen.add(album)
+                yield album
+
+    def run(self, callback: Callable[[str], None],
+            stop: Optional[threading.Event] = None,
+            catch_up: bool = True) -> None:
+        """
+        Watch until stopped, calling back for each changed album.
+
+        Args:
+            callback: Called with each album directory that changed
+            stop: Event that ends the loop when set (default: run forever)
+            catch_up: First report every album already in the folder
+
+        Raises:
+            OSError: If the "inotify" backend was requested but can't start
+        """
+        stop = stop or threading.Event()
+        backend = self._open_backend()
+        try:
+            if catch_up:
+                for album in self.album_directories():
+                    if stop.is_set():
+                        return
+                    callback(album)
+
+            pending: Dict[str, float] = {}
+            while not stop.is_set():
+                timeout = None
+                if pending:
+                    quiet_at = min(pending.values()) + self.debounce
+                    timeout = max(quiet_at - time.monotonic(), 0)
+                touched = backend.wait(timeout, stop)
+
+                now = time.monotonic()
+                for directory in touched:
+                    album = album_directory(directory, self.root)
+                    if album:
+                        pending[album] = now
+                for album, changed_at in list(pending.items()):
+                    if now - changed_at < self.debounce:
+                        continue
+                    del pending[album]
+                    if has_audio(album):
+                        callback(album)
+        finally:
+            backend.close()